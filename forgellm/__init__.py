@@ -14,11 +14,17 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Import submodules
-from . import models
-from . import training
-from . import api
-from . import cli
+# Submodules are imported on first access, so that each entry point (model
+# server, web app, CLI) only imports what it uses
+_SUBMODULES = ("models", "training", "api", "cli")
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        import importlib
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Import key components for easier access (lazy imports to avoid circular dependencies)
 def get_training_config():
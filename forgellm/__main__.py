@@ -8,6 +8,11 @@ interface with subcommands for different functionality.
 """
 
 import sys
+
+# Started before the other imports so that they are part of the startup profile
+from .utils import startup_profile
+startup_profile.profile_startup_from_argv()
+
 import argparse
 import logging
 import subprocess
@@ -51,6 +56,7 @@ Examples:
   forgellm cli generate --model <model> # Interactive chat with a model
   forgellm server --port 5001          # Start model server only
   forgellm web --port 5002             # Start web interface only
+  forgellm server --profile-startup    # Print an import-time breakdown once the server is ready
   
   python -m forgellm start             # Alternative invocation
         """
@@ -63,6 +69,8 @@ Examples:
     start_parser.add_argument('--server-port', type=int, default=5001, help='Model server port')
     start_parser.add_argument('--web-port', type=int, default=5002, help='Web interface port')
     start_parser.add_argument('--host', default='localhost', help='Host to bind to')
+    start_parser.add_argument('--unix-socket',
+                              help='Unix domain socket the web interface uses to reach the model server')
     
     # CLI subcommand - allow unknown args to be forwarded
     cli_parser = subparsers.add_parser('cli', help='Command-line interface for model operations')
@@ -72,8 +80,29 @@ Examples:
     server_parser = subparsers.add_parser('server', help='Start the model server')
     server_parser.add_argument('--host', default='localhost', help='Host to bind to')
     server_parser.add_argument('--port', type=int, default=5001, help='Port to bind to')
+    server_parser.add_argument('--unix-socket', help='Also listen on this Unix domain socket')
+    server_parser.add_argument('--keepalive-timeout', type=float, help='Seconds an idle keep-alive connection stays open')
     server_parser.add_argument('--model', help='Model to preload')
     server_parser.add_argument('--adapter', help='Adapter to preload')
+    server_parser.add_argument('--max-concurrent', type=int, help='Generation requests decoded together in one batch')
+    server_parser.add_argument('--prefill-step-size', type=int, help='Prompt tokens prefilled per step between decode steps')
+    server_parser.add_argument('--prompt-cache-size', type=int, help='Memory budget in MB for reusing KV caches across chat turns (0 disables)')
+    server_parser.add_argument('--prefix-cache-dir', help='Directory for registered prefix caches')
+    server_parser.add_argument('--max-adapters', type=int, help='LoRA adapters per model served side by side')
+    server_parser.add_argument('--adapter-cache-size', type=int, help='Memory budget in MB for cached LoRA adapters per model')
+    server_parser.add_argument('--draft-model', help='Small model with the same tokenizer for speculative decoding')
+    server_parser.add_argument('--num-draft-tokens', type=int, help='Tokens proposed by the draft model per step')
+    server_parser.add_argument('--stream-flush-tokens', type=int, help='Tokens coalesced into one streamed /v1 event')
+    server_parser.add_argument('--stream-flush-ms', type=float, help='Milliseconds before a partial streamed /v1 event is sent')
+    server_parser.add_argument('--score-batch-tokens', type=int, help='Padded tokens per forward pass of /api/model/score')
+    server_parser.add_argument('--load-workers', type=int, help='Threads reading weight shards in parallel while loading')
+    server_parser.add_argument('--response-cache-size', type=int, help='Memory budget in MB for cached deterministic responses')
+    server_parser.add_argument('--response-cache-ttl', type=float, help='Seconds a cached response stays valid')
+    server_parser.add_argument('--response-cache-dir', help='Directory for the on-disk tier of the response cache')
+    server_parser.add_argument('--max-models', type=int, help='Maximum number of models kept resident')
+    server_parser.add_argument('--model-memory-gb', type=float, help='Memory budget in GB for resident model weights')
+    server_parser.add_argument('--queue-depth', type=int, help='Generation requests allowed to wait for a slot')
+    server_parser.add_argument('--queue-timeout', type=float, help='Seconds a request may wait for a slot')
     
     # Web subcommand
     web_parser = subparsers.add_parser('web', help='Start the web interface')
@@ -83,6 +112,7 @@ Examples:
     
     # Special handling for CLI command to preserve all arguments
     if len(sys.argv) > 1 and sys.argv[1] == 'cli':
+        startup_profile.mark('arguments parsed')
         from .cli.main import main as cli_main
         # Forward everything after 'cli' to the CLI
         cli_args = sys.argv[2:] if len(sys.argv) > 2 else ['--help']
@@ -90,6 +120,7 @@ Examples:
         return cli_main()
     
     args, unknown_args = parser.parse_known_args()
+    startup_profile.mark('arguments parsed')
     
     if not args.command:
         parser.print_help()
@@ -107,10 +138,52 @@ Examples:
                 server_args.extend(['--host', args.host])
             if args.port != 5001:
                 server_args.extend(['--port', str(args.port)])
+            if args.unix_socket:
+                server_args.extend(['--unix-socket', args.unix_socket])
+            if args.keepalive_timeout is not None:
+                server_args.extend(['--keepalive-timeout', str(args.keepalive_timeout)])
             if args.model:
                 server_args.extend(['--model', args.model])
             if args.adapter:
                 server_args.extend(['--adapter', args.adapter])
+            if args.max_concurrent is not None:
+                server_args.extend(['--max-concurrent', str(args.max_concurrent)])
+            if args.queue_depth is not None:
+                server_args.extend(['--queue-depth', str(args.queue_depth)])
+            if args.queue_timeout is not None:
+                server_args.extend(['--queue-timeout', str(args.queue_timeout)])
+            if args.prefill_step_size is not None:
+                server_args.extend(['--prefill-step-size', str(args.prefill_step_size)])
+            if args.prompt_cache_size is not None:
+                server_args.extend(['--prompt-cache-size', str(args.prompt_cache_size)])
+            if args.prefix_cache_dir:
+                server_args.extend(['--prefix-cache-dir', args.prefix_cache_dir])
+            if args.max_adapters is not None:
+                server_args.extend(['--max-adapters', str(args.max_adapters)])
+            if args.adapter_cache_size is not None:
+                server_args.extend(['--adapter-cache-size', str(args.adapter_cache_size)])
+            if args.draft_model:
+                server_args.extend(['--draft-model', args.draft_model])
+            if args.num_draft_tokens is not None:
+                server_args.extend(['--num-draft-tokens', str(args.num_draft_tokens)])
+            if args.stream_flush_tokens is not None:
+                server_args.extend(['--stream-flush-tokens', str(args.stream_flush_tokens)])
+            if args.stream_flush_ms is not None:
+                server_args.extend(['--stream-flush-ms', str(args.stream_flush_ms)])
+            if args.score_batch_tokens is not None:
+                server_args.extend(['--score-batch-tokens', str(args.score_batch_tokens)])
+            if args.load_workers is not None:
+                server_args.extend(['--load-workers', str(args.load_workers)])
+            if args.response_cache_size is not None:
+                server_args.extend(['--response-cache-size', str(args.response_cache_size)])
+            if args.response_cache_ttl is not None:
+                server_args.extend(['--response-cache-ttl', str(args.response_cache_ttl)])
+            if args.response_cache_dir:
+                server_args.extend(['--response-cache-dir', args.response_cache_dir])
+            if args.max_models is not None:
+                server_args.extend(['--max-models', str(args.max_models)])
+            if args.model_memory_gb is not None:
+                server_args.extend(['--model-memory-gb', str(args.model_memory_gb)])
             
             sys.argv = server_args
             return server_main()
@@ -154,6 +227,10 @@ def start_both_servers(args):
             '--host', args.host,
             '--port', str(args.server_port)
         ]
+        if args.unix_socket:
+            server_cmd.extend(['--unix-socket', args.unix_socket])
+        if startup_profile.enabled():
+            server_cmd.append(startup_profile.FLAG)
         
         logger.info("Starting model server...")
         server_proc = subprocess.Popen(server_cmd)
@@ -169,9 +246,16 @@ def start_both_servers(args):
             '--host', args.host,
             '--port', str(args.web_port)
         ]
+        if startup_profile.enabled():
+            web_cmd.append(startup_profile.FLAG)
+        
+        # Tell the web interface where the model server listens
+        web_env = dict(os.environ, MODEL_SERVER_HOST=args.host, MODEL_SERVER_PORT=str(args.server_port))
+        if args.unix_socket:
+            web_env['MODEL_SERVER_SOCKET'] = args.unix_socket
         
         logger.info("Starting web interface...")
-        web_proc = subprocess.Popen(web_cmd)
+        web_proc = subprocess.Popen(web_cmd, env=web_env)
         processes.append(web_proc)
         process_tracker.track_process(web_proc)
         
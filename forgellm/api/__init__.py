@@ -1,5 +1,15 @@
 """API module for ForgeLLM."""
 
-from .routes import setup_api
+_EXPORTS = {"setup_api": ".routes"}
 
-__all__ = ["setup_api"] 
\ No newline at end of file
+__all__ = ["setup_api"] 
+
+
+def __getattr__(name):
+    # Imported on first access: the submodules pull in mlx, matplotlib or Flask
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -20,6 +20,11 @@ from ..models import ModelManager, ModelPublisher, ModelQuantizer, ModelFuser
 from ..training.config import TrainingConfig
 from ..training.trainer import ContinuedPretrainer
 from ..training.process_manager import TrainingProcessManager
+from ..training.session_index import get_session_index
+from ..training.metrics_stream import get_metrics_tail
+from ..training.downsampling import METHODS as DOWNSAMPLING_METHODS, MIN_POINTS
+from ..utils.process_watch import process_watch
+from ..models.model_catalog import get_model_catalog, round_gb
 from ..training.dashboard import create_comprehensive_dashboard, identify_best_checkpoints, load_training_data, generate_web_chart_data
 from ..utils.text_stats import count_tokens_accurate
 from .. import __version__
@@ -67,74 +72,61 @@ def setup_api(app: Flask) -> Blueprint:
         fuser = ModelFuser()
         app.fuser = fuser
     
+    # Measure the model directories in the background, so that the first dropdown is quick
+    model_catalog = get_model_catalog()
+    try:
+        models_dir = os.environ.get('MODELS_DIR', 'models')
+        model_catalog.sizes.prefetch(
+            [m['full_path'] for t in ('cpt', 'ift') for m in model_catalog.local_models(models_dir, t)] +
+            [m['dir'] for m in model_catalog.hf_models()])
+    except Exception as e:
+        logger.warning(f"Error scheduling model size calculation: {e}")
+    
+    def list_local_models(model_type: str) -> List[Dict[str, Any]]:
+        """List the models of a type in MODELS_DIR with their sizes in GB."""
+        models_dir = os.environ.get('MODELS_DIR', 'models')
+        models = model_catalog.local_models(models_dir, model_type)
+        sizes = model_catalog.sizes.get_many_gb([m['full_path'] for m in models])
+        return [{
+            "name": m["name"],
+            "path": m["path"],
+            "size": round_gb(sizes[m['full_path']])  # None while the size is being measured
+        } for m in models]
+    
+    def chart_options(params) -> Dict[str, Any]:
+        """
+        Read the chart downsampling options of a request.
+
+        Args:
+            params: Query arguments or JSON body with optional 'max_points',
+                'method' ('auto', 'lttb' or 'minmax'), 'x_min' and 'x_max'
+
+        Returns:
+            Keyword arguments for generate_web_chart_data
+
+        Raises:
+            ValueError: If an option is invalid
+        """
+        options = {}
+        if params.get('max_points') not in (None, ''):
+            options['max_points'] = int(params['max_points'])
+            if options['max_points'] < MIN_POINTS:
+                raise ValueError(f"max_points must be at least {MIN_POINTS}")
+        method = params.get('method') or 'auto'
+        if method != 'auto' and method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"Unknown downsampling method '{method}'")
+        options['method'] = method
+        x_min, x_max = params.get('x_min'), params.get('x_max')
+        if x_min not in (None, '') or x_max not in (None, ''):
+            options['x_range'] = (float(x_min) if x_min not in (None, '') else None,
+                                  float(x_max) if x_max not in (None, '') else None)
+        return options
+    
     @bp.route('/cpt_models', methods=['GET'])
     def get_cpt_models():
         """Get CPT models."""
         try:
-            # Get models directory from environment or use default
-            models_dir = os.environ.get('MODELS_DIR', 'models')
-            cpt_dir = os.path.join(models_dir, 'cpt')
-            
-            # Check if the directory exists
-            if not os.path.exists(cpt_dir):
-                return jsonify({"models": []})
-            
-            # Get list of CPT models
-            cpt_models = []
-            for model_path in glob.glob(os.path.join(cpt_dir, '*')):
-                if os.path.isdir(model_path):
-                    model_name = os.path.basename(model_path)
-                    
-                    # Calculate model size using du command for accurate directory size
-                    try:
-                        # Use subprocess to run du command for accurate directory size with human-readable format
-                        result = subprocess.run(
-                            ['du', '-sh', model_path],  # -sh gives human-readable size
-                            capture_output=True, 
-                            text=True, 
-                            check=False
-                        )
-                        if result.returncode == 0:
-                            # Parse the output to get size with unit (e.g., "9.3G")
-                            size_str = result.stdout.strip().split()[0]
-                            
-                            # Extract numeric part and unit
-                            match = re.match(r'([0-9.]+)([KMGTP])', size_str)
-                            if match:
-                                size_num = float(match.group(1))
-                                unit = match.group(2)
-                                
-                                # Convert to GB based on unit
-                                if unit == 'K':
-                                    size_gb = size_num / (1024 * 1024)
-                                elif unit == 'M':
-                                    size_gb = size_num / 1024
-                                elif unit == 'G':
-                                    size_gb = size_num
-                                elif unit == 'T':
-                                    size_gb = size_num * 1024
-                                elif unit == 'P':
-                                    size_gb = size_num * 1024 * 1024
-                                else:
-                                    size_gb = 0
-                            else:
-                                size_gb = 0
-                        else:
-                            # Fallback to a simple directory walk if du fails
-                            size_gb = sum(os.path.getsize(os.path.join(dirpath, filename)) 
-                                    for dirpath, dirnames, filenames in os.walk(model_path) 
-                                    for filename in filenames if os.path.isfile(os.path.join(dirpath, filename))) / (1024**3)
-                    except Exception as e:
-                        logger.warning(f"Error calculating size for {model_name}: {e}")
-                        size_gb = 0
-                    
-                    cpt_models.append({
-                        "name": model_name,
-                        "path": os.path.join('cpt', model_name),
-                        "size": round(size_gb, 2)  # Round to 2 decimal places
-                    })
-            
-            return jsonify({"models": cpt_models})
+            return jsonify({"models": list_local_models('cpt')})
         except Exception as e:
             logger.error(f"Error getting CPT models: {e}")
             return jsonify({"error": str(e)}), 500
@@ -143,70 +135,7 @@ def setup_api(app: Flask) -> Blueprint:
     def get_ift_models():
         """Get IFT models."""
         try:
-            # Get models directory from environment or use default
-            models_dir = os.environ.get('MODELS_DIR', 'models')
-            ift_dir = os.path.join(models_dir, 'ift')
-            
-            # Check if the directory exists
-            if not os.path.exists(ift_dir):
-                return jsonify({"models": []})
-            
-            # Get list of IFT models
-            ift_models = []
-            for model_path in glob.glob(os.path.join(ift_dir, '*')):
-                if os.path.isdir(model_path):
-                    model_name = os.path.basename(model_path)
-                    
-                    # Calculate model size using du command for accurate directory size
-                    try:
-                        # Use subprocess to run du command for accurate directory size with human-readable format
-                        result = subprocess.run(
-                            ['du', '-sh', model_path],  # -sh gives human-readable size
-                            capture_output=True, 
-                            text=True, 
-                            check=False
-                        )
-                        if result.returncode == 0:
-                            # Parse the output to get size with unit (e.g., "9.3G")
-                            size_str = result.stdout.strip().split()[0]
-                            
-                            # Extract numeric part and unit
-                            match = re.match(r'([0-9.]+)([KMGTP])', size_str)
-                            if match:
-                                size_num = float(match.group(1))
-                                unit = match.group(2)
-                                
-                                # Convert to GB based on unit
-                                if unit == 'K':
-                                    size_gb = size_num / (1024 * 1024)
-                                elif unit == 'M':
-                                    size_gb = size_num / 1024
-                                elif unit == 'G':
-                                    size_gb = size_num
-                                elif unit == 'T':
-                                    size_gb = size_num * 1024
-                                elif unit == 'P':
-                                    size_gb = size_num * 1024 * 1024
-                                else:
-                                    size_gb = 0
-                            else:
-                                size_gb = 0
-                        else:
-                            # Fallback to a simple directory walk if du fails
-                            size_gb = sum(os.path.getsize(os.path.join(dirpath, filename)) 
-                                    for dirpath, dirnames, filenames in os.walk(model_path) 
-                                    for filename in filenames if os.path.isfile(os.path.join(dirpath, filename))) / (1024**3)
-                    except Exception as e:
-                        logger.warning(f"Error calculating size for {model_name}: {e}")
-                        size_gb = 0
-                    
-                    ift_models.append({
-                        "name": model_name,
-                        "path": os.path.join('ift', model_name),
-                        "size": round(size_gb, 2)  # Round to 2 decimal places
-                    })
-            
-            return jsonify({"models": ift_models})
+            return jsonify({"models": list_local_models('ift')})
         except Exception as e:
             logger.error(f"Error getting IFT models: {e}")
             return jsonify({"error": str(e)}), 500
@@ -215,73 +144,14 @@ def setup_api(app: Flask) -> Blueprint:
     def get_base_models():
         """Get base models."""
         try:
-            # Define a list of common base models
-            base_models = []
-            
-            # Check HuggingFace cache for available models
-            hf_cache_base = os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface'))
-            cache_path = Path(hf_cache_base) / 'hub'
-            if cache_path.exists():
-                # Look for models in the cache
-                model_dirs = list(cache_path.glob('models--*'))
-                for model_dir in model_dirs:
-                    try:
-                        # Extract model name from directory name
-                        if model_dir.name.startswith('published--'):
-                            # Handle published models - extract the actual model name
-                            model_name = model_dir.name.replace('published--', '')
-                        else:
-                            # Handle regular cached models
-                            model_name = model_dir.name.replace('models--', '').replace('--', '/')
-                        
-                        # Calculate model size using du command for accurate directory size
-                        try:
-                            # Use subprocess to run du command for accurate directory size with human-readable format
-                            result = subprocess.run(
-                                ['du', '-sh', str(model_dir)],  # -sh gives human-readable size
-                                capture_output=True, 
-                                text=True, 
-                                check=False
-                            )
-                            if result.returncode == 0:
-                                # Parse the output to get size with unit (e.g., "9.3G")
-                                size_str = result.stdout.strip().split()[0]
-                                
-                                # Extract numeric part and unit
-                                match = re.match(r'([0-9.]+)([KMGTP])', size_str)
-                                if match:
-                                    size_num = float(match.group(1))
-                                    unit = match.group(2)
-                                    
-                                    # Convert to GB based on unit
-                                    if unit == 'K':
-                                        size_gb = size_num / (1024 * 1024)
-                                    elif unit == 'M':
-                                        size_gb = size_num / 1024
-                                    elif unit == 'G':
-                                        size_gb = size_num
-                                    elif unit == 'T':
-                                        size_gb = size_num * 1024
-                                    elif unit == 'P':
-                                        size_gb = size_num * 1024 * 1024
-                                    else:
-                                        size_gb = 0
-                                else:
-                                    size_gb = 0
-                            else:
-                                # Fallback to a simple directory walk if du fails
-                                size_gb = sum(f.stat().st_size for f in model_dir.glob('**/*') if f.is_file()) / (1024**3)
-                        except Exception as e:
-                            logger.warning(f"Error calculating size for {model_name}: {e}")
-                            size_gb = 0
-                        
-                        base_models.append({
-                            "name": model_name,
-                            "path": str(model_dir),
-                            "size": round(size_gb, 2)  # Round to 2 decimal places
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error processing model directory {model_dir}: {e}")
+            # Models in the HuggingFace cache
+            models = model_catalog.hf_models()
+            sizes = model_catalog.sizes.get_many_gb([m['dir'] for m in models])
+            base_models = [{
+                "name": m["name"],
+                "path": m["dir"],
+                "size": round_gb(sizes[m['dir']])  # None while the size is being measured
+            } for m in models]
             
             return jsonify({"models": base_models})
         except Exception as e:
@@ -405,54 +275,11 @@ def setup_api(app: Flask) -> Blueprint:
                     'error': 'Missing model_name (could not auto-detect from adapter)'
                 }), 400
             
-            # Handle specific checkpoint files - if it's a specific checkpoint, ensure adapters.safetensors exists
+            # Specific checkpoint files (e.g. 0000175_adapters.safetensors) are passed
+            # through as-is: the model server applies the selected checkpoint in place
             final_adapter_path = adapter_path
-            
             if adapter_path and adapter_path.endswith('.safetensors'):
-                adapter_dir = adapter_path.rsplit('/', 1)[0]
-                adapter_filename = adapter_path.rsplit('/', 1)[1]
-                
-                # Check if this is a specific checkpoint file (pattern: 0000175_adapters.safetensors)
-                import re
-                if re.match(r'^\d+_adapters\.safetensors$', adapter_filename):
-                    logger.info(f"🎯 Detected specific checkpoint file: {adapter_filename}")
-                    
-                    expected_adapter_path = os.path.join(adapter_dir, 'adapters.safetensors')
-                    
-                    # ALWAYS remove existing adapters.safetensors and recreate it
-                    # This ensures we're always loading the specific checkpoint selected
-                    if os.path.exists(expected_adapter_path) or os.path.islink(expected_adapter_path):
-                        logger.info(f"🔄 Removing existing adapters.safetensors to update checkpoint")
-                        os.remove(expected_adapter_path)
-                    
-                    # Create a symlink to the specific checkpoint
-                    try:
-                        # Use absolute paths for the symlink
-                        abs_adapter_path = os.path.abspath(adapter_path)
-                        abs_expected_path = os.path.abspath(expected_adapter_path)
-                        
-                        os.symlink(abs_adapter_path, abs_expected_path)
-                        logger.info(f"✅ Created symlink: {abs_expected_path} -> {abs_adapter_path}")
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to create symlink, trying copy: {e}")
-                        try:
-                            # Fallback: copy the file
-                            shutil.copy2(adapter_path, expected_adapter_path)
-                            logger.info(f"✅ Copied checkpoint file: {adapter_path} -> {expected_adapter_path}")
-                        except Exception as copy_error:
-                            logger.error(f"❌ Failed to copy checkpoint file: {copy_error}")
-                            return jsonify({
-                                'success': False,
-                                'error': f'Failed to prepare checkpoint file: {copy_error}'
-                            }), 500
-                    
-                    # Always use the directory for MLX-LM
-                    final_adapter_path = adapter_dir
-                else:
-                    # Regular adapter file, use directory
-                    final_adapter_path = adapter_dir
-                    logger.info(f"📂 Using adapter directory for MLX-LM: {final_adapter_path}")
+                logger.info(f"🎯 Using checkpoint file: {os.path.basename(adapter_path)}")
             
             # Start loading the model
             load_started = model_manager.load(model_name, final_adapter_path)
@@ -463,51 +290,18 @@ def setup_api(app: Flask) -> Blueprint:
                     'error': f'Failed to start loading model: {model_manager.error}'
                 }), 500
             
-            # Wait for the model to actually load (with timeout)
-            max_wait_time = 60  # 60 seconds timeout
-            poll_interval = 0.5  # Poll every 500ms
-            start_time = time.time()
-            
-            while time.time() - start_time < max_wait_time:
-                status = model_manager.get_status()
-                elapsed = round(time.time() - start_time, 2)
-                logger.info(f"🔄 Polling status at {elapsed}s: {status}")
-                
-                if status.get('loaded'):
-                    # Model successfully loaded
-                    logger.info(f"✅ Model loaded after {elapsed}s")
-                    return jsonify({
-                        'success': True,
-                        'message': f'Model {model_name} loaded successfully',
-                        'model_name': model_name,
-                        'adapter_path': final_adapter_path,
-                        'original_adapter_selection': adapter_path,
-                        'loading_time': elapsed
-                    })
-                elif status.get('error'):
-                    # Loading failed with error
-                    logger.error(f"❌ Model loading failed after {elapsed}s: {status.get('error')}")
-                    return jsonify({
-                        'success': False,
-                        'error': f'Model loading failed: {status.get("error")}'
-                    }), 500
-                elif not status.get('is_loading', True):
-                    # Not loading anymore but not loaded either
-                    logger.error(f"❌ Model loading stopped unexpectedly after {elapsed}s")
-                    return jsonify({
-                        'success': False,
-                        'error': 'Model loading stopped unexpectedly'
-                    }), 500
-                
-                # Still loading, wait and check again
-                logger.info(f"⏳ Still loading at {elapsed}s, waiting...")
-                time.sleep(poll_interval)
-            
-            # Timeout reached
+            # Do not hold a worker for the whole load: clients follow bytes
+            # loaded, shards and ETA through /api/model/status
+            loading = model_manager.loading
             return jsonify({
-                'success': False,
-                'error': f'Model loading timed out after {max_wait_time} seconds'
-            }), 500
+                'success': True,
+                'message': f'Model {model_name} {"loading started" if loading else "loaded successfully"}',
+                'model_name': model_name,
+                'adapter_path': final_adapter_path,
+                'original_adapter_selection': adapter_path,
+                'loading': loading,
+                'loaded': model_manager.loaded
+            })
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             return jsonify({
@@ -515,11 +309,18 @@ def setup_api(app: Flask) -> Blueprint:
                 'error': str(e)
             }), 500
     
+    @bp.route('/model/load/cancel', methods=['POST'])
+    def cancel_load():
+        """Cancel the model load in progress."""
+        result, status_code = model_manager.cancel_load()
+        return jsonify(result), status_code
+    
     @bp.route('/model/unload', methods=['POST'])
     def unload_model():
-        """Unload the model."""
+        """Unload one resident model, or all of them when none is named."""
         try:
-            success = model_manager.unload()
+            data = request.get_json(silent=True) or {}
+            success = model_manager.unload(data.get('model_name'), data.get('adapter_path'))
             
             if success:
                 return jsonify({
@@ -538,6 +339,19 @@ def setup_api(app: Flask) -> Blueprint:
                 'error': str(e)
             }), 500
     
+    @bp.route('/model/score', methods=['POST'])
+    def score_texts():
+        """Score texts or prompt/continuation pairs (log-probs, NLL, perplexity)."""
+        data = request.get_json(silent=True) or {}
+        result, status_code = model_manager.score(data)
+        return jsonify(result), status_code
+    
+    @bp.route('/model/cancel/<request_id>', methods=['POST'])
+    def cancel_generation(request_id):
+        """Cancel a running generation request."""
+        result, status_code = model_manager.cancel_generation(request_id)
+        return jsonify(result), status_code
+    
     @bp.route('/model/generate', methods=['POST'])
     def generate_text():
         """Generate text from the model."""
@@ -556,6 +370,10 @@ def setup_api(app: Flask) -> Blueprint:
             system_prompt = data.get('system_prompt', '')  # Legacy support
             streaming = data.get('streaming', False)
             is_base_model = data.get('is_base_model', None)  # New parameter
+            session_id = data.get('session_id')  # Conversation id for prompt cache reuse
+            model_name = data.get('model_name')  # Resident model to use instead of the active one
+            adapter_path = data.get('adapter_path')  # LoRA adapter for this request only
+            stop = data.get('stop')  # Sequences that end the generation
             
             if not prompt:
                 return jsonify({
@@ -565,7 +383,15 @@ def setup_api(app: Flask) -> Blueprint:
             
             # Check if model is loaded
             status = model_manager.get_status()
-            if not status.get('loaded'):
+            if model_name:
+                resident = any(m.get('model_name') == model_name for m in status.get('resident_models', []))
+                if not resident:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Model {model_name} is not loaded',
+                        'resident_models': status.get('resident_models', [])
+                    }), 404
+            elif not status.get('loaded'):
                 return jsonify({
                     'success': False,
                     'error': 'No model loaded'
@@ -574,10 +400,9 @@ def setup_api(app: Flask) -> Blueprint:
             if streaming:
                 # Handle streaming by forwarding to model manager's streaming endpoint
                 try:
-                    # Forward the streaming request to the model manager
-                    import requests
-                    response = requests.post(
-                        f"http://{model_manager.server_host}:{model_manager.server_port}/api/model/generate",
+                    # Forward the streaming request over the model manager's pooled connection
+                    response = model_manager.client.post(
+                        "/api/model/generate",
                         json={
                             'prompt': prompt,
                             'max_tokens': max_tokens,
@@ -589,18 +414,50 @@ def setup_api(app: Flask) -> Blueprint:
                             'seed': seed,
                             'system_prompt': system_prompt,
                             'streaming': True,
-                            'is_base_model': is_base_model
+                            'is_base_model': is_base_model,
+                            'session_id': session_id,
+                            'model_name': model_name,
+                            'adapter_path': adapter_path,
+                            'stop': stop
                         },
                         stream=True
                     )
                     
+                    # Surface queue rejections (429/503) to the browser instead of streaming an error body
+                    if response.status_code != 200:
+                        try:
+                            error_data = response.json()
+                        except ValueError:
+                            error_data = {'success': False, 'error': f'HTTP error {response.status_code}'}
+                        proxied = jsonify(error_data)
+                        proxied.status_code = response.status_code
+                        if 'Retry-After' in response.headers:
+                            proxied.headers['Retry-After'] = response.headers['Retry-After']
+                        return proxied
+                    
                     # Forward the streaming response
+                    # Pass bytes on as soon as they arrive: iter_content(chunk_size=n)
+                    # waits for n bytes, which holds small chunks back
                     def generate():
-                        for chunk in response.iter_content(chunk_size=1024):
-                            if chunk:
+                        try:
+                            read1 = getattr(response.raw, 'read1', None)
+                            if read1 is None:
+                                yield from response.iter_content(chunk_size=None)
+                                return
+                            while True:
+                                chunk = read1(65536)
+                                if not chunk:
+                                    break
                                 yield chunk
+                        finally:
+                            # Closing the upstream connection when the browser goes
+                            # away makes the model server cancel the generation
+                            response.close()
                     
-                    return Response(generate(), mimetype='text/plain')
+                    proxied = Response(generate(), mimetype='text/plain')
+                    if 'X-Request-Id' in response.headers:
+                        proxied.headers['X-Request-Id'] = response.headers['X-Request-Id']
+                    return proxied
                 except Exception as e:
                     logger.error(f"Error forwarding streaming request: {e}")
                     return jsonify({
@@ -620,13 +477,19 @@ def setup_api(app: Flask) -> Blueprint:
                     'max_kv_size': max_kv_size,
                     'seed': seed,
                     'system_prompt': system_prompt,  # Legacy support
-                    'is_base_model': is_base_model  # New parameter
+                    'is_base_model': is_base_model,  # New parameter
+                    'session_id': session_id,
+                    'model_name': model_name,
+                    'adapter_path': adapter_path,
+                    'stop': stop
                 })
                 end_time = time.time()
                 
-                # Calculate tokens per second if we have token information
+                # Calculate tokens per second if we have token information (not for cached responses,
+                # which were not decoded)
                 tokens_per_sec = None
-                if isinstance(response, dict) and 'completion_tokens' in response and 'generation_time' in response:
+                if isinstance(response, dict) and not response.get('cached') and \
+                        'completion_tokens' in response and 'generation_time' in response:
                     completion_tokens = response.get('completion_tokens', 0)
                     gen_time = response.get('generation_time', 0)
                     if gen_time > 0 and completion_tokens > 0:
@@ -649,6 +512,8 @@ def setup_api(app: Flask) -> Blueprint:
                         result['total_tokens'] = response['total_tokens']
                     if tokens_per_sec is not None:
                         result['tokens_per_sec'] = round(tokens_per_sec, 1)
+                    if response.get('cached'):
+                        result['cached'] = True
                 
                 return jsonify(result)
         except Exception as e:
@@ -678,33 +543,19 @@ def setup_api(app: Flask) -> Blueprint:
         """Get real-time dashboard data with direct, efficient logic."""
         try:
             # Simple, direct approach - no background monitoring needed
-            import psutil
-            import glob
             import json
             import os
             import time
             from pathlib import Path
             from datetime import datetime
             
-            # 1. Check if MLX training is actually running (lightweight check)
-            mlx_running = False
-            active_training_file = None
-            
             try:
-                for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                    try:
-                        if proc.info['cmdline']:
-                            cmdline = ' '.join(proc.info['cmdline'])
-                            if any(pattern in cmdline for pattern in [
-                                'mlx_lm.lora', 'mlx_lm.fuse', 'mlx-lm', 'python -m mlx_lm'
-                            ]):
-                                mlx_running = True
-                                logger.info(f"Active MLX training detected: PID {proc.info['pid']}")
-                                break
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-            except Exception as e:
-                logger.warning(f"Error checking MLX processes: {e}")
+                options = chart_options(request.args)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            # 1. Check if MLX training is actually running (cached process watch)
+            mlx_running = process_watch.is_active()
             
             # 2. If no MLX running, return inactive status immediately
             if not mlx_running:
@@ -715,45 +566,14 @@ def setup_api(app: Flask) -> Blueprint:
                     'message': 'No active training detected'
                 })
             
-            # 3. MLX is running - find the active training file
-            models_dir = os.environ.get('MODELS_DIR', 'models')
-            possible_dirs = [Path(models_dir) / "cpt"]
-            all_log_files = []
-            
-            for models_dir in possible_dirs:
-                if models_dir.exists():
-                    pattern = str(models_dir / "*" / "CPT_*.json")
-                    log_files = glob.glob(pattern)
-                    all_log_files.extend(log_files)
-            
-            # Find the most recent active training file
-            most_recent = None
-            most_recent_time = 0
-            
-            for log_file in all_log_files:
-                try:
-                    mtime = os.path.getmtime(log_file)
-                    # Ensure mtime is valid
-                    if mtime is None:
-                        continue
-                        
-                    # Only consider files modified in the last 10 minutes
-                    if time.time() - mtime < 600:
-                        try:
-                            with open(log_file, 'r') as f:
-                                data = json.load(f)
-                                # File should not have end_time to be considered active
-                                # Ensure both values are valid for comparison
-                                if (data.get('end_time') is None and 
-                                    mtime is not None and 
-                                    most_recent_time is not None and 
-                                    mtime > most_recent_time):
-                                    most_recent_time = mtime
-                                    most_recent = log_file
-                        except Exception:
-                            continue
-                except Exception:
-                    continue
+            # 3. MLX is running - find the active training file: the log registered by the
+            # training process, else the most recently written log without an end_time,
+            # modified in the last 10 minutes
+            run = process_watch.active_training()
+            most_recent = run.get('log_file') if run else None
+            if not most_recent or not os.path.exists(most_recent):
+                active_sessions = get_session_index().active_sessions(max_age=600)
+                most_recent = active_sessions[0]['log_file'] if active_sessions else None
             
             if not most_recent:
                 return jsonify({
@@ -763,10 +583,11 @@ def setup_api(app: Flask) -> Blueprint:
                     'message': 'MLX running but no active training file found'
                 })
             
-            # 4. Read the active training data
+            # 4. Read the active training data (parsed again only when the log changed)
             try:
-                with open(most_recent, 'r') as f:
-                    training_data = json.load(f)
+                tail = get_metrics_tail(most_recent)
+                tail.refresh()
+                training_data, metrics_cursor = tail.data, tail.cursor
                 
                 if not training_data.get('metrics'):
                     return jsonify({
@@ -898,14 +719,16 @@ def setup_api(app: Flask) -> Blueprint:
                 if eta_minutes is not None:
                     current_values['eta_minutes'] = format_numeric_value(eta_minutes, 1)
                 
-                # 6. Generate charts if needed
+                # 6. Generate charts, unless the client already draws this run and
+                # appends to it from /training/<session_id>/metrics
                 charts = None
-                try:
-                    from ..training.dashboard import generate_web_chart_data
-                    chart_data = {'metrics': training_data['metrics']}
-                    charts = generate_web_chart_data(chart_data)
-                except Exception as e:
-                    logger.warning(f"Error generating charts: {e}")
+                if request.args.get('have_charts') != most_recent:
+                    try:
+                        from ..training.dashboard import generate_web_chart_data
+                        chart_data = {'metrics': training_data['metrics']}
+                        charts = generate_web_chart_data(chart_data, **options)
+                    except Exception as e:
+                        logger.warning(f"Error generating charts: {e}")
                 
                 # Return data with both current_values and individual fields for UI compatibility
                 response_data = {
@@ -915,6 +738,8 @@ def setup_api(app: Flask) -> Blueprint:
                     'config': config,
                     'charts': charts,
                     'training_file': most_recent,
+                    'session_id': os.path.basename(os.path.dirname(most_recent)),
+                    'metrics_cursor': metrics_cursor,
                     'start_time': training_data.get('start_time'),
                     'last_update': datetime.now().isoformat()
                 }
@@ -1161,14 +986,19 @@ def setup_api(app: Flask) -> Blueprint:
             if not log_file:
                 return jsonify({'success': False, 'error': 'No log file specified'}), 400
             
+            try:
+                options = chart_options(request.json)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
             # Load training data
             data = load_training_data(log_file)
             
             if 'error' in data:
                 return jsonify({'success': False, 'error': data['error']}), 500
             
-            # Generate chart data for web display
-            charts = generate_web_chart_data(data)
+            # Generate chart data for web display (downsampled or a range if requested)
+            charts = generate_web_chart_data(data, **options)
             
             # Identify best checkpoints
             best_checkpoints = identify_best_checkpoints(data, top_k=3)
@@ -1268,22 +1098,7 @@ def setup_api(app: Flask) -> Blueprint:
                 return jsonify({'success': False, 'error': 'No session IDs provided'}), 400
             
             # Check if training is active - this is the ONLY place we check
-            import psutil
-            mlx_training_active = False
-            try:
-                for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                    try:
-                        if proc.info['cmdline']:
-                            cmdline = ' '.join(proc.info['cmdline'])
-                            if any(pattern in cmdline for pattern in [
-                                'mlx_lm.lora', 'mlx_lm.fuse', 'mlx-lm', 'python -m mlx_lm'
-                            ]):
-                                mlx_training_active = True
-                                break
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-            except Exception:
-                pass
+            mlx_training_active = process_watch.is_active()
             
             # If training is active, return training-in-progress response
             if mlx_training_active:
@@ -1293,46 +1108,29 @@ def setup_api(app: Flask) -> Blueprint:
                     'message': 'Badge data loading disabled during training to prevent memory conflicts'
                 })
             
-            # Find all sessions and collect their data
-            import glob
-            from pathlib import Path
-            
-            models_dir = os.environ.get('MODELS_DIR', 'models')
-            possible_dirs = [Path(models_dir) / "cpt"]
+            # Collect the data of each session from the session index
+            session_index = get_session_index()
             batch_results = {}
             
             for session_id in session_ids:
                 try:
-                    # Find session log file
-                    log_file = None
-                    for models_dir in possible_dirs:
-                        if models_dir.exists():
-                            log_pattern = str(models_dir / session_id / "CPT_*.json")
-                            log_files = glob.glob(log_pattern)
-                            if log_files:
-                                log_file = log_files[0]
-                                break
+                    session = session_index.get_session(session_id)
                     
-                    if not log_file:
+                    if not session:
                         batch_results[session_id] = {
                             'success': False,
                             'error': 'Session not found'
                         }
                         continue
                     
-                    # Load minimal data for badges only
-                    with open(log_file, 'r') as f:
-                        session_data = json.load(f)
-                    
-                    metrics = session_data.get('metrics', [])
-                    config = session_data.get('config', {})
+                    config = session['config']
                     
                     # Extract latest loss values
                     latest_train_loss = 'N/A'
                     latest_val_loss = 'N/A'
                     
-                    if metrics:
-                        latest = metrics[-1]
+                    latest = session['latest_metrics']
+                    if latest:
                         train_loss = latest.get('train_loss')
                         val_loss = latest.get('val_loss')
                         
@@ -1349,40 +1147,30 @@ def setup_api(app: Flask) -> Blueprint:
                     fine_tune_type = None
                     max_seq_length = None
                     
-                    # Get session path from log file
-                    session_path = os.path.dirname(log_file)
-                    
-                    # Try to load from adapter_config.json first (most complete)
-                    adapter_config_path = os.path.join(session_path, 'adapter_config.json')
-                    if os.path.exists(adapter_config_path):
-                        try:
-                            with open(adapter_config_path, 'r') as f:
-                                adapter_config = json.load(f)
-                                
-                            # Extract values from adapter_config.json
-                            learning_rate = adapter_config.get('learning_rate')
-                            max_seq_length = adapter_config.get('max_seq_length')
-                            fine_tune_type = adapter_config.get('fine_tune_type')
-                            
-                            # Extract lr_decay_factor from lr_schedule
-                            lr_schedule = adapter_config.get('lr_schedule', {})
-                            if isinstance(lr_schedule, dict) and 'arguments' in lr_schedule:
-                                args = lr_schedule['arguments']
-                                if len(args) >= 3:
-                                    initial_lr = args[0]
-                                    final_lr = args[2]
-                                    if initial_lr and final_lr:
-                                        lr_decay_factor = round(final_lr / initial_lr, 3)
-                            
-                            # Extract weight_decay from optimizer_config
-                            optimizer_config = adapter_config.get('optimizer_config', {})
-                            adamw_config = optimizer_config.get('adamw', {})
-                            wd = adamw_config.get('weight_decay')
-                            if wd is not None:
-                                weight_decay = round(wd, 3)
-                            
-                        except (json.JSONDecodeError, FileNotFoundError):
-                            pass
+                    # Try adapter_config.json first (most complete)
+                    adapter_config = session['adapter_config']
+                    if adapter_config:
+                        # Extract values from adapter_config.json
+                        learning_rate = adapter_config.get('learning_rate')
+                        max_seq_length = adapter_config.get('max_seq_length')
+                        fine_tune_type = adapter_config.get('fine_tune_type')
+                        
+                        # Extract lr_decay_factor from lr_schedule
+                        lr_schedule = adapter_config.get('lr_schedule', {})
+                        if isinstance(lr_schedule, dict) and 'arguments' in lr_schedule:
+                            args = lr_schedule['arguments']
+                            if len(args) >= 3:
+                                initial_lr = args[0]
+                                final_lr = args[2]
+                                if initial_lr and final_lr:
+                                    lr_decay_factor = round(final_lr / initial_lr, 3)
+                        
+                        # Extract weight_decay from optimizer_config
+                        optimizer_config = adapter_config.get('optimizer_config', {})
+                        adamw_config = optimizer_config.get('adamw', {})
+                        wd = adamw_config.get('weight_decay')
+                        if wd is not None:
+                            weight_decay = round(wd, 3)
                     
                     # Fallback to CPT config if adapter_config didn't have everything
                     if not all([learning_rate, lr_decay_factor, weight_decay, fine_tune_type, max_seq_length]):
@@ -1433,68 +1221,41 @@ def setup_api(app: Flask) -> Blueprint:
     def get_training_sessions():
         """Get available training sessions."""
         try:
-            import glob
-            from pathlib import Path
+            # Sessions from the session index, newest first
+            all_sessions = get_session_index().list_sessions()
             
-            # Look for training sessions using the global output folder
-            models_dir = os.environ.get('MODELS_DIR', 'models')
-            possible_dirs = [
-                Path(models_dir) / "cpt"
-            ]
+            return jsonify({"success": True, "training_sessions": all_sessions})
             
-            all_sessions = []
+        except Exception as e:
+            logger.error(f"Error getting training sessions: {e}")
+            return jsonify({"success": False, "error": str(e)}), 500
+
+    @bp.route('/training/<session_id>/metrics', methods=['GET'])
+    def get_training_metrics_delta(session_id):
+        """Get the metrics of a training session added since a previous request.
+
+        Query parameters:
+            cursor: The cursor of the previous answer; only entries new or
+                changed since then are returned
+            since_iteration: Return the entries after this iteration
+        """
+        try:
+            try:
+                cursor = int(request.args['cursor']) if 'cursor' in request.args else None
+                since_iteration = (int(request.args['since_iteration'])
+                                   if 'since_iteration' in request.args else None)
+            except ValueError:
+                return jsonify({"success": False, "error": "cursor and since_iteration must be integers"}), 400
             
-            for models_dir in possible_dirs:
-                if models_dir.exists():
-                    # Find all CPT log files
-                    log_pattern = str(models_dir / "*" / "CPT_*.json")
-                    log_files = glob.glob(log_pattern)
-                    
-                    for log_file in log_files:
-                        try:
-                            log_path = Path(log_file)
-                            session_dir = log_path.parent
-                            
-                            # Read training data
-                            with open(log_file, 'r') as f:
-                                data = json.load(f)
-                            
-                            # Extract session info
-                            session_info = {
-                                "session_id": session_dir.name,
-                                "session_name": session_dir.name,
-                                "log_file": str(log_path),
-                                "start_time": data.get('start_time'),
-                                "status": data.get('status', 'unknown'),
-                                "model_name": data.get('model_name') or data.get('base_model') or data.get('config', {}).get('model_name', 'Unknown'),
-                                "base_model": data.get('base_model'),
-                                "metrics_count": len(data.get('metrics', [])),
-                                "modified": datetime.fromtimestamp(log_path.stat().st_mtime).isoformat()
-                            }
-                            
-                            # Add latest metrics if available
-                            metrics = data.get('metrics', [])
-                            if metrics:
-                                latest = metrics[-1]
-                                session_info.update({
-                                    "latest_iteration": latest.get('iteration'),
-                                    "latest_loss": latest.get('train_loss'),
-                                    "latest_val_loss": latest.get('val_loss')
-                                })
-                            
-                            all_sessions.append(session_info)
-                            
-                        except Exception as e:
-                            logger.warning(f"Error reading training session {log_file}: {e}")
-                            continue
-            
-            # Sort sessions by modification time (newest first)
-            all_sessions.sort(key=lambda x: x['modified'], reverse=True)
+            log_file = get_session_index().find_log_file(session_id)
+            if not log_file:
+                return jsonify({"success": False, "error": f"Session '{session_id}' not found"}), 404
             
-            return jsonify({"success": True, "training_sessions": all_sessions})
+            delta = get_metrics_tail(log_file).delta(since_iteration=since_iteration, cursor=cursor)
+            return jsonify({"success": True, "session_id": session_id, **delta})
             
         except Exception as e:
-            logger.error(f"Error getting training sessions: {e}")
+            logger.error(f"Error getting metrics of session {session_id}: {e}")
             return jsonify({"success": False, "error": str(e)}), 500
 
     @bp.route('/training/sessions/delete', methods=['POST'])
@@ -1536,6 +1297,8 @@ def setup_api(app: Flask) -> Blueprint:
             if not session_found:
                 return jsonify({"success": False, "error": f"Session '{session_id}' not found"}), 404
             
+            get_session_index().invalidate()
+            
             return jsonify({
                 "success": True, 
                 "message": f"Session '{session_id}' deleted successfully",
@@ -1559,25 +1322,17 @@ def setup_api(app: Flask) -> Blueprint:
                     'error': 'At least 2 sessions required for comparison'
                 }), 400
             
+            try:
+                options = chart_options(data)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
             # Load all session data
             comparison_data = []
             
             for session_id in session_ids:
                 # Find the session log file
-                import glob
-                from pathlib import Path
-                
-                models_dir = os.environ.get('MODELS_DIR', 'models')
-                possible_dirs = [Path(models_dir) / "cpt"]
-                log_file = None
-                
-                for models_dir in possible_dirs:
-                    if models_dir.exists():
-                        log_pattern = str(models_dir / session_id / "CPT_*.json")
-                        log_files = glob.glob(log_pattern)
-                        if log_files:
-                            log_file = log_files[0]  # Take the first match
-                            break
+                log_file = get_session_index().find_log_file(session_id)
                 
                 if not log_file:
                     return jsonify({
@@ -1594,11 +1349,15 @@ def setup_api(app: Flask) -> Blueprint:
                     }), 500
                 
                 # Generate chart data
-                charts = generate_web_chart_data(session_data)
+                charts = generate_web_chart_data(session_data, **options)
                 
                 # Identify best checkpoints
                 best_checkpoints = identify_best_checkpoints(session_data, top_k=3)
                 
+                if 'max_points' in options:
+                    # The (downsampled) charts stand in for the full metrics
+                    session_data = {k: v for k, v in session_data.items() if k != 'metrics'}
+                
                 comparison_data.append({
                     'session_id': session_id,
                     'data': session_data,
@@ -1714,90 +1473,17 @@ def setup_api(app: Flask) -> Blueprint:
             # CPT models are always excluded - both tabs show the same list
             # This matches the existing testing tab behavior
             
-            # Get base models - call the logic directly to avoid response parsing issues
-            base_models = []
-            hf_cache_base = os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface'))
-            cache_path = Path(hf_cache_base) / 'hub'
-            if cache_path.exists():
-                model_dirs = list(cache_path.glob('models--*'))
-                for model_dir in model_dirs:
-                    try:
-                        model_name = model_dir.name.replace('models--', '').replace('--', '/')
-                        
-                        # Determine the correct model path
-                        actual_model_path = str(model_dir)
-                        
-                        # Check if this is a published model (files directly in main directory)
-                        if model_name.startswith('published'):
-                            config_file = model_dir / 'config.json'
-                            if config_file.exists():
-                                actual_model_path = str(model_dir)
-                            else:
-                                # Skip if no config.json found
-                                continue
-                        else:
-                            # Regular model - check for snapshots directory
-                            snapshots_dir = model_dir / 'snapshots'
-                            if snapshots_dir.exists():
-                                # Get all snapshot directories (usually just one)
-                                snapshot_dirs = [d for d in snapshots_dir.iterdir() if d.is_dir()]
-                                if snapshot_dirs:
-                                    # Use the first (and usually only) snapshot
-                                    actual_model_path = str(snapshot_dirs[0])
-                                else:
-                                    # Skip if no snapshots found
-                                    continue
-                            else:
-                                # Skip if no snapshots directory
-                                continue
-                        
-                        # Calculate model size
-                        try:
-                            result = subprocess.run(
-                                ['du', '-sh', actual_model_path],
-                                capture_output=True, 
-                                text=True, 
-                                check=False
-                            )
-                            if result.returncode == 0:
-                                size_str = result.stdout.strip().split()[0]
-                                match = re.match(r'([0-9.]+)([KMGTP])', size_str)
-                                if match:
-                                    size_num = float(match.group(1))
-                                    unit = match.group(2)
-                                    
-                                    if unit == 'K':
-                                        size_gb = size_num / (1024 * 1024)
-                                    elif unit == 'M':
-                                        size_gb = size_num / 1024
-                                    elif unit == 'G':
-                                        size_gb = size_num
-                                    elif unit == 'T':
-                                        size_gb = size_num * 1024
-                                    elif unit == 'P':
-                                        size_gb = size_num * 1024 * 1024
-                                    else:
-                                        size_gb = 0
-                                else:
-                                    size_gb = 0
-                            else:
-                                size_gb = sum(f.stat().st_size for f in Path(actual_model_path).glob('**/*') if f.is_file()) / (1024**3)
-                        except Exception as e:
-                            logger.warning(f"Error calculating size for {model_name}: {e}")
-                            size_gb = 0
-                        
-                        base_models.append({
-                            "name": model_name,
-                            "path": actual_model_path,
-                            "size": round(size_gb, 2)
-                        })
-                    except Exception as e:
-                        logger.warning(f"Error processing model directory {model_dir}: {e}")
+            # Get base models: cached HuggingFace models with a snapshot (or published models)
+            hf_models = [m for m in model_catalog.hf_models() if m['model_path']]
+            sizes = model_catalog.sizes.get_many_gb([m['dir'] for m in hf_models])
+            base_models = [{
+                "name": m["name"],
+                "path": m["model_path"],
+                "size": round_gb(sizes[m['dir']])
+            } for m in hf_models]
             
             # Get IFT models
-            ift_response = get_ift_models()
-            ift_data = json.loads(ift_response.data) if not isinstance(ift_response, tuple) else {"models": []}
-            ift_models = ift_data.get("models", [])
+            ift_models = list_local_models('ift')
             
             # Combine all models (base + IFT, NO CPT)
             all_models = []
@@ -1809,7 +1495,7 @@ def setup_api(app: Flask) -> Blueprint:
                     "name": model.get("name", ""),
                     "path": model.get("path", ""),
                     "type": "base",
-                    "size": model.get("size", 0)
+                    "size": model.get("size")
                 })
             
             # Add IFT models
@@ -1819,7 +1505,7 @@ def setup_api(app: Flask) -> Blueprint:
                     "name": model.get("name", ""),
                     "path": model.get("path", ""),
                     "type": "ift",
-                    "size": model.get("size", 0)
+                    "size": model.get("size")
                 })
             
             # Sort models alphabetically by name
@@ -1920,6 +1606,30 @@ def setup_api(app: Flask) -> Blueprint:
                 'error': str(e)
             }), 500
     
+    @bp.route('/model/prefixes', methods=['GET'])
+    def list_prompt_prefixes():
+        """List the prompt prefixes cached for the loaded model."""
+        result, status_code = model_manager.list_prefixes()
+        return jsonify(result), status_code
+    
+    @bp.route('/model/prefixes', methods=['POST'])
+    def register_prompt_prefix():
+        """Precompute and cache a shared system prompt or few-shot preamble."""
+        data = request.get_json() or {}
+        result, status_code = model_manager.register_prefix(
+            prefix=data.get('prefix'),
+            system_prompt=data.get('system_prompt'),
+            messages=data.get('messages'),
+            is_base_model=data.get('is_base_model')
+        )
+        return jsonify(result), status_code
+    
+    @bp.route('/model/prefixes/<prefix_id>', methods=['DELETE'])
+    def evict_prompt_prefix(prefix_id):
+        """Evict a cached prompt prefix."""
+        result, status_code = model_manager.evict_prefix(prefix_id)
+        return jsonify(result), status_code
+    
     @bp.route('/directories/contents', methods=['POST'])
     def get_directory_contents():
         """Get contents of a directory."""
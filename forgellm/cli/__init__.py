@@ -1,5 +1,15 @@
 """Command-line interface for ForgeLLM."""
 
-from .commands import setup_cli
+_EXPORTS = {"setup_cli": ".commands"}
 
-__all__ = ["setup_cli"] 
\ No newline at end of file
+__all__ = ["setup_cli"] 
+
+
+def __getattr__(name):
+    # Imported on first access: the submodules pull in mlx, matplotlib or Flask
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
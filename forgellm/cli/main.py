@@ -75,6 +75,28 @@ def main():
     generate_parser.add_argument('--prompt', help='Prompt to generate from (if not provided, starts REPL mode)')
     generate_parser.add_argument('--max-tokens', type=int, default=100, help='Maximum tokens to generate')
     generate_parser.add_argument('--temperature', type=float, default=0.7, help='Temperature for sampling')
+    generate_parser.add_argument('--seed', type=int, help='Seed for reproducible sampling')
+    generate_parser.add_argument('--draft-model', help='Small model with the same tokenizer for speculative decoding')
+    generate_parser.add_argument('--num-draft-tokens', type=int, default=3,
+                                 help='Tokens proposed by the draft model per forward pass of the model')
+    
+    # Batch generate command for offline generation over a JSONL file
+    batch_parser = subparsers.add_parser('batch-generate', help='Generate completions for every prompt of a JSONL file')
+    batch_parser.add_argument('--model', required=True, help='Model name or path')
+    batch_parser.add_argument('--adapter-path', help='Optional adapter path')
+    batch_parser.add_argument('--input', required=True,
+                              help='JSONL file with one {"prompt": ...} or {"messages": [...]} record per line')
+    batch_parser.add_argument('--output', required=True, help='JSONL file the completions are appended to')
+    batch_parser.add_argument('--batch-size', type=int, default=16, help='Sequences decoded together')
+    batch_parser.add_argument('--window', type=int,
+                              help='Records sorted by length before they are submitted (default: 8 x batch size)')
+    batch_parser.add_argument('--max-tokens', type=int, default=256, help='Maximum tokens to generate per record')
+    batch_parser.add_argument('--temperature', type=float, default=0.0, help='Temperature for sampling')
+    batch_parser.add_argument('--top-p', type=float, default=1.0, help='Top-p for sampling')
+    batch_parser.add_argument('--seed', type=int,
+                              help='Base seed; record N is sampled with seed + N so reruns are reproducible')
+    batch_parser.add_argument('--overwrite', action='store_true',
+                              help='Start over instead of resuming after the last completed record')
     
     # Info command for model architecture information
     info_parser = subparsers.add_parser('info', help='Get information about model architecture and formatting')
@@ -109,7 +131,10 @@ def main():
                 args.adapter_path,
                 args.prompt,
                 args.max_tokens,
-                args.temperature
+                args.temperature,
+                seed=args.seed,
+                draft_model=args.draft_model,
+                num_draft_tokens=args.num_draft_tokens
             )
         else:
             # Start REPL mode
@@ -117,8 +142,26 @@ def main():
                 args.model,
                 args.adapter_path,
                 args.max_tokens,
-                args.temperature
+                args.temperature,
+                seed=args.seed,
+                draft_model=args.draft_model,
+                num_draft_tokens=args.num_draft_tokens
             )
+    elif args.command == 'batch-generate':
+        stats = batch_generate(
+            args.model,
+            args.input,
+            args.output,
+            adapter_path=args.adapter_path,
+            batch_size=args.batch_size,
+            window=args.window,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            top_p=args.top_p,
+            seed=args.seed,
+            resume=not args.overwrite
+        )
+        return 0 if stats is not None else 1
     elif args.command == 'info':
         show_model_info(args.model, args.show_example)
     else:
@@ -282,19 +325,81 @@ def train_model(model_name, input_dir, output_dir, batch_size, learning_rate, ma
         logger.error(f"Error training model: {e}")
         return False
 
-def generate_text(model_name, adapter_path, prompt, max_tokens, temperature):
+def _start_engine(model, tokenizer, draft_model=None, num_draft_tokens=3, max_batch_size=1):
+    """Start a BatchEngine (single-sequence by default), with a draft model for speculative decoding if given."""
+    from forgellm.server.batch_engine import BatchEngine
+    
+    draft = None
+    if draft_model:
+        from forgellm.server.speculative import load_draft_model
+        logger.info(f"Loading draft model {draft_model}...")
+        draft = load_draft_model(draft_model, tokenizer)
+    engine = BatchEngine(model, tokenizer, max_batch_size=max_batch_size, draft_model=draft,
+                         num_draft_tokens=num_draft_tokens)
+    engine.start()
+    return engine
+
+def _submit_prompt(engine, tokenizer, prompt, max_tokens, sampler, seed=None, stop=None):
+    """
+    Submit a prompt string to the engine.
+    
+    The engine samples each position with its own seed, so the output is the
+    same with and without a draft model.
+    """
+    from forgellm.server.batch_engine import GenerationRequest
+    
+    add_special_tokens = tokenizer.bos_token is None or not prompt.startswith(tokenizer.bos_token)
+    prompt_tokens = tokenizer.encode(prompt, add_special_tokens=add_special_tokens)
+    return engine.submit(GenerationRequest(prompt_tokens, max_tokens=max_tokens, sampler=sampler, seed=seed,
+                                           stop=stop))
+
+def _stop_sequences(model_name, stop=None):
+    """Stop sequences of a prompt: the given ones, and the end-of-turn markers of instruct models."""
+    from forgellm.server.stopping import parse_stop
+    
+    stops = parse_stop(stop)
+    if ARCHITECTURE_MANAGER and ARCHITECTURE_MANAGER.is_instruct_model(model_name):
+        stops += [s for s in ARCHITECTURE_MANAGER.get_stop_sequences(model_name) if s not in stops]
+    return stops
+
+def _stream_text(request, tokenizer):
+    """Yield the text of a submitted request as it is decoded."""
+    from forgellm.server.stopping import detokenizer_for
+    
+    detokenizer = detokenizer_for(tokenizer, request)
+    for token in request.tokens():
+        detokenizer.add_token(token)
+        segment = detokenizer.last_segment
+        if segment:
+            yield segment
+    detokenizer.finalize()
+    segment = detokenizer.last_segment
+    if segment:
+        yield segment
+
+def _log_speculative_stats(request):
+    """Log acceptance rate and estimated speedup of speculative decoding."""
+    stats = request.get_speculative_stats()
+    if stats:
+        logger.info(f"Speculative decoding: {stats['accepted_tokens']}/{stats['draft_tokens']} drafted tokens "
+                    f"accepted ({stats['acceptance_rate']:.0%}), {stats['tokens_per_pass']} tokens per pass, "
+                    f"~{stats['speedup']}x speedup")
+
+def generate_text(model_name, adapter_path, prompt, max_tokens, temperature, seed=None,
+                  draft_model=None, num_draft_tokens=3):
     """Generate text from a model."""
     logger.info(f"Generating text with model {model_name}")
     
+    engine = None
     try:
         # Import here to avoid loading mlx until needed
         from mlx_lm import load
-        from mlx_lm.generate import stream_generate
         from mlx_lm.sample_utils import make_sampler
         
         # Load the model
         logger.info("Loading model...")
         model, tokenizer = load(model_name, adapter_path=adapter_path)
+        engine = _start_engine(model, tokenizer, draft_model, num_draft_tokens)
         logger.info("Model loaded successfully")
         
         # Format prompt using WEB UI LOGIC (copy exact formatting from app.js)
@@ -329,33 +434,240 @@ def generate_text(model_name, adapter_path, prompt, max_tokens, temperature):
         logger.info(f"Generating with formatted prompt (streaming to terminal)")
         print("\n" + "="*50 + "\nGENERATED OUTPUT:\n" + "="*50)
         
-        for chunk in stream_generate(
-            model, 
-            tokenizer, 
-            prompt=final_prompt, 
-            max_tokens=max_tokens,
-            sampler=sampler
-        ):
-            print(chunk.text, end='', flush=True)  # Stream to terminal in real-time
+        request = _submit_prompt(engine, tokenizer, final_prompt, max_tokens, sampler, seed,
+                                 _stop_sequences(model_name))
+        for segment in _stream_text(request, tokenizer):
+            print(segment, end='', flush=True)  # Stream to terminal in real-time
         
         end_time = time.time()
         
         # Final formatting
         print("\n" + "="*50)
         logger.info(f"Streaming generation completed in {end_time - start_time:.2f} seconds")
+        _log_speculative_stats(request)
         
         return True
     except Exception as e:
         logger.error(f"Error generating text: {e}")
         return False
+    finally:
+        if engine is not None:
+            engine.stop()
+
+def _format_messages(model_name, messages):
+    """Format chat messages for a model (instruct models get their chat template, base models the raw text)."""
+    if ARCHITECTURE_MANAGER and ARCHITECTURE_MANAGER.is_instruct_model(model_name):
+        return ARCHITECTURE_MANAGER.format_messages(messages, model_name)
+    return "\n\n".join(m['content'] for m in messages)
+
+def _completed_lines(output_path):
+    """
+    Find the input lines already completed in an output file.
+    
+    A partial last line (from a crash while writing) is cut off so that new
+    records are appended after the last complete one.
+    
+    Returns:
+        set: Input line numbers with a result in the output file
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    valid_end = 0
+    with open(output_path, 'rb+') as f:
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(raw)['line'])
+            except (ValueError, KeyError, TypeError):
+                break
+            valid_end += len(raw)
+        if valid_end < f.seek(0, os.SEEK_END):
+            logger.warning(f"Discarding incomplete records at the end of {output_path}")
+            f.truncate(valid_end)
+    return done
+
+def _read_records(input_path, skip):
+    """Yield (line, record, error) for every input line not in skip; line numbers start at 0."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line, raw in enumerate(f):
+            if line in skip or not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                if not isinstance(record, dict) or not (record.get('prompt') or record.get('messages')):
+                    raise ValueError("record needs a 'prompt' or 'messages'")
+                yield line, record, None
+            except ValueError as e:
+                yield line, None, f"Invalid record: {e}"
+
+def batch_generate(model_name, input_path, output_path, adapter_path=None, batch_size=16, window=None,
+                   max_tokens=256, temperature=0.0, top_p=1.0, seed=None, resume=True):
+    """
+    Generate a completion for every record of a JSONL file.
+    
+    Records are read as a stream. Each window of records is sorted by prompt
+    length before it is submitted to a BatchEngine, so the sequences decoded
+    together have similar lengths and little padding. Results are written
+    in input order as soon as they are complete, one JSON line per record
+    (the input record plus completion, finish_reason and token counts).
+    After a crash the command resumes after the last complete output line.
+    
+    A record holds a "prompt" string or chat "messages", and can override
+    max_tokens, temperature, top_p and seed, and add "stop" sequences.
+    
+    Args:
+        model_name: Model name or path
+        input_path: Input JSONL file
+        output_path: Output JSONL file (appended to when resuming)
+        adapter_path: Optional adapter path
+        batch_size: Sequences decoded together
+        window: Records sorted by length together (default 8 x batch_size)
+        max_tokens: Default maximum tokens per completion
+        temperature: Default sampling temperature
+        top_p: Default top-p
+        seed: Base seed; record N uses seed + N
+        resume: Skip the records already in the output file
+        
+    Returns:
+        dict: Aggregate statistics, or None if the run failed
+    """
+    from collections import deque
+    
+    window = max(batch_size, window or batch_size * 8)
+    done = _completed_lines(output_path) if resume else set()
+    if done:
+        logger.info(f"Resuming: {len(done)} records already in {output_path}")
+    
+    engine = None
+    try:
+        # Import here to avoid loading mlx until needed
+        from mlx_lm import load
+        from mlx_lm.sample_utils import make_sampler
+        
+        logger.info(f"Loading model {model_name}...")
+        model, tokenizer = load(model_name, adapter_path=adapter_path)
+        engine = _start_engine(model, tokenizer, max_batch_size=batch_size)
+        
+        samplers = {}
+        
+        def prompt_of(record):
+            messages = record.get('messages') or [{'role': 'user', 'content': record['prompt']}]
+            if record.get('system') and not record.get('messages'):
+                messages = [{'role': 'system', 'content': record['system']}] + messages
+            return _format_messages(model_name, messages)
+        
+        def submit(line, record, prompt):
+            """Submit one record; returns its request, or an error message."""
+            sampling = (record.get('temperature', temperature), record.get('top_p', top_p))
+            if sampling not in samplers:
+                samplers[sampling] = make_sampler(temp=sampling[0], top_p=sampling[1])
+            try:
+                return _submit_prompt(engine, tokenizer, prompt, record.get('max_tokens', max_tokens),
+                                      samplers[sampling], record.get('seed', None if seed is None else seed + line),
+                                      _stop_sequences(model_name, record.get('stop')))
+            except Exception as e:
+                return f"Could not submit record: {e}"
+        
+        records = _read_records(input_path, done)
+        order = deque()  # (line, record, request or error message) in input order
+        stats = {'records': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        start_time = last_report = time.time()
+        
+        def fill():
+            """Read the next window of records and submit it, shortest prompts first."""
+            chunk = []
+            for line, record, error in records:
+                chunk.append([line, record, error])
+                if len(chunk) >= window:
+                    break
+            prompts = {id(c): prompt_of(c[1]) for c in chunk if c[2] is None}
+            # The engine admits requests in submission order, so sequences of
+            # similar length share a batch and little of it is padding
+            for c in sorted((c for c in chunk if c[2] is None), key=lambda c: len(prompts[id(c)])):
+                c[2] = submit(c[0], c[1], prompts[id(c)])
+            order.extend(chunk)
+        
+        fill()
+        with open(output_path, 'a' if resume else 'w', encoding='utf-8') as out:
+            while order:
+                # Keep the next window queued so the batch never runs dry
+                if len(order) <= window:
+                    fill()
+                
+                line, record, request = order[0]
+                if isinstance(request, str) or request.wait(timeout=1.0):
+                    order.popleft()
+                    out.write(json.dumps(_batch_result(line, record, request, tokenizer)) + '\n')
+                    if isinstance(request, str) or request.finish_reason == 'error':
+                        stats['errors'] += 1
+                    else:
+                        stats['prompt_tokens'] += len(request.prompt_tokens)
+                        stats['completion_tokens'] += len(request.generated_tokens)
+                    stats['records'] += 1
+                    if order and not isinstance(order[0][2], str) and not order[0][2].finished:
+                        # Nothing else is ready yet: make what was written durable
+                        out.flush()
+                
+                if time.time() - last_report >= 10:
+                    last_report = time.time()
+                    out.flush()
+                    elapsed = last_report - start_time
+                    logger.info(f"{stats['records']} records, "
+                                f"{stats['completion_tokens'] / elapsed:.1f} generated tokens/s, "
+                                f"{stats['records'] / elapsed:.2f} records/s")
+        
+        elapsed = time.time() - start_time
+        stats.update({
+            'skipped': len(done),
+            'elapsed': round(elapsed, 2),
+            'records_per_sec': round(stats['records'] / elapsed, 2) if elapsed > 0 else 0,
+            'generation_tokens_per_sec': round(stats['completion_tokens'] / elapsed, 1) if elapsed > 0 else 0,
+            'prompt_tokens_per_sec': round(stats['prompt_tokens'] / elapsed, 1) if elapsed > 0 else 0
+        })
+        logger.info(f"Generated {stats['records']} completions ({stats['errors']} errors) in {elapsed:.1f}s: "
+                    f"{stats['generation_tokens_per_sec']} generated tokens/s, "
+                    f"{stats['prompt_tokens_per_sec']} prompt tokens/s, {stats['records_per_sec']} records/s")
+        print(json.dumps(stats))
+        return stats
+    except Exception as e:
+        logger.error(f"Error in batch generation: {e}")
+        return None
+    finally:
+        if engine is not None:
+            engine.stop()
 
-def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
+def _batch_result(line, record, request, tokenizer):
+    """Build the output record of one input line."""
+    from forgellm.server.stopping import completion_text
+    
+    result = dict(record or {})
+    result['line'] = line
+    if isinstance(request, str):
+        result['error'] = request
+        return result
+    if request.finish_reason == 'error':
+        result['error'] = str(request.error)
+        return result
+    result.update({
+        'completion': completion_text(tokenizer, request),
+        'finish_reason': request.finish_reason,
+        'prompt_tokens': len(request.prompt_tokens),
+        'completion_tokens': len(request.generated_tokens)
+    })
+    return result
+
+def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7, seed=None,
+               draft_model=None, num_draft_tokens=3):
     """Start REPL mode for interactive conversation."""
     print(f"\n🤖 ForgeLLM REPL - Interactive Chat")
     print(f"Model: {model_name}")
     if adapter_path:
         print(f"Adapter: {adapter_path}")
     print(f"Max tokens: {max_tokens}, Temperature: {temperature}")
+    if draft_model:
+        print(f"Draft model: {draft_model} ({num_draft_tokens} tokens per step)")
     print("\nCommands:")
     print("  /help - Show this help")
     print("  /q, /exit, /quit - Exit REPL")
@@ -367,15 +679,16 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
     print("  /format - Show current formatting details")
     print("\nType your message and press Enter to chat!\n")
     
+    engine = None
     try:
         # Import here to avoid loading mlx until needed
         from mlx_lm import load
-        from mlx_lm.generate import stream_generate
         from mlx_lm.sample_utils import make_sampler
         
         # Load the model
         print("Loading model...")
         model, tokenizer = load(model_name, adapter_path=adapter_path)
+        engine = _start_engine(model, tokenizer, draft_model, num_draft_tokens)
         print("✅ Model loaded successfully!\n")
         
         # Initialize session state
@@ -385,6 +698,8 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
             'turns': 0,
             'prompt_tokens': 0,
             'response_tokens': 0,
+            'draft_tokens': 0,
+            'accepted_draft_tokens': 0,
             'start_time': datetime.now()
         }
         
@@ -430,6 +745,10 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
                         print(f"  Prompt tokens (est): {session_stats['prompt_tokens']}")
                         print(f"  Response tokens (est): {session_stats['response_tokens']}")
                         print(f"  Total tokens (est): {session_stats['prompt_tokens'] + session_stats['response_tokens']}")
+                        if session_stats['draft_tokens']:
+                            rate = session_stats['accepted_draft_tokens'] / session_stats['draft_tokens']
+                            print(f"  Draft tokens accepted: {session_stats['accepted_draft_tokens']}/"
+                                  f"{session_stats['draft_tokens']} ({rate:.0%})")
                         print()
                         continue
                     
@@ -666,15 +985,11 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
                 start_time = time.time()
                 response_text = ""
                 
-                for chunk in stream_generate(
-                    model, 
-                    tokenizer, 
-                    prompt=full_prompt, 
-                    max_tokens=max_tokens,
-                    sampler=sampler
-                ):
-                    print(chunk.text, end='', flush=True)
-                    response_text += chunk.text
+                request = _submit_prompt(engine, tokenizer, full_prompt, max_tokens, sampler, seed,
+                                         _stop_sequences(model_name))
+                for segment in _stream_text(request, tokenizer):
+                    print(segment, end='', flush=True)
+                    response_text += segment
                 
                 print("\n")  # New line after response
                 
@@ -689,6 +1004,8 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
                 # Use the actual tokenizer for accurate token counting
                 session_stats['prompt_tokens'] += len(tokenizer.encode(full_prompt))
                 session_stats['response_tokens'] += len(tokenizer.encode(response_text))
+                session_stats['draft_tokens'] += request.draft_tokens
+                session_stats['accepted_draft_tokens'] += request.accepted_draft_tokens
                 
             except KeyboardInterrupt:
                 print("\n\n👋 Goodbye!")
@@ -703,6 +1020,9 @@ def start_repl(model_name, adapter_path=None, max_tokens=100, temperature=0.7):
     except Exception as e:
         logger.error(f"Error in REPL mode: {e}")
         return False
+    finally:
+        if engine is not None:
+            engine.stop()
 
 def show_model_info(model_name, show_example=False):
     """Show information about a model's architecture and formatting."""
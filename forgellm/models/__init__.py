@@ -1,8 +1,20 @@
 """Models module for ForgeLLM."""
 
-from .model_manager import ModelManager
-from .model_publisher import ModelPublisher
-from .model_quantizer import ModelQuantizer
-from .model_fuser import ModelFuser
+_EXPORTS = {
+    "ModelManager": ".model_manager",
+    "ModelPublisher": ".model_publisher",
+    "ModelQuantizer": ".model_quantizer",
+    "ModelFuser": ".model_fuser",
+}
 
-__all__ = ["ModelManager", "ModelPublisher", "ModelQuantizer", "ModelFuser"] 
\ No newline at end of file
+__all__ = ["ModelManager", "ModelPublisher", "ModelQuantizer", "ModelFuser"] 
+
+
+def __getattr__(name):
+    # Imported on first access: the submodules pull in mlx, matplotlib or Flask
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
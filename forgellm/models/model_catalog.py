@@ -0,0 +1,329 @@
+"""
+Model catalog and directory sizes.
+
+The model dropdowns list the CPT and IFT models in MODELS_DIR and the
+models in the HuggingFace cache, each with its size on disk. Walking a
+multi-gigabyte model directory on every request is what made them slow, so
+sizes come from a shared service instead:
+
+- Sizes are exact byte counts of the regular files in the directory.
+  Symlinks are not followed, and hard-linked files are counted once, so the
+  HuggingFace cache's ``snapshots`` links do not double its ``blobs``.
+- A size is cached with the inode and modification time of the directory
+  and of its direct subdirectories. A size whose key changed, or that is
+  older than ``MAX_AGE``, is still served but is recomputed in a worker
+  pool (stale-while-revalidate).
+- A directory that was never measured is measured in the pool, and the
+  request waits at most ``WAIT_TIMEOUT`` seconds for it.
+
+The directory listings behind the catalog are cached in the same way.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Threads measuring directories
+SIZE_WORKERS = 4
+
+# Seconds after which a cached size is recomputed even if the directory looks unchanged
+MAX_AGE = 300.0
+
+# Seconds a request waits for directories that were never measured
+WAIT_TIMEOUT = 5.0
+
+GB = 1024 ** 3
+
+_service = None
+_catalog = None
+_lock = threading.Lock()
+
+
+def directory_size(path: str) -> int:
+    """
+    Get the exact size of the files in a directory tree.
+
+    Args:
+        path: Directory
+
+    Returns:
+        Total size in bytes of the regular files (symlinks are not followed,
+        hard links are counted once)
+    """
+    total = 0
+    seen = set()
+    stack = [path]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    if st.st_nlink > 1:
+                        if (st.st_dev, st.st_ino) in seen:
+                            continue
+                        seen.add((st.st_dev, st.st_ino))
+                    total += st.st_size
+            except OSError:
+                continue
+    return total
+
+
+def round_gb(size_gb: Optional[float], digits: int = 2) -> Optional[float]:
+    """Round a size in GB for display (None, for a size not known yet, stays None)."""
+    return None if size_gb is None else round(size_gb, digits)
+
+
+def directory_key(path: str) -> Optional[Tuple]:
+    """
+    Get the change key of a directory.
+
+    Returns:
+        Inode and modification time of the directory and of its direct
+        subdirectories, or None if it does not exist
+    """
+    try:
+        st = os.stat(path)
+        key = [(st.st_ino, st.st_mtime_ns)]
+        for entry in os.scandir(path):
+            if entry.is_dir(follow_symlinks=False):
+                sub = entry.stat(follow_symlinks=False)
+                key.append((entry.name, sub.st_ino, sub.st_mtime_ns))
+    except OSError:
+        return None
+    return tuple(sorted(key, key=str))
+
+
+class DirectorySizeService:
+    """Cached, asynchronously refreshed directory sizes."""
+
+    def __init__(self, max_workers: int = SIZE_WORKERS, max_age: float = MAX_AGE,
+                 wait_timeout: float = WAIT_TIMEOUT):
+        self.max_age = max_age
+        self.wait_timeout = wait_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dir-size')
+        self._lock = threading.Lock()
+        # path -> (key, size in bytes, time measured)
+        self._sizes: Dict[str, Tuple[Optional[Tuple], int, float]] = {}
+        # path -> future of the measurement in progress
+        self._pending = {}
+        self._stats = {'hits': 0, 'stale': 0, 'misses': 0, 'computed': 0}
+
+    def get_many(self, paths: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[int]]:
+        """
+        Get the sizes of directories.
+
+        Cached sizes are returned at once (and refreshed in the background if
+        stale); directories never measured are measured in parallel.
+
+        Args:
+            paths: Directories
+            timeout: Seconds to wait for directories never measured (default:
+                wait_timeout; None in the result if it runs out)
+
+        Returns:
+            Dictionary of path to size in bytes
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        sizes, waiting = {}, {}
+        for path in paths:
+            size, future = self._lookup(path)
+            sizes[path] = size
+            if future is not None:
+                waiting[path] = future
+        if waiting:
+            wait_futures(list(waiting.values()), timeout=timeout)
+            for path, future in waiting.items():
+                if future.done() and future.exception() is None:
+                    sizes[path] = future.result()
+        return sizes
+
+    def get(self, path: str, timeout: Optional[float] = None) -> Optional[int]:
+        """Get the size of a directory in bytes (see get_many)."""
+        return self.get_many([path], timeout)[path]
+
+    def get_many_gb(self, paths: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """Get the sizes of directories in GB (None for those still being measured; see get_many)."""
+        return {path: None if size is None else size / GB
+                for path, size in self.get_many(paths, timeout).items()}
+
+    def prefetch(self, paths: Iterable[str]):
+        """Measure directories in the background."""
+        for path in paths:
+            self._lookup(path)
+
+    def invalidate(self, path: Optional[str] = None):
+        """Forget the size of a directory (or of all of them)."""
+        with self._lock:
+            if path is None:
+                self._sizes.clear()
+            else:
+                self._sizes.pop(path, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics."""
+        with self._lock:
+            return dict(self._stats, cached=len(self._sizes), pending=len(self._pending))
+
+    def _lookup(self, path: str):
+        """Cached size of a directory and, if it was never measured, the future measuring it."""
+        key = directory_key(path)
+        with self._lock:
+            cached = self._sizes.get(path)
+            if cached is None:
+                self._stats['misses'] += 1
+                return None, self._schedule(path)
+            cached_key, size, measured = cached
+            if cached_key != key or time.monotonic() - measured > self.max_age:
+                self._stats['stale'] += 1
+                self._schedule(path)
+            else:
+                self._stats['hits'] += 1
+            return size, None
+
+    def _schedule(self, path: str):
+        # Called with the lock held
+        future = self._pending.get(path)
+        if future is None:
+            future = self._executor.submit(self._measure, path)
+            self._pending[path] = future
+        return future
+
+    def _measure(self, path: str) -> int:
+        try:
+            key = directory_key(path)
+            size = directory_size(path)
+            with self._lock:
+                self._sizes[path] = (key, size, time.monotonic())
+                self._stats['computed'] += 1
+            return size
+        except Exception as e:
+            logger.warning(f"Error calculating size for {path}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+
+
+class ModelCatalog:
+    """Cached listings of the local and HuggingFace-cached models."""
+
+    def __init__(self, sizes: DirectorySizeService):
+        self.sizes = sizes
+        self._lock = threading.Lock()
+        # directory -> (key, entries)
+        self._listings: Dict[str, Tuple[Optional[Tuple], List[str]]] = {}
+        # HF model directory -> (key, entry)
+        self._hf_entries: Dict[str, Tuple[Optional[Tuple], Dict]] = {}
+
+    def _subdirectories(self, directory: str, prefix: str = '') -> List[str]:
+        """Names of the subdirectories of a directory, cached until it changes."""
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return []
+        key = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            cached = self._listings.get(directory)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+        try:
+            names = sorted(e.name for e in os.scandir(directory)
+                           if e.name.startswith(prefix) and e.is_dir())
+        except OSError:
+            names = []
+        with self._lock:
+            self._listings[directory] = (key, names)
+        return names
+
+    def local_models(self, models_dir: str, model_type: str) -> List[Dict]:
+        """
+        List the models of a type in MODELS_DIR.
+
+        Args:
+            models_dir: The models directory
+            model_type: 'cpt', 'ift' or 'base'
+
+        Returns:
+            List of {'name', 'path' (relative to models_dir), 'full_path'}
+        """
+        type_dir = os.path.join(models_dir, model_type)
+        return [{
+            "name": name,
+            "path": os.path.join(model_type, name),
+            "full_path": os.path.join(type_dir, name)
+        } for name in self._subdirectories(type_dir)]
+
+    def hf_models(self, hf_home: Optional[str] = None) -> List[Dict]:
+        """
+        List the models in the HuggingFace cache.
+
+        Args:
+            hf_home: HuggingFace home (default: HF_HOME or ~/.cache/huggingface)
+
+        Returns:
+            List of {'name', 'dir' (the cache directory of the model),
+            'model_path' (its snapshot, or the directory for published models;
+            None if it has no usable files)}
+        """
+        hf_home = hf_home or os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface'))
+        hub = os.path.join(hf_home, 'hub')
+        models = []
+        for dir_name in self._subdirectories(hub, 'models--'):
+            model_dir = os.path.join(hub, dir_name)
+            key = directory_key(model_dir)
+            with self._lock:
+                cached = self._hf_entries.get(model_dir)
+            if cached is None or cached[0] != key:
+                cached = (key, self._hf_entry(model_dir, dir_name))
+                with self._lock:
+                    self._hf_entries[model_dir] = cached
+            models.append(cached[1])
+        return models
+
+    @staticmethod
+    def _hf_entry(model_dir: str, dir_name: str) -> Dict:
+        name = dir_name.replace('models--', '').replace('--', '/')
+        model_path = None
+        if name.startswith('published'):
+            # Published models have their files directly in the directory
+            if os.path.exists(os.path.join(model_dir, 'config.json')):
+                model_path = model_dir
+        else:
+            snapshots_dir = Path(model_dir) / 'snapshots'
+            if snapshots_dir.is_dir():
+                snapshot_dirs = sorted(d for d in snapshots_dir.iterdir() if d.is_dir())
+                if snapshot_dirs:
+                    # Usually the only one
+                    model_path = str(snapshot_dirs[0])
+        return {"name": name, "dir": model_dir, "model_path": model_path}
+
+
+def get_size_service() -> DirectorySizeService:
+    """Get the shared directory size service."""
+    global _service
+    with _lock:
+        if _service is None:
+            _service = DirectorySizeService()
+        return _service
+
+
+def get_model_catalog() -> ModelCatalog:
+    """Get the shared model catalog."""
+    global _catalog
+    sizes = get_size_service()
+    with _lock:
+        if _catalog is None:
+            _catalog = ModelCatalog(sizes)
+        return _catalog
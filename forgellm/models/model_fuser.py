@@ -14,6 +14,9 @@ import json
 import subprocess
 from datetime import datetime
 
+from ..utils.process_watch import process_watch
+from .model_catalog import get_size_service, round_gb
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -45,53 +48,58 @@ class ModelFuser:
         logger.info("ModelFuser initialized")
 
     def get_available_base_models(self) -> List[Dict[str, Any]]:
-        """Get list of available base models for fusion."""
+        """Get list of available base models for fusion (size None while it is still being measured)."""
         models = []
         
         # Scan local models directory
+        local_models = []
         for model_type in ['base', 'cpt', 'ift']:
             type_dir = os.path.join(self.models_dir, model_type)
             if os.path.exists(type_dir):
                 for model_path in glob.glob(os.path.join(type_dir, '*')):
                     if os.path.isdir(model_path):
-                        model_name = os.path.basename(model_path)
-                        
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_path)
-                        
-                        models.append({
-                            "name": model_name,
-                            "path": os.path.join(model_type, model_name),
-                            "full_path": model_path,
-                            "type": model_type.upper(),
-                            "size": round(size_gb, 2)
-                        })
+                        local_models.append((model_type, model_path))
         
         # Scan HuggingFace cache
         hf_cache_dir = os.path.expanduser("~/.cache/huggingface/hub")
+        hf_models = []
         if os.path.exists(hf_cache_dir):
             for model_dir in glob.glob(os.path.join(hf_cache_dir, "models--*")):
                 if os.path.isdir(model_dir):
-                    # Extract model name from directory
-                    dir_name = os.path.basename(model_dir)
-                    if dir_name.startswith("models--"):
-                        model_name = dir_name[8:].replace("--", "/")
-                        
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_dir)
-                        
-                        # Only include models > 100MB to filter out small files
-                        if size_gb > 0.1:
-                            models.append({
-                                "name": model_name,
-                                "path": model_dir,
-                                "full_path": model_dir,
-                                "type": "HF_CACHE",
-                                "size": round(size_gb, 2)
-                            })
+                    hf_models.append(model_dir)
+        
+        # Calculate model sizes, all at once
+        sizes = self._directory_sizes([path for _, path in local_models] + hf_models)
+        
+        for model_type, model_path in local_models:
+            model_name = os.path.basename(model_path)
+            models.append({
+                "name": model_name,
+                "path": os.path.join(model_type, model_name),
+                "full_path": model_path,
+                "type": model_type.upper(),
+                "size": round_gb(sizes[model_path])
+            })
+        
+        for model_dir in hf_models:
+            # Extract model name from directory
+            dir_name = os.path.basename(model_dir)
+            if dir_name.startswith("models--"):
+                model_name = dir_name[8:].replace("--", "/")
+                size_gb = sizes[model_dir]
+                
+                # Only include models > 100MB to filter out small files (or not measured yet)
+                if size_gb is None or size_gb > 0.1:
+                    models.append({
+                        "name": model_name,
+                        "path": model_dir,
+                        "full_path": model_dir,
+                        "type": "HF_CACHE",
+                        "size": round_gb(size_gb)
+                    })
         
         # Sort by size (largest first)
-        models.sort(key=lambda x: x["size"], reverse=True)
+        models.sort(key=lambda x: x["size"] or 0, reverse=True)
         
         return models
 
@@ -101,8 +109,13 @@ class ModelFuser:
         
         # Scan CPT models directory for adapters
         cpt_dir = os.path.join(self.models_dir, 'cpt')
+        adapter_dirs = [d for d in glob.glob(os.path.join(cpt_dir, '*')) if os.path.isdir(d)]
+        
+        # Calculate adapter sizes, all at once
+        sizes = self._directory_sizes(adapter_dirs)
+        
         if os.path.exists(cpt_dir):
-            for adapter_path in glob.glob(os.path.join(cpt_dir, '*')):
+            for adapter_path in adapter_dirs:
                 if os.path.isdir(adapter_path):
                     # Check if this contains adapter files (both .npz and .safetensors formats)
                     adapter_files_npz = glob.glob(os.path.join(adapter_path, 'adapters.npz'))
@@ -111,8 +124,7 @@ class ModelFuser:
                     if adapter_files_npz or adapter_files_safetensors:
                         adapter_name = os.path.basename(adapter_path)
                         
-                        # Calculate adapter size
-                        size_gb = self._calculate_directory_size(adapter_path)
+                        size_gb = sizes[adapter_path]
                         
                         # Try to determine adapter type from config
                         adapter_type = self._detect_adapter_type(adapter_path)
@@ -122,7 +134,7 @@ class ModelFuser:
                             "path": adapter_path,
                             "full_path": adapter_path,
                             "type": adapter_type,
-                            "size": round(size_gb, 2)
+                            "size": round_gb(size_gb)
                         })
         
         # Sort by name
@@ -157,19 +169,13 @@ class ModelFuser:
             logger.warning(f"Error detecting adapter type for {adapter_path}: {e}")
             return "LoRA"
 
-    def _calculate_directory_size(self, directory: str) -> float:
-        """Calculate directory size in GB."""
+    def _directory_sizes(self, directories: List[str]) -> Dict[str, Optional[float]]:
+        """Calculate directory sizes in GB, in parallel (cached; None while still being measured, see model_catalog)."""
         try:
-            total_size = 0
-            for dirpath, dirnames, filenames in os.walk(directory):
-                for filename in filenames:
-                    filepath = os.path.join(dirpath, filename)
-                    if os.path.isfile(filepath):
-                        total_size += os.path.getsize(filepath)
-            return total_size / (1024**3)
+            return get_size_service().get_many_gb(directories)
         except Exception as e:
-            logger.warning(f"Error calculating size for {directory}: {e}")
-            return 0
+            logger.warning(f"Error calculating directory sizes: {e}")
+            return {directory: None for directory in directories}
     
     def _is_valid_base_model(self, base_model_path: str) -> bool:
         """Check if base model path is valid (local path or HuggingFace model name)."""
@@ -400,31 +406,31 @@ print(response)
                     universal_newlines=True,
                     bufsize=1
                 )
-                
-                # Monitor the process output
-                while True:
-                    output = process.stdout.readline()
-                    if output == '' and process.poll() is not None:
-                        break
-                    if output:
-                        logger.info(f"MLX-LM fuse: {output.strip()}")
+                with process_watch.watching(process, 'fuse', output_dir=output_path):
+                    # Monitor the process output
+                    while True:
+                        output = process.stdout.readline()
+                        if output == '' and process.poll() is not None:
+                            break
+                        if output:
+                            logger.info(f"MLX-LM fuse: {output.strip()}")
                         
-                        # Update progress based on output patterns
-                        if "Loading" in output:
-                            self.progress = 20
-                            self.status_message = "Loading models..."
-                        elif "Fusing" in output or "Merging" in output:
-                            self.progress = 50
-                            self.status_message = "Fusing layers..."
-                        elif "Saving" in output:
-                            self.progress = 80
-                            self.status_message = "Saving fused model..."
-                        elif "Done" in output or "Complete" in output:
-                            self.progress = 90
-                            self.status_message = "Finalizing..."
+                            # Update progress based on output patterns
+                            if "Loading" in output:
+                                self.progress = 20
+                                self.status_message = "Loading models..."
+                            elif "Fusing" in output or "Merging" in output:
+                                self.progress = 50
+                                self.status_message = "Fusing layers..."
+                            elif "Saving" in output:
+                                self.progress = 80
+                                self.status_message = "Saving fused model..."
+                            elif "Done" in output or "Complete" in output:
+                                self.progress = 90
+                                self.status_message = "Finalizing..."
                 
-                # Check if process completed successfully
-                return_code = process.poll()
+                    # Check if process completed successfully
+                    return_code = process.poll()
                 if return_code != 0:
                     raise subprocess.CalledProcessError(return_code, cmd)
                 
@@ -517,16 +523,20 @@ print(response)
         models = []
         
         # Scan HuggingFace cache for fused models
+        fused_dirs = [d for d in glob.glob(os.path.join(self.hf_cache_dir, "models--*_fused_*")) if os.path.isdir(d)]
+        
+        # Calculate model sizes, all at once
+        sizes = self._directory_sizes(fused_dirs)
+        
         if os.path.exists(self.hf_cache_dir):
-            for model_dir in glob.glob(os.path.join(self.hf_cache_dir, "models--*_fused_*")):
+            for model_dir in fused_dirs:
                 if os.path.isdir(model_dir):
                     # Extract model name from directory
                     dir_name = os.path.basename(model_dir)
                     if dir_name.startswith("models--"):
                         model_name = dir_name[8:].replace("--", "/")
                         
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_dir)
+                        size_gb = sizes[model_dir]
                         
                         # Get creation time
                         creation_time = os.path.getctime(model_dir)
@@ -534,7 +544,7 @@ print(response)
                         models.append({
                             "name": model_name,
                             "path": model_dir,
-                            "size": round(size_gb, 2),
+                            "size": round_gb(size_gb),
                             "created": datetime.fromtimestamp(creation_time).isoformat(),
                             "type": "FUSED"
                         })
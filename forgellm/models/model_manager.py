@@ -10,21 +10,22 @@ import concurrent.futures
 import subprocess
 import json
 import time
-import signal
+import uuid
 from typing import Dict, List, Optional, Any, Tuple, Union
 import glob
 from pathlib import Path
 import shutil
-import mlx.core as mx
-import mlx.nn as nn
-from mlx_lm import generate
-from .model_publisher import ModelPublisher
+from .model_paths import resolve_model_path
+from .server_client import ServerClient, iter_lines
 import psutil
-import requests
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Seconds without a status event after which the event stream is considered lost
+# (the model server sends one at least every 2 seconds)
+STATUS_EVENTS_TIMEOUT = 10
+
 
 class ModelManager:
     """
@@ -68,6 +69,10 @@ class ModelManager:
         self.server_host = os.environ.get('MODEL_SERVER_HOST', 'localhost')
         self.server_port = int(os.environ.get('MODEL_SERVER_PORT', 5001))
         self.server_url = f"http://{self.server_host}:{self.server_port}"
+        # Unix domain socket of a model server on the same host (optional)
+        self.server_socket = os.environ.get('MODEL_SERVER_SOCKET') or None
+        # Keep-alive connections shared by every request to the model server
+        self.client = ServerClient(self.server_url, socket_path=self.server_socket)
         
         # Model state
         self.model = None
@@ -77,10 +82,28 @@ class ModelManager:
         self.loaded = False
         self.loading = False
         self.error = None
+        # Bytes, shards and ETA of the load in progress, as of the last status poll
+        self.load_progress = None
+        
+        # Models kept warm by the server, as of the last status poll
+        self.resident_models = []
         
         # Server process
         self.server_process = None
         
+        # Ids of the generation requests this manager is waiting for
+        self._generating = set()
+        
+        # Latest status pushed by the model server on /api/model/events
+        self._server_status = None
+        self._server_status_time = 0.0
+        self._events_thread = None
+        self._events_connected = False
+        # Pushed statuses older than this version predate the last load or unload
+        self._min_status_version = 0
+        self._polling_load = False
+        self._state_lock = threading.Lock()
+        
         # Start the model server if not already running
         self._ensure_server_running()
         
@@ -90,7 +113,7 @@ class ModelManager:
     def _ensure_server_running(self):
         """Ensure the model server is running."""
         try:
-            response = requests.get(f"{self.server_url}/api/model/status", timeout=1)
+            response = self.client.get("/api/model/status", timeout=1)
             if response.status_code == 200:
                 logger.info("Model server is already running")
                 return
@@ -110,6 +133,8 @@ class ModelManager:
             "--host", self.server_host, 
             "--port", str(self.server_port)
         ]
+        if self.server_socket:
+            cmd.extend(["--unix-socket", self.server_socket])
         
         logger.info(f"Starting model server with command: {' '.join(cmd)}")
         
@@ -124,7 +149,7 @@ class ModelManager:
         # Wait for the server to start
         for _ in range(10):
             try:
-                response = requests.get(f"{self.server_url}/api/model/status", timeout=1)
+                response = self.client.get("/api/model/status", timeout=1)
                 if response.status_code == 200:
                     logger.info("Model server started successfully")
                     return
@@ -152,6 +177,7 @@ class ModelManager:
         self.loading = True
         self.loaded = False
         self.error = None
+        self.load_progress = None
         
         # Send request to load the model
         data = {
@@ -159,20 +185,29 @@ class ModelManager:
             'adapter_path': adapter_path
         }
         
+        # Ignore pushed statuses until the server has received this request
+        previous_status_version = self._min_status_version
+        self._min_status_version = float('inf')
         try:
-            response = requests.post(
-                f"{self.server_url}/api/model/load",
-                json=data,
-                timeout=5
-            )
+            response = self.client.post("/api/model/load", json=data, timeout=5)
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('success'):
+                    self._min_status_version = result.get('status_version', 0)
+                    if result.get('resident'):
+                        # Already resident on the server: the switch is immediate
+                        logger.info(f"Model {model_name} is resident, switched without reloading")
+                        self.loading = False
+                        self.loaded = True
+                        return True
+                    
                     logger.info(f"Model {model_name} loading started")
                     
-                    # Start a thread to check loading status
-                    threading.Thread(target=self._check_loading_status).start()
+                    # Follow the load through pushed status events, or by
+                    # polling when the server does not push them
+                    if not self._start_status_events():
+                        self._start_load_polling()
                     
                     return True
                 else:
@@ -180,6 +215,12 @@ class ModelManager:
                     self.error = result.get('error')
                     self.loading = False
                     return False
+            elif response.status_code == 409:
+                # Another model is still loading on the server
+                self.error = response.json().get('error')
+                logger.error(f"Failed to load model: {self.error}")
+                self.loading = False
+                return False
             else:
                 logger.error(f"Failed to load model: {response.status_code} {response.text}")
                 self.error = f"HTTP error: {response.status_code}"
@@ -190,47 +231,151 @@ class ModelManager:
             self.error = str(e)
             self.loading = False
             return False
+        finally:
+            if self._min_status_version == float('inf'):
+                self._min_status_version = previous_status_version
+    
+    def _apply_load_status(self, result):
+        """
+        Update the state of the load in progress from a server status.
+        
+        Returns:
+            bool: True once the load has finished (loaded or failed)
+        """
+        self.resident_models = result.get('resident_models', self.resident_models)
+        self.load_progress = result.get('load_progress', self.load_progress)
+        
+        if result.get('loaded'):
+            logger.info("Model loaded successfully")
+            self.loading = False
+            self.loaded = True
+            self.error = None
+            return True
+        elif result.get('error'):
+            logger.error(f"Error loading model: {result.get('error')}")
+            self.loading = False
+            self.loaded = False
+            self.error = result.get('error')
+            return True
+        elif not result.get('is_loading'):
+            # Not loading anymore but not loaded either, must be an error
+            logger.error("Model loading failed")
+            self.loading = False
+            self.loaded = False
+            self.error = "Model loading failed"
+            return True
+        return False
+    
+    def _start_load_polling(self):
+        """Poll the load in progress (used when status events are not available)."""
+        with self._state_lock:
+            if self._polling_load:
+                return
+            self._polling_load = True
+        threading.Thread(target=self._check_loading_status, daemon=True).start()
     
     def _check_loading_status(self):
         """Check the loading status of the model."""
-        while True:
-            try:
-                response = requests.get(f"{self.server_url}/api/model/status", timeout=5)
-                
-                if response.status_code == 200:
-                    result = response.json()
+        try:
+            while self.loading:
+                try:
+                    response = self.client.get("/api/model/status", timeout=5)
                     
-                    if result.get('loaded'):
-                        logger.info("Model loaded successfully")
-                        self.loading = False
-                        self.loaded = True
-                        self.error = None
-                        return
-                    elif result.get('error'):
-                        logger.error(f"Error loading model: {result.get('error')}")
-                        self.loading = False
-                        self.loaded = False
-                        self.error = result.get('error')
+                    if response.status_code == 200 and self._apply_load_status(response.json()):
                         return
-                    elif not result.get('is_loading'):
-                        # Not loading anymore but not loaded either, must be an error
-                        logger.error("Model loading failed")
-                        self.loading = False
-                        self.loaded = False
-                        self.error = "Model loading failed"
+                    
+                    # Still loading, wait and check again
+                    time.sleep(0.5)
+                except Exception as e:
+                    logger.error(f"Error checking loading status: {e}")
+                    self.loading = False
+                    self.loaded = False
+                    self.error = str(e)
+                    return
+        finally:
+            self._polling_load = False
+    
+    def _start_status_events(self):
+        """
+        Subscribe to the status events of the model server, once.
+        
+        Returns:
+            bool: Whether the event stream is connected
+        """
+        with self._state_lock:
+            if self._events_thread is None:
+                self._events_thread = threading.Thread(target=self._follow_status_events, daemon=True)
+                self._events_thread.start()
+        return self._events_connected
+    
+    def _follow_status_events(self):
+        """Keep the latest status pushed by the model server, reconnecting when the stream drops."""
+        delay = 1.0
+        while True:
+            try:
+                with self.client.get("/api/model/events", stream=True,
+                                     timeout=(5, STATUS_EVENTS_TIMEOUT)) as response:
+                    if response.status_code == 404:
+                        logger.info("Model server does not push status events, polling instead")
                         return
-                
-                # Still loading, wait and check again
-                time.sleep(1)
+                    response.raise_for_status()
+                    # The first event is current (versions restart with the server)
+                    self._min_status_version = 0
+                    self._events_connected = True
+                    delay = 1.0
+                    for line in iter_lines(response):
+                        self._on_status_event(json.loads(line))
             except Exception as e:
-                logger.error(f"Error checking loading status: {e}")
-                self.loading = False
-                self.loaded = False
-                self.error = str(e)
-                return
+                logger.debug(f"Status event stream interrupted: {e}")
+            finally:
+                self._events_connected = False
+                self._server_status = None
+            
+            # Do not leave a load in progress without anyone following it
+            if self.loading:
+                self._start_load_polling()
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    
+    def _on_status_event(self, status):
+        """Handle a status pushed by the model server."""
+        self._server_status = status
+        self._server_status_time = time.time()
+        if status.get('status_version', 0) < self._min_status_version:
+            # Sent before the server received our last load request
+            return
+        if self.loading and not self._polling_load:
+            self._apply_load_status(status)
+        elif not self.loading:
+            self.resident_models = status.get('resident_models', self.resident_models)
     
-    def unload(self):
-        """Unload the model."""
+    def unload(self, model_name=None, adapter_path=None):
+        """
+        Unload models from the model server.
+        
+        Args:
+            model_name (str, optional): Resident model to unload; all models are unloaded if omitted.
+            adapter_path (str, optional): Adapter of the resident model to unload.
+        
+        Returns:
+            bool: True once the local state has been reset.
+        """
+        payload = {'model_name': model_name, 'adapter_path': adapter_path} if model_name else {}
+        try:
+            response = self.client.post("/api/model/unload", json=payload, timeout=10)
+            if response.status_code == 200:
+                result = response.json()
+                self.resident_models = result.get('resident_models', [])
+                self._min_status_version = result.get('status_version', self._min_status_version)
+            else:
+                logger.warning(f"Model server could not unload: {response.status_code} {response.text}")
+        except Exception as e:
+            logger.warning(f"Could not reach model server to unload: {e}")
+        
+        if model_name and (model_name, adapter_path or None) != (self.model_name, self.adapter_path or None):
+            # Another resident model was unloaded; the active one stays loaded
+            return True
+        
         if not self.loaded and not self.loading:
             logger.info("No model loaded")
             return True
@@ -250,7 +395,7 @@ class ModelManager:
         logger.info("Model unloaded")
         return True
     
-    def generate(self, prompt, max_tokens=100, temperature=0.7, history=None, top_p=None, repetition_penalty=None, system_prompt=None, max_kv_size=None, seed=None):
+    def generate(self, prompt, max_tokens=100, temperature=0.7, history=None, top_p=None, repetition_penalty=None, system_prompt=None, max_kv_size=None, seed=None, session_id=None, model_name=None, adapter_path=None, stop=None):
         """
         Generate text from the model.
         
@@ -264,11 +409,15 @@ class ModelManager:
             system_prompt (str, optional): System prompt for chat models.
             max_kv_size (int, optional): Maximum KV cache size.
             seed (int, optional): Random seed for deterministic generation.
+            session_id (str, optional): Conversation id used to reuse the prompt cache.
+            model_name (str, optional): Resident model to use instead of the active one.
+            adapter_path (str, optional): LoRA adapter or checkpoint to apply to this request only.
+            stop (str or list, optional): Sequences at which generation stops (not included in the text).
         
         Returns:
             dict or str: Generated response with token information, or error string.
         """
-        if not self.loaded:
+        if not self.loaded and not model_name:
             if self.loading:
                 logger.error("Model is still loading")
                 return "Error: Model is still loading"
@@ -297,13 +446,22 @@ class ModelManager:
             data['max_kv_size'] = max_kv_size
         if seed is not None:
             data['seed'] = seed
+        if session_id is not None:
+            data['session_id'] = session_id
+        if model_name:
+            data['model_name'] = model_name
+        if adapter_path:
+            data['adapter_path'] = adapter_path
+        if stop:
+            data['stop'] = stop
+        
+        # Named so that stop_generation can cancel it
+        request_id = uuid.uuid4().hex
+        data['request_id'] = request_id
+        self._generating.add(request_id)
         
         try:
-            response = requests.post(
-                f"{self.server_url}/api/model/generate",
-                json=data,
-                timeout=30
-            )
+            response = self.client.post("/api/model/generate", json=data, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -318,7 +476,60 @@ class ModelManager:
                 return f"Error: HTTP error {response.status_code}"
         except Exception as e:
             logger.error(f"Error generating text: {e}")
+            # Do not leave the request decoding on the server
+            self.cancel_generation(request_id)
             return f"Error: {str(e)}"
+        finally:
+            self._generating.discard(request_id)
+    
+    def cancel_generation(self, request_id):
+        """
+        Cancel a running generation request on the model server.
+        
+        Args:
+            request_id (str): Id of the request (sent as request_id or returned in X-Request-Id).
+        
+        Returns:
+            tuple: (response dict with the partial token usage, HTTP status code)
+        """
+        try:
+            response = self.client.post(f"/api/model/cancel/{request_id}", timeout=15)
+            return response.json(), response.status_code
+        except Exception as e:
+            logger.error(f"Error cancelling generation {request_id}: {e}")
+            return {'success': False, 'error': str(e)}, 500
+    
+    def score(self, payload, timeout=600):
+        """
+        Score texts or prompt/continuation pairs with the loaded model.
+        
+        Args:
+            payload (dict): Request body of /api/model/score (texts or items, plus options).
+            timeout (float): Seconds to wait for the whole batch to be scored.
+        
+        Returns:
+            tuple: (response dict with per-item log-probs, NLL and perplexity, HTTP status code)
+        """
+        try:
+            response = self.client.post("/api/model/score", json=payload, timeout=timeout)
+            return response.json(), response.status_code
+        except Exception as e:
+            logger.error(f"Error scoring texts: {e}")
+            return {'success': False, 'error': str(e)}, 500
+    
+    def cancel_load(self):
+        """
+        Cancel the model load in progress on the model server.
+        
+        Returns:
+            tuple: (response dict, HTTP status code)
+        """
+        try:
+            response = self.client.post("/api/model/load/cancel", timeout=5)
+            return response.json(), response.status_code
+        except Exception as e:
+            logger.error(f"Error cancelling model load: {e}")
+            return {'success': False, 'error': str(e)}, 500
     
     def get_status(self):
         """
@@ -337,15 +548,24 @@ class ModelManager:
                 'is_loading': self.loading,
                 'model_name': self.model_name,
                 'adapter_path': self.adapter_path,
-                'error': self.error
+                'error': self.error,
+                'load_progress': self.load_progress,
+                'resident_models': self.resident_models
             }
         
-        # Otherwise, get status from model server
+        # Otherwise use the status pushed by the model server, or ask for it
+        self._start_status_events()
         try:
-            response = requests.get(f"{self.server_url}/api/model/status", timeout=5)
+            server_status = self._server_status
+            if server_status is not None and time.time() - self._server_status_time < STATUS_EVENTS_TIMEOUT \
+                    and server_status.get('status_version', 0) >= self._min_status_version:
+                response = None
+            else:
+                response = self.client.get("/api/model/status", timeout=5)
+                server_status = response.json() if response.status_code == 200 else None
             
-            if response.status_code == 200:
-                server_status = response.json()
+            if server_status is not None:
+                self.resident_models = server_status.get('resident_models', [])
                 
                 # Update our internal state to match server
                 if not self.loading:
@@ -369,6 +589,58 @@ class ModelManager:
                 'error': str(e)
             }
     
+    def _prefix_request(self, method, path='', payload=None, timeout=10):
+        """Send a request to the model server's registered-prefix API."""
+        try:
+            response = self.client.request(method, f"/api/model/prefixes{path}", json=payload, timeout=timeout)
+            return response.json(), response.status_code
+        except Exception as e:
+            logger.error(f"Error calling prefix cache API: {e}")
+            return {'success': False, 'error': str(e)}, 500
+
+    def list_prefixes(self):
+        """
+        List the prompt prefixes registered for the loaded model.
+        
+        Returns:
+            tuple: (response dict, HTTP status code)
+        """
+        return self._prefix_request('GET')
+
+    def register_prefix(self, prefix=None, system_prompt=None, messages=None, is_base_model=None):
+        """
+        Precompute and persist the KV cache of a shared prompt prefix.
+        
+        Args:
+            prefix (str, optional): Raw prefix text, used as-is.
+            system_prompt (str, optional): System prompt, formatted for the model's architecture.
+            messages (list, optional): Few-shot messages following the system prompt.
+            is_base_model (bool, optional): Model type hint.
+        
+        Returns:
+            tuple: (response dict, HTTP status code)
+        """
+        payload = {
+            'prefix': prefix,
+            'system_prompt': system_prompt or '',
+            'messages': messages or [],
+            'is_base_model': is_base_model
+        }
+        # Prefilling a long prefix can take a while on large models
+        return self._prefix_request('POST', payload=payload, timeout=300)
+
+    def evict_prefix(self, prefix_id):
+        """
+        Remove a registered prefix from memory and disk.
+        
+        Args:
+            prefix_id (str): Identifier returned when the prefix was registered.
+        
+        Returns:
+            tuple: (response dict, HTTP status code)
+        """
+        return self._prefix_request('DELETE', path=f"/{prefix_id}")
+
     def list_models(self):
         """
         List available models.
@@ -430,6 +702,10 @@ class ModelManager:
                 - top_p: Nucleus sampling parameter (lower = more focused)
                 - repetition_penalty: Penalty for repeating tokens
                 - system_prompt: Optional system prompt for chat models
+                - session_id: Optional conversation id for prompt cache reuse
+                - model_name: Optional resident model to use instead of the active one
+                - adapter_path: Optional LoRA adapter for this request only
+                - stop: Optional stop sequences
             
         Returns:
             dict or str: Generated response with token information, or error string
@@ -443,6 +719,7 @@ class ModelManager:
         system_prompt = params.get('system_prompt')
         max_kv_size = params.get('max_kv_size')
         seed = params.get('seed')
+        session_id = params.get('session_id')
         
         return self.generate(
             prompt,
@@ -453,14 +730,17 @@ class ModelManager:
             repetition_penalty=repetition_penalty,
             system_prompt=system_prompt,
             max_kv_size=max_kv_size,
-            seed=seed
+            seed=seed,
+            session_id=session_id,
+            model_name=params.get('model_name'),
+            adapter_path=params.get('adapter_path'),
+            stop=params.get('stop')
         )
 
     def stop_generation(self) -> None:
-        """Stop the current generation."""
-        # Send SIGINT to the model process
-        if self.model_process and self.model_process.poll() is None:
-            os.kill(self.model_process.pid, signal.SIGINT)
+        """Stop the generation requests this manager is waiting for."""
+        for request_id in list(self._generating):
+            self.cancel_generation(request_id)
 
     def memory_usage_gb(self) -> float:
         """Get the current memory usage in GB."""
@@ -498,70 +778,7 @@ class ModelManager:
     
     def _resolve_model_path(self, model_name: str) -> str:
         """Resolve model path, handling published models and HF cache."""
-        logger.info(f"Resolving model path for: {model_name}")
-        
-        # If it's a local path that exists, return it directly
-        if Path(model_name).exists():
-            logger.info(f"Found local path: {model_name}")
-            return model_name
-            
-        # Check if it's a published model (starts with "published/")
-        if model_name.startswith("published/"):
-            # Remove the "published/" prefix and look in HF cache
-            actual_model_name = model_name[10:]  # Remove "published/"
-            cache_root = Path.home() / '.cache' / 'huggingface' / 'hub'
-            candidate = cache_root / ('models--published--' + actual_model_name.replace('/', '--'))
-            if candidate.exists():
-                # Published models store files directly in the main directory (no snapshots)
-                # Check if config.json exists to confirm it's a valid model directory
-                config_file = candidate / 'config.json'
-                if config_file.exists():
-                    logger.info(f"Found published model in HF cache: {candidate}")
-                    return str(candidate)
-                else:
-                    error_msg = f"Published model directory exists but no config.json found: {candidate}"
-                    logger.error(error_msg)
-                    raise FileNotFoundError(error_msg)
-            else:
-                # For published models, if not found in cache, it's an error - never try to download from HF
-                error_msg = f"Published model not found in local cache: {candidate}. Published models must be local only."
-                logger.error(error_msg)
-                raise FileNotFoundError(error_msg)
-                
-        # Check if it's a regular published model in local published directory
-        published_path = Path("published") / model_name
-        if published_path.exists():
-            logger.info(f"Found published model: {published_path}")
-            return str(published_path)
-            
-        # Check HuggingFace cache for regular models
-        try:
-            cache_root = Path.home() / '.cache' / 'huggingface' / 'hub'
-            candidate = cache_root / ('models--' + model_name.replace('/', '--'))
-            if candidate.exists():
-                # Find the snapshots directory and get the latest snapshot
-                snapshots_dir = candidate / 'snapshots'
-                if snapshots_dir.exists():
-                    # Get all snapshot directories (usually just one)
-                    snapshot_dirs = [d for d in snapshots_dir.iterdir() if d.is_dir()]
-                    if snapshot_dirs:
-                        # Use the first (and usually only) snapshot
-                        actual_model_path = str(snapshot_dirs[0])
-                        logger.info(f"Found model in HF cache: {actual_model_path}")
-                        return actual_model_path
-                    else:
-                        logger.error(f"No snapshots found in HF cache: {snapshots_dir}")
-                else:
-                    logger.error(f"No snapshots directory in HF cache: {candidate}")
-            else:
-                logger.error(f"Model not found in HF cache: {candidate}")
-        except Exception as e:
-            logger.warning(f"Error checking HF cache: {e}")
-            
-        # NEVER download from HuggingFace - only use local models
-        error_msg = f"Model '{model_name}' not found in any local cache. Only local models are supported. Available locations checked: local path, published directory, HuggingFace cache."
-        logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+        return resolve_model_path(model_name)
 
     def _is_base_model(self, model_name: str) -> bool:
         """Detect if a model is a base model (not instruction-tuned) using SOTA practices.
@@ -0,0 +1,90 @@
+"""
+Model path resolution shared by the web app, the model server and the CLI.
+
+Kept free of heavy imports so that the model server can resolve paths
+without importing the web-side ModelManager.
+"""
+
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_model_path(model_name: str) -> str:
+    """
+    Resolve a model name to a local directory, handling published models and the HF cache.
+    
+    Args:
+        model_name: Local path, published/<name> or HuggingFace model id
+        
+    Returns:
+        str: Path of the model directory
+        
+    Raises:
+        FileNotFoundError: If the model is not available locally (nothing is downloaded)
+    """
+    logger.info(f"Resolving model path for: {model_name}")
+    
+    # If it's a local path that exists, return it directly
+    if Path(model_name).exists():
+        logger.info(f"Found local path: {model_name}")
+        return model_name
+        
+    # Check if it's a published model (starts with "published/")
+    if model_name.startswith("published/"):
+        # Remove the "published/" prefix and look in HF cache
+        actual_model_name = model_name[10:]  # Remove "published/"
+        cache_root = Path.home() / '.cache' / 'huggingface' / 'hub'
+        candidate = cache_root / ('models--published--' + actual_model_name.replace('/', '--'))
+        if candidate.exists():
+            # Published models store files directly in the main directory (no snapshots)
+            # Check if config.json exists to confirm it's a valid model directory
+            config_file = candidate / 'config.json'
+            if config_file.exists():
+                logger.info(f"Found published model in HF cache: {candidate}")
+                return str(candidate)
+            else:
+                error_msg = f"Published model directory exists but no config.json found: {candidate}"
+                logger.error(error_msg)
+                raise FileNotFoundError(error_msg)
+        else:
+            # For published models, if not found in cache, it's an error - never try to download from HF
+            error_msg = f"Published model not found in local cache: {candidate}. Published models must be local only."
+            logger.error(error_msg)
+            raise FileNotFoundError(error_msg)
+            
+    # Check if it's a regular published model in local published directory
+    published_path = Path("published") / model_name
+    if published_path.exists():
+        logger.info(f"Found published model: {published_path}")
+        return str(published_path)
+        
+    # Check HuggingFace cache for regular models
+    try:
+        cache_root = Path.home() / '.cache' / 'huggingface' / 'hub'
+        candidate = cache_root / ('models--' + model_name.replace('/', '--'))
+        if candidate.exists():
+            # Find the snapshots directory and get the latest snapshot
+            snapshots_dir = candidate / 'snapshots'
+            if snapshots_dir.exists():
+                # Get all snapshot directories (usually just one)
+                snapshot_dirs = [d for d in snapshots_dir.iterdir() if d.is_dir()]
+                if snapshot_dirs:
+                    # Use the first (and usually only) snapshot
+                    actual_model_path = str(snapshot_dirs[0])
+                    logger.info(f"Found model in HF cache: {actual_model_path}")
+                    return actual_model_path
+                else:
+                    logger.error(f"No snapshots found in HF cache: {snapshots_dir}")
+            else:
+                logger.error(f"No snapshots directory in HF cache: {candidate}")
+        else:
+            logger.error(f"Model not found in HF cache: {candidate}")
+    except Exception as e:
+        logger.warning(f"Error checking HF cache: {e}")
+        
+    # NEVER download from HuggingFace - only use local models
+    error_msg = f"Model '{model_name}' not found in any local cache. Only local models are supported. Available locations checked: local path, published directory, HuggingFace cache."
+    logger.error(error_msg)
+    raise FileNotFoundError(error_msg)
@@ -14,6 +14,7 @@ import numpy as np
 
 # Import our training dashboard generator
 from ..training.dashboard import DashboardGenerator, identify_best_checkpoints, load_training_data
+from ..utils.process_watch import process_watch
 
 logger = logging.getLogger(__name__)
 
@@ -183,7 +184,11 @@ class ModelPublisher:
             ]
             
             logger.info(f"Converting LoRA to full model: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            with process_watch.watching(process, 'fuse', output_dir=str(output_dir)):
+                stdout, stderr = process.communicate()
+            if process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
             
             logger.info("Model conversion completed successfully")
             return {"success": True}
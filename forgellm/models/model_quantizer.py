@@ -14,6 +14,9 @@ import json
 import subprocess
 from datetime import datetime
 
+from ..utils.process_watch import process_watch
+from .model_catalog import get_size_service, round_gb
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -53,89 +56,77 @@ class ModelQuantizer:
         
         Returns:
             List of model dictionaries with name, path, type, and size
+            (None while the size is still being measured)
         """
         models = []
         
         # Scan local models directory
+        local_models = []
         for model_type in ['base', 'cpt', 'ift']:
             type_dir = os.path.join(self.models_dir, model_type)
             if os.path.exists(type_dir):
                 for model_path in glob.glob(os.path.join(type_dir, '*')):
                     if os.path.isdir(model_path):
-                        model_name = os.path.basename(model_path)
-                        
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_path)
-                        
-                        models.append({
-                            "name": model_name,
-                            "path": os.path.join(model_type, model_name),
-                            "full_path": model_path,
-                            "type": model_type.upper(),
-                            "size": round(size_gb, 2)
-                        })
+                        local_models.append((model_type, model_path))
         
         # Scan HuggingFace cache
         hf_cache_dir = os.path.expanduser("~/.cache/huggingface/hub")
+        hf_models = []
         if os.path.exists(hf_cache_dir):
             for model_dir in glob.glob(os.path.join(hf_cache_dir, "models--*")):
                 if os.path.isdir(model_dir):
-                    # Extract model name from directory (e.g., models--microsoft--DialoGPT-medium)
-                    dir_name = os.path.basename(model_dir)
-                    if dir_name.startswith("models--"):
-                        model_name = dir_name[8:].replace("--", "/")  # Remove "models--" prefix and convert -- to /
-                        
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_dir)
-                        
-                        # Only include models > 100MB to filter out small files
-                        if size_gb > 0.1:
-                            models.append({
-                                "name": model_name,
-                                "path": model_dir,
-                                "full_path": model_dir,
-                                "type": "HF_CACHE",
-                                "size": round(size_gb, 2)
-                            })
+                    hf_models.append(model_dir)
+        
+        # Calculate model sizes, all at once
+        sizes = self._directory_sizes([path for _, path in local_models] + hf_models)
+        
+        for model_type, model_path in local_models:
+            model_name = os.path.basename(model_path)
+            models.append({
+                "name": model_name,
+                "path": os.path.join(model_type, model_name),
+                "full_path": model_path,
+                "type": model_type.upper(),
+                "size": round_gb(sizes[model_path])
+            })
+        
+        for model_dir in hf_models:
+            # Extract model name from directory (e.g., models--microsoft--DialoGPT-medium)
+            dir_name = os.path.basename(model_dir)
+            if dir_name.startswith("models--"):
+                model_name = dir_name[8:].replace("--", "/")  # Remove "models--" prefix and convert -- to /
+                size_gb = sizes[model_dir]
+                
+                # Only include models > 100MB to filter out small files (or not measured yet)
+                if size_gb is None or size_gb > 0.1:
+                    models.append({
+                        "name": model_name,
+                        "path": model_dir,
+                        "full_path": model_dir,
+                        "type": "HF_CACHE",
+                        "size": round_gb(size_gb)
+                    })
         
         # Sort by size (largest first)
-        models.sort(key=lambda x: x["size"], reverse=True)
+        models.sort(key=lambda x: x["size"] or 0, reverse=True)
         
         return models
 
-    def _calculate_directory_size(self, directory: str) -> float:
-        """Calculate directory size in GB.
+    def _directory_sizes(self, directories: List[str]) -> Dict[str, Optional[float]]:
+        """Calculate directory sizes in GB, measuring them in parallel.
         
         Args:
-            directory: Path to directory
+            directories: Paths to directories
             
         Returns:
-            Size in GB
+            Dictionary of path to size in GB (cached; None while still being
+            measured, see model_catalog)
         """
         try:
-            # Use subprocess to run du command for accurate directory size
-            result = subprocess.run(
-                ['du', '-sb', directory],  # -sb gives size in bytes
-                capture_output=True, 
-                text=True, 
-                check=False
-            )
-            if result.returncode == 0:
-                # Parse the output to get size in bytes
-                size_bytes = int(result.stdout.strip().split()[0])
-                return size_bytes / (1024**3)  # Convert to GB
-            else:
-                # Fallback to Python calculation
-                total_size = 0
-                for dirpath, dirnames, filenames in os.walk(directory):
-                    for filename in filenames:
-                        filepath = os.path.join(dirpath, filename)
-                        if os.path.isfile(filepath):
-                            total_size += os.path.getsize(filepath)
-                return total_size / (1024**3)
+            return get_size_service().get_many_gb(directories)
         except Exception as e:
-            logger.warning(f"Error calculating size for {directory}: {e}")
-            return 0
+            logger.warning(f"Error calculating directory sizes: {e}")
+            return {directory: None for directory in directories}
 
     def start_quantization(self, model_path: str, bits: int = 4, group_size: int = 64) -> Dict[str, Any]:
         """Start quantization of a model.
@@ -295,47 +286,47 @@ class ModelQuantizer:
                 bufsize=1,
                 universal_newlines=True
             )
+            with process_watch.watching(process, 'convert', output_dir=job["output_path"]):
+                # Monitor the process
+                stdout_lines = []
+                stderr_lines = []
             
-            # Monitor the process
-            stdout_lines = []
-            stderr_lines = []
-            
-            while True:
-                # Check if process is still running
-                if process.poll() is not None:
-                    break
+                while True:
+                    # Check if process is still running
+                    if process.poll() is not None:
+                        break
                 
-                # Read any available output
-                try:
-                    import select
-                    ready, _, _ = select.select([process.stdout, process.stderr], [], [], 0.1)
+                    # Read any available output
+                    try:
+                        import select
+                        ready, _, _ = select.select([process.stdout, process.stderr], [], [], 0.1)
                     
-                    if process.stdout in ready:
-                        line = process.stdout.readline()
-                        if line:
-                            stdout_lines.append(line.strip())
-                            logger.debug(f"Quantization stdout: {line.strip()}")
+                        if process.stdout in ready:
+                            line = process.stdout.readline()
+                            if line:
+                                stdout_lines.append(line.strip())
+                                logger.debug(f"Quantization stdout: {line.strip()}")
                             
-                            # Update progress based on output
-                            if "Converting" in line:
-                                self.progress = min(self.progress + 5, 80)
-                            elif "Saving" in line:
-                                self.progress = 85
-                                self.status_message = "Saving quantized model..."
+                                # Update progress based on output
+                                if "Converting" in line:
+                                    self.progress = min(self.progress + 5, 80)
+                                elif "Saving" in line:
+                                    self.progress = 85
+                                    self.status_message = "Saving quantized model..."
                     
-                    if process.stderr in ready:
-                        line = process.stderr.readline()
-                        if line:
-                            stderr_lines.append(line.strip())
-                            logger.debug(f"Quantization stderr: {line.strip()}")
+                        if process.stderr in ready:
+                            line = process.stderr.readline()
+                            if line:
+                                stderr_lines.append(line.strip())
+                                logger.debug(f"Quantization stderr: {line.strip()}")
                 
-                except ImportError:
-                    # Fallback for systems without select
-                    time.sleep(0.5)
-                    self.progress = min(self.progress + 2, 80)
+                    except ImportError:
+                        # Fallback for systems without select
+                        time.sleep(0.5)
+                        self.progress = min(self.progress + 2, 80)
             
-            # Wait for process to complete and get final output
-            stdout, stderr = process.communicate()
+                # Wait for process to complete and get final output
+                stdout, stderr = process.communicate()
             if stdout:
                 stdout_lines.extend(stdout.strip().split('\n'))
             if stderr:
@@ -478,20 +469,28 @@ class ModelQuantizer:
         """Get list of quantized models.
         
         Returns:
-            List of quantized model dictionaries
+            List of quantized model dictionaries (size None while it is
+            still being measured)
         """
         models = []
         
+        # Quantized models in the HuggingFace cache (contain _Q4 or _Q8) and in the legacy directory
+        hf_dirs = [d for d in glob.glob(os.path.join(self.hf_cache_dir, "models--*"))
+                   if os.path.isdir(d) and ("_Q4" in os.path.basename(d) or "_Q8" in os.path.basename(d))]
+        legacy_dirs = [d for d in glob.glob(os.path.join(self.quantized_models_dir, '*')) if os.path.isdir(d)]
+        
+        # Calculate model sizes, all at once
+        sizes = self._directory_sizes(hf_dirs + legacy_dirs)
+        
         # Scan HuggingFace cache for quantized models
         if os.path.exists(self.hf_cache_dir):
-            for model_dir in glob.glob(os.path.join(self.hf_cache_dir, "models--*")):
+            for model_dir in hf_dirs:
                 if os.path.isdir(model_dir):
                     model_name = os.path.basename(model_dir)
                     
                     # Check if this is a quantized model (contains _Q4 or _Q8)
                     if "_Q4" in model_name or "_Q8" in model_name:
-                        # Calculate model size
-                        size_gb = self._calculate_directory_size(model_dir)
+                        size_gb = sizes[model_dir]
                         
                         # Load quantization info if available
                         quant_info_path = os.path.join(model_dir, "quantization_info.json")
@@ -514,7 +513,7 @@ class ModelQuantizer:
                             "name": display_name,
                             "path": model_dir,
                             "full_path": model_dir,
-                            "size": round(size_gb, 2),
+                            "size": round_gb(size_gb),
                             "bits": quant_info.get("bits"),
                             "group_size": quant_info.get("group_size"),
                             "quantized_at": quant_info.get("quantized_at"),
@@ -524,12 +523,11 @@ class ModelQuantizer:
         
         # Also scan legacy quantized models directory for backwards compatibility
         if os.path.exists(self.quantized_models_dir):
-            for model_path in glob.glob(os.path.join(self.quantized_models_dir, '*')):
+            for model_path in legacy_dirs:
                 if os.path.isdir(model_path):
                     model_name = os.path.basename(model_path)
                     
-                    # Calculate model size
-                    size_gb = self._calculate_directory_size(model_path)
+                    size_gb = sizes[model_path]
                     
                     # Load quantization info if available
                     quant_info_path = os.path.join(model_path, "quantization_info.json")
@@ -545,7 +543,7 @@ class ModelQuantizer:
                         "name": model_name,
                         "path": os.path.join('quantized', model_name),
                         "full_path": model_path,
-                        "size": round(size_gb, 2),
+                        "size": round_gb(size_gb),
                         "bits": quant_info.get("bits"),
                         "group_size": quant_info.get("group_size"),
                         "quantized_at": quant_info.get("quantized_at"),
@@ -0,0 +1,134 @@
+"""
+Pooled HTTP client for the model server.
+
+One ``requests.Session`` is shared by every caller in the web process, so
+status checks, generation requests and streamed responses reuse keep-alive
+connections instead of opening a new connection each time. When the model
+server listens on a Unix domain socket (``MODEL_SERVER_SOCKET``), the same
+client talks to it over that socket.
+"""
+
+import socket
+import logging
+from typing import Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Connections kept open to the model server (one per concurrent caller)
+DEFAULT_POOL_SIZE = 16
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, *args, **kwargs):
+        self.socket_path = socket_path
+        super().__init__('localhost', *args, **kwargs)
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class UnixHTTPConnectionPool(HTTPConnectionPool):
+    """Pool of keep-alive connections to a Unix domain socket."""
+
+    ConnectionCls = UnixHTTPConnection
+
+    def __init__(self, socket_path: str, **kwargs):
+        super().__init__('localhost', **kwargs)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        self.num_connections += 1
+        return self.ConnectionCls(self.socket_path, timeout=self.timeout.connect_timeout, **self.conn_kw)
+
+
+class UnixSocketAdapter(HTTPAdapter):
+    """Transport adapter sending every request of a session to a Unix domain socket."""
+
+    def __init__(self, socket_path: str, pool_maxsize: int = DEFAULT_POOL_SIZE):
+        self.socket_path = socket_path
+        self._pool = UnixHTTPConnectionPool(socket_path, maxsize=pool_maxsize, block=False)
+        super().__init__(pool_maxsize=pool_maxsize)
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self._pool
+
+    def get_connection(self, url, proxies=None):
+        return self._pool
+
+    def close(self):
+        self._pool.close()
+        super().close()
+
+
+class ServerClient:
+    """Keep-alive client for the model server, over TCP or a Unix domain socket."""
+
+    def __init__(self, server_url: str, socket_path: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE):
+        """
+        Initialize the client.
+
+        Args:
+            server_url: Base URL of the model server (http://host:port)
+            socket_path: Unix domain socket of the model server (used instead of TCP if given)
+            pool_size: Connections kept open to the server
+        """
+        self.socket_path = socket_path
+        self.session = requests.Session()
+        if socket_path:
+            # The host of the URL is ignored; every request goes to the socket
+            self.base_url = 'http://localhost'
+            self.session.mount('http://', UnixSocketAdapter(socket_path, pool_size))
+        else:
+            self.base_url = server_url.rstrip('/')
+            self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        return self.session.request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def iter_lines(response: requests.Response) -> Iterator[bytes]:
+    """
+    Yield the lines of a streamed response as soon as each one is complete.
+
+    Response.iter_lines reads fixed-size chunks and holds the end of a line
+    back until the next chunk arrives, which delays every pushed event.
+    """
+    buffer = b''
+    while True:
+        chunk = response.raw.read1(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            if line:
+                yield line
+    if buffer:
+        yield buffer
@@ -0,0 +1,187 @@
+"""
+In-place LoRA/DoRA adapter swapping for resident models.
+
+Loading a checkpoint with ``mlx_lm.load(model, adapter_path=...)`` reads the
+base weights again every time. The AdapterSwapper keeps the base model and
+only replaces the adapter tensors: the adapter layers are created once per
+adapter configuration (rank, scale, target keys, number of layers) and each
+checkpoint then only loads its ``lora_a``/``lora_b``/``m`` tensors into them.
+Swapping between checkpoints of one training run therefore takes
+milliseconds, and going back to the base model removes the adapter layers.
+
+An adapter can be given as a directory (``adapters.safetensors`` is used) or
+as a specific checkpoint file such as ``0000175_adapters.safetensors`` next
+to its ``adapter_config.json``.
+
+Full fine-tunes (``fine_tune_type: full``) overwrite the base weights. They
+can be applied to a freshly loaded base model, but cannot be swapped out
+again; switching away from them needs a fresh load.
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ADAPTER_CONFIG_FILE = 'adapter_config.json'
+ADAPTER_WEIGHTS_FILE = 'adapters.safetensors'
+ADAPTER_LEAVES = {'lora_a', 'lora_b', 'm'}
+
+
+class AdapterSwapError(Exception):
+    """Raised when an adapter cannot be swapped into a resident model."""
+    pass
+
+
+def resolve_adapter(adapter_path: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Split an adapter selection into its directory and weights file.
+
+    Args:
+        adapter_path: Adapter directory or checkpoint ``.safetensors`` file
+
+    Returns:
+        Tuple of (adapter_dir, weights_file), both None for the base model
+    """
+    if not adapter_path:
+        return None, None
+    if adapter_path.endswith('.safetensors'):
+        return os.path.dirname(adapter_path) or '.', adapter_path
+    return adapter_path, os.path.join(adapter_path, ADAPTER_WEIGHTS_FILE)
+
+
+def read_adapter_config(adapter_dir: str) -> Dict[str, Any]:
+    """Read the adapter_config.json of an adapter directory."""
+    config_path = os.path.join(adapter_dir, ADAPTER_CONFIG_FILE)
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def _layer_signature(config: Dict[str, Any]) -> str:
+    """Identify the adapter layers an adapter configuration needs."""
+    return json.dumps([
+        config.get('fine_tune_type', 'lora'),
+        config.get('num_layers'),
+        config.get('lora_parameters')
+    ], sort_keys=True)
+
+
+class AdapterSwapper:
+    """Applies and removes adapters on one resident model."""
+
+    def __init__(self, model):
+        """
+        Initialize the swapper.
+
+        Args:
+            model: The loaded MLX base model (without adapters)
+        """
+        self.model = model
+        self.adapter_path = None
+        self._signature = None
+        self._full = False
+
+    def apply(self, adapter_path: Optional[str]) -> float:
+        """
+        Switch the model to another adapter, or back to the base weights.
+
+        Must run on the thread that evaluates the model, with no sequence
+        in flight.
+
+        Args:
+            adapter_path: Adapter directory or checkpoint file (None for the base model)
+
+        Returns:
+            float: Seconds the swap took
+
+        Raises:
+            FileNotFoundError: If the adapter configuration or weights are missing
+            AdapterSwapError: If the adapter cannot be applied in place
+        """
+        import mlx.core as mx
+        from mlx.utils import tree_flatten
+
+        start_time = time.time()
+        adapter_dir, weights_file = resolve_adapter(adapter_path)
+
+        if self._full:
+            raise AdapterSwapError(
+                f"Model has the full fine-tune {self.adapter_path} applied and needs a fresh load"
+            )
+
+        if adapter_dir is None:
+            self._remove_adapter_layers()
+            self.adapter_path = None
+            return time.time() - start_time
+
+        config = read_adapter_config(adapter_dir)
+        fine_tune_type = config.get('fine_tune_type', 'lora')
+        if fine_tune_type == 'full' and (self._signature is not None or self.adapter_path is not None):
+            raise AdapterSwapError(f"{adapter_path} is a full fine-tune and needs a fresh load")
+        if not os.path.exists(weights_file):
+            raise FileNotFoundError(f"Adapter weights not found: {weights_file}")
+
+        if fine_tune_type == 'full':
+            weights = mx.load(weights_file)
+            self.model.load_weights(list(weights.items()), strict=False)
+            mx.eval(self.model.parameters())
+            self.adapter_path = adapter_path
+            self._full = True
+            return time.time() - start_time
+
+        signature = _layer_signature(config)
+        if signature != self._signature:
+            from mlx_lm.tuner.utils import linear_to_lora_layers
+
+            self._remove_adapter_layers()
+            linear_to_lora_layers(
+                self.model,
+                config['num_layers'],
+                config['lora_parameters'],
+                use_dora=(fine_tune_type == 'dora')
+            )
+            # New layers are created in training mode (active dropout)
+            self.model.eval()
+            self._signature = signature
+
+        weights = mx.load(weights_file)
+        allowed = {
+            name: value for name, value in tree_flatten(self.model.parameters())
+            if name.rsplit('.', 1)[-1] in ADAPTER_LEAVES
+        }
+        errors = [
+            name for name, value in weights.items()
+            if name not in allowed or value.shape != allowed[name].shape
+        ]
+        if errors:
+            raise AdapterSwapError(
+                f"Adapter {weights_file} does not match the model: {', '.join(errors[:5])}"
+            )
+        self.model.load_weights(list(weights.items()), strict=False)
+        # Materialize here: lazy arrays are bound to this thread's stream
+        mx.eval(self.model.parameters())
+
+        self.adapter_path = adapter_path
+        elapsed = time.time() - start_time
+        logger.info(f"Applied adapter {adapter_path} in {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def _remove_adapter_layers(self):
+        """Replace every adapter layer with the base layer it wraps."""
+        from mlx.utils import tree_unflatten
+
+        if self._signature is None:
+            return
+        reset_layers = []
+        for name, module in self.model.named_modules():
+            # LoRA/DoRA layers hold their base layer as .linear or .embedding
+            if 'lora_a' in module:
+                base = module.get('linear', module.get('embedding'))
+                if base is not None:
+                    reset_layers.append((name, base))
+        if reset_layers:
+            self.model.update_modules(tree_unflatten(reset_layers))
+        self._signature = None
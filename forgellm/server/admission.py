@@ -0,0 +1,161 @@
+"""
+Admission control for generation requests on the model server.
+
+Status and health calls are served directly by the threaded HTTP server,
+while generation requests must first obtain a slot from the
+AdmissionController. Requests that cannot get a slot wait in a bounded
+queue; when the queue is full or the wait exceeds the configured limit the
+caller is told to retry later.
+"""
+
+import math
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionError(Exception):
+    """Raised when a request cannot be admitted for generation."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AdmissionError):
+    """The wait queue is at its configured depth (HTTP 429)."""
+
+    status_code = 429
+
+
+class QueueTimeoutError(AdmissionError):
+    """The request waited longer than the queue-time limit (HTTP 503)."""
+
+    status_code = 503
+
+
+class AdmissionController:
+    """Bounded admission queue in front of the generation slots."""
+
+    def __init__(self, max_concurrent: int = 1, max_queue: int = 16, queue_timeout: float = 30.0):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Number of generation requests allowed to run at once
+            max_queue: Number of requests allowed to wait for a slot
+            queue_timeout: Maximum seconds a request may wait for a slot
+        """
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+
+        # Exponential moving average of slot hold time, used for Retry-After
+        self._avg_service_time = None
+        self._admitted_total = 0
+        self._rejected_total = 0
+        self._timed_out_total = 0
+        self._queue_wait_total = 0.0
+
+    def retry_after(self) -> int:
+        """Estimate how many seconds a rejected client should wait before retrying."""
+        service_time = self._avg_service_time or 1.0
+        backlog = (self._waiting + 1) / self.max_concurrent
+        return max(1, int(math.ceil(service_time * backlog)))
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """
+        Hold a generation slot for the duration of the block.
+
+        Args:
+            timeout: Override for the queue-time limit in seconds
+
+        Yields:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            QueueFullError: If the wait queue is already full
+            QueueTimeoutError: If no slot became free within the time limit
+        """
+        wait_time = self._acquire(self.queue_timeout if timeout is None else timeout)
+        started = time.time()
+        try:
+            yield wait_time
+        finally:
+            self._release(time.time() - started)
+
+    def _acquire(self, timeout: float) -> float:
+        """Block until a slot is free and return the time spent waiting."""
+        start = time.time()
+        with self._cond:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                self._admitted_total += 1
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                self._rejected_total += 1
+                retry_after = self.retry_after()
+                logger.warning(f"Generation queue full ({self._waiting}/{self.max_queue}), rejecting request")
+                raise QueueFullError(
+                    f"Generation queue is full ({self.max_queue} waiting)", retry_after
+                )
+
+            self._waiting += 1
+            try:
+                deadline = start + timeout
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self._timed_out_total += 1
+                        retry_after = self.retry_after()
+                        logger.warning(f"Request waited {timeout:.1f}s without a generation slot")
+                        raise QueueTimeoutError(
+                            f"Timed out after {timeout:.1f}s waiting for a generation slot", retry_after
+                        )
+                    self._cond.wait(remaining)
+                self._active += 1
+                self._admitted_total += 1
+            finally:
+                self._waiting -= 1
+
+            wait_time = time.time() - start
+            self._queue_wait_total += wait_time
+            return wait_time
+
+    def _release(self, service_time: float):
+        """Free a slot and wake the next waiter."""
+        with self._cond:
+            self._active -= 1
+            if self._avg_service_time is None:
+                self._avg_service_time = service_time
+            else:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            self._cond.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the queue state."""
+        with self._cond:
+            return {
+                'active': self._active,
+                'queued': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'admitted_total': self._admitted_total,
+                'rejected_total': self._rejected_total,
+                'timed_out_total': self._timed_out_total,
+                'queue_wait_total': round(self._queue_wait_total, 3),
+                'avg_service_time': round(self._avg_service_time, 3) if self._avg_service_time else None,
+            }
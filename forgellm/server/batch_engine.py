@@ -0,0 +1,925 @@
+"""
+Continuous batching engine for the model server.
+
+All generation requests for a loaded model are decoded by a single engine
+thread. Active sequences share one batched KV cache and advance together,
+one token per forward pass. New requests are prefilled in chunks between
+decode steps and join the batch at the next token boundary; finished
+requests leave it immediately. Every request keeps its own sampler, logits
+processors, token budget and seed.
+
+When a PromptCacheStore is attached, a request's prompt is first matched
+against the KV states of earlier requests so that only the new suffix is
+prefilled, and the KV state of every finished request is handed back to
+the store for the next turn of the conversation.
+
+When an AdapterCache is attached, each request can name its own LoRA
+adapter (requests that do not name one use the engine's default adapter).
+Rows addressed to different adapters are decoded in the same forward pass,
+and prompt cache entries are kept apart per adapter.
+
+When a draft model is attached, a sequence that is decoding on its own is
+decoded speculatively: the draft model proposes a few tokens, the model
+checks them in one forward pass and keeps those it would have sampled
+itself. Sampling is seeded per position, so the output is the same with and
+without the draft model.
+
+A request can name stop sequences: it finishes with the reason 'stop' as
+soon as one is generated (see stopping.py), and the tokens of the matched
+sequence are not passed on to the consumer.
+
+A request can be cancelled at any time (for example when its client has
+gone away): it leaves the queue or the batch at the next step boundary,
+its KV state is dropped, and it finishes with the reason 'cancelled' and the
+tokens generated so far.
+
+Work that must not overlap with generation, such as applying an adapter in
+place, is queued with run_exclusive: it runs on the engine thread once
+every request submitted before it has finished. run_on_engine queues work
+that only needs the engine thread, without waiting for the batch to drain.
+"""
+
+import queue
+import threading
+import time
+import uuid
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .speculative import DEFAULT_NUM_DRAFT_TOKENS, speculative_stats
+from .stopping import StopCompiler, StopMatcher
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _ExclusiveTask:
+    """A callable queued between requests, run on the engine thread (with an empty batch if drain)."""
+
+    def __init__(self, fn: Callable[[], Any], drain: bool = True):
+        self.fn = fn
+        self.drain = drain
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def run(self):
+        try:
+            self.result = self.fn()
+        except Exception as e:
+            self.error = e
+        self.done.set()
+
+
+class GenerationRequest:
+    """A single sequence submitted to the BatchEngine."""
+
+    def __init__(
+        self,
+        prompt_tokens: List[int],
+        max_tokens: int = 100,
+        sampler: Optional[Callable] = None,
+        logits_processors: Optional[List[Callable]] = None,
+        seed: Optional[int] = None,
+        request_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        prefill_only: bool = False,
+        adapter: Optional[str] = None,
+        stop: Optional[List[str]] = None
+    ):
+        """
+        Initialize the request.
+
+        Args:
+            prompt_tokens: Token ids of the formatted prompt
+            max_tokens: Maximum number of tokens to generate
+            sampler: Sampler from mlx_lm.sample_utils.make_sampler (greedy if None)
+            logits_processors: Logits processors such as the repetition penalty
+            seed: Optional seed for reproducible sampling of this request only
+            request_id: Optional identifier (generated if not provided)
+            session_id: Optional conversation id used to look up the prompt cache
+            prefill_only: Only compute the KV cache of the prompt (kept in ``cache``)
+            adapter: Optional LoRA adapter for this request (the engine default if None)
+            stop: Optional sequences that end the generation (not included in the output)
+        """
+        if not prompt_tokens:
+            raise ValueError("Prompt must contain at least one token")
+
+        self.request_id = request_id or uuid.uuid4().hex
+        self.prompt_tokens = list(prompt_tokens)
+        self.max_tokens = max(0, int(max_tokens))
+        self.sampler = sampler
+        self.logits_processors = logits_processors or []
+        self.seed = seed
+        self.session_id = session_id
+        self.prefill_only = prefill_only
+        self.adapter = adapter
+        self.stop_sequences = list(stop or [])
+
+        # Set by the engine on submit: token ids that stop the request, and the
+        # matcher of the stop sequences that are not single tokens
+        self.stop_token_ids = frozenset()
+        self.stop_matcher = None
+        # Generated tokens held back while they may be the start of a stop sequence
+        self._held = deque()
+        self._published = 0
+        # Matched stop sequence and its offset in the generated text
+        self.stop_sequence = None
+        self.stop_offset = None
+
+        # Adapter slot assigned by the engine when the request is admitted
+        self._slot = 0
+
+        # Draft model KV cache and speculative decoding counters
+        self._draft_cache = None
+        self.draft_tokens = 0
+        self.accepted_draft_tokens = 0
+        self._speculative = {'tokens': 0, 'passes': 0, 'target_time': 0.0, 'time': 0.0}
+
+        # KV cache of the whole prompt, set when a prefill_only request finishes
+        self.cache = None
+
+        # Number of prompt tokens restored from the prompt cache
+        self.cached_tokens = 0
+        self.generated_tokens = []
+        self.finish_reason = None
+        self.error = None
+        self.cancelled = False
+
+        self.submit_time = time.time()
+        self.prefill_start_time = None
+        self.prefill_end_time = None
+        self.first_token_time = None
+        self.last_token_time = None
+        self.end_time = None
+        # Seconds between consecutive generated tokens (inter-token latency)
+        self.token_gaps = []
+
+        self._events = queue.Queue()
+        self._done = threading.Event()
+        self._history = None
+
+    def _sample(self, logits, draft: Optional[List[int]] = None):
+        """
+        Sample the next token from a (1, vocab) row of logits.
+
+        Args:
+            logits: Logits of the next position
+            draft: Drafted tokens assumed to precede this position (speculative decoding)
+        """
+        import mlx.core as mx
+
+        draft = draft or []
+        if self.logits_processors:
+            if self._history is None:
+                self._history = mx.array(self.prompt_tokens + self.generated_tokens)
+            history = mx.concatenate([self._history, mx.array(draft)]) if draft else self._history
+            for processor in self.logits_processors:
+                logits = processor(history, logits)
+
+        logprobs = logits - mx.logsumexp(logits, axis=-1, keepdims=True)
+
+        if self.sampler is None:
+            return mx.argmax(logprobs, axis=-1)
+
+        if self.seed is not None:
+            # Derive the key from (seed, position) so the draw does not depend
+            # on which other requests happen to share the batch
+            mx.random.seed(hash((self.seed, len(self.generated_tokens) + len(draft))) & 0xFFFFFFFF)
+        return self.sampler(logprobs)
+
+    def _accept(self, token: int) -> bool:
+        """
+        Record a generated token and publish it to the consumer.
+
+        Returns:
+            True if the token completed a stop sequence
+        """
+        import mlx.core as mx
+
+        now = time.time()
+        if self.first_token_time is None:
+            self.first_token_time = now
+        else:
+            self.token_gaps.append(now - self.last_token_time)
+        self.last_token_time = now
+        self.generated_tokens.append(token)
+        if self._history is not None:
+            self._history = mx.concatenate([self._history, mx.array([token])])
+
+        matcher = self.stop_matcher
+        if matcher is None:
+            self._publish(token)
+            return False
+        start = matcher.text_length
+        stopped = matcher.add(token)
+        self._held.append((token, start, matcher.text_length))
+        if stopped:
+            # Tokens with text before the match are passed on (the consumer
+            # cuts the text at stop_offset), the others are dropped
+            self.stop_sequence, self.stop_offset = matcher.match, matcher.match_offset
+            while self._held and self._held[0][1] < self.stop_offset:
+                self._publish(self._held.popleft()[0])
+            self._held.clear()
+            return True
+        while self._held and self._held[0][2] <= matcher.safe_offset:
+            self._publish(self._held.popleft()[0])
+        return False
+
+    def _publish(self, token: int):
+        self._published += 1
+        self._events.put(token)
+
+    @property
+    def output_tokens(self) -> List[int]:
+        """Generated tokens passed on to the consumer (without those of a matched stop sequence)."""
+        if self.stop_matcher is None:
+            return self.generated_tokens
+        return self.generated_tokens[:self._published]
+
+    def _finish(self, reason: str, error: Optional[BaseException] = None):
+        """Mark the request as finished and wake the consumer."""
+        # Text held back for a stop sequence that was never completed
+        while self._held:
+            self._publish(self._held.popleft()[0])
+        self.finish_reason = reason
+        self.error = error
+        self.end_time = time.time()
+        self._events.put(_DONE)
+        self._done.set()
+
+    @property
+    def finished(self) -> bool:
+        return self.finish_reason is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the request has finished; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def pending_tokens(self) -> int:
+        """Number of generated tokens the consumer has not read yet."""
+        return self._events.qsize()
+
+    def tokens(self, timeout: Optional[float] = None) -> Iterator[int]:
+        """
+        Iterate over generated token ids as they are produced.
+
+        Args:
+            timeout: Maximum seconds to wait for each token
+
+        Raises:
+            RuntimeError: If the engine failed while generating this request
+        """
+        while True:
+            item = self._events.get(timeout=timeout)
+            if item is _DONE:
+                break
+            yield item
+        if self.error is not None:
+            raise RuntimeError(f"Generation failed: {self.error}") from self.error
+
+    def token_batches(self, max_tokens: int = 1, max_delay: float = 0.0,
+                      timeout: Optional[float] = None) -> Iterator[List[int]]:
+        """
+        Iterate over generated tokens in batches, for coalesced streaming.
+
+        A batch is yielded once it holds max_tokens tokens or max_delay seconds
+        after its first token, whichever comes first. All tokens that piled up
+        while the consumer was busy (a slow client) are taken in one go, so a
+        slow consumer gets larger batches and never holds up the engine.
+
+        Args:
+            max_tokens: Tokens after which a batch is yielded
+            max_delay: Seconds after the first token of a batch when it is yielded
+            timeout: Maximum seconds to wait for each token
+
+        Raises:
+            RuntimeError: If the engine failed while generating this request
+        """
+        batch, deadline, done = [], None, False
+        while not done:
+            wait = timeout
+            if batch:
+                wait = max(0.0, deadline - time.time())
+            try:
+                item = self._events.get(timeout=wait) if wait is None or wait > 0 else self._events.get_nowait()
+            except queue.Empty:
+                if not batch:
+                    raise
+                item = None
+            while item is not None:
+                if item is _DONE:
+                    done = True
+                    break
+                if not batch:
+                    deadline = time.time() + max_delay
+                batch.append(item)
+                try:
+                    item = self._events.get_nowait()
+                except queue.Empty:
+                    item = None
+            if batch and (done or len(batch) >= max_tokens or time.time() >= deadline):
+                yield batch
+                batch = []
+        if self.error is not None:
+            raise RuntimeError(f"Generation failed: {self.error}") from self.error
+
+    def get_timing(self) -> Dict[str, Any]:
+        """Get timing information for the request."""
+        end_time = self.end_time or time.time()
+        prefill_end_time = self.prefill_end_time or end_time
+        return {
+            'queue_time': (self.prefill_start_time or self.submit_time) - self.submit_time,
+            'prefill_time': (prefill_end_time - self.prefill_start_time) if self.prefill_start_time else 0.0,
+            'decode_time': end_time - prefill_end_time,
+            'time_to_first_token': (self.first_token_time - self.submit_time) if self.first_token_time else None,
+            'total_time': end_time - self.submit_time
+        }
+
+    def get_speculative_stats(self) -> Optional[Dict[str, Any]]:
+        """Get acceptance rate and estimated speedup of speculative decoding (None if unused)."""
+        stats = self._speculative
+        return speculative_stats(self.draft_tokens, self.accepted_draft_tokens, stats['tokens'],
+                                 stats['passes'], stats['target_time'], stats['time'])
+
+
+class BatchEngine:
+    """Continuous batching scheduler bound to one loaded model."""
+
+    def __init__(self, model, tokenizer, max_batch_size: int = 8, prefill_step_size: int = 512,
+                 prompt_cache=None, adapters=None, draft_model=None,
+                 num_draft_tokens: int = DEFAULT_NUM_DRAFT_TOKENS,
+                 on_finish: Optional[Callable[[GenerationRequest], None]] = None):
+        """
+        Initialize the engine.
+
+        Args:
+            model: The loaded MLX model
+            tokenizer: The tokenizer wrapper returned by mlx_lm.load
+            max_batch_size: Maximum number of sequences decoded together
+            prefill_step_size: Prompt tokens processed per prefill chunk
+            prompt_cache: Optional PromptCacheStore for reusing KV states across requests
+            adapters: Optional AdapterCache for serving per-request LoRA adapters
+            draft_model: Optional small model sharing the tokenizer, for speculative decoding
+            num_draft_tokens: Tokens proposed by the draft model per step
+            on_finish: Optional callback for every finished request, e.g. to record metrics
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.prefill_step_size = max(1, int(prefill_step_size))
+        self.prompt_cache = prompt_cache
+        self.adapters = adapters
+        # Adapter used by requests that do not name one
+        self.default_adapter = None
+        self.draft_model = draft_model
+        self.num_draft_tokens = max(1, int(num_draft_tokens))
+        self.on_finish = on_finish
+        self.eos_token_ids = set(getattr(tokenizer, 'eos_token_ids', None) or [])
+        self._stops = StopCompiler(tokenizer)
+
+        # Batched caches need BatchKVCache support in mlx_lm; without it the
+        # engine still works but decodes one sequence at a time
+        try:
+            from mlx_lm.models.cache import BatchKVCache  # noqa: F401
+            self.supports_batching = True
+        except ImportError:
+            logger.warning("mlx_lm has no BatchKVCache, continuous batching disabled (batch size 1)")
+            self.supports_batching = False
+            self.max_batch_size = 1
+
+        self._lock = threading.Condition()
+        self._pending = deque()
+        # Unfinished requests by id, for cancellation
+        self._requests = {}
+        self._running = False
+        self._thread = None
+
+        # Engine-thread state
+        self._prefilling = None
+        self._active = []
+        self._last_tokens = []
+        self._batch_cache = None
+
+        # Aggregate statistics
+        self._stats = {
+            'requests_completed': 0,
+            'prompt_tokens': 0,
+            'cached_prompt_tokens': 0,
+            'generated_tokens': 0,
+            'decode_steps': 0,
+            'prefill_time': 0.0,
+            'decode_time': 0.0,
+            'max_batch_seen': 0,
+            'speculative_steps': 0,
+            'draft_tokens': 0,
+            'accepted_draft_tokens': 0
+        }
+
+    def start(self):
+        """Start the engine thread."""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="batch-engine", daemon=True)
+        self._thread.start()
+        logger.info(f"Batch engine started (max_batch_size={self.max_batch_size}, "
+                    f"prefill_step_size={self.prefill_step_size})")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the engine thread and fail any unfinished requests."""
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+        error = RuntimeError("Model was unloaded")
+        for request in list(self._pending) + self._active + ([self._prefilling[0]] if self._prefilling else []):
+            if isinstance(request, _ExclusiveTask):
+                request.error = error
+                request.done.set()
+            elif not request.finished:
+                request._finish('error', error)
+        self._pending.clear()
+        self._requests.clear()
+        self._active, self._last_tokens, self._batch_cache, self._prefilling = [], [], None, None
+
+    def submit(self, request: GenerationRequest) -> GenerationRequest:
+        """
+        Queue a request; it joins the batch at the next token boundary.
+
+        Args:
+            request: The request to generate
+
+        Returns:
+            GenerationRequest: The same request, for chaining
+        """
+        if request.max_tokens == 0 and not request.prefill_only:
+            request._finish('length')
+            return request
+        if request.stop_sequences:
+            request.stop_token_ids, texts = self._stops.compile(request.stop_sequences)
+            if texts:
+                request.stop_matcher = StopMatcher(self.tokenizer.detokenizer, texts)
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("Batch engine is not running")
+            self._pending.append(request)
+            self._requests[request.request_id] = request
+            self._lock.notify()
+        return request
+
+    def cancel(self, request_id: str) -> Optional[GenerationRequest]:
+        """
+        Cancel a request that has not finished yet.
+
+        A queued request is finished right away; one that is being prefilled
+        or decoded leaves the batch at the next step boundary and its KV state
+        is dropped. Either way it finishes with the reason 'cancelled'.
+
+        Args:
+            request_id: Identifier of the request
+
+        Returns:
+            GenerationRequest: The cancelled request, or None if it is unknown or finished
+        """
+        with self._lock:
+            request = self._requests.get(request_id)
+            if request is None or request.finished:
+                return None
+            request.cancelled = True
+            if request in self._pending:
+                self._pending.remove(request)
+                del self._requests[request_id]
+                request._finish('cancelled')
+                self._notify_finished(request)
+            self._lock.notify()
+        return request
+
+    def run_exclusive(self, fn: Callable[[], Any], timeout: Optional[float] = None, drain: bool = True) -> Any:
+        """
+        Run a function on the engine thread once the current batch has drained.
+
+        Requests submitted earlier finish first; requests submitted later wait
+        until the function has returned.
+
+        Args:
+            fn: Function to run without any sequence in flight
+            timeout: Maximum seconds to wait for the function to complete
+            drain: Wait for the batch to drain (False only needs the engine thread)
+
+        Returns:
+            The function's return value
+
+        Raises:
+            TimeoutError: If the function did not complete in time
+            Exception: Whatever the function raised
+        """
+        task = _ExclusiveTask(fn, drain)
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("Batch engine is not running")
+            self._pending.append(task)
+            self._lock.notify()
+        if not task.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for the batch to drain")
+        if task.error is not None:
+            raise task.error
+        return task.result
+
+    def run_on_engine(self, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run a function on the engine thread between two steps, without draining the batch."""
+        return self.run_exclusive(fn, timeout, drain=False)
+
+    def kv_cache_bytes(self) -> int:
+        """Memory held by the KV caches of the sequences in flight."""
+        prefilling = self._prefilling
+        caches = [self._batch_cache] + ([prefilling[1]] if prefilling else [])
+        try:
+            return sum(layer.nbytes for cache in caches if cache for layer in cache)
+        except Exception:
+            # The batch changed under us; report it at the next scrape
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get engine statistics."""
+        stats = dict(self._stats)
+        stats['active_sequences'] = len(self._active)
+        stats['prefilling'] = 1 if self._prefilling else 0
+        stats['pending'] = sum(1 for r in self._pending if not isinstance(r, _ExclusiveTask))
+        stats['max_batch_size'] = self.max_batch_size
+        stats['batching_enabled'] = self.supports_batching
+        stats['speculative_decoding'] = self.draft_model is not None
+        if stats['draft_tokens']:
+            stats['draft_acceptance_rate'] = round(stats['accepted_draft_tokens'] / stats['draft_tokens'], 3)
+        decode_time = stats['decode_time']
+        stats['decode_tokens_per_sec'] = round(stats['generated_tokens'] / decode_time, 1) if decode_time > 0 else 0
+        stats['prefill_time'] = round(stats['prefill_time'], 3)
+        stats['decode_time'] = round(decode_time, 3)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Engine thread
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        """Main scheduling loop: interleave chunked prefill with batched decode."""
+        import mlx.core as mx
+
+        while True:
+            with self._lock:
+                while self._running and not self._pending and not self._active and not self._prefilling:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                task = None
+                if self._pending and isinstance(self._pending[0], _ExclusiveTask):
+                    # Hold back admission until the batch has drained
+                    if not self._pending[0].drain or (not self._active and self._prefilling is None):
+                        task = self._pending.popleft()
+                elif (self._prefilling is None and self._pending and len(self._active) < self.max_batch_size
+                      and self._adapter_available(self._pending[0])):
+                    self._prefilling = self._start_prefill(self._pending.popleft())
+
+            if task is not None:
+                task.run()
+                continue
+
+            try:
+                self._drop_cancelled()
+                if self._prefilling is not None:
+                    self._prefill_chunk()
+                if self._active:
+                    if self._can_speculate():
+                        self._speculative_step()
+                    else:
+                        self._decode_step()
+            except Exception as e:
+                logger.error(f"Batch engine step failed: {e}")
+                failed = self._active + ([self._prefilling[0]] if self._prefilling else [])
+                for request in failed:
+                    self._release_adapter(request)
+                    self._requests.pop(request.request_id, None)
+                    request._finish('error', e)
+                self._active, self._last_tokens, self._batch_cache, self._prefilling = [], [], None, None
+                try:
+                    mx.clear_cache()
+                except Exception:
+                    pass
+
+    def _drop_cancelled(self):
+        """Remove cancelled requests from the prefill slot and the batch, dropping their KV state."""
+        if self._prefilling is not None and self._prefilling[0].cancelled:
+            self._complete(self._prefilling[0], 'cancelled')
+            self._prefilling = None
+        if not any(request.cancelled for request in self._active):
+            return
+        keep = []
+        for i, request in enumerate(self._active):
+            if request.cancelled:
+                self._complete(request, 'cancelled')
+            else:
+                keep.append(i)
+        self._remove_rows(keep)
+
+    def _remove_rows(self, keep):
+        """Keep only the given rows of the batch."""
+        import mlx.core as mx
+
+        self._active = [self._active[i] for i in keep]
+        self._last_tokens = [self._last_tokens[i] for i in keep]
+        if not keep:
+            self._batch_cache = None
+        elif self.supports_batching:
+            indices = mx.array(keep)
+            for layer in self._batch_cache:
+                layer.filter(indices)
+
+    def _adapter_available(self, request) -> bool:
+        """Whether the adapter of a pending request can get a slot now."""
+        if self.adapters is None:
+            return True
+        return self.adapters.can_acquire(request.adapter or self.default_adapter)
+
+    def _release_adapter(self, request):
+        if self.adapters is not None and request._slot:
+            self.adapters.release(request._slot)
+            request._slot = 0
+
+    def _start_prefill(self, request):
+        """Create the per-request cache for a newly admitted request."""
+        from mlx_lm.models.cache import make_prompt_cache
+
+        request.prefill_start_time = time.time()
+        request.adapter = request.adapter or self.default_adapter
+        if request.adapter:
+            if self.adapters is None:
+                self._requests.pop(request.request_id, None)
+                request._finish('error', RuntimeError("This engine does not serve adapters"))
+                return None
+            try:
+                request._slot = self.adapters.acquire(request.adapter)
+            except Exception as e:
+                logger.warning(f"Could not load adapter {request.adapter}: {e}")
+                self._requests.pop(request.request_id, None)
+                request._finish('error', e)
+                return None
+
+        if self.prompt_cache is not None:
+            cache, cached = self.prompt_cache.fetch(request.prompt_tokens, request.session_id, request.adapter)
+            if cache is not None:
+                request.cached_tokens = cached
+                self._stats['cached_prompt_tokens'] += cached
+                return [request, cache, cached]
+        return [request, make_prompt_cache(self.model), 0]
+
+    def _prefill_chunk(self):
+        """Process the next prompt chunk of the request being prefilled."""
+        import mlx.core as mx
+
+        request, cache, offset = self._prefilling
+        tic = time.time()
+
+        if self.adapters is not None:
+            self.adapters.set_batch([request._slot])
+        end = min(offset + self.prefill_step_size, len(request.prompt_tokens))
+        logits = self.model(mx.array(request.prompt_tokens[offset:end])[None], cache=cache)
+
+        if end < len(request.prompt_tokens) or request.prefill_only:
+            mx.eval([c.state for c in cache])
+            self._stats['prefill_time'] += time.time() - tic
+            if end < len(request.prompt_tokens):
+                self._prefilling[2] = end
+                return
+            request.prefill_end_time = time.time()
+            self._prefilling = None
+            self._stats['prompt_tokens'] += len(request.prompt_tokens)
+            request.cache = cache
+            self._complete(request, 'prefill')
+            return
+
+        token = request._sample(logits[:, -1, :])
+        mx.eval(token)
+        token = token.item()
+        request.prefill_end_time = time.time()
+        self._prefilling = None
+        self._stats['prefill_time'] += time.time() - tic
+        self._stats['prompt_tokens'] += len(request.prompt_tokens)
+
+        reason = self._handle_token(request, token)
+        if reason:
+            self._save_prompt_cache(request, cache)
+            self._complete(request, reason)
+            return
+        self._join_batch(request, cache, token)
+
+    def _join_batch(self, request, cache, token):
+        """Merge a prefilled request's cache into the running batch."""
+        if self.supports_batching:
+            cache = [type(c).merge([c]) for c in cache]
+            if self._batch_cache is None:
+                self._batch_cache = cache
+            else:
+                for batch_layer, layer in zip(self._batch_cache, cache):
+                    batch_layer.extend(layer)
+        else:
+            self._batch_cache = cache
+
+        self._active.append(request)
+        self._last_tokens.append(token)
+        self._stats['max_batch_seen'] = max(self._stats['max_batch_seen'], len(self._active))
+
+    def _decode_step(self):
+        """Advance every active sequence by one token."""
+        import mlx.core as mx
+
+        tic = time.time()
+        if self.adapters is not None:
+            self.adapters.set_batch([request._slot for request in self._active])
+        inputs = mx.array(self._last_tokens)[:, None]
+        logits = self.model(inputs, cache=self._batch_cache)[:, -1, :]
+
+        samples = [request._sample(logits[i:i + 1]) for i, request in enumerate(self._active)]
+        tokens = mx.concatenate([s.reshape(-1) for s in samples])
+        mx.eval(tokens)
+        tokens = tokens.tolist()
+
+        keep, finished = [], []
+        for i, (request, token) in enumerate(zip(self._active, tokens)):
+            reason = self._handle_token(request, token)
+            if reason:
+                finished.append((i, reason))
+            else:
+                keep.append(i)
+                self._last_tokens[i] = token
+
+        self._stats['decode_steps'] += 1
+        self._stats['decode_time'] += time.time() - tic
+
+        if finished:
+            # Save the KV state before signalling completion so that a
+            # follow-up turn always finds it
+            for i, reason in finished:
+                self._save_prompt_cache(self._active[i], self._extract_cache(i))
+                self._complete(self._active[i], reason)
+            self._remove_rows(keep)
+
+    def _can_speculate(self) -> bool:
+        """Whether the next step should be speculative (one sequence, nobody waiting)."""
+        if self.draft_model is None or len(self._active) != 1 or self._prefilling is not None:
+            return False
+        request = self._active[0]
+        if request._draft_cache is False or request.max_tokens - len(request.generated_tokens) < 2:
+            return False
+        if any(not isinstance(r, _ExclusiveTask) for r in self._pending):
+            return False
+        from mlx_lm.models.cache import can_trim_prompt_cache
+        return can_trim_prompt_cache(self._batch_cache)
+
+    def _speculative_step(self):
+        """Draft tokens with the draft model and verify them in one forward pass."""
+        import mlx.core as mx
+        from mlx_lm.models.cache import can_trim_prompt_cache, make_prompt_cache, trim_prompt_cache
+
+        tic = time.time()
+        request = self._active[0]
+        num_draft = min(self.num_draft_tokens, request.max_tokens - len(request.generated_tokens) - 1)
+
+        if request._draft_cache is None:
+            request._draft_cache = make_prompt_cache(self.draft_model)
+        if not can_trim_prompt_cache(request._draft_cache):
+            logger.info("Draft model cache cannot be rewound, decoding without it")
+            request._draft_cache = False
+            self._decode_step()
+            return
+        draft_cache = request._draft_cache
+
+        # Bring the draft cache up to date: it may lag behind after the prompt,
+        # after a rejected draft or after decoding in a batch with others
+        sequence = request.prompt_tokens + request.generated_tokens
+        missing = sequence[draft_cache[0].offset:]
+        while len(missing) > self.prefill_step_size:
+            self.draft_model(mx.array(missing[:self.prefill_step_size])[None], cache=draft_cache)
+            mx.eval([c.state for c in draft_cache])
+            missing = missing[self.prefill_step_size:]
+        logits = self.draft_model(mx.array(missing)[None], cache=draft_cache)[:, -1, :]
+        drafted = []
+        for i in range(num_draft):
+            token = mx.argmax(logits, axis=-1)
+            drafted.append(token)
+            if i < num_draft - 1:
+                logits = self.draft_model(token[None], cache=draft_cache)[:, -1, :]
+        drafted = mx.concatenate(drafted)
+        mx.eval(drafted)
+        drafted = drafted.tolist()
+
+        # One forward pass of the model over the last token and the drafts
+        target_tic = time.time()
+        if self.adapters is not None:
+            self.adapters.set_batch([request._slot])
+        inputs = mx.array([self._last_tokens[0]] + drafted)[None]
+        logits = self.model(inputs, cache=self._batch_cache)
+        samples = [request._sample(logits[:, j, :], drafted[:j]) for j in range(num_draft + 1)]
+        tokens = mx.concatenate([s.reshape(-1) for s in samples])
+        mx.eval(tokens)
+        tokens = tokens.tolist()
+        target_time = time.time() - target_tic
+
+        # Keep the model's own tokens up to and including the first mismatch
+        reason, emitted, accepted = None, 0, 0
+        for j, token in enumerate(tokens):
+            emitted += 1
+            reason = self._handle_token(request, token)
+            if reason or j == num_draft or token != drafted[j]:
+                break
+            accepted += 1
+
+        # Drop the KV entries of rejected drafts; the last emitted token is fed next step
+        trim_prompt_cache(self._batch_cache, num_draft + 1 - emitted)
+        trim_prompt_cache(draft_cache, draft_cache[0].offset - len(sequence) - min(emitted - 1, num_draft - 1))
+
+        elapsed = time.time() - tic
+        request.draft_tokens += num_draft
+        request.accepted_draft_tokens += accepted
+        speculative = request._speculative
+        speculative['tokens'] += emitted
+        speculative['passes'] += 1
+        speculative['target_time'] += target_time
+        speculative['time'] += elapsed
+        self._stats['speculative_steps'] += 1
+        self._stats['draft_tokens'] += num_draft
+        self._stats['accepted_draft_tokens'] += accepted
+        self._stats['decode_steps'] += 1
+        self._stats['decode_time'] += elapsed
+
+        if reason:
+            self._save_prompt_cache(request, self._extract_cache(0))
+            self._complete(request, reason)
+            self._active, self._last_tokens, self._batch_cache = [], [], None
+        else:
+            self._last_tokens[0] = tokens[emitted - 1]
+
+    def _extract_cache(self, index):
+        """Copy one sequence's KV state out of the batched cache."""
+        if not self.supports_batching:
+            return self._batch_cache
+        try:
+            return [layer.extract(index) for layer in self._batch_cache]
+        except Exception as e:
+            logger.debug(f"Could not extract cache row {index}: {e}")
+            return None
+
+    def _save_prompt_cache(self, request, cache):
+        """Hand a finished request's KV state to the prompt cache."""
+        if self.prompt_cache is None or not self.prompt_cache.enabled or not cache:
+            return
+        if self.adapters is not None and not self.adapters.is_current(request._slot):
+            # Computed with adapter weights that have since been replaced
+            return
+        import mlx.core as mx
+
+        try:
+            mx.eval([c.state for c in cache])
+            # The final sampled token was never fed to the model, so the
+            # cache may cover one token less than prompt + generated
+            length = cache[0].offset
+            tokens = (request.prompt_tokens + request.generated_tokens)[:length]
+            self.prompt_cache.insert(tokens, cache, request.session_id, request.adapter)
+        except Exception as e:
+            logger.debug(f"Could not store prompt cache for {request.request_id}: {e}")
+
+    def _handle_token(self, request, token) -> Optional[str]:
+        """Apply a sampled token to a request and return its finish reason, if any."""
+        if token in self.eos_token_ids or token in request.stop_token_ids:
+            return 'stop'
+
+        stopped = request._accept(token)
+        self._stats['generated_tokens'] += 1
+
+        if stopped:
+            return 'stop'
+        if len(request.generated_tokens) >= request.max_tokens:
+            return 'length'
+        return None
+
+    def _complete(self, request, reason):
+        self._release_adapter(request)
+        with self._lock:
+            self._requests.pop(request.request_id, None)
+        request._draft_cache = None
+        request._finish(reason)
+        self._stats['requests_completed'] += 1
+        self._notify_finished(request)
+
+    def _notify_finished(self, request):
+        if self.on_finish is None:
+            return
+        try:
+            self.on_finish(request)
+        except Exception as e:
+            logger.debug(f"on_finish callback failed for {request.request_id}: {e}")
@@ -3,13 +3,19 @@
 Simple HTTP server for model inference.
 """
 
+import io
 import os
 import sys
 import time
 import json
 import logging
+import functools
 import argparse
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import queue
+import select
+import socket
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs
 import threading
 import traceback
@@ -38,25 +44,163 @@ except ImportError as e:
     logger.warning(f"Python path: {sys.path[:3]}")
     ARCHITECTURE_MANAGER = None
 
+from forgellm.server.admission import AdmissionController, AdmissionError
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.prompt_cache import PromptCacheStore
+from forgellm.server.prefix_cache import PrefixCacheRegistry
+from forgellm.server.model_pool import ModelPool, ResidentModel, estimate_model_bytes
+from forgellm.server.adapters import AdapterSwapError, ADAPTER_CONFIG_FILE, resolve_adapter
+from forgellm.server.multi_adapter import AdapterCache
+from forgellm.server.speculative import DEFAULT_NUM_DRAFT_TOKENS, load_draft_model
+from forgellm.server import openai_api, scoring, stopping
+from forgellm.server.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, InferenceMetrics
+from forgellm.server.model_loader import DEFAULT_LOAD_WORKERS, LoadCancelled, LoadProgress, load_model_with_progress
+from forgellm.server.response_cache import ResponseCache, cache_directives, is_deterministic
+from forgellm.server.transport import StatusEvents, UnixHTTPServer
+from forgellm.models.model_paths import resolve_model_path
+from forgellm.utils import startup_profile
+
 # Global variables
-MODEL = None
-TOKENIZER = None
 MODEL_NAME = None
 ADAPTER_PATH = None
 IS_LOADING = False
 LOADING_ERROR = None
+# Progress of the most recent model load (None until a model is loaded)
+LOAD_PROGRESS = None
+# Held while a load request checks and claims IS_LOADING: one load at a time
+LOAD_LOCK = threading.Lock()
+# Threads reading weight shards ahead of evaluation while loading
+LOAD_WORKERS = DEFAULT_LOAD_WORKERS
+
+# Resident (model, adapter) pairs; MODEL_NAME/ADAPTER_PATH name the active one
+MODEL_POOL = ModelPool()
+
+# Admission control for generation requests (reconfigured from CLI args in main)
+ADMISSION = AdmissionController(max_concurrent=8)
+
+# Prometheus metrics served on /metrics
+METRICS = InferenceMetrics()
+
+# Continuous batching engine settings (one engine per resident model)
+MAX_BATCH_SIZE = 8
+PREFILL_STEP_SIZE = 512
+
+# Per-model cache of LoRA adapters served side by side over the shared base weights
+MAX_ADAPTERS = 8
+ADAPTER_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Optional small model sharing the tokenizer, used for speculative decoding of single sequences
+DRAFT_MODEL = None
+NUM_DRAFT_TOKENS = DEFAULT_NUM_DRAFT_TOKENS
+
+# Coalescing of streamed OpenAI events, and how long a stalled streaming client may block a write
+STREAM_FLUSH_TOKENS = openai_api.DEFAULT_FLUSH_TOKENS
+STREAM_FLUSH_MS = openai_api.DEFAULT_FLUSH_MS
+STREAM_WRITE_TIMEOUT = 30.0
+
+# How often a handler waiting for tokens checks whether its client is still connected
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# Per-model budget for KV states of earlier turns, reused so each chat turn only prefills the new suffix
+PROMPT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Registered prefixes (system prompts, few-shot preambles) persisted on disk
+PREFIX_CACHE_DIR = os.path.join(
+    os.environ.get('MODELS_DIR', os.path.join(os.path.dirname(os.path.dirname(current_dir)), 'models')),
+    'prompt_cache'
+)
+
+# Padded tokens per forward pass of /api/model/score
+SCORE_BATCH_TOKENS = scoring.DEFAULT_BATCH_TOKENS
+
+# Responses of deterministic generation requests (disabled unless --response-cache-size is set)
+RESPONSE_CACHE = ResponseCache(max_bytes=0)
+
+# Seconds an idle keep-alive connection is kept open waiting for its next request
+KEEPALIVE_TIMEOUT = 120.0
+
+# Model state changes pushed to /api/model/events subscribers, and how often
+# a subscriber gets a fresh snapshot when nothing changed (more often while loading)
+STATUS_EVENTS = StatusEvents()
+STATUS_EVENT_INTERVAL = 2.0
+STATUS_EVENT_LOAD_INTERVAL = 0.5
+
+# Marks where the user message starts when cutting a registered chat prefix
+PREFIX_SENTINEL = "\u2063FORGELLM_PREFIX_END\u2063"
 
 class ModelHandler(BaseHTTPRequestHandler):
     """HTTP request handler for model inference."""
     
-    def _set_headers(self, status_code=200, content_type='application/json'):
-        """Set response headers."""
+    # Persistent connections: clients reuse one connection for many requests
+    protocol_version = 'HTTP/1.1'
+    
+    def setup(self):
+        super().setup()
+        if self.connection.family != socket.AF_UNIX:
+            # Small writes (streamed chunks, keep-alive responses) must not wait for delayed ACKs
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    
+    def handle_one_request(self):
+        """Serve one request of a connection, closing it after KEEPALIVE_TIMEOUT idle seconds."""
+        self._response_body = None
+        self.connection.settimeout(KEEPALIVE_TIMEOUT or None)
+        try:
+            super().handle_one_request()
+        finally:
+            self._send_response_body()
+    
+    def parse_request(self):
+        # The idle timeout only applies while waiting for the next request
+        self.connection.settimeout(None)
+        return super().parse_request()
+    
+    def address_string(self):
+        return str(self.client_address[0]) if self.client_address else 'unix'
+    
+    def _set_headers(self, status_code=200, content_type='application/json', extra_headers=None, stream=False):
+        """
+        Set response headers.
+        
+        The body of a regular response is buffered until the handler returns
+        so that it can be sent with a Content-Length and the connection kept
+        open. A streamed response is written as it is produced and ends when
+        the connection is closed.
+        """
+        if getattr(self, '_response_body', None) is not None:
+            # Replaces a response that was not sent yet, e.g. with an error
+            self._headers_buffer = []
+            self.wfile = self._socket_wfile
+            self._response_body = None
         self.send_response(status_code)
         self.send_header('Content-Type', content_type)
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, str(value))
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        if stream:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+            self.end_headers()
+        else:
+            self._response_body = io.BytesIO()
+            self._socket_wfile, self.wfile = self.wfile, self._response_body
+    
+    def _send_response_body(self):
+        """Send the headers and buffered body of a regular response."""
+        body = self._response_body
+        if body is None:
+            return
+        self._response_body = None
+        self.wfile = self._socket_wfile
+        data = body.getvalue()
+        try:
+            self.send_header('Content-Length', str(len(data)))
+            # Headers and body in a single write
+            self._headers_buffer.append(b"\r\n" + data)
+            self.flush_headers()
+        except OSError:
+            self.close_connection = True
     
     def do_OPTIONS(self):
         """Handle OPTIONS requests for CORS."""
@@ -67,6 +211,16 @@ class ModelHandler(BaseHTTPRequestHandler):
         """Handle GET requests."""
         if self.path.startswith('/api/model/status'):
             self._handle_status()
+        elif self.path.startswith('/api/model/events'):
+            self._handle_status_events()
+        elif self.path.startswith('/health'):
+            self._handle_health()
+        elif self.path.startswith('/api/model/prefixes'):
+            self._handle_list_prefixes()
+        elif self.path.startswith('/v1/models'):
+            self._handle_openai_models()
+        elif self.path.split('?')[0] == '/metrics':
+            self._handle_metrics()
         else:
             self._set_headers(404)
             response = {'success': False, 'error': 'Not found'}
@@ -74,49 +228,188 @@ class ModelHandler(BaseHTTPRequestHandler):
     
     def do_POST(self):
         """Handle POST requests."""
-        content_length = int(self.headers['Content-Length'])
+        content_length = int(self.headers.get('Content-Length') or 0)
         post_data = self.rfile.read(content_length).decode('utf-8')
         
         try:
-            data = json.loads(post_data)
+            data = json.loads(post_data) if post_data.strip() else {}
         except json.JSONDecodeError:
             self._set_headers(400)
             response = {'success': False, 'error': 'Invalid JSON'}
             self.wfile.write(json.dumps(response).encode())
             return
         
-        if self.path.startswith('/api/model/load'):
+        if self.path.startswith('/api/model/load/cancel'):
+            self._handle_cancel_load()
+        elif self.path.startswith('/api/model/load'):
             self._handle_load(data)
         elif self.path.startswith('/api/model/generate'):
-            self._handle_generate(data)
+            self._handle_admitted_generate(data)
+        elif self.path.startswith('/api/model/score'):
+            self._handle_admitted_score(data)
+        elif self.path.startswith('/api/model/prefixes'):
+            self._handle_register_prefix(data)
+        elif self.path.startswith('/api/model/unload'):
+            self._handle_unload(data)
+        elif self.path.startswith('/api/model/cancel/'):
+            self._handle_cancel(self.path[len('/api/model/cancel/'):].split('?')[0])
+        elif self.path.startswith('/v1/chat/completions'):
+            self._handle_admitted_openai(data, chat=True)
+        elif self.path.startswith('/v1/completions'):
+            self._handle_admitted_openai(data, chat=False)
+        else:
+            self._set_headers(404)
+            response = {'success': False, 'error': 'Not found'}
+            self.wfile.write(json.dumps(response).encode())
+    
+    def do_DELETE(self):
+        """Handle DELETE requests."""
+        if self.path.startswith('/api/model/prefixes/'):
+            self._handle_evict_prefix(self.path[len('/api/model/prefixes/'):].split('?')[0])
         else:
             self._set_headers(404)
             response = {'success': False, 'error': 'Not found'}
             self.wfile.write(json.dumps(response).encode())
     
+    def _get_resident(self, data=None):
+        """Return the resident model a request is addressed to (the active one by default)."""
+        model_name = (data or {}).get('model_name')
+        if model_name:
+            # Adapters are chosen per request on top of the resident base model
+            return MODEL_POOL.get_base(model_name)
+        resident = MODEL_POOL.active
+        if resident is not None:
+            resident.touch()
+        return resident
+    
+    def _client_disconnected(self):
+        """Whether the client has closed the connection (it sends nothing while waiting)."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except (OSError, ValueError):
+            return True
+    
+    def _follow_tokens(self, request, engine, max_tokens=1, max_delay=0.0):
+        """
+        Yield batches of generated tokens, cancelling the request if the client goes away.
+        
+        Sets self.client_gone when the generation was abandoned, in which case
+        there is nobody left to send a response to.
+        """
+        self.client_gone = False
+        batches = request.token_batches(max_tokens, max_delay, timeout=DISCONNECT_POLL_INTERVAL)
+        last_check = time.time()
+        while True:
+            try:
+                yield next(batches)
+            except StopIteration:
+                return
+            except queue.Empty:
+                # Nothing generated for a while (e.g. a long prefill); keep waiting
+                batches = request.token_batches(max_tokens, max_delay, timeout=DISCONNECT_POLL_INTERVAL)
+            if time.time() - last_check >= DISCONNECT_POLL_INTERVAL:
+                last_check = time.time()
+                if self._client_disconnected():
+                    self._abandon(request, engine, "client disconnected")
+                    return
+    
+    def _abandon(self, request, engine, reason):
+        """Cancel a request whose client cannot be reached any more."""
+        self.client_gone = True
+        self.close_connection = True
+        if engine.cancel(request.request_id) is not None:
+            logger.info(f"Cancelled request {request.request_id} after {len(request.generated_tokens)} tokens: {reason}")
+    
+    def _write_chunk(self, segments):
+        """Send buffered text segments as one streaming chunk and clear the buffer."""
+        chunk_data = json.dumps({
+            'type': 'chunk',
+            'text': ''.join(segments),
+            'timestamp': time.time()
+        }) + '\n'
+        self.wfile.write(chunk_data.encode())
+        self.wfile.flush()
+        segments.clear()
+    
+    def _send_no_model(self, data=None):
+        """Reply that the requested model is not resident."""
+        model_name = (data or {}).get('model_name')
+        if model_name:
+            self._set_headers(404)
+            response = {
+                'success': False,
+                'error': f'Model {model_name} is not loaded',
+                'resident_models': MODEL_POOL.list()
+            }
+        else:
+            self._set_headers(400)
+            response = {'success': False, 'error': 'No model loaded'}
+        self.wfile.write(json.dumps(response).encode())
+    
     def _handle_status(self):
         """Handle model status requests."""
-        global MODEL, MODEL_NAME, ADAPTER_PATH, IS_LOADING, LOADING_ERROR
+        self._set_headers()
+        self.wfile.write(json.dumps(status_snapshot()).encode())
+    
+    def _handle_status_events(self):
+        """
+        Stream status snapshots, one JSON object per line, as the model state changes.
         
-        # Basic response
+        A snapshot is sent right away, then whenever a load starts, progresses
+        or ends and when models are unloaded, and at least every
+        STATUS_EVENT_INTERVAL seconds otherwise (which also detects clients
+        that went away).
+        """
+        self._set_headers(content_type='application/x-ndjson', stream=True)
+        if STREAM_WRITE_TIMEOUT:
+            self.connection.settimeout(STREAM_WRITE_TIMEOUT)
+        version = STATUS_EVENTS.version
+        try:
+            while True:
+                self.wfile.write((json.dumps(status_snapshot(version)) + '\n').encode())
+                self.wfile.flush()
+                version = STATUS_EVENTS.wait(
+                    version, STATUS_EVENT_LOAD_INTERVAL if IS_LOADING else STATUS_EVENT_INTERVAL)
+        except (ConnectionError, TimeoutError):
+            logger.debug("Status event subscriber disconnected")
+    
+    def _handle_metrics(self):
+        """Serve inference metrics in the Prometheus text format."""
+        body = METRICS.render(MODEL_POOL, ADMISSION).encode()
+        self._set_headers(content_type=METRICS_CONTENT_TYPE)
+        self.wfile.write(body)
+    
+    def _handle_cancel_load(self):
+        """Handle requests to cancel the model load in progress."""
+        progress = LOAD_PROGRESS
+        if not IS_LOADING or progress is None:
+            self._set_headers(409)
+            response = {'success': False, 'error': 'No model is loading'}
+            self.wfile.write(json.dumps(response).encode())
+            return
+        
+        progress.cancel()
+        STATUS_EVENTS.notify()
+        logger.info(f"Cancelling the load of {progress.model_name}")
+        self._set_headers()
         response = {
             'success': True,
-            'loaded': MODEL is not None,
-            'is_loading': IS_LOADING,
-            'model_name': MODEL_NAME,
-            'adapter_path': ADAPTER_PATH
+            'message': f'Cancelling the load of {progress.model_name}',
+            'model_name': progress.model_name,
+            'adapter_path': progress.adapter_path
         }
-        
-        # Add error if there is one
-        if LOADING_ERROR:
-            response['error'] = str(LOADING_ERROR)
-        
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_health(self):
+        """Handle health checks (never waits on generation)."""
         self._set_headers()
+        response = {'status': 'ok', 'queue': ADMISSION.get_stats()}
         self.wfile.write(json.dumps(response).encode())
     
     def _handle_load(self, data):
         """Handle model loading requests."""
-        global MODEL, TOKENIZER, MODEL_NAME, ADAPTER_PATH, IS_LOADING, LOADING_ERROR
+        global MODEL_NAME, ADAPTER_PATH, IS_LOADING, LOADING_ERROR, LOAD_PROGRESS
         
         model_name = data.get('model_name')
         adapter_path = data.get('adapter_path')
@@ -127,233 +420,476 @@ class ModelHandler(BaseHTTPRequestHandler):
             self.wfile.write(json.dumps(response).encode())
             return
         
-        # Start loading in a separate thread
-        IS_LOADING = True
-        LOADING_ERROR = None
-        MODEL_NAME = model_name
-        ADAPTER_PATH = adapter_path
+        with LOAD_LOCK:
+            # A second load would replace the progress of the first and race it
+            # for room in the pool; switching models would end it early
+            if IS_LOADING:
+                progress = LOAD_PROGRESS
+                self._set_headers(409)
+                response = {
+                    'success': False,
+                    'error': f'Model {progress.model_name if progress else MODEL_NAME} is loading',
+                    'loading_model_name': progress.model_name if progress else MODEL_NAME,
+                    'loading_adapter_path': progress.adapter_path if progress else ADAPTER_PATH
+                }
+                self.wfile.write(json.dumps(response).encode())
+                return
+            
+            MODEL_NAME = model_name
+            ADAPTER_PATH = adapter_path
+            LOADING_ERROR = None
+            
+            # Switching back to a resident model is immediate
+            if MODEL_POOL.activate(model_name, adapter_path) is not None:
+                response = {
+                    'success': True,
+                    'message': f'Model {model_name} is resident and now active',
+                    'model_name': model_name,
+                    'adapter_path': adapter_path,
+                    'resident': True,
+                    'status_version': STATUS_EVENTS.notify()
+                }
+            else:
+                # Start loading in a separate thread
+                IS_LOADING = True
+                LOAD_PROGRESS = LoadProgress(model_name, adapter_path)
+                
+                # Status events from this version on describe this load
+                status_version = STATUS_EVENTS.notify()
+                threading.Thread(target=load_model, args=(model_name, adapter_path, LOAD_PROGRESS)).start()
+                response = {
+                    'success': True,
+                    'message': f'Model {model_name} loading started',
+                    'model_name': model_name,
+                    'adapter_path': adapter_path,
+                    'status_version': status_version
+                }
+        
+        self._set_headers()
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_list_prefixes(self):
+        """List the registered prefixes of the active model."""
+        resident = MODEL_POOL.active
+        self._set_headers()
+        response = {
+            'success': True,
+            'model_name': resident.model_name if resident else None,
+            'adapter_path': resident.adapter_path if resident else None,
+            'prefixes': resident.prefixes.list() if resident else []
+        }
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_register_prefix(self, data):
+        """Precompute, persist and pin the KV cache of a shared prompt prefix."""
+        resident = self._get_resident(data)
+        if resident is None:
+            self._send_no_model(data)
+            return
+        model_name, tokenizer = resident.model_name, resident.tokenizer
         
-        threading.Thread(target=load_model, args=(model_name, adapter_path)).start()
+        prefix_text = data.get('prefix')
+        system_prompt = data.get('system_prompt', '')
+        messages = data.get('messages', [])
+        
+        try:
+            if not prefix_text:
+                is_base_model_hint = data.get('is_base_model')
+                if is_base_model_hint is not None:
+                    is_instruct = not is_base_model_hint
+                elif ARCHITECTURE_MANAGER:
+                    is_instruct = ARCHITECTURE_MANAGER.is_instruct_model(model_name)
+                else:
+                    is_instruct = is_instruct_model(model_name)
+                
+                if is_instruct:
+                    # Format exactly like a chat request, then cut where the user message begins
+                    history = ([{'role': 'system', 'content': system_prompt}] if system_prompt else []) + messages
+                    formatted = format_history_prompt(history, PREFIX_SENTINEL, model_name, tokenizer)
+                    prefix_text = formatted[:formatted.index(PREFIX_SENTINEL)]
+                elif system_prompt:
+                    prefix_text = f"{system_prompt}\n\n"
+            
+            if not prefix_text:
+                self._set_headers(400)
+                response = {'success': False, 'error': 'Missing prefix or system_prompt'}
+                self.wfile.write(json.dumps(response).encode())
+                return
+            
+            add_special_tokens = tokenizer.bos_token is None or not prefix_text.startswith(tokenizer.bos_token)
+            tokens = tokenizer.encode(prefix_text, add_special_tokens=add_special_tokens)
+            
+            start_time = time.time()
+            request = resident.engine.submit(GenerationRequest(tokens, prefill_only=True))
+            for _ in request.tokens():
+                pass
+            prefill_time = time.time() - start_time
+            
+            info = resident.prefixes.save(tokens, request.cache, prefix_text)
+            resident.prompt_cache.pin(f"registered:{info['id']}", tokens, request.cache, resident.namespace)
+            
+            self._set_headers()
+            response = {'success': True, 'prefix': info, 'prefill_time': round(prefill_time, 3)}
+            self.wfile.write(json.dumps(response).encode())
+        except Exception as e:
+            logger.error(f"Error registering prefix: {e}")
+            self._set_headers(500)
+            response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_evict_prefix(self, prefix_id):
+        """Remove a registered prefix of the active model from memory and disk."""
+        resident = MODEL_POOL.active
+        info = resident.prefixes.evict(prefix_id) if resident else None
+        if info is not None:
+            resident.prompt_cache.unpin(f"registered:{prefix_id}", resident.namespace)
+        if info is None:
+            self._set_headers(404)
+            response = {'success': False, 'error': f'Prefix {prefix_id} not found'}
+        else:
+            self._set_headers()
+            response = {'success': True, 'prefix': info}
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_unload(self, data):
+        """Unload one resident model, or every model when none is named."""
+        global MODEL_NAME, ADAPTER_PATH
+        
+        model_name = data.get('model_name')
+        if model_name:
+            resident = MODEL_POOL.get_base(model_name)
+            if resident is None or not MODEL_POOL.remove(model_name):
+                self._send_no_model(data)
+                return
+            unloaded = [{'model_name': model_name, 'adapter_path': resident.adapter_path}]
+        else:
+            unloaded = [{'model_name': m['model_name'], 'adapter_path': m['adapter_path']} for m in MODEL_POOL.list()]
+            MODEL_POOL.clear()
+        for model in unloaded:
+            RESPONSE_CACHE.invalidate(model['model_name'])
+        
+        active = MODEL_POOL.active
+        MODEL_NAME = active.model_name if active else None
+        ADAPTER_PATH = active.adapter_path if active else None
+        
+        self._set_headers()
+        response = {
+            'success': True,
+            'unloaded': unloaded,
+            'resident_models': MODEL_POOL.list(),
+            'status_version': STATUS_EVENTS.notify()
+        }
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_cancel(self, request_id):
+        """Cancel a generation request and report what it generated so far."""
+        for resident in MODEL_POOL.residents():
+            request = resident.engine.cancel(request_id) if resident.engine else None
+            if request is not None:
+                break
+        else:
+            self._set_headers(404)
+            response = {'success': False, 'error': f'No running request {request_id}'}
+            self.wfile.write(json.dumps(response).encode())
+            return
         
+        # The request leaves the batch at the next step boundary
+        request.wait(timeout=10)
+        prompt_tokens = len(request.prompt_tokens)
+        completion_tokens = len(request.generated_tokens)
         self._set_headers()
         response = {
             'success': True,
-            'message': f'Model {model_name} loading started',
-            'model_name': model_name,
-            'adapter_path': adapter_path
+            'request_id': request_id,
+            'finish_reason': request.finish_reason,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'cached_tokens': request.cached_tokens
         }
         self.wfile.write(json.dumps(response).encode())
     
-    def _handle_generate(self, data):
-        """Handle text generation requests."""
-        global MODEL, TOKENIZER, MODEL_NAME
+    def _handle_admitted_generate(self, data):
+        """Answer a generation request from the response cache, or admit it through the bounded queue and run it."""
+        # Route to the named resident model, or the active one
+        resident = self._get_resident(data)
+        if resident is None:
+            self._send_no_model(data)
+            return
         
-        if not MODEL or not TOKENIZER:
+        if not data.get('prompt'):
             self._set_headers(400)
-            response = {'success': False, 'error': 'No model loaded'}
+            response = {'success': False, 'error': 'Missing prompt'}
             self.wfile.write(json.dumps(response).encode())
             return
         
-        prompt = data.get('prompt')
-        max_tokens = data.get('max_tokens', 100)
-        temperature = data.get('temperature', 0.7)
-        top_p = data.get('top_p', 0.9)
-        repetition_penalty = data.get('repetition_penalty', 1.1)
-        max_kv_size = data.get('max_kv_size')
-        seed = data.get('seed')  # No default - use None for random generation
-        streaming = data.get('streaming', False)
+        # Validate before the response cache or the engine sees the parameters
+        try:
+            generate_params(data)
+            stopping.parse_stop(data.get('stop'))
+        except ValueError as e:
+            self._set_headers(400)
+            response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode())
+            return
         
-        # NEW: Handle history array and model type hint from frontend
-        history = data.get('history', [])
-        is_base_model_hint = data.get('is_base_model', None)
+        try:
+            prepared = prepare_generate_prompt(data, resident.model_name, resident.tokenizer)
+        except Exception as e:
+            logger.error(f"Error formatting prompt: {e}")
+            traceback.print_exc()
+            self._set_headers(500)
+            response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode())
+            return
         
-        # LEGACY: Still support old system_prompt parameter for backward compatibility
-        legacy_system_prompt = data.get('system_prompt', '')
+        # Repeated deterministic requests do not wait for a slot
+        tic = time.time()
+        cache_key, cached, cache_status = self._lookup_response(data, resident, prepared[1])
+        if cached is not None:
+            self._send_cached_response(data, resident, prepared, cached, time.time() - tic)
+            return
         
-        if not prompt:
+        try:
+            with ADMISSION.slot() as wait_time:
+                METRICS.observe_admission_wait(wait_time)
+                if wait_time > 0:
+                    logger.info(f"Generation request admitted after {wait_time:.2f}s in queue")
+                self._handle_generate(data, resident, prepared, cache_key, cache_status)
+        except AdmissionError as e:
+            self._set_headers(e.status_code, extra_headers={'Retry-After': e.retry_after})
+            response = {
+                'success': False,
+                'error': str(e),
+                'retry_after': e.retry_after,
+                'queue': ADMISSION.get_stats()
+            }
+            self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_admitted_score(self, data):
+        """Admit a scoring request through the bounded queue, then run it."""
+        try:
+            with ADMISSION.slot() as wait_time:
+                METRICS.observe_admission_wait(wait_time)
+                self._handle_score(data)
+        except AdmissionError as e:
+            self._set_headers(e.status_code, extra_headers={'Retry-After': e.retry_after})
+            response = {
+                'success': False,
+                'error': str(e),
+                'retry_after': e.retry_after,
+                'queue': ADMISSION.get_stats()
+            }
+            self.wfile.write(json.dumps(response).encode())
+    
+    def _handle_score(self, data):
+        """Handle log-likelihood scoring of texts or prompt/continuation pairs."""
+        resident = self._get_resident(data)
+        if resident is None:
+            self._send_no_model(data)
+            return
+        
+        try:
+            items = scoring.parse_items(data, resident.tokenizer)
+        except ValueError as e:
             self._set_headers(400)
-            response = {'success': False, 'error': 'Missing prompt'}
+            response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode())
+            return
+        
+        try:
+            elapsed = scoring.score(resident.engine, resident.model, items,
+                                    adapter=data.get('adapter_path') or None,
+                                    max_tokens=data.get('batch_tokens') or SCORE_BATCH_TOKENS)
+        except (ValueError, AdapterSwapError, FileNotFoundError) as e:
+            self._set_headers(400)
+            response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode())
+            return
+        except Exception as e:
+            logger.error(f"Error scoring texts: {e}")
+            traceback.print_exc()
+            self._set_headers(500)
+            response = {'success': False, 'error': str(e)}
             self.wfile.write(json.dumps(response).encode())
             return
         
+        response = scoring.summarize(items, elapsed, include_logprobs=data.get('logprobs', True))
+        response.update({
+            'success': True,
+            'model_name': resident.model_name,
+            'adapter_path': data.get('adapter_path') or resident.adapter_path
+        })
+        self._set_headers()
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _lookup_response(self, data, resident, prompt_token_ids):
+        """
+        Look up a generation request in the response cache.
+        
+        Returns:
+            Tuple of (key, cached, status): the key to cache the response under
+            (None if it must not be cached), the cached response or None, and
+            the X-Response-Cache header value (None when the cache does not apply)
+        """
+        params = generate_params(data)
+        if not RESPONSE_CACHE.enabled or not is_deterministic(params['temperature'], params['seed']):
+            return None, None, None
+        
+        lookup, store = cache_directives(self.headers.get('Cache-Control'))
+        if not lookup:
+            RESPONSE_CACHE.bypass()
+        if not store:
+            return None, None, 'bypass'
+        
+        if params['temperature'] is not None and params['temperature'] <= 0:
+            # Greedy sampling ignores these, equivalent requests share an entry
+            params['top_p'], params['seed'] = None, None
+        key = RESPONSE_CACHE.key(resident.model_name, resident.model_path,
+                                 data.get('adapter_path') or resident.adapter_path,
+                                 prompt_token_ids, params)
+        if not lookup:
+            return key, None, 'refresh'
+        cached = RESPONSE_CACHE.get(key, resident.model_name)
+        return key, cached, 'hit' if cached is not None else 'miss'
+    
+    def _send_cached_response(self, data, resident, prepared, cached, lookup_time=0.0):
+        """
+        Answer a generation request with a cached response.
+        
+        Nothing is decoded, so generation_time is the time spent answering from
+        the cache (formatting, tokenizing, lookup), tokens_per_sec is None rather
+        than a rate, and 'cached' is set.
+        """
+        final_prompt, prompt_token_ids, is_instruct, format_time, tokenize_time = prepared
+        request_id = str(data.get('request_id') or uuid.uuid4().hex)
+        headers = {'X-Request-Id': request_id, 'X-Response-Cache': 'hit'}
+        text = cached['text']
+        completion_tokens = cached['completion_tokens']
+        result = {
+            'request_id': request_id,
+            'generation_time': format_time + tokenize_time + lookup_time,
+            'prompt_tokens': cached['prompt_tokens'],
+            'completion_tokens': completion_tokens,
+            'total_tokens': cached['prompt_tokens'] + completion_tokens,
+            'tokens_per_sec': None,
+            'cached': True,
+            'cached_tokens': cached['prompt_tokens'],
+            'finish_reason': cached['finish_reason'],
+            'adapter_path': data.get('adapter_path') or resident.adapter_path,
+            'response_cache': 'hit',
+            'timing': {'format': round(format_time, 4), 'tokenize': round(tokenize_time, 4),
+                       'cache_lookup': round(lookup_time, 4)}
+        }
+        
+        if data.get('streaming', False):
+            self._set_headers(content_type='text/plain', extra_headers=headers, stream=True)
+            try:
+                if text:
+                    self._write_chunk([text])
+                self.wfile.write((json.dumps(dict(result, type='complete')) + '\n').encode())
+                self.wfile.flush()
+            except (ConnectionError, TimeoutError):
+                self.close_connection = True
+            return
+        
+        if is_instruct:
+            text = clean_instruct_response(text)
+        self._set_headers(extra_headers=headers)
+        self.wfile.write(json.dumps(dict(result, success=True, text=text)).encode())
+    
+    def _handle_generate(self, data, resident, prepared, cache_key=None, cache_status=None):
+        """
+        Generate the response to a formatted prompt with the batch engine.
+        
+        Args:
+            data: The request body
+            resident: The resident model the request is addressed to
+            prepared: The prompt as returned by prepare_generate_prompt
+            cache_key: Key to store the response under in the response cache (None to not cache it)
+            cache_status: X-Response-Cache header value, if the response cache applies
+        """
+        model_name, tokenizer, engine = resident.model_name, resident.tokenizer, resident.engine
+        final_prompt, prompt_token_ids, is_instruct, format_time, tokenize_time = prepared
+        
+        params = generate_params(data)
+        max_kv_size = data.get('max_kv_size')
+        streaming = data.get('streaming', False)
+        session_id = data.get('session_id')  # Optional conversation id for prompt cache reuse
+        request_id = data.get('request_id')  # Optional id for /api/model/cancel (generated if missing)
+        
         try:
-            from mlx_lm.generate import stream_generate
             from mlx_lm.sample_utils import make_sampler, make_repetition_penalty
             
-            # Detect if this is an instruct model (use hint if available)
-            if is_base_model_hint is not None:
-                is_instruct = not is_base_model_hint
-                logger.info(f"Using frontend hint: Model {MODEL_NAME} is {'BASE' if is_base_model_hint else 'INSTRUCT'}")
-            elif ARCHITECTURE_MANAGER:
-                is_instruct = ARCHITECTURE_MANAGER.is_instruct_model(MODEL_NAME)
-                logger.info(f"Model {MODEL_NAME} detected as instruct model: {is_instruct} (via ArchitectureManager)")
-            else:
-                is_instruct = is_instruct_model(MODEL_NAME)
-                logger.info(f"Model {MODEL_NAME} detected as instruct model: {is_instruct} (fallback detection)")
-            
-            # NEW: Intelligent prompt formatting using ModelArchitectureManager
-            final_prompt = prompt
-            
-            if history and is_instruct:
-                # INSTRUCT MODEL with history: Use architecture-specific formatting
-                try:
-                    # CRITICAL FIX: Transform system messages for models that don't support them
-                    transformed_history = history
-                    logger.info(f"🔍 DEBUG: Starting transformation logic for {len(history)} messages")
-                    logger.info(f"🔍 DEBUG: ARCHITECTURE_MANAGER available: {ARCHITECTURE_MANAGER is not None}")
-                    
-                    if ARCHITECTURE_MANAGER:
-                        architecture = ARCHITECTURE_MANAGER.detect_architecture(MODEL_NAME)
-                        arch_config = ARCHITECTURE_MANAGER.get_architecture_config(architecture)
-                        system_as_assistant = arch_config.get("system_as_assistant", False)
-                        
-                        logger.info(f"🔍 DEBUG: Architecture: {architecture}, system_as_assistant: {system_as_assistant}")
-                        
-                        # If this architecture treats system messages as assistant turns (e.g., Gemma)
-                        if system_as_assistant:
-                            logger.info(f"🔄 TRANSFORMING system messages to assistant messages for {architecture}")
-                            transformed_history = []
-                            for msg in history:
-                                if msg.get("role") == "system":
-                                    # Convert system message to assistant message (Gemma speaks as itself)
-                                    transformed_msg = {
-                                        "role": "assistant", 
-                                        "content": msg.get('content', '')
-                                    }
-                                    transformed_history.append(transformed_msg)
-                                    logger.info(f"✅ Transformed: {msg} -> {transformed_msg}")
-                                else:
-                                    transformed_history.append(msg)
-                                    logger.info(f"➡️  Kept as-is: {msg}")
-                        else:
-                            logger.info(f"❌ No transformation applied (system_as_assistant = {system_as_assistant})")
-                    else:
-                        logger.warning("❌ ARCHITECTURE_MANAGER not available for transformation")
-                    
-                    # Add current user message to transformed history
-                    messages = transformed_history + [{"role": "user", "content": prompt}]
-                    
-                    if ARCHITECTURE_MANAGER:
-                        # Use the architecture manager for proper formatting
-                        logger.info(f"Using ModelArchitectureManager for formatting {len(messages)} messages")
-                        final_prompt = ARCHITECTURE_MANAGER.format_messages(messages, MODEL_NAME)
-                        logger.info(f"Architecture-based format result: {final_prompt[:200]}...")
-                    elif hasattr(TOKENIZER, 'apply_chat_template') and TOKENIZER.chat_template:
-                        # Fallback: Try to use tokenizer chat template
-                        logger.info("Using tokenizer chat template for INSTRUCT model")
-                        final_prompt = TOKENIZER.apply_chat_template(
-                            messages, 
-                            tokenize=False, 
-                            add_generation_prompt=True
-                        )
-                        logger.info(f"Chat template result: {final_prompt[:200]}...")
-                    else:
-                        # Last resort: Manual formatting for INSTRUCT models
-                        logger.info("No architecture manager or chat template available, using manual INSTRUCT formatting")
-                        formatted_messages = []
-                        for msg in messages:
-                            if msg["role"] == "system":
-                                formatted_messages.append(f"System: {msg['content']}")
-                            elif msg["role"] == "user":
-                                formatted_messages.append(f"Human: {msg['content']}")
-                            elif msg["role"] == "assistant":
-                                formatted_messages.append(f"Assistant: {msg['content']}")
-                        final_prompt = "\n".join(formatted_messages) + "\nAssistant:"
-                        
-                except Exception as e:
-                    logger.warning(f"Error applying formatting: {e}, falling back to raw prompt")
-                    final_prompt = prompt
-                    
-            elif history and not is_instruct:
-                # BASE MODEL with history: Prompt is already formatted by frontend
-                logger.info("Using pre-formatted prompt for BASE model (system prompt already included)")
-                final_prompt = prompt
-                
-            elif legacy_system_prompt and legacy_system_prompt.strip():
-                # LEGACY: Handle old system_prompt parameter for backward compatibility
-                logger.info(f"Using legacy system prompt: {legacy_system_prompt[:50]}...")
-                
-                if is_instruct and ARCHITECTURE_MANAGER:
-                    # Use architecture manager for legacy system prompts
-                    logger.info("Using ModelArchitectureManager for legacy system prompt formatting")
-                    final_prompt = ARCHITECTURE_MANAGER.format_single_turn(prompt, legacy_system_prompt, MODEL_NAME)
-                elif is_instruct:
-                    # Fallback formatting for instruct models
-                    if "User:" in prompt and "Assistant:" in prompt:
-                        final_prompt = f"System: {legacy_system_prompt}\n\n{prompt}"
-                    else:
-                        final_prompt = f"System: {legacy_system_prompt}\n\nHuman: {prompt}\nAssistant:"
-                else:
-                    # For base models, prepend directly
-                    final_prompt = f"{legacy_system_prompt}\n\n{prompt}"
-                    
-            elif is_instruct and not history:
-                # INSTRUCT MODEL without history: Add minimal formatting if needed
-                if ARCHITECTURE_MANAGER:
-                    # Use architecture manager for single-turn formatting
-                    logger.info("Using ModelArchitectureManager for single-turn INSTRUCT formatting")
-                    final_prompt = ARCHITECTURE_MANAGER.format_single_turn(prompt, "", MODEL_NAME)
-                elif "Human:" not in prompt and "User:" not in prompt and "Assistant:" not in prompt:
-                    # Fallback: Add basic instruct formatting
-                    final_prompt = f"Human: {prompt}\nAssistant:"
-                else:
-                    final_prompt = prompt
-            else:
-                # BASE MODEL without history or system prompt: Use as-is
-                final_prompt = prompt
-            
-            logger.info(f"Final prompt being used: {final_prompt[:200]}...")
-            
             # Create sampler with proper parameters
-            sampler = make_sampler(temp=temperature, top_p=top_p)
+            sampler = make_sampler(temp=params['temperature'], top_p=params['top_p'])
             
             # Create repetition penalty processor if specified
             logits_processors = []
+            repetition_penalty = params['repetition_penalty']
             if repetition_penalty and repetition_penalty != 1.0:
                 repetition_processor = make_repetition_penalty(penalty=repetition_penalty)
                 logits_processors.append(repetition_processor)
             
+            if max_kv_size:
+                logger.debug(f"Ignoring per-request max_kv_size={max_kv_size}: the batched KV cache is shared")
+            
             start_time = time.time()
             
-            # Prepare generation kwargs
-            generation_kwargs = {
-                'max_tokens': max_tokens,
-                'sampler': sampler
-            }
+            # Submit to the batch engine; the request joins the running batch at the next token
+            request = engine.submit(GenerationRequest(
+                prompt_token_ids,
+                max_tokens=params['max_tokens'],
+                sampler=sampler,
+                logits_processors=logits_processors,
+                seed=params['seed'],
+                request_id=str(request_id) if request_id else None,
+                session_id=str(session_id) if session_id is not None else None,
+                adapter=data.get('adapter_path') or None,
+                stop=generation_stops(params['stop'], model_name, is_instruct)
+            ))
+            detokenizer = stopping.detokenizer_for(tokenizer, request)
+            detokenize_time = 0.0
             
-            if logits_processors:
-                generation_kwargs['logits_processors'] = logits_processors
-                
-            if max_kv_size:
-                generation_kwargs['max_kv_size'] = max_kv_size
-                
-            # Set seed for deterministic generation
-            if seed is not None:
-                import mlx.core as mx
-                mx.random.seed(seed)
-                logger.info(f"Set random seed to {seed} for deterministic generation")
+            # Token counts come from the engine, no need to encode the text again
+            prompt_tokens = len(prompt_token_ids)
+            headers = {'X-Request-Id': request.request_id}
+            if cache_status:
+                headers['X-Response-Cache'] = cache_status
             
             if streaming:
                 # Streaming response
-                self._set_headers(content_type='text/plain')
-                
-                # Count prompt tokens
-                prompt_tokens = len(TOKENIZER.encode(final_prompt))
-                completion_text = ""
+                self._set_headers(content_type='text/plain', extra_headers=headers, stream=True)
                 
-                # Generate and stream text chunks
-                for chunk in stream_generate(MODEL, TOKENIZER, prompt=final_prompt, **generation_kwargs):
-                    completion_text += chunk.text
-                    chunk_data = json.dumps({
-                        'type': 'chunk',
-                        'text': chunk.text,
-                        'timestamp': time.time()
-                    }) + '\n'
-                    self.wfile.write(chunk_data.encode())
-                    self.wfile.flush()
+                # Stream text chunks as the engine produces tokens; tokens that
+                # are already waiting are sent as one chunk. A client that went
+                # away cancels the request instead of decoding to max_tokens.
+                buffered = []
+                try:
+                    for tokens in self._follow_tokens(request, engine):
+                        tic = time.time()
+                        for token in tokens:
+                            detokenizer.add_token(token)
+                        segment = detokenizer.last_segment
+                        detokenize_time += time.time() - tic
+                        if segment:
+                            buffered.append(segment)
+                            self._write_chunk(buffered)
+                    if self.client_gone:
+                        return
+                    tic = time.time()
+                    detokenizer.finalize()
+                    segment = detokenizer.last_segment
+                    detokenize_time += time.time() - tic
+                    if segment:
+                        buffered.append(segment)
+                        self._write_chunk(buffered)
+                except (ConnectionError, TimeoutError) as e:
+                    self._abandon(request, engine, str(e))
+                    return
+                cache_response(cache_key, model_name, request, detokenizer.text)
                 
-                # Count completion tokens
-                completion_tokens = len(TOKENIZER.encode(completion_text))
+                completion_tokens = len(request.generated_tokens)
                 
                 # Send completion signal with token counts
                 end_time = time.time()
@@ -364,23 +900,39 @@ class ModelHandler(BaseHTTPRequestHandler):
                 
                 completion_data = json.dumps({
                     'type': 'complete',
+                    'request_id': request.request_id,
                     'generation_time': generation_time,
                     'prompt_tokens': prompt_tokens,
                     'completion_tokens': completion_tokens,
                     'total_tokens': prompt_tokens + completion_tokens,
-                    'tokens_per_sec': round(tokens_per_sec, 1)
+                    'tokens_per_sec': round(tokens_per_sec, 1),
+                    'cached_tokens': request.cached_tokens,
+                    'finish_reason': request.finish_reason,
+                    'adapter_path': request.adapter,
+                    'response_cache': cache_status,
+                    'speculative': request.get_speculative_stats(),
+                    'timing': generation_timing(request, format_time, tokenize_time, detokenize_time)
                 }) + '\n'
-                self.wfile.write(completion_data.encode())
-                self.wfile.flush()
+                try:
+                    self.wfile.write(completion_data.encode())
+                    self.wfile.flush()
+                except (ConnectionError, TimeoutError):
+                    self.close_connection = True
             else:
                 # Non-streaming response (original behavior)
-                response_text = ""
-                chunk_count = 0
-                for chunk in stream_generate(MODEL, TOKENIZER, prompt=final_prompt, **generation_kwargs):
-                    chunk_count += 1
-                    logger.debug(f"Chunk {chunk_count}: '{chunk.text}'")
-                    response_text += chunk.text
-                logger.info(f"Total chunks received: {chunk_count}, total length: {len(response_text)}")
+                for tokens in self._follow_tokens(request, engine):
+                    tic = time.time()
+                    for token in tokens:
+                        detokenizer.add_token(token)
+                    detokenize_time += time.time() - tic
+                if self.client_gone:
+                    return
+                tic = time.time()
+                detokenizer.finalize()
+                response_text = detokenizer.text
+                detokenize_time += time.time() - tic
+                cache_response(cache_key, model_name, request, response_text)
+                logger.info(f"Total tokens received: {len(request.generated_tokens)}, total length: {len(response_text)}")
                 
                 end_time = time.time()
                 
@@ -391,23 +943,28 @@ class ModelHandler(BaseHTTPRequestHandler):
                     response_text = clean_instruct_response(response_text)
                     logger.info(f"Response after cleaning: {response_text[:100]}...")
                 
-                # Count tokens
-                prompt_tokens = len(TOKENIZER.encode(final_prompt))
-                completion_tokens = len(TOKENIZER.encode(response_text))
+                completion_tokens = len(request.generated_tokens)
                 generation_time = end_time - start_time
                 
                 # Calculate tokens per second
                 tokens_per_sec = completion_tokens / generation_time if generation_time > 0 else 0
                 
-                self._set_headers()
+                self._set_headers(extra_headers=headers)
                 response = {
                     'success': True,
+                    'request_id': request.request_id,
                     'text': response_text,
                     'generation_time': generation_time,
                     'prompt_tokens': prompt_tokens,
                     'completion_tokens': completion_tokens,
                     'total_tokens': prompt_tokens + completion_tokens,
-                    'tokens_per_sec': round(tokens_per_sec, 1)
+                    'tokens_per_sec': round(tokens_per_sec, 1),
+                    'cached_tokens': request.cached_tokens,
+                    'finish_reason': request.finish_reason,
+                    'adapter_path': request.adapter,
+                    'response_cache': cache_status,
+                    'speculative': request.get_speculative_stats(),
+                    'timing': generation_timing(request, format_time, tokenize_time, detokenize_time)
                 }
                 self.wfile.write(json.dumps(response).encode())
         except Exception as e:
@@ -418,87 +975,586 @@ class ModelHandler(BaseHTTPRequestHandler):
             response = {'success': False, 'error': str(e)}
             self.wfile.write(json.dumps(response).encode())
 
-def load_model(model_name, adapter_path=None):
-    """Load a model in a separate thread."""
-    global MODEL, TOKENIZER, IS_LOADING, LOADING_ERROR
+    def _send_openai_error(self, error, extra_headers=None):
+        """Reply with an error in the OpenAI format."""
+        self._set_headers(error.status_code, extra_headers=extra_headers)
+        self.wfile.write(json.dumps(error.to_dict()).encode())
     
-    try:
-        logger.info(f"🚀 Loading model {model_name} with adapter {adapter_path}")
+    def _handle_openai_models(self):
+        """List resident models for OpenAI clients."""
+        self._set_headers()
+        self.wfile.write(json.dumps(openai_api.model_list(MODEL_POOL.list())).encode())
+    
+    def _handle_admitted_openai(self, data, chat):
+        """Admit an OpenAI-compatible request through the bounded queue, then run it."""
+        try:
+            with ADMISSION.slot() as wait_time:
+                METRICS.observe_admission_wait(wait_time)
+                self._handle_openai_completion(data, chat)
+        except AdmissionError as e:
+            code = 'rate_limit_exceeded' if e.status_code == 429 else 'queue_timeout'
+            self._send_openai_error(
+                openai_api.OpenAIError(str(e), e.status_code, 'server_error', code=code),
+                extra_headers={'Retry-After': e.retry_after}
+            )
+    
+    def _handle_openai_completion(self, data, chat):
+        """Handle /v1/chat/completions (chat=True) and /v1/completions requests."""
+        # The requested model, which must be resident, otherwise the active one
+        requested = data.get('model')
+        if requested:
+            resident = MODEL_POOL.get_base(requested) if isinstance(requested, str) else None
+            if resident is None:
+                resident_names = [m['model_name'] for m in MODEL_POOL.list()]
+                self._send_openai_error(openai_api.OpenAIError(
+                    f"The model '{requested}' is not loaded (resident models: {', '.join(resident_names) or 'none'})",
+                    404, param='model', code='model_not_found'))
+                return
+        else:
+            resident = self._get_resident()
+        if resident is None:
+            self._send_openai_error(openai_api.OpenAIError('No model loaded', 503, 'server_error'))
+            return
+        model_name, tokenizer, engine = resident.model_name, resident.tokenizer, resident.engine
         
-        # Use ModelManager to resolve the model path - this ensures we only use local models
-        from forgellm.models.model_manager import ModelManager
-        model_manager = ModelManager()
-        actual_model_path = model_manager._resolve_model_path(model_name)
-        logger.info(f"📁 Resolved model path: {actual_model_path}")
+        try:
+            options = openai_api.generation_options(data)
+            if chat:
+                prompt = format_chat_messages(openai_api.parse_messages(data), model_name, tokenizer)
+                # Stop at the end of the assistant turn, like the native API does for instruct models
+                options['stop'] = generation_stops(options['stop'], model_name, True)
+            else:
+                prompt = openai_api.parse_prompt(data)
+        except openai_api.OpenAIError as e:
+            self._send_openai_error(e)
+            return
+        
+        if isinstance(prompt, list):
+            prompt_token_ids = prompt
+        else:
+            add_special_tokens = tokenizer.bos_token is None or not prompt.startswith(tokenizer.bos_token)
+            prompt_token_ids = tokenizer.encode(prompt, add_special_tokens=add_special_tokens)
+        
+        response_id = openai_api.completion_id(chat)
+        session_id = data.get('session_id')
+        try:
+            request = engine.submit(GenerationRequest(
+                prompt_token_ids,
+                request_id=response_id,
+                session_id=str(session_id) if session_id is not None else None,
+                adapter=data.get('adapter_path') or None,
+                **options
+            ))
+        except Exception as e:
+            logger.error(f"Error submitting generation request: {e}")
+            self._send_openai_error(openai_api.OpenAIError(str(e), 500, 'server_error'))
+            return
+        
+        created = int(time.time())
+        if data.get('stream'):
+            self._stream_openai_completion(request, engine, tokenizer, model_name, chat, response_id, created, data)
+            return
+        
+        try:
+            detokenizer = stopping.detokenizer_for(tokenizer, request)
+            for tokens in self._follow_tokens(request, engine):
+                for token in tokens:
+                    detokenizer.add_token(token)
+            if self.client_gone:
+                return
+            detokenizer.finalize()
+        except Exception as e:
+            logger.error(f"Error generating text: {e}")
+            self._send_openai_error(openai_api.OpenAIError(str(e), 500, 'server_error'))
+            return
+        usage = openai_api.usage(len(prompt_token_ids), len(request.generated_tokens), request.cached_tokens)
+        response = openai_api.completion_response(response_id, model_name, chat, detokenizer.text,
+                                                  request.finish_reason, usage, created)
+        self._set_headers()
+        self.wfile.write(json.dumps(response).encode())
+    
+    def _stream_openai_completion(self, request, engine, tokenizer, model_name, chat, response_id, created, data):
+        """
+        Stream a completion as Server-Sent Events.
+        
+        Tokens are coalesced into one event every STREAM_FLUSH_TOKENS tokens or
+        STREAM_FLUSH_MS milliseconds. The engine queues tokens without waiting
+        for the client; a slow client gets larger events, and a client that
+        stops reading for STREAM_WRITE_TIMEOUT seconds or disconnects is
+        dropped and its request cancelled.
+        """
+        include_usage, flush_tokens, flush_delay = openai_api.stream_settings(
+            data, STREAM_FLUSH_TOKENS, STREAM_FLUSH_MS)
+        self._set_headers(content_type='text/event-stream', extra_headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            'X-Request-Id': request.request_id
+        }, stream=True)
+        if STREAM_WRITE_TIMEOUT:
+            self.connection.settimeout(STREAM_WRITE_TIMEOUT)
         
-        # Unload previous model first to free memory
-        if MODEL is not None:
-            logger.info("Unloading previous model to free memory")
-            MODEL = None
-            TOKENIZER = None
-            # Force garbage collection to free GPU memory
-            import gc
-            gc.collect()
+        def send(payload):
+            self.wfile.write(payload if isinstance(payload, bytes) else openai_api.sse(payload))
+            self.wfile.flush()
+        
+        try:
+            if chat:
+                send(openai_api.completion_chunk(response_id, model_name, chat, created, text="", role=True))
+            detokenizer = stopping.detokenizer_for(tokenizer, request)
             try:
-                import mlx.core as mx
-                mx.metal.clear_cache()
-                logger.info("Cleared MLX metal cache")
-            except:
-                pass
+                for tokens in self._follow_tokens(request, engine, flush_tokens, flush_delay):
+                    for token in tokens:
+                        detokenizer.add_token(token)
+                    text = detokenizer.last_segment
+                    if text:
+                        send(openai_api.completion_chunk(response_id, model_name, chat, created, text=text))
+                if self.client_gone:
+                    return
+                detokenizer.finalize()
+                text = detokenizer.last_segment
+                if text:
+                    send(openai_api.completion_chunk(response_id, model_name, chat, created, text=text))
+            except RuntimeError as e:
+                logger.error(f"Error generating text: {e}")
+                send(openai_api.error_body(str(e), 'server_error'))
+                send(openai_api.SSE_DONE)
+                return
+            send(openai_api.completion_chunk(response_id, model_name, chat, created,
+                                             reason=request.finish_reason))
+            if include_usage:
+                usage = openai_api.usage(len(request.prompt_tokens), len(request.generated_tokens),
+                                         request.cached_tokens)
+                send(openai_api.usage_chunk(response_id, model_name, chat, created, usage))
+            send(openai_api.SSE_DONE)
+        except OSError as e:
+            # Includes timeouts and disconnects; the neighbours in the batch are not affected
+            logger.warning(f"Dropped streaming client for {response_id}: {e}")
+            self._abandon(request, engine, str(e))
+
+def generate_params(data):
+    """
+    Get the sampling parameters of a /api/model/generate request, with their defaults.
+    
+    Args:
+        data: The request body
         
-        # Import here to avoid loading mlx until needed
-        from mlx_lm import load
+    Returns:
+        dict: max_tokens, temperature, top_p, repetition_penalty, seed and stop
         
-        start_time = time.time()
+    Raises:
+        ValueError: If a sampling parameter is not a number, or max_tokens or seed not an integer
+    """
+    params = {
+        'max_tokens': data.get('max_tokens', 100),
+        'temperature': data.get('temperature', 0.7),
+        'top_p': data.get('top_p', 0.9),
+        'repetition_penalty': data.get('repetition_penalty', 1.1),
+        'seed': data.get('seed'),  # No default - use None for random generation
+        'stop': data.get('stop')
+    }
+    for name, default in (('temperature', 0.7), ('top_p', 0.9), ('repetition_penalty', 1.1)):
+        try:
+            params[name] = default if params[name] is None else float(params[name])
+        except (TypeError, ValueError):
+            raise ValueError(f"'{name}' must be a number")
+    if isinstance(params['max_tokens'], bool) or not isinstance(params['max_tokens'], int) or params['max_tokens'] < 0:
+        raise ValueError("'max_tokens' must be a non-negative integer")
+    if params['seed'] is not None and (isinstance(params['seed'], bool) or not isinstance(params['seed'], int)):
+        raise ValueError("'seed' must be an integer")
+    return params
+
+def generation_stops(stop, model_name, is_instruct):
+    """
+    Get the stop sequences of a generation request.
+    
+    Instruct models also stop at the end-of-turn markers of their architecture,
+    so a response that runs on past its turn is cut while it is decoded.
+    
+    Args:
+        stop: The stop parameter of the request (a string, a list of strings or None)
+        model_name: Name of the model the request is addressed to
+        is_instruct: Whether the prompt was formatted with the model's chat template
+        
+    Returns:
+        list: Stop sequences for the GenerationRequest
         
+    Raises:
+        ValueError: If the stop parameter is malformed
+    """
+    stops = stopping.parse_stop(stop)
+    if is_instruct and ARCHITECTURE_MANAGER:
+        stops += [s for s in ARCHITECTURE_MANAGER.get_stop_sequences(model_name) if s not in stops]
+    return stops
+
+def prepare_generate_prompt(data, model_name, tokenizer):
+    """
+    Format and tokenize the prompt of a /api/model/generate request.
+    
+    Args:
+        data: The request body
+        model_name: Name of the model the request is addressed to
+        tokenizer: Tokenizer of that model
+        
+    Returns:
+        tuple: (final_prompt, prompt_token_ids, is_instruct, format_time, tokenize_time)
+    """
+    prompt = data.get('prompt')
+    
+    # NEW: Handle history array and model type hint from frontend
+    history = data.get('history', [])
+    is_base_model_hint = data.get('is_base_model', None)
+    
+    # LEGACY: Still support old system_prompt parameter for backward compatibility
+    legacy_system_prompt = data.get('system_prompt', '')
+    
+    format_start = time.time()
+    
+    # Detect if this is an instruct model (use hint if available)
+    if is_base_model_hint is not None:
+        is_instruct = not is_base_model_hint
+        logger.debug(f"Using frontend hint: Model {model_name} is {'BASE' if is_base_model_hint else 'INSTRUCT'}")
+    elif ARCHITECTURE_MANAGER:
+        is_instruct = ARCHITECTURE_MANAGER.is_instruct_model(model_name)
+        logger.debug(f"Model {model_name} detected as instruct model: {is_instruct} (via ArchitectureManager)")
+    else:
+        is_instruct = is_instruct_model(model_name)
+        logger.debug(f"Model {model_name} detected as instruct model: {is_instruct} (fallback detection)")
+    
+    # NEW: Intelligent prompt formatting using ModelArchitectureManager
+    final_prompt = prompt
+    
+    if history and is_instruct:
+        # INSTRUCT MODEL with history: Use architecture-specific formatting
         try:
-            if adapter_path:
-                logger.info(f"📂 Attempting to load with adapter: {adapter_path}")
-                # Check if adapter_config.json exists before trying to load
-                adapter_config_path = os.path.join(adapter_path, 'adapter_config.json')
-                if os.path.exists(adapter_config_path):
-                    logger.info(f"✅ Found adapter_config.json at: {adapter_config_path}")
-                    model, tokenizer = load(actual_model_path, adapter_path=adapter_path)
-                    logger.info(f"✅ Successfully loaded model with adapter!")
-                else:
-                    logger.warning(f"❌ adapter_config.json not found at: {adapter_config_path}")
-                    logger.warning(f"Directory contents:")
-                    try:
-                        for item in os.listdir(adapter_path):
-                            logger.warning(f"  - {item}")
-                    except Exception as e:
-                        logger.warning(f"  Could not list directory: {e}")
-                    logger.warning(f"Loading model without adapter")
-                    model, tokenizer = load(actual_model_path, adapter_path=None)
+            final_prompt = format_history_prompt(history, prompt, model_name, tokenizer)
+        except Exception as e:
+            logger.warning(f"Error applying formatting: {e}, falling back to raw prompt")
+            final_prompt = prompt
+            
+    elif history and not is_instruct:
+        # BASE MODEL with history: Prompt is already formatted by frontend
+        logger.debug("Using pre-formatted prompt for BASE model (system prompt already included)")
+        final_prompt = prompt
+        
+    elif legacy_system_prompt and legacy_system_prompt.strip():
+        # LEGACY: Handle old system_prompt parameter for backward compatibility
+        logger.info(f"Using legacy system prompt: {legacy_system_prompt[:50]}...")
+        
+        if is_instruct and ARCHITECTURE_MANAGER:
+            # Use architecture manager for legacy system prompts
+            logger.debug("Using ModelArchitectureManager for legacy system prompt formatting")
+            final_prompt = ARCHITECTURE_MANAGER.format_single_turn(prompt, legacy_system_prompt, model_name)
+        elif is_instruct:
+            # Fallback formatting for instruct models
+            if "User:" in prompt and "Assistant:" in prompt:
+                final_prompt = f"System: {legacy_system_prompt}\n\n{prompt}"
             else:
-                logger.info(f"📂 Loading model without adapter")
-                model, tokenizer = load(actual_model_path, adapter_path=None)
-        except FileNotFoundError as e:
-            if "adapter_config.json" in str(e):
-                # Handle missing adapter_config.json by loading without adapter
-                logger.warning(f"❌ adapter_config.json not found, loading model without adapter: {e}")
-                model, tokenizer = load(actual_model_path, adapter_path=None)
+                final_prompt = f"System: {legacy_system_prompt}\n\nHuman: {prompt}\nAssistant:"
+        else:
+            # For base models, prepend directly
+            final_prompt = f"{legacy_system_prompt}\n\n{prompt}"
+            
+    elif is_instruct and not history:
+        # INSTRUCT MODEL without history: Add minimal formatting if needed
+        if ARCHITECTURE_MANAGER:
+            # Use architecture manager for single-turn formatting
+            logger.debug("Using ModelArchitectureManager for single-turn INSTRUCT formatting")
+            final_prompt = ARCHITECTURE_MANAGER.format_single_turn(prompt, "", model_name)
+        elif "Human:" not in prompt and "User:" not in prompt and "Assistant:" not in prompt:
+            # Fallback: Add basic instruct formatting
+            final_prompt = f"Human: {prompt}\nAssistant:"
+        else:
+            final_prompt = prompt
+    else:
+        # BASE MODEL without history or system prompt: Use as-is
+        final_prompt = prompt
+    
+    logger.debug(f"Final prompt being used: {final_prompt[:200]}...")
+    format_time = time.time() - format_start
+    
+    # Tokenize the same way stream_generate does for string prompts
+    tic = time.time()
+    add_special_tokens = tokenizer.bos_token is None or not final_prompt.startswith(tokenizer.bos_token)
+    prompt_token_ids = tokenizer.encode(final_prompt, add_special_tokens=add_special_tokens)
+    tokenize_time = time.time() - tic
+    
+    return final_prompt, prompt_token_ids, is_instruct, format_time, tokenize_time
+
+def cache_response(cache_key, model_name, request, text):
+    """Store the raw text of a finished generation request in the response cache."""
+    if cache_key is None or request.finish_reason not in ('stop', 'length'):
+        return
+    RESPONSE_CACHE.put(cache_key, {
+        'text': text,
+        'prompt_tokens': len(request.prompt_tokens),
+        'completion_tokens': len(request.generated_tokens),
+        'finish_reason': request.finish_reason
+    }, model_name)
+
+def generation_timing(request, format_time, tokenize_time, detokenize_time):
+    """
+    Break the time spent on a generation request down by stage.
+    
+    Args:
+        request: The finished GenerationRequest
+        format_time: Seconds spent formatting the prompt
+        tokenize_time: Seconds spent tokenizing the prompt
+        detokenize_time: Seconds spent turning generated tokens into text
+        
+    Returns:
+        dict: Seconds per stage (queue, prefill and decode are measured by the engine)
+    """
+    timing = request.get_timing()
+    breakdown = {
+        'format': format_time,
+        'tokenize': tokenize_time,
+        'queue': timing['queue_time'],
+        'prefill': timing['prefill_time'],
+        'decode': timing['decode_time'],
+        'detokenize': detokenize_time
+    }
+    breakdown = {stage: round(seconds, 4) for stage, seconds in breakdown.items()}
+    if timing['time_to_first_token'] is not None:
+        breakdown['time_to_first_token'] = round(timing['time_to_first_token'], 4)
+    return breakdown
+
+def format_history_prompt(history, prompt, model_name, tokenizer):
+    """
+    Format chat history plus the current user prompt for an instruct model.
+    
+    Args:
+        history: List of message dictionaries with 'role' and 'content' keys
+        prompt: The current user message
+        model_name: Name of the model, used to detect its architecture
+        tokenizer: The model's tokenizer, used for its chat template fallback
+        
+    Returns:
+        str: Formatted prompt string ready for the model
+    """
+    return format_chat_messages(history + [{"role": "user", "content": prompt}], model_name, tokenizer)
+
+def format_chat_messages(messages, model_name, tokenizer):
+    """
+    Format a conversation for an instruct model, ending with the assistant's turn.
+    
+    Args:
+        messages: List of message dictionaries with 'role' and 'content' keys
+        model_name: Name of the model, used to detect its architecture
+        tokenizer: The model's tokenizer, used for its chat template fallback
+        
+    Returns:
+        str: Formatted prompt string ready for the model
+    """
+    if ARCHITECTURE_MANAGER:
+        formatter = ARCHITECTURE_MANAGER.get_formatter(model_name)
+        
+        # If this architecture treats system messages as assistant turns (e.g., Gemma),
+        # the model speaks the system prompt as itself
+        if formatter.system_as_assistant:
+            messages = [
+                {"role": "assistant", "content": msg.get('content', '')} if msg.get("role") == "system" else msg
+                for msg in messages
+            ]
+            logger.debug(f"Transformed system messages to assistant messages for {formatter.architecture}")
+    else:
+        logger.warning("❌ ARCHITECTURE_MANAGER not available for transformation")
+    
+    if ARCHITECTURE_MANAGER:
+        # Use the compiled formatter; earlier turns of the conversation are reused
+        final_prompt = formatter.format(messages)
+    elif hasattr(tokenizer, 'apply_chat_template') and tokenizer.chat_template:
+        # Fallback: Try to use tokenizer chat template
+        logger.info("Using tokenizer chat template for INSTRUCT model")
+        final_prompt = tokenizer.apply_chat_template(
+            messages, 
+            tokenize=False, 
+            add_generation_prompt=True
+        )
+        logger.info(f"Chat template result: {final_prompt[:200]}...")
+    else:
+        # Last resort: Manual formatting for INSTRUCT models
+        logger.info("No architecture manager or chat template available, using manual INSTRUCT formatting")
+        formatted_messages = []
+        for msg in messages:
+            if msg["role"] == "system":
+                formatted_messages.append(f"System: {msg['content']}")
+            elif msg["role"] == "user":
+                formatted_messages.append(f"Human: {msg['content']}")
+            elif msg["role"] == "assistant":
+                formatted_messages.append(f"Assistant: {msg['content']}")
+        final_prompt = "\n".join(formatted_messages) + "\nAssistant:"
+    
+    return final_prompt
+
+def load_model(model_name, adapter_path=None, progress=None):
+    """Load a model in a separate thread and add it to the residency pool."""
+    global ADAPTER_PATH, IS_LOADING, LOADING_ERROR
+    
+    progress = progress or LoadProgress(model_name, adapter_path)
+    try:
+        adapter_path = adapter_path or None
+        if adapter_path:
+            logger.info(f"📂 Attempting to load with adapter: {adapter_path}")
+            # Check if adapter_config.json exists before trying to load
+            adapter_dir, _ = resolve_adapter(adapter_path)
+            adapter_config_path = os.path.join(adapter_dir, ADAPTER_CONFIG_FILE)
+            if os.path.exists(adapter_config_path):
+                logger.info(f"✅ Found adapter_config.json at: {adapter_config_path}")
             else:
-                # Re-raise if it's a different file not found error
-                raise
-                
+                logger.warning(f"❌ adapter_config.json not found at: {adapter_config_path}")
+                logger.warning(f"Directory contents:")
+                try:
+                    for item in os.listdir(adapter_dir):
+                        logger.warning(f"  - {item}")
+                except Exception as e:
+                    logger.warning(f"  Could not list directory: {e}")
+                logger.warning(f"Loading model without adapter")
+                adapter_path = None
+                ADAPTER_PATH = None
+        
+        # A resident base model only needs its adapter swapped
+        try:
+            resident = MODEL_POOL.activate_with_adapter(model_name, adapter_path)
+        except AdapterSwapError as e:
+            logger.info(f"{e}, reloading {model_name}")
+            MODEL_POOL.remove(model_name)
+            resident = None
+        if resident is not None:
+            logger.info(f"Model {model_name} is resident, now serving adapter {adapter_path}")
+            RESPONSE_CACHE.invalidate(model_name)
+            progress.finish('done')
+            IS_LOADING = False
+            LOADING_ERROR = None
+            return
+        
+        logger.info(f"🚀 Loading model {model_name} with adapter {adapter_path}")
+        
+        # Only local models are used (published models, HF cache or a path)
+        actual_model_path = resolve_model_path(model_name)
+        logger.info(f"📁 Resolved model path: {actual_model_path}")
+        
+        # Unload least recently used models until the new one fits
+        evicted = MODEL_POOL.make_room(estimate_model_bytes(actual_model_path))
+        if evicted:
+            logger.info(f"Evicted resident models to free memory: {evicted}")
+        
+        start_time = time.time()
+        
+        # Load the base weights only; adapters are added on top so that other
+        # adapters and checkpoints can be served without reading the base again
+        model, tokenizer = load_model_with_progress(actual_model_path, progress, LOAD_WORKERS)
+        
         end_time = time.time()
         
         logger.info(f"Model loaded successfully in {end_time - start_time:.2f} seconds")
         
-        # Update global variables
-        MODEL = model
-        TOKENIZER = tokenizer
+        draft_model = None
+        if DRAFT_MODEL:
+            try:
+                draft_model = load_draft_model(DRAFT_MODEL, tokenizer)
+            except Exception as e:
+                logger.warning(f"Not using draft model {DRAFT_MODEL} for {model_name}: {e}")
+        
+        # Each resident model has its own batch engine, prompt cache and adapter cache
+        prompt_cache = PromptCacheStore(max_bytes=PROMPT_CACHE_BYTES)
+        engine = BatchEngine(
+            model, tokenizer,
+            max_batch_size=MAX_BATCH_SIZE,
+            prefill_step_size=PREFILL_STEP_SIZE,
+            prompt_cache=prompt_cache,
+            adapters=AdapterCache(model, max_adapters=MAX_ADAPTERS, max_bytes=ADAPTER_CACHE_BYTES,
+                                  on_change=functools.partial(prompt_cache.clear_namespace,
+                                                              reason="adapter weights changed")),
+            draft_model=draft_model,
+            num_draft_tokens=NUM_DRAFT_TOKENS,
+            on_finish=functools.partial(METRICS.observe_request, model_name)
+        )
+        engine.start()
+        
+        resident = ResidentModel(
+            model_name, None, model, tokenizer,
+            engine=engine,
+            prompt_cache=prompt_cache,
+            prefixes=PrefixCacheRegistry(PREFIX_CACHE_DIR),
+            model_path=actual_model_path,
+            load_time=end_time - start_time
+        )
+        try:
+            if adapter_path:
+                resident.swap_adapter(adapter_path)
+                logger.info(f"✅ Successfully loaded model with adapter!")
+            else:
+                # Restore the registered prefixes of the base model from disk
+                resident.restore_prefixes()
+        except Exception:
+            resident.unload()
+            raise
+        
+        # Responses of weights loaded earlier under this name must not be served
+        RESPONSE_CACHE.invalidate(model_name)
+        MODEL_POOL.add(resident)
+        METRICS.observe_model_load(model_name, adapter_path, time.time() - start_time)
         IS_LOADING = False
         LOADING_ERROR = None
+    except LoadCancelled as e:
+        logger.info(str(e))
+        progress.finish('cancelled')
+        IS_LOADING = False
+        LOADING_ERROR = str(e)
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         traceback.print_exc()
+        progress.finish('error')
         IS_LOADING = False
         LOADING_ERROR = str(e)
+    finally:
+        STATUS_EVENTS.notify()
 
+def status_snapshot(status_version=None):
+    """
+    Build the model status served by /api/model/status and /api/model/events.
+    
+    Args:
+        status_version: Version of STATUS_EVENTS the snapshot was taken at
+        
+    Returns:
+        dict: The model state, load progress and cache and queue statistics
+    """
+    active = MODEL_POOL.active
+    
+    # Basic response; 'loaded' refers to the most recently requested model
+    response = {
+        'success': True,
+        'loaded': not IS_LOADING and active is not None
+                  and active.key == ModelPool.make_key(MODEL_NAME, ADAPTER_PATH),
+        'is_loading': IS_LOADING,
+        'model_name': MODEL_NAME,
+        'adapter_path': ADAPTER_PATH,
+        'status_version': STATUS_EVENTS.version if status_version is None else status_version
+    }
+    
+    # Add error if there is one
+    if LOADING_ERROR:
+        response['error'] = str(LOADING_ERROR)
+    
+    progress = LOAD_PROGRESS
+    if progress is not None:
+        response['load_progress'] = progress.to_dict()
+    
+    response['queue'] = ADMISSION.get_stats()
+    if active is not None:
+        response['engine'] = active.engine.get_stats()
+        response['prompt_cache'] = active.prompt_cache.get_stats()
+    response['resident_models'] = MODEL_POOL.list()
+    response['model_pool'] = MODEL_POOL.get_stats()
+    response['response_cache'] = RESPONSE_CACHE.get_stats()
+    if ARCHITECTURE_MANAGER:
+        response['prompt_formatting'] = ARCHITECTURE_MANAGER.get_stats()
+    return response
+
+@functools.lru_cache(maxsize=256)
 def is_instruct_model(model_name):
-    """Detect if a model is an instruct model based on its name."""
+    """Detect if a model is an instruct model based on its name (once per name)."""
     if not model_name:
         return False
     
@@ -591,29 +1647,126 @@ def clean_instruct_response(text):
 
 def main():
     """Main entry point."""
+    global MODEL_NAME, ADAPTER_PATH, ADMISSION, MAX_BATCH_SIZE, PREFILL_STEP_SIZE, PROMPT_CACHE_BYTES, PREFIX_CACHE_DIR, MODEL_POOL
+    global MAX_ADAPTERS, ADAPTER_CACHE_BYTES, DRAFT_MODEL, NUM_DRAFT_TOKENS
+    global STREAM_FLUSH_TOKENS, STREAM_FLUSH_MS, STREAM_WRITE_TIMEOUT, LOAD_WORKERS, RESPONSE_CACHE
+    global SCORE_BATCH_TOKENS, KEEPALIVE_TIMEOUT
+    
     parser = argparse.ArgumentParser(description="Simple HTTP server for model inference")
     parser.add_argument("--host", default="localhost", help="Host to bind to")
     parser.add_argument("--port", type=int, default=5001, help="Port to bind to")
+    parser.add_argument("--unix-socket",
+                        help="Also listen on this Unix domain socket (for a web process on the same host)")
+    parser.add_argument("--keepalive-timeout", type=float, default=120.0,
+                        help="Seconds an idle keep-alive connection stays open (0 keeps it open)")
     parser.add_argument("--model", help="Model to preload")
     parser.add_argument("--adapter", help="Adapter to preload")
+    parser.add_argument("--max-concurrent", type=int, default=8,
+                        help="Generation requests decoded together in one continuous batch")
+    parser.add_argument("--queue-depth", type=int, default=16,
+                        help="Generation requests allowed to wait for a slot before returning 429")
+    parser.add_argument("--queue-timeout", type=float, default=30.0,
+                        help="Seconds a request may wait for a slot before returning 503")
+    parser.add_argument("--prefill-step-size", type=int, default=512,
+                        help="Prompt tokens prefilled per step between batched decode steps")
+    parser.add_argument("--prompt-cache-size", type=int, default=1024,
+                        help="Memory budget in MB for reusing KV caches across chat turns (0 disables)")
+    parser.add_argument("--prefix-cache-dir",
+                        help="Directory for registered prefix caches (default: $MODELS_DIR/prompt_cache)")
+    parser.add_argument("--max-adapters", type=int, default=8,
+                        help="LoRA adapters per model that can be served side by side in one batch")
+    parser.add_argument("--adapter-cache-size", type=int, default=1024,
+                        help="Memory budget in MB for cached LoRA adapters per model")
+    parser.add_argument("--max-models", type=int, default=4,
+                        help="Maximum number of models (or model/adapter pairs) kept resident")
+    parser.add_argument("--model-memory-gb", type=float,
+                        help="Memory budget in GB for resident model weights (default: 60%% of system memory)")
+    parser.add_argument("--draft-model",
+                        help="Small model with the same tokenizer for speculative decoding")
+    parser.add_argument("--num-draft-tokens", type=int, default=DEFAULT_NUM_DRAFT_TOKENS,
+                        help="Tokens proposed by the draft model per forward pass of the model")
+    parser.add_argument("--stream-flush-tokens", type=int, default=openai_api.DEFAULT_FLUSH_TOKENS,
+                        help="Tokens coalesced into one streamed /v1 event")
+    parser.add_argument("--stream-flush-ms", type=float, default=openai_api.DEFAULT_FLUSH_MS,
+                        help="Milliseconds after which a partial streamed /v1 event is sent")
+    parser.add_argument("--response-cache-size", type=int, default=0,
+                        help="Memory budget in MB for cached responses of deterministic requests (0 disables the cache)")
+    parser.add_argument("--response-cache-ttl", type=float, default=3600.0,
+                        help="Seconds a cached response stays valid (0 keeps it until evicted)")
+    parser.add_argument("--response-cache-dir",
+                        help="Directory for an on-disk tier of the response cache that survives restarts")
+    parser.add_argument("--response-cache-disk-size", type=int, default=1024,
+                        help="Disk budget in MB for the on-disk tier of the response cache")
+    parser.add_argument("--score-batch-tokens", type=int, default=scoring.DEFAULT_BATCH_TOKENS,
+                        help="Padded tokens evaluated per forward pass by /api/model/score")
+    parser.add_argument("--load-workers", type=int, default=DEFAULT_LOAD_WORKERS,
+                        help="Threads reading weight shards in parallel while a model loads (0 disables it)")
+    parser.add_argument("--stream-write-timeout", type=float, default=30.0,
+                        help="Seconds a streaming client may stall a write before it is dropped (0 disables)")
     
     args = parser.parse_args()
     
+    ADMISSION = AdmissionController(
+        max_concurrent=args.max_concurrent,
+        max_queue=args.queue_depth,
+        queue_timeout=args.queue_timeout
+    )
+    MAX_BATCH_SIZE = args.max_concurrent
+    PREFILL_STEP_SIZE = args.prefill_step_size
+    PROMPT_CACHE_BYTES = args.prompt_cache_size * 1024 * 1024
+    MAX_ADAPTERS = args.max_adapters
+    ADAPTER_CACHE_BYTES = args.adapter_cache_size * 1024 * 1024
+    DRAFT_MODEL = args.draft_model
+    NUM_DRAFT_TOKENS = args.num_draft_tokens
+    STREAM_FLUSH_TOKENS = args.stream_flush_tokens
+    STREAM_FLUSH_MS = args.stream_flush_ms
+    STREAM_WRITE_TIMEOUT = args.stream_write_timeout
+    LOAD_WORKERS = args.load_workers
+    SCORE_BATCH_TOKENS = args.score_batch_tokens
+    KEEPALIVE_TIMEOUT = args.keepalive_timeout
+    RESPONSE_CACHE = ResponseCache(
+        max_bytes=args.response_cache_size * 1024 * 1024,
+        ttl=args.response_cache_ttl,
+        cache_dir=args.response_cache_dir,
+        max_disk_bytes=args.response_cache_disk_size * 1024 * 1024
+    )
+    if args.prefix_cache_dir:
+        PREFIX_CACHE_DIR = args.prefix_cache_dir
+    MODEL_POOL = ModelPool(
+        max_bytes=int(args.model_memory_gb * 1024 ** 3) if args.model_memory_gb else None,
+        max_models=args.max_models
+    )
+    
     # Preload model if specified
     if args.model:
         logger.info(f"Preloading model {args.model}")
+        MODEL_NAME, ADAPTER_PATH = args.model, args.adapter
         load_model(args.model, args.adapter)
+        startup_profile.mark('model preloaded')
     
     # Start server
     server_address = (args.host, args.port)
-    httpd = HTTPServer(server_address, ModelHandler)
+    httpd = ThreadingHTTPServer(server_address, ModelHandler)
+    httpd.daemon_threads = True
+    
+    unix_httpd = None
+    if args.unix_socket:
+        unix_httpd = UnixHTTPServer(args.unix_socket, ModelHandler)
+        threading.Thread(target=unix_httpd.serve_forever, daemon=True).start()
+        logger.info(f"Listening on Unix socket {args.unix_socket}")
     
-    logger.info(f"Starting server on {args.host}:{args.port}")
+    logger.info(f"Starting server on {args.host}:{args.port} "
+                f"(max_concurrent={args.max_concurrent}, queue_depth={args.queue_depth}, "
+                f"queue_timeout={args.queue_timeout}s)")
+    startup_profile.mark_ready('model server ready')
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         logger.info("Shutting down")
         httpd.server_close()
+        if unix_httpd is not None:
+            unix_httpd.shutdown()
+            unix_httpd.server_close()
     
     return 0
 
@@ -0,0 +1,292 @@
+"""
+Prometheus metrics for the model server.
+
+The model server answers ``GET /metrics`` in the Prometheus text exposition
+format (version 0.0.4). The few metric types it needs are implemented here,
+so the endpoint works offline and without the prometheus_client package:
+any Prometheus-compatible scraper, or plain curl, can read it.
+
+Per-request histograms and counters (time to first token, inter-token
+latency, queue time, token counts) are recorded when a request finishes on
+its batch engine. Gauges and cache counters (active sequences, queue depth,
+KV cache memory, cache hits, tokens/sec) are read from the resident models
+and the admission queue when the endpoint is scraped.
+"""
+
+import bisect
+import logging
+import math
+import threading
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+TTFT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 20.0, 40.0, 80.0)
+INTER_TOKEN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.1, 0.25, 0.5, 1.0, 2.5)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0, 320.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Observations counted in cumulative buckets per label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple = ()):
+        self.observe_many((value,), labels)
+
+    def observe_many(self, values: Iterable[float], labels: Tuple = ()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = series[0]
+            for value in values:
+                counts[bisect.bisect_left(self.buckets, value)] += 1
+                series[1] += value
+                series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += bucket_count
+                    le = ('le', _format_value(bound))
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+def _collected(name: str, kind: str, documentation: str, labelnames: Sequence[str],
+               samples: List[Tuple[Tuple, Optional[float]]]) -> List[str]:
+    """Render a gauge or counter whose values are read at scrape time."""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}']
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f'{name}{_labels(labelnames, labels)} {_format_value(value)}')
+    return lines
+
+
+class InferenceMetrics:
+    """Metrics of the model server, labelled by model and adapter."""
+
+    def __init__(self):
+        labels = ('model', 'adapter')
+        self.time_to_first_token = Histogram(
+            'forgellm_time_to_first_token_seconds',
+            'Time from submission to the first generated token.', labels, TTFT_BUCKETS)
+        self.inter_token_latency = Histogram(
+            'forgellm_inter_token_latency_seconds',
+            'Time between consecutive generated tokens.', labels, INTER_TOKEN_BUCKETS)
+        self.engine_queue_time = Histogram(
+            'forgellm_engine_queue_seconds',
+            'Time a request waited on the batch engine before its prefill started.', labels, WAIT_BUCKETS)
+        self.request_duration = Histogram(
+            'forgellm_request_duration_seconds',
+            'Time from submission to the last generated token.', labels, DURATION_BUCKETS)
+        self.admission_wait = Histogram(
+            'forgellm_queue_wait_seconds',
+            'Time a generation request waited in the admission queue.', (), WAIT_BUCKETS)
+        self.requests = Counter(
+            'forgellm_requests_total', 'Finished generation requests.', labels + ('finish_reason',))
+        self.prompt_tokens = Counter(
+            'forgellm_prompt_tokens_total', 'Prompt tokens of finished requests.', labels)
+        self.cached_prompt_tokens = Counter(
+            'forgellm_cached_prompt_tokens_total', 'Prompt tokens restored from the prompt cache.', labels)
+        self.generation_tokens = Counter(
+            'forgellm_generation_tokens_total', 'Generated tokens of finished requests.', labels)
+        self._load_durations = {}
+        self._lock = threading.Lock()
+
+    def observe_request(self, model_name: str, request):
+        """
+        Record a finished request (called on the engine thread).
+
+        Args:
+            model_name: Name of the resident model that served the request
+            request: The finished GenerationRequest
+        """
+        if request.prefill_only:
+            return
+        labels = (model_name, request.adapter or '')
+        timing = request.get_timing()
+        self.requests.inc(labels + (request.finish_reason or '',))
+        self.prompt_tokens.inc(labels, len(request.prompt_tokens))
+        self.cached_prompt_tokens.inc(labels, request.cached_tokens)
+        self.generation_tokens.inc(labels, len(request.generated_tokens))
+        if request.prefill_start_time is not None:
+            self.engine_queue_time.observe(timing['queue_time'], labels)
+        if timing['time_to_first_token'] is not None:
+            self.time_to_first_token.observe(timing['time_to_first_token'], labels)
+            self.request_duration.observe(timing['total_time'], labels)
+        if request.token_gaps:
+            self.inter_token_latency.observe_many(request.token_gaps, labels)
+
+    def observe_admission_wait(self, seconds: float):
+        self.admission_wait.observe(seconds)
+
+    def observe_model_load(self, model_name: str, adapter_path: Optional[str], seconds: float):
+        with self._lock:
+            self._load_durations[(model_name, adapter_path or '')] = seconds
+
+    def render(self, pool=None, admission=None) -> str:
+        """
+        Render all metrics in the Prometheus text format.
+
+        Args:
+            pool: The ModelPool of resident models
+            admission: The AdmissionController of generation requests
+
+        Returns:
+            str: The metrics page
+        """
+        lines = []
+        for metric in (self.time_to_first_token, self.inter_token_latency, self.engine_queue_time,
+                       self.request_duration, self.admission_wait, self.requests, self.prompt_tokens,
+                       self.cached_prompt_tokens, self.generation_tokens):
+            lines.extend(metric.render())
+
+        with self._lock:
+            loads = sorted(self._load_durations.items())
+        lines.extend(_collected('forgellm_model_load_duration_seconds', 'gauge',
+                                'Time the last load of a model took.', ('model', 'adapter'), loads))
+
+        if admission is not None:
+            stats = admission.get_stats()
+            for name, kind, documentation, key in (
+                ('forgellm_queue_depth', 'gauge', 'Generation requests waiting for admission.', 'queued'),
+                ('forgellm_requests_running', 'gauge', 'Generation requests admitted and running.', 'active'),
+                ('forgellm_requests_rejected_total', 'counter', 'Requests rejected with a full queue.',
+                 'rejected_total'),
+                ('forgellm_requests_timed_out_total', 'counter', 'Requests that timed out in the queue.',
+                 'timed_out_total'),
+            ):
+                lines.extend(_collected(name, kind, documentation, (), [((), stats[key])]))
+
+        if pool is not None:
+            lines.extend(self._render_pool(pool))
+        return '\n'.join(lines) + '\n'
+
+    def _render_pool(self, pool) -> List[str]:
+        """Gauges and cache counters of the resident models."""
+        samples = {}
+
+        def add(name, labels, value):
+            samples.setdefault(name, []).append((labels, value))
+
+        for resident in pool.residents():
+            model = (resident.model_name,)
+            add('forgellm_model_bytes', model, resident.nbytes)
+            engine = resident.engine
+            if engine is None:
+                continue
+            stats = engine.get_stats()
+            add('forgellm_active_sequences', model, stats['active_sequences'])
+            add('forgellm_pending_sequences', model, stats['pending'] + stats['prefilling'])
+            add('forgellm_prefill_tokens_total', model, stats['prompt_tokens'] - stats['cached_prompt_tokens'])
+            add('forgellm_prefill_seconds_total', model, stats['prefill_time'])
+            add('forgellm_decode_tokens_total', model, stats['generated_tokens'])
+            add('forgellm_decode_seconds_total', model, stats['decode_time'])
+            prefill_tokens = stats['prompt_tokens'] - stats['cached_prompt_tokens']
+            if stats['prefill_time'] > 0:
+                add('forgellm_prefill_tokens_per_second', model, round(prefill_tokens / stats['prefill_time'], 1))
+            add('forgellm_decode_tokens_per_second', model, stats['decode_tokens_per_sec'])
+            add('forgellm_kv_cache_bytes', model + ('batch',), engine.kv_cache_bytes())
+            if stats.get('draft_tokens'):
+                add('forgellm_draft_acceptance_ratio', model, stats['draft_acceptance_rate'])
+            if engine.prompt_cache is not None:
+                cache = engine.prompt_cache.get_stats()
+                add('forgellm_kv_cache_bytes', model + ('prompt_cache',), cache['bytes'] + cache['pinned_bytes'])
+                add('forgellm_prompt_cache_hits_total', model, cache['hits'])
+                add('forgellm_prompt_cache_misses_total', model, cache['misses'])
+                add('forgellm_prompt_cache_hit_ratio', model, cache['hit_rate'])
+            if engine.adapters is not None:
+                adapters = engine.adapters.get_stats()
+                add('forgellm_adapter_cache_hits_total', model, adapters['hits'])
+                add('forgellm_adapter_cache_loads_total', model, adapters['loads'])
+                add('forgellm_adapter_cache_bytes', model, adapters['bytes'])
+
+        stats = pool.get_stats()
+        lines = []
+        for name, kind, documentation, labelnames in (
+            ('forgellm_model_bytes', 'gauge', 'Estimated weight memory of a resident model.', ('model',)),
+            ('forgellm_active_sequences', 'gauge', 'Sequences being decoded in the batch.', ('model',)),
+            ('forgellm_pending_sequences', 'gauge', 'Sequences queued on or being prefilled by the engine.', ('model',)),
+            ('forgellm_prefill_tokens_total', 'counter', 'Prompt tokens prefilled (excluding cached ones).', ('model',)),
+            ('forgellm_prefill_seconds_total', 'counter', 'Time spent prefilling prompts.', ('model',)),
+            ('forgellm_decode_tokens_total', 'counter', 'Tokens decoded.', ('model',)),
+            ('forgellm_decode_seconds_total', 'counter', 'Time spent in decode steps.', ('model',)),
+            ('forgellm_prefill_tokens_per_second', 'gauge', 'Average prefill throughput in tokens per second.', ('model',)),
+            ('forgellm_decode_tokens_per_second', 'gauge', 'Average decode throughput in tokens per second.', ('model',)),
+            ('forgellm_kv_cache_bytes', 'gauge', 'KV cache memory in use.', ('model', 'cache')),
+            ('forgellm_draft_acceptance_ratio', 'gauge', 'Share of drafted tokens accepted by the model.', ('model',)),
+            ('forgellm_prompt_cache_hits_total', 'counter', 'Prompt cache lookups that reused a KV state.', ('model',)),
+            ('forgellm_prompt_cache_misses_total', 'counter', 'Prompt cache lookups without a reusable KV state.', ('model',)),
+            ('forgellm_prompt_cache_hit_ratio', 'gauge', 'Share of prompt cache lookups that were hits.', ('model',)),
+            ('forgellm_adapter_cache_hits_total', 'counter', 'Requests whose adapter was already cached.', ('model',)),
+            ('forgellm_adapter_cache_loads_total', 'counter', 'Adapters loaded into the adapter cache.', ('model',)),
+            ('forgellm_adapter_cache_bytes', 'gauge', 'Memory of the cached adapters.', ('model',)),
+        ):
+            lines.extend(_collected(name, kind, documentation, labelnames, samples.get(name, [])))
+        for name, kind, documentation, key in (
+            ('forgellm_resident_models', 'gauge', 'Models kept resident.', 'resident'),
+            ('forgellm_model_pool_hits_total', 'counter', 'Requests served by an already resident model.', 'hits'),
+            ('forgellm_model_loads_total', 'counter', 'Models loaded from disk.', 'loads'),
+            ('forgellm_model_evictions_total', 'counter', 'Resident models evicted to free memory.', 'evictions'),
+        ):
+            lines.extend(_collected(name, kind, documentation, (), [((), stats[key])]))
+        return lines
@@ -0,0 +1,197 @@
+"""
+Model loading with progress reporting for the model server.
+
+mlx_lm builds the model lazily: each safetensors shard is mapped by
+mx.load and its tensors are only read when they are evaluated, straight
+into MLX buffers without passing through Python. Evaluating every
+parameter at once gives no feedback and reads one tensor after another,
+so the loader instead
+
+- reads the shards ahead of time with a small pool of threads, so that
+  several files stream from disk at once and the tensors are served from
+  the page cache when they are evaluated, and
+- evaluates the parameters in batches of a few hundred MB, reporting
+  bytes loaded, shards read and an ETA after each batch.
+
+A load can be cancelled between two chunks; the partially loaded model is
+then dropped.
+"""
+
+import glob
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Threads reading shards ahead of materialization
+DEFAULT_LOAD_WORKERS = 4
+
+# Bytes read per call by a reader thread
+READ_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Parameter bytes evaluated together between two progress updates
+EVAL_BATCH_BYTES = 512 * 1024 * 1024
+
+
+class LoadCancelled(Exception):
+    """Raised when a model load was cancelled."""
+
+
+class LoadProgress:
+    """Thread-safe progress of one model load."""
+
+    def __init__(self, model_name: str, adapter_path: Optional[str] = None):
+        self.model_name = model_name
+        self.adapter_path = adapter_path
+        self.stage = 'starting'
+        self.bytes_total = 0
+        self.bytes_read = 0
+        self.bytes_loaded = 0
+        self.shards_total = 0
+        self.shards_done = 0
+        self.start_time = time.time()
+        self.end_time = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def begin(self, bytes_total: int, shards_total: int):
+        with self._lock:
+            self.bytes_total = bytes_total
+            self.shards_total = shards_total
+            self.stage = 'loading'
+
+    def add_read(self, nbytes: int):
+        with self._lock:
+            self.bytes_read += nbytes
+
+    def add_loaded(self, nbytes: int):
+        with self._lock:
+            self.bytes_loaded = min(self.bytes_loaded + nbytes, self.bytes_total or self.bytes_loaded + nbytes)
+
+    def shard_done(self):
+        with self._lock:
+            self.shards_done += 1
+
+    def finish(self, stage: str):
+        with self._lock:
+            self.stage = stage
+            self.end_time = time.time()
+            if stage == 'done':
+                self.bytes_loaded = self.bytes_total
+                self.shards_done = self.shards_total
+
+    def cancel(self):
+        """Ask the load to stop at the next chunk."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise LoadCancelled if the load was cancelled."""
+        if self._cancelled.is_set():
+            raise LoadCancelled(f"Loading {self.model_name} was cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = (self.end_time or time.time()) - self.start_time
+            # Whichever of reading and evaluating is further along
+            done = max(self.bytes_loaded, self.bytes_read)
+            rate = done / elapsed if elapsed > 0 else 0
+            eta = None
+            if self.stage == 'loading' and self.bytes_total and rate > 0:
+                eta = round((self.bytes_total - done) / rate, 1)
+            return {
+                'model_name': self.model_name,
+                'adapter_path': self.adapter_path,
+                'stage': self.stage,
+                'bytes_total': self.bytes_total,
+                'bytes_read': self.bytes_read,
+                'bytes_loaded': self.bytes_loaded,
+                'shards_total': self.shards_total,
+                'shards_done': self.shards_done,
+                'percent': round(100.0 * done / self.bytes_total, 1) if self.bytes_total else 0.0,
+                'elapsed': round(elapsed, 1),
+                'eta_seconds': eta,
+                'throughput_mb_s': round(rate / (1024 * 1024), 1)
+            }
+
+
+def weight_files(model_path: str) -> List[str]:
+    """List the safetensors shards mlx_lm loads for a model directory."""
+    return sorted(glob.glob(os.path.join(model_path, 'model*.safetensors')))
+
+
+def _read_shard(path: str, progress: LoadProgress, stop: threading.Event):
+    """Read a shard into the page cache, reusing one buffer."""
+    buffer = bytearray(READ_CHUNK_BYTES)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while not stop.is_set():
+            n = f.readinto(view)
+            if not n:
+                break
+            progress.add_read(n)
+    if not stop.is_set():
+        progress.shard_done()
+
+
+def load_model_with_progress(model_path: str, progress: LoadProgress, workers: int = DEFAULT_LOAD_WORKERS):
+    """
+    Load a model and tokenizer with mlx_lm, reporting progress.
+
+    Args:
+        model_path: Local model directory
+        progress: LoadProgress updated while loading (and checked for cancellation)
+        workers: Number of threads reading shards ahead of evaluation (0 disables it)
+
+    Returns:
+        Tuple of (model, tokenizer)
+
+    Raises:
+        LoadCancelled: If progress.cancel() was called before the load finished
+    """
+    import mlx.core as mx
+    from mlx.utils import tree_flatten
+    from mlx_lm import load
+
+    files = weight_files(model_path)
+    progress.begin(sum(os.path.getsize(f) for f in files), len(files))
+    progress.check()
+
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shard-reader') if workers > 0 else None
+    try:
+        for f in files if pool else []:
+            pool.submit(_read_shard, f, progress, stop)
+
+        # Builds the model without reading any tensor data yet
+        model, tokenizer = load(model_path, lazy=True)
+        progress.check()
+
+        batch, batch_bytes = [], 0
+        for _, array in tree_flatten(model.parameters()):
+            batch.append(array)
+            batch_bytes += array.nbytes
+            if batch_bytes >= EVAL_BATCH_BYTES:
+                mx.eval(batch)
+                progress.add_loaded(batch_bytes)
+                progress.check()
+                batch, batch_bytes = [], 0
+        if batch:
+            mx.eval(batch)
+            progress.add_loaded(batch_bytes)
+        progress.check()
+    finally:
+        # Reading ahead is best effort; whatever is left is not needed any more
+        stop.set()
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    progress.finish('done')
+    return model, tokenizer
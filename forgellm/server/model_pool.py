@@ -0,0 +1,466 @@
+"""
+Residency pool for the models loaded by the model server.
+
+Instead of dropping the previous model on every load, the server keeps
+several base models resident, each with its own batch engine and prompt
+cache. Loading a model that is already resident only makes it the active
+model, and loading it with another adapter swaps the adapter tensors in
+place (see adapters) instead of reading the base weights again. When a new
+model does not fit in the memory budget (or the model count limit is
+reached) the least recently used models are unloaded first. Generation
+requests can address any resident model by name; requests without a model
+name go to the active one.
+"""
+
+import gc
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .adapters import AdapterSwapError, AdapterSwapper
+
+logger = logging.getLogger(__name__)
+
+
+def default_memory_budget() -> int:
+    """Return the default model memory budget in bytes (60% of system memory)."""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total * 0.6)
+    except ImportError:
+        return 16 * 1024 ** 3
+
+
+def estimate_model_bytes(model_path: str) -> int:
+    """Estimate the memory needed by a model from the size of its weight files."""
+    if not model_path or not os.path.isdir(model_path):
+        return 0
+    total = 0
+    for file_name in os.listdir(model_path):
+        if file_name.endswith(('.safetensors', '.npz', '.bin')):
+            try:
+                total += os.path.getsize(os.path.join(model_path, file_name))
+            except OSError:
+                pass
+    return total
+
+
+def model_bytes(model) -> int:
+    """Return the number of bytes held by a model's parameters."""
+    from mlx.utils import tree_flatten
+
+    return sum(v.nbytes for _, v in tree_flatten(model.parameters()))
+
+
+class ResidentModel:
+    """A loaded base model, its current adapter and the per-model serving state."""
+
+    def __init__(
+        self,
+        model_name: str,
+        adapter_path: Optional[str],
+        model,
+        tokenizer,
+        engine=None,
+        prompt_cache=None,
+        prefixes=None,
+        model_path: Optional[str] = None,
+        load_time: float = 0.0,
+        adapters: Optional[AdapterSwapper] = None
+    ):
+        """
+        Initialize the resident model.
+
+        Args:
+            model_name: Model name as requested by the client
+            adapter_path: Adapter applied to the model, if any
+            model: The loaded MLX model
+            tokenizer: The tokenizer wrapper returned by mlx_lm.load
+            engine: The BatchEngine serving this model
+            prompt_cache: The PromptCacheStore of this model
+            prefixes: The PrefixCacheRegistry of this model
+            model_path: Resolved local path of the model
+            load_time: Seconds it took to load the model
+            adapters: The AdapterSwapper that applied adapter_path, if any
+        """
+        self.model_name = model_name
+        self.adapter_path = adapter_path or None
+        self.model = model
+        self.tokenizer = tokenizer
+        self.engine = engine
+        self.prompt_cache = prompt_cache
+        self.prefixes = prefixes
+        self.model_path = model_path
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.nbytes = model_bytes(model) if model is not None else 0
+        self.adapters = adapters or AdapterSwapper(model)
+        self.adapter_swaps = 0
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return (self.model_name, self.adapter_path)
+
+    def touch(self):
+        self.last_used = time.time()
+
+    def swap_adapter(self, adapter_path: Optional[str], timeout: Optional[float] = None) -> float:
+        """
+        Replace the adapter of the resident model without reloading the base weights.
+
+        LoRA adapters are loaded into the engine's adapter cache and become the
+        default for requests that do not name an adapter; requests already in
+        flight keep the adapter they started with. Other adapters (DoRA, full
+        fine-tunes) are applied in place once in-flight requests have finished,
+        and the prompt cache is cleared because its KV states no longer match.
+        The registered prefixes of the new adapter are restored.
+
+        Args:
+            adapter_path: Adapter directory or checkpoint file (None for the base model)
+            timeout: Maximum seconds to wait for in-flight requests
+
+        Returns:
+            float: Seconds the swap itself took
+        """
+        adapter_path = adapter_path or None
+        start_time = time.time()
+        previous_namespace = self.namespace
+        stacked_cache = self.engine.adapters if self.engine is not None else None
+
+        in_place = self.adapters.adapter_path
+        try:
+            if in_place is not None:
+                # Undo the adapter applied in place before anything else
+                self._run(lambda: self._apply_in_place(None), timeout, drain=True)
+
+            stacked = False
+            if stacked_cache is not None:
+                try:
+                    self._run(lambda: self._set_default_adapter(adapter_path), timeout, drain=False)
+                    stacked = True
+                except AdapterSwapError as e:
+                    logger.info(f"{e}; applying adapter in place")
+            if not stacked:
+                self._run(lambda: self._apply_in_place(adapter_path), timeout, drain=True)
+        except Exception:
+            if in_place is not None and self.adapters.adapter_path != in_place:
+                try:
+                    self._run(lambda: self._apply_in_place(in_place), timeout, drain=True)
+                except Exception as e:
+                    logger.warning(f"Could not restore adapter {in_place}: {e}")
+            raise
+
+        self.adapter_path = adapter_path
+        if self.prompt_cache is not None:
+            self.prompt_cache.unpin_namespace(previous_namespace)
+            if self.prefixes is not None:
+                self.restore_prefixes()
+        self.adapter_swaps += 1
+        self.touch()
+        return time.time() - start_time
+
+    def restore_prefixes(self):
+        """Pin the registered prefixes of the current (model, adapter) pair."""
+        try:
+            for info, tokens, cache in self.prefixes.activate(self.model_path or self.model_name, self.adapter_path):
+                self.prompt_cache.pin(f"registered:{info['id']}", tokens, cache, self.namespace)
+        except Exception as e:
+            logger.warning(f"Could not load registered prefixes: {e}")
+
+    @property
+    def namespace(self) -> Optional[str]:
+        """Prompt cache namespace of requests that do not name an adapter."""
+        return self.engine.default_adapter if self.engine is not None else None
+
+    def _run(self, fn, timeout, drain):
+        if self.engine is None:
+            return fn()
+        return self.engine.run_exclusive(fn, timeout, drain=drain)
+
+    def _set_default_adapter(self, adapter_path):
+        """Load a LoRA adapter into the adapter cache and make it the default (engine thread)."""
+        stacked_cache = self.engine.adapters
+        stacked_cache.enabled = True
+        if adapter_path:
+            stacked_cache.release(stacked_cache.acquire(adapter_path))
+        self.engine.default_adapter = adapter_path
+
+    def _apply_in_place(self, adapter_path):
+        """Apply an adapter to the model weights (engine thread, nothing in flight)."""
+        stacked_cache = self.engine.adapters if self.engine is not None else None
+        if stacked_cache is not None:
+            self.engine.default_adapter = None
+            if adapter_path:
+                # Stacked layers would wrap the layers the adapter converts
+                stacked_cache.unwrap()
+                stacked_cache.enabled = False
+            else:
+                stacked_cache.enabled = True
+
+        previous = self.adapters.adapter_path
+        try:
+            self.adapters.apply(adapter_path)
+        except Exception:
+            # Leave the model as it was rather than half converted
+            try:
+                self.adapters.apply(previous)
+            except Exception as e:
+                logger.warning(f"Could not restore adapter {previous}: {e}")
+            if stacked_cache is not None and previous is None:
+                stacked_cache.enabled = True
+            raise
+        if self.prompt_cache is not None:
+            self.prompt_cache.clear("adapter swap")
+
+    def unload(self):
+        """Stop the engine and drop all references to the weights."""
+        if self.engine is not None:
+            self.engine.stop()
+        if self.prompt_cache is not None:
+            self.prompt_cache.clear("model unloaded")
+        self.engine = None
+        self.model = None
+        self.tokenizer = None
+
+    def get_info(self) -> Dict[str, Any]:
+        info = {
+            'model_name': self.model_name,
+            'adapter_path': self.adapter_path,
+            'adapter_swaps': self.adapter_swaps,
+            'bytes': self.nbytes,
+            'load_time': round(self.load_time, 2),
+            'loaded_at': self.loaded_at,
+            'last_used': self.last_used
+        }
+        if self.engine is not None:
+            stats = self.engine.get_stats()
+            info['active_sequences'] = stats['active_sequences'] + stats['prefilling'] + stats['pending']
+            if self.engine.adapters is not None:
+                info['adapters'] = self.engine.adapters.list()
+                info['adapter_cache'] = self.engine.adapters.get_stats()
+        return info
+
+
+class ModelPool:
+    """LRU pool of resident models bounded by a memory budget."""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_models: int = 4):
+        """
+        Initialize the pool.
+
+        Args:
+            max_bytes: Memory budget for model weights (default: 60% of system memory)
+            max_models: Maximum number of resident (model, adapter) pairs
+        """
+        self.max_bytes = int(max_bytes) if max_bytes else default_memory_budget()
+        self.max_models = max(1, int(max_models))
+
+        self._lock = threading.RLock()
+        self._models = OrderedDict()
+        self._active_key = None
+
+        self._hits = 0
+        self._swaps = 0
+        self._loads = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(model_name: str, adapter_path: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        return (model_name, adapter_path or None)
+
+    @property
+    def active(self) -> Optional[ResidentModel]:
+        """The model used by requests that do not name one."""
+        with self._lock:
+            return self._models.get(self._active_key)
+
+    def get_base(self, model_name: str) -> Optional[ResidentModel]:
+        """
+        Look up a resident base model, whatever its adapter, and mark it as recently used.
+
+        Args:
+            model_name: Model name as used when it was loaded
+
+        Returns:
+            ResidentModel or None: The resident model, if loaded
+        """
+        with self._lock:
+            resident = self._models.get(model_name)
+            if resident is not None:
+                self._models.move_to_end(model_name)
+                resident.touch()
+            return resident
+
+    def get(self, model_name: str, adapter_path: Optional[str] = None) -> Optional[ResidentModel]:
+        """
+        Look up a resident model with a given adapter and mark it as recently used.
+
+        Args:
+            model_name: Model name as used when it was loaded
+            adapter_path: Adapter the model must currently have applied
+
+        Returns:
+            ResidentModel or None: The resident model, if loaded with that adapter
+        """
+        with self._lock:
+            resident = self.get_base(model_name)
+            if resident is None or resident.adapter_path != (adapter_path or None):
+                return None
+            return resident
+
+    def activate(self, model_name: str, adapter_path: Optional[str] = None) -> Optional[ResidentModel]:
+        """Make a resident model the active one; returns None if it is not loaded with that adapter."""
+        with self._lock:
+            resident = self.get(model_name, adapter_path)
+            if resident is not None:
+                self._active_key = model_name
+                self._hits += 1
+            return resident
+
+    def activate_with_adapter(self, model_name: str, adapter_path: Optional[str] = None) -> Optional[ResidentModel]:
+        """
+        Make a resident base model active, swapping its adapter in place if needed.
+
+        Args:
+            model_name: Model name as used when it was loaded
+            adapter_path: Adapter directory or checkpoint file (None for the base model)
+
+        Returns:
+            ResidentModel or None: The resident model, None if the base model is not loaded
+
+        Raises:
+            AdapterSwapError: If the adapter cannot be swapped in place
+            FileNotFoundError: If the adapter files are missing
+        """
+        resident = self.activate(model_name, adapter_path)
+        if resident is not None:
+            return resident
+        resident = self.get_base(model_name)
+        if resident is None:
+            return None
+        resident.swap_adapter(adapter_path)
+        with self._lock:
+            if self._models.get(model_name) is resident:
+                self._active_key = model_name
+                self._swaps += 1
+        return resident
+
+    def make_room(self, incoming_bytes: int) -> List[Tuple[str, Optional[str]]]:
+        """
+        Unload least recently used models until a new model of the given size fits.
+
+        Args:
+            incoming_bytes: Estimated size of the model about to be loaded
+
+        Returns:
+            List of (model_name, adapter_path) keys that were unloaded
+        """
+        evicted = []
+        with self._lock:
+            while self._models and (
+                len(self._models) >= self.max_models
+                or self.used_bytes() + incoming_bytes > self.max_bytes
+            ):
+                name, resident = self._models.popitem(last=False)
+                if name == self._active_key:
+                    self._active_key = None
+                self._unload(resident)
+                evicted.append(resident.key)
+                self._evictions += 1
+        if evicted:
+            self._free_memory()
+        return evicted
+
+    def add(self, resident: ResidentModel, activate: bool = True):
+        """
+        Add a freshly loaded model to the pool.
+
+        Args:
+            resident: The loaded model
+            activate: Whether to make it the active model
+        """
+        with self._lock:
+            previous = self._models.pop(resident.model_name, None)
+            if previous is not None:
+                self._unload(previous)
+            self._models[resident.model_name] = resident
+            self._loads += 1
+            if activate:
+                self._active_key = resident.model_name
+
+    def remove(self, model_name: str) -> bool:
+        """Unload one resident model; returns False if it was not loaded."""
+        with self._lock:
+            resident = self._models.pop(model_name, None)
+            if resident is None:
+                return False
+            if model_name == self._active_key:
+                self._active_key = None
+            self._unload(resident)
+        self._free_memory()
+        return True
+
+    def clear(self):
+        """Unload every resident model."""
+        with self._lock:
+            residents = list(self._models.values())
+            self._models.clear()
+            self._active_key = None
+            for resident in residents:
+                self._unload(resident)
+        self._free_memory()
+
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(resident.nbytes for resident in self._models.values())
+
+    def residents(self) -> List[ResidentModel]:
+        """Get the resident models, most recently used first."""
+        with self._lock:
+            return list(reversed(self._models.values()))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """List resident models, most recently used first."""
+        with self._lock:
+            residents = list(reversed(self._models.values()))
+            active_key = self._active_key
+        models = []
+        for resident in residents:
+            info = resident.get_info()
+            info['active'] = resident.model_name == active_key
+            models.append(info)
+        return models
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics."""
+        with self._lock:
+            return {
+                'resident': len(self._models),
+                'max_models': self.max_models,
+                'bytes': self.used_bytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'adapter_swaps': self._swaps,
+                'loads': self._loads,
+                'evictions': self._evictions
+            }
+
+    def _unload(self, resident: ResidentModel):
+        logger.info(f"Unloading resident model {resident.model_name} (adapter: {resident.adapter_path})")
+        resident.unload()
+
+    def _free_memory(self):
+        """Release the memory of unloaded models back to the system."""
+        gc.collect()
+        try:
+            import mlx.core as mx
+            if hasattr(mx, 'clear_cache'):
+                mx.clear_cache()
+            else:
+                mx.metal.clear_cache()
+        except Exception:
+            pass
@@ -0,0 +1,439 @@
+"""
+Serving several LoRA adapters over one shared base model.
+
+Every linear layer targeted by a loaded adapter is wrapped in a
+MultiLoRALinear that keeps the LoRA matrices of all cached adapters stacked
+in slots (slot 0 is the bare base model). Before each forward pass the batch
+engine tells the layers which slot every row of the batch uses, so requests
+addressed to different adapters share one batched forward pass: the base
+projection is computed once for the whole batch and each row adds its own
+low-rank update. Adapters of different ranks are zero-padded to the largest
+rank, which leaves their output unchanged.
+
+The AdapterCache loads adapters on demand and keeps them in a
+least-recently-used cache bounded by a number of slots and a memory budget.
+Adapters used by in-flight requests are never evicted. Adapters are cached
+by path and by the size and modification time of their weights file, so a
+checkpoint rewritten in place is loaded again; requests already running on
+the previous weights finish with them, and on_change lets the owner drop
+prompt caches computed with the previous weights. Only LoRA adapters
+of linear layers can be stacked; DoRA and full fine-tunes are applied in
+place instead (see adapters).
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from .adapters import AdapterSwapError, read_adapter_config, resolve_adapter
+
+logger = logging.getLogger(__name__)
+
+
+class AdapterBatch:
+    """Slot assignment of the rows of the current forward pass, shared by all layers."""
+
+    def __init__(self):
+        self.slots = []
+        self.indices = None
+
+    def set(self, slots: List[int]):
+        import mlx.core as mx
+
+        self.slots = list(slots)
+        self.indices = mx.array(self.slots) if len(set(self.slots)) > 1 else None
+
+
+class MultiLoRALinear:
+    """Factory for the multi-adapter wrapper (the class needs mlx at import time)."""
+
+    _cls = None
+
+    @classmethod
+    def get(cls):
+        if cls._cls is None:
+            cls._cls = _make_multi_lora_linear()
+        return cls._cls
+
+
+def _make_multi_lora_linear():
+    import mlx.core as mx
+    import mlx.nn as nn
+
+    class _MultiLoRALinear(nn.Module):
+        """A linear layer plus the stacked LoRA matrices of several adapters."""
+
+        def __init__(self, linear, batch: AdapterBatch, num_slots: int, rank: int, dtype):
+            super().__init__()
+            self.linear = linear
+            if isinstance(linear, nn.QuantizedLinear):
+                output_dims, input_dims = linear.weight.shape
+                input_dims = input_dims * 32 // linear.bits
+            else:
+                output_dims, input_dims = linear.weight.shape
+            self.stacked_a = mx.zeros((num_slots, input_dims, rank), dtype=dtype)
+            self.stacked_b = mx.zeros((num_slots, rank, output_dims), dtype=dtype)
+            self.stacked_scales = mx.zeros((num_slots,), dtype=mx.float32)
+            # Plain attributes, kept out of the parameter tree
+            object.__setattr__(self, '_batch', batch)
+            object.__setattr__(self, '_ranks', [0] * num_slots)
+            self.freeze()
+
+        def resize(self, num_slots: int, rank: int):
+            """Grow the slot and rank dimensions, zero-padding the new entries."""
+            slots, input_dims, current_rank = self.stacked_a.shape
+            output_dims = self.stacked_b.shape[2]
+            if rank > current_rank:
+                pad = rank - current_rank
+                self.stacked_a = mx.concatenate(
+                    [self.stacked_a, mx.zeros((slots, input_dims, pad), dtype=self.stacked_a.dtype)], axis=2)
+                self.stacked_b = mx.concatenate(
+                    [self.stacked_b, mx.zeros((slots, pad, output_dims), dtype=self.stacked_b.dtype)], axis=1)
+                current_rank = rank
+            if num_slots > slots:
+                extra = num_slots - slots
+                self.stacked_a = mx.concatenate(
+                    [self.stacked_a, mx.zeros((extra, input_dims, current_rank), dtype=self.stacked_a.dtype)])
+                self.stacked_b = mx.concatenate(
+                    [self.stacked_b, mx.zeros((extra, current_rank, output_dims), dtype=self.stacked_b.dtype)])
+                self.stacked_scales = mx.concatenate([self.stacked_scales, mx.zeros((extra,), dtype=mx.float32)])
+                self._ranks.extend([0] * extra)
+
+        def set_slot(self, slot: int, lora_a=None, lora_b=None, scale: float = 0.0):
+            """Write (or clear, when lora_a is None) the matrices of one slot."""
+            if lora_a is None:
+                self.stacked_a[slot] = 0
+                self.stacked_b[slot] = 0
+                self.stacked_scales[slot] = 0
+                self._ranks[slot] = 0
+                return
+            rank = lora_a.shape[1]
+            self.resize(self.stacked_a.shape[0], rank)
+            self.stacked_a[slot] = 0
+            self.stacked_b[slot] = 0
+            self.stacked_a[slot, :, :rank] = lora_a.astype(self.stacked_a.dtype)
+            self.stacked_b[slot, :rank, :] = lora_b.astype(self.stacked_b.dtype)
+            self.stacked_scales[slot] = scale
+            self._ranks[slot] = rank
+
+        def __call__(self, x):
+            y = self.linear(x)
+            slots = self._batch.slots
+            if self._batch.indices is None:
+                # Every row uses the same adapter: plain LoRA on the unpadded slice
+                slot = slots[0] if slots else 0
+                rank = self._ranks[slot] if slot < len(self._ranks) else 0
+                if rank == 0:
+                    return y
+                z = (x @ self.stacked_a[slot, :, :rank]) @ self.stacked_b[slot, :rank, :]
+                return y + (self.stacked_scales[slot] * z).astype(x.dtype)
+
+            indices = self._batch.indices
+            z = (x @ self.stacked_a[indices]) @ self.stacked_b[indices]
+            return y + (self.stacked_scales[indices][:, None, None] * z).astype(x.dtype)
+
+    return _MultiLoRALinear
+
+
+class _CachedAdapter:
+    """An adapter held in a slot of the AdapterCache."""
+
+    __slots__ = ('key', 'path', 'slot', 'nbytes', 'rank', 'refs', 'loaded_at', 'last_used', 'uses', 'stale')
+
+    def __init__(self, key, slot, nbytes, rank):
+        self.key = key
+        self.path = key[0]
+        self.slot = slot
+        self.nbytes = nbytes
+        self.rank = rank
+        self.refs = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+        # Newer weights of the same path were loaded into another slot
+        self.stale = False
+
+
+class AdapterCache:
+    """LRU cache of LoRA adapters stacked into the layers of one base model."""
+
+    def __init__(self, model, max_adapters: int = 8, max_bytes: int = 1 << 30,
+                 on_change: Optional[Callable[[str], Any]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            model: The loaded MLX base model
+            max_adapters: Maximum number of adapters held at once
+            max_bytes: Memory budget for the stacked adapter matrices
+            on_change: Called with the path of an adapter whose weights file
+                changed since it was loaded, before it is loaded again
+        """
+        self.model = model
+        self.on_change = on_change
+        self.max_adapters = max(1, int(max_adapters))
+        self.max_bytes = max(0, int(max_bytes))
+        self.batch = AdapterBatch()
+        self.enabled = True
+
+        self._adapters = OrderedDict()
+        self._layers = {}
+        self._num_slots = 1
+        self._rank = 0
+        self._free_slots = []
+
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+
+    # ------------------------------------------------------------------
+    # Engine-thread API
+    # ------------------------------------------------------------------
+
+    def is_loaded(self, path: Optional[str]) -> bool:
+        return not path or self._key(path) in self._adapters
+
+    def can_acquire(self, path: Optional[str]) -> bool:
+        """Whether an adapter can be used now without evicting an adapter in use."""
+        if self.is_loaded(path):
+            return True
+        return len(self._adapters) < self.max_adapters or any(
+            a.refs == 0 for a in self._adapters.values()
+        )
+
+    def acquire(self, path: Optional[str]) -> int:
+        """
+        Return the slot of an adapter, loading it if needed, and mark it in use.
+
+        Args:
+            path: Adapter directory or checkpoint file (None for the base model)
+
+        Returns:
+            int: Slot index (0 for the base model)
+
+        Raises:
+            AdapterSwapError: If the adapter cannot be stacked or no slot is free
+            FileNotFoundError: If the adapter files are missing
+        """
+        if not path:
+            return 0
+        if not self.enabled:
+            raise AdapterSwapError("Per-request adapters are unavailable while an adapter is applied in place")
+        key = self._key(path)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            # Earlier weights of a rewritten adapter: dropped now, or once idle
+            previous = [a for a in self._adapters.values() if a.path == path]
+            for old in previous:
+                if old.refs:
+                    old.stale = True
+                else:
+                    self._drop(old)
+            if previous:
+                logger.info(f"Adapter {path} changed since it was loaded, loading it again")
+                if self.on_change is not None:
+                    self.on_change(path)
+            adapter = self._load(path, key)
+        else:
+            self._hits += 1
+            self._adapters.move_to_end(key)
+        adapter.refs += 1
+        adapter.uses += 1
+        adapter.last_used = time.time()
+        return adapter.slot
+
+    def release(self, slot: int):
+        """Mark one use of the adapter in a slot as finished."""
+        if not slot:
+            return
+        for adapter in self._adapters.values():
+            if adapter.slot == slot:
+                adapter.refs = max(0, adapter.refs - 1)
+                if not adapter.refs and adapter.stale:
+                    self._drop(adapter)
+                return
+
+    def is_current(self, slot: int) -> bool:
+        """Whether a slot holds the latest loaded weights of its adapter (the base model always does)."""
+        if not slot:
+            return True
+        return any(a.slot == slot and not a.stale for a in self._adapters.values())
+
+    def set_batch(self, slots: List[int]):
+        """Assign the rows of the next forward pass to adapter slots."""
+        self.batch.set(slots)
+
+    def evict(self, path: str) -> bool:
+        """Drop an idle adapter from the cache; returns False if absent or in use."""
+        adapters = [a for a in self._adapters.values() if a.path == path]
+        if not adapters or any(a.refs for a in adapters):
+            return False
+        for adapter in adapters:
+            self._drop(adapter)
+        return True
+
+    # ------------------------------------------------------------------
+    # Introspection (any thread)
+    # ------------------------------------------------------------------
+
+    def used_bytes(self) -> int:
+        return sum(a.nbytes for a in list(self._adapters.values()))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """List cached adapters, most recently used first."""
+        return [
+            {
+                'adapter_path': a.path,
+                'slot': a.slot,
+                'rank': a.rank,
+                'bytes': a.nbytes,
+                'in_use': a.refs,
+                'uses': a.uses,
+                'loaded_at': a.loaded_at,
+                'last_used': a.last_used
+            }
+            for a in reversed(list(self._adapters.values()))
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'adapters': len(self._adapters),
+            'max_adapters': self.max_adapters,
+            'bytes': self.used_bytes(),
+            'max_bytes': self.max_bytes,
+            'hits': self._hits,
+            'loads': self._loads,
+            'evictions': self._evictions,
+            'wrapped_layers': len(self._layers)
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _key(path: str):
+        """Cache key of an adapter: its path and the size and modification time of its weights."""
+        _, weights_file = resolve_adapter(path)
+        try:
+            st = os.stat(weights_file)
+        except OSError:
+            return (path, None, None)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _load(self, path: str, key) -> _CachedAdapter:
+        import mlx.core as mx
+        import mlx.nn as nn
+
+        adapter_dir, weights_file = resolve_adapter(path)
+        config = read_adapter_config(adapter_dir)
+        fine_tune_type = config.get('fine_tune_type', 'lora')
+        if fine_tune_type != 'lora':
+            raise AdapterSwapError(f"{path} is a {fine_tune_type} adapter; only LoRA adapters can share a batch")
+        if not os.path.exists(weights_file):
+            raise FileNotFoundError(f"Adapter weights not found: {weights_file}")
+
+        weights = mx.load(weights_file)
+        modules = dict(self.model.named_modules())
+        layers = {}
+        for name, value in weights.items():
+            module_name, leaf = name.rsplit('.', 1)
+            if leaf not in ('lora_a', 'lora_b'):
+                raise AdapterSwapError(f"{path} has unsupported tensor {name}")
+            module = self._layers.get(module_name) or modules.get(module_name)
+            if module is None or not (
+                module_name in self._layers or isinstance(module, (nn.Linear, nn.QuantizedLinear))
+            ):
+                raise AdapterSwapError(f"{path} targets {module_name}, which is not a linear layer")
+            layers.setdefault(module_name, {})[leaf] = value
+        rank = max((v['lora_a'].shape[1] for v in layers.values() if 'lora_a' in v), default=0)
+        nbytes = sum(v.nbytes for v in weights.values())
+
+        self._make_room(nbytes)
+        if self._free_slots:
+            slot = self._free_slots.pop(0)
+        else:
+            slot = self._num_slots
+            self._num_slots += 1
+        self._rank = max(self._rank, rank)
+
+        scale = config['lora_parameters']['scale']
+        self._wrap(layers.keys(), weights)
+        for module_name, layer in self._layers.items():
+            layer.resize(self._num_slots, self._rank)
+            tensors = layers.get(module_name)
+            if tensors and 'lora_a' in tensors and 'lora_b' in tensors:
+                layer.set_slot(slot, tensors['lora_a'], tensors['lora_b'], scale)
+            else:
+                layer.set_slot(slot)
+        # Materialize here so the arrays are not bound to a lazy graph
+        mx.eval([(l.stacked_a, l.stacked_b, l.stacked_scales) for l in self._layers.values()])
+
+        adapter = _CachedAdapter(key, slot, nbytes, rank)
+        self._adapters[key] = adapter
+        self._loads += 1
+        logger.info(f"Loaded adapter {path} into slot {slot} (rank {rank}, {nbytes} bytes)")
+        return adapter
+
+    def _wrap(self, module_names, weights):
+        """Replace plain linear layers with MultiLoRALinear wrappers."""
+        from mlx.utils import tree_unflatten
+
+        cls = MultiLoRALinear.get()
+        modules = dict(self.model.named_modules())
+        wrapped = []
+        for module_name in module_names:
+            if module_name in self._layers:
+                continue
+            dtype = weights[module_name + '.lora_a'].dtype
+            layer = cls(modules[module_name], self.batch, self._num_slots, self._rank, dtype)
+            self._layers[module_name] = layer
+            wrapped.append((module_name, layer))
+        if wrapped:
+            self.model.update_modules(tree_unflatten(wrapped))
+
+    def unwrap(self):
+        """Drop every cached adapter and restore the plain linear layers."""
+        from mlx.utils import tree_unflatten
+
+        if self._layers:
+            self.model.update_modules(tree_unflatten(
+                [(name, layer.linear) for name, layer in self._layers.items()]
+            ))
+        self._adapters.clear()
+        self._layers = {}
+        self._num_slots = 1
+        self._rank = 0
+        self._free_slots = []
+        self.batch.set([])
+
+    def _make_room(self, incoming_bytes: int):
+        """
+        Evict idle adapters until a new one fits.
+
+        When the adapters in use alone exceed the memory budget, the new one is
+        still loaded (refusing it would fail the request) and a warning is logged.
+        """
+        while self._adapters and (
+            len(self._adapters) >= self.max_adapters
+            or self.used_bytes() + incoming_bytes > self.max_bytes
+        ):
+            idle = next((a for a in self._adapters.values() if a.refs == 0), None)
+            if idle is None:
+                if len(self._adapters) >= self.max_adapters:
+                    raise AdapterSwapError("All adapter slots are in use")
+                break
+            self._drop(idle)
+            self._evictions += 1
+        if self.used_bytes() + incoming_bytes > self.max_bytes:
+            logger.warning(f"Adapter cache exceeds its budget of {self.max_bytes} bytes: "
+                           f"{self.used_bytes()} bytes in use plus {incoming_bytes} bytes for the new adapter")
+
+    def _drop(self, adapter: _CachedAdapter):
+        del self._adapters[adapter.key]
+        for layer in self._layers.values():
+            layer.set_slot(adapter.slot)
+        self._free_slots.append(adapter.slot)
+        logger.info(f"Evicted adapter {adapter.path} from slot {adapter.slot}")
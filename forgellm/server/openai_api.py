@@ -0,0 +1,265 @@
+"""
+OpenAI-compatible request and response formats for the model server.
+
+The model server answers ``POST /v1/chat/completions``, ``POST /v1/completions``
+and ``GET /v1/models`` in the OpenAI wire format, so tools written against
+the OpenAI API can talk to a model loaded in ForgeLLM. Streaming responses
+are Server-Sent Events (``data: {...}`` records ending with ``data: [DONE]``).
+Generated tokens are coalesced into one event every few tokens or
+milliseconds, and a slow client only ever receives larger events: the batch
+engine never waits for a client.
+
+This module only translates between the wire format and generation
+parameters; the HTTP handling lives in forgellm.server.main.
+"""
+
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import stopping
+
+# Default token coalescing for streamed events
+DEFAULT_FLUSH_TOKENS = 4
+DEFAULT_FLUSH_MS = 25
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+FINISH_REASONS = {'stop': 'stop', 'length': 'length'}
+
+
+class OpenAIError(Exception):
+    """An error reported to the client in the OpenAI error format."""
+
+    def __init__(self, message: str, status_code: int = 400, error_type: str = "invalid_request_error",
+                 param: Optional[str] = None, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.error_type = error_type
+        self.param = param
+        self.code = code
+
+    def to_dict(self) -> Dict[str, Any]:
+        return error_body(str(self), self.error_type, self.param, self.code)
+
+
+def error_body(message: str, error_type: str = "invalid_request_error",
+               param: Optional[str] = None, code: Optional[str] = None) -> Dict[str, Any]:
+    """Build an OpenAI error object."""
+    return {'error': {'message': message, 'type': error_type, 'param': param, 'code': code}}
+
+
+def sse(payload: Dict[str, Any]) -> bytes:
+    """Encode one Server-Sent Event."""
+    return b"data: " + json.dumps(payload).encode() + b"\n\n"
+
+
+def message_text(content: Any) -> str:
+    """Get the text of a message content (a string or a list of content parts)."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part.get('text', '') for part in content
+            if isinstance(part, dict) and part.get('type', 'text') == 'text'
+        )
+    raise OpenAIError("Message content must be a string or a list of content parts", param="messages")
+
+
+def parse_messages(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Validate the messages of a chat completion request.
+
+    Args:
+        data: The request body
+
+    Returns:
+        List of messages with plain text content
+
+    Raises:
+        OpenAIError: If the messages are missing or malformed
+    """
+    messages = data.get('messages')
+    if not isinstance(messages, list) or not messages:
+        raise OpenAIError("'messages' must be a non-empty list", param="messages")
+    parsed = []
+    for message in messages:
+        if not isinstance(message, dict) or 'role' not in message:
+            raise OpenAIError("Each message needs a 'role'", param="messages")
+        role = 'system' if message['role'] == 'developer' else message['role']
+        parsed.append({'role': role, 'content': message_text(message.get('content'))})
+    return parsed
+
+
+def parse_prompt(data: Dict[str, Any]) -> Any:
+    """
+    Get the prompt of a completion request: a string or a list of token ids.
+
+    Raises:
+        OpenAIError: If the prompt is missing or is a batch of prompts
+    """
+    prompt = data.get('prompt')
+    if isinstance(prompt, list) and len(prompt) == 1 and isinstance(prompt[0], (str, list)):
+        prompt = prompt[0]
+    if isinstance(prompt, str) and prompt:
+        return prompt
+    if isinstance(prompt, list) and prompt and all(isinstance(t, int) for t in prompt):
+        return prompt
+    raise OpenAIError("'prompt' must be a non-empty string or list of token ids (one prompt per request)",
+                      param="prompt")
+
+
+def number_option(data: Dict[str, Any], name: str, default: float) -> float:
+    """
+    Read a numeric sampling parameter.
+
+    Raises:
+        OpenAIError: If the parameter is set but is not a number
+    """
+    value = data.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise OpenAIError(f"'{name}' must be a number", param=name)
+
+
+def generation_options(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Translate OpenAI sampling parameters into BatchEngine request options.
+
+    Args:
+        data: The request body
+
+    Returns:
+        Dictionary with max_tokens, sampler, logits_processors, seed and stop
+
+    Raises:
+        OpenAIError: If a parameter is not supported or is not a number
+    """
+    from mlx_lm.sample_utils import make_sampler, make_repetition_penalty
+
+    if data.get('n', 1) != 1:
+        raise OpenAIError("Only n=1 is supported", param="n")
+
+    max_tokens = data.get('max_completion_tokens', data.get('max_tokens'))
+    max_tokens = 512 if max_tokens is None else max_tokens
+    if not isinstance(max_tokens, int) or max_tokens < 0:
+        raise OpenAIError("'max_tokens' must be a non-negative integer", param="max_tokens")
+
+    temperature = number_option(data, 'temperature', 1.0)
+    top_p = number_option(data, 'top_p', 1.0)
+
+    try:
+        stop = stopping.parse_stop(data.get('stop'))
+    except ValueError as e:
+        raise OpenAIError(str(e), param="stop")
+
+    logits_processors = []
+    # Not an OpenAI parameter, but supported by the native API as well
+    repetition_penalty = number_option(data, 'repetition_penalty', 1.0)
+    if repetition_penalty and repetition_penalty != 1.0:
+        logits_processors.append(make_repetition_penalty(penalty=repetition_penalty))
+
+    return {
+        'max_tokens': max_tokens,
+        'sampler': make_sampler(temp=temperature, top_p=top_p) if temperature > 0 else None,
+        'logits_processors': logits_processors,
+        'seed': data.get('seed'),
+        'stop': stop
+    }
+
+
+def completion_id(chat: bool) -> str:
+    return f"{'chatcmpl' if chat else 'cmpl'}-{uuid.uuid4().hex}"
+
+
+def usage(prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> Dict[str, Any]:
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens,
+        'prompt_tokens_details': {'cached_tokens': cached_tokens}
+    }
+
+
+def finish_reason(reason: Optional[str]) -> Optional[str]:
+    return FINISH_REASONS.get(reason, reason)
+
+
+def completion_response(response_id: str, model: str, chat: bool, text: str, reason: Optional[str],
+                        usage_info: Dict[str, Any], created: Optional[int] = None) -> Dict[str, Any]:
+    """Build a complete (non-streaming) chat completion or text completion object."""
+    if chat:
+        choice = {'index': 0, 'message': {'role': 'assistant', 'content': text},
+                  'logprobs': None, 'finish_reason': finish_reason(reason)}
+    else:
+        choice = {'index': 0, 'text': text, 'logprobs': None, 'finish_reason': finish_reason(reason)}
+    return {
+        'id': response_id,
+        'object': 'chat.completion' if chat else 'text_completion',
+        'created': created or int(time.time()),
+        'model': model,
+        'choices': [choice],
+        'usage': usage_info
+    }
+
+
+def completion_chunk(response_id: str, model: str, chat: bool, created: int, text: Optional[str] = None,
+                     reason: Optional[str] = None, role: bool = False) -> Dict[str, Any]:
+    """Build one streamed chunk of a chat completion or text completion."""
+    if chat:
+        delta = {}
+        if role:
+            delta['role'] = 'assistant'
+        if text is not None:
+            delta['content'] = text
+        choice = {'index': 0, 'delta': delta, 'logprobs': None, 'finish_reason': finish_reason(reason)}
+    else:
+        choice = {'index': 0, 'text': text or "", 'logprobs': None, 'finish_reason': finish_reason(reason)}
+    return {
+        'id': response_id,
+        'object': 'chat.completion.chunk' if chat else 'text_completion',
+        'created': created,
+        'model': model,
+        'choices': [choice]
+    }
+
+
+def usage_chunk(response_id: str, model: str, chat: bool, created: int,
+                usage_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the final chunk that carries token usage (stream_options.include_usage)."""
+    return {
+        'id': response_id,
+        'object': 'chat.completion.chunk' if chat else 'text_completion',
+        'created': created,
+        'model': model,
+        'choices': [],
+        'usage': usage_info
+    }
+
+
+def model_list(resident_models: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """List the resident models as OpenAI model objects."""
+    return {
+        'object': 'list',
+        'data': [
+            {'id': m['model_name'], 'object': 'model', 'created': int(m.get('loaded_at', 0)), 'owned_by': 'forgellm'}
+            for m in resident_models
+        ]
+    }
+
+
+def stream_settings(data: Dict[str, Any], flush_tokens: int, flush_ms: float) -> Tuple[bool, int, float]:
+    """
+    Get the streaming options of a request.
+
+    Returns:
+        Tuple of (include_usage, flush_tokens, flush_seconds)
+    """
+    options = data.get('stream_options') or {}
+    return bool(options.get('include_usage')), max(1, int(flush_tokens)), max(0.0, flush_ms) / 1000.0
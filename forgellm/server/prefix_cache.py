@@ -0,0 +1,184 @@
+"""
+Persistent prompt caches for registered prefixes.
+
+Long system prompts and few-shot preambles that many requests share can be
+registered with the model server. Their KV cache is computed once, saved to
+``<cache_dir>/<model-key>/<prefix-id>.safetensors`` and loaded again whenever
+the same model and adapter are loaded, so a restart does not pay the prefill
+cost a second time. The model key is derived from the model path and adapter
+path, and the prefix id from the prefix token ids.
+
+Loaded prefixes are pinned in the server's PromptCacheStore, where they are
+matched against new prompts like any other cached conversation.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = '.safetensors'
+
+
+def model_cache_key(model_name: str, adapter_path: Optional[str] = None) -> str:
+    """Return the directory name used for a (model, adapter) pair."""
+    identity = json.dumps([os.path.abspath(model_name) if os.path.exists(model_name) else model_name,
+                           os.path.abspath(adapter_path) if adapter_path else None])
+    return hashlib.sha1(identity.encode()).hexdigest()[:16]
+
+
+def prefix_id(tokens: List[int]) -> str:
+    """Return the identifier of a prefix from its token ids."""
+    return hashlib.sha1(json.dumps(list(tokens)).encode()).hexdigest()[:16]
+
+
+class PrefixCacheRegistry:
+    """On-disk registry of precomputed prefix caches for the loaded model."""
+
+    def __init__(self, cache_dir: str):
+        """
+        Initialize the registry.
+
+        Args:
+            cache_dir: Directory where prefix caches are stored
+        """
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._model_name = None
+        self._adapter_path = None
+        self._entries = {}
+
+    @property
+    def model_dir(self) -> Optional[str]:
+        """Directory of the currently active (model, adapter) pair."""
+        if self._model_name is None:
+            return None
+        return os.path.join(self.cache_dir, model_cache_key(self._model_name, self._adapter_path))
+
+    def activate(self, model_name: str, adapter_path: Optional[str] = None) -> List[Tuple[Dict[str, Any], List[int], List[Any]]]:
+        """
+        Switch to a newly loaded model and load its saved prefixes.
+
+        Args:
+            model_name: Path or name of the loaded model
+            adapter_path: Path of the loaded adapter, if any
+
+        Returns:
+            List of (info, tokens, cache) tuples for every saved prefix
+        """
+        import mlx.core as mx
+        from mlx_lm.models.cache import load_prompt_cache
+
+        with self._lock:
+            self._model_name = model_name
+            self._adapter_path = adapter_path
+            self._entries = {}
+            model_dir = self.model_dir
+
+        loaded = []
+        if not os.path.isdir(model_dir):
+            return loaded
+
+        for file_name in sorted(os.listdir(model_dir)):
+            if not file_name.endswith(CACHE_FILE_SUFFIX) or '.tmp' in file_name:
+                continue
+            path = os.path.join(model_dir, file_name)
+            try:
+                cache, metadata = load_prompt_cache(path, return_metadata=True)
+                # Materialize now: lazily loaded arrays are bound to this
+                # thread's stream and cannot be evaluated by the engine thread
+                mx.eval([c.state for c in cache])
+                tokens = json.loads(metadata['tokens'])
+                info = self._info_from_metadata(metadata, path)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable prefix cache {path}: {e}")
+                continue
+            loaded.append((info, tokens, cache))
+            with self._lock:
+                self._entries[info['id']] = info
+
+        if loaded:
+            logger.info(f"Loaded {len(loaded)} registered prefix caches from {model_dir}")
+        return loaded
+
+    def save(self, tokens: List[int], cache: List[Any], text: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Save the KV cache of a prefix for the active model.
+
+        Args:
+            tokens: Token ids of the prefix
+            cache: Per-layer KV cache covering exactly those tokens
+            text: Optional formatted prefix text, kept for listing
+
+        Returns:
+            dict: Information about the saved prefix
+        """
+        from mlx_lm.models.cache import save_prompt_cache
+
+        model_dir = self.model_dir
+        if model_dir is None:
+            raise RuntimeError("No model loaded")
+        os.makedirs(model_dir, exist_ok=True)
+
+        pid = prefix_id(tokens)
+        path = os.path.join(model_dir, pid + CACHE_FILE_SUFFIX)
+        metadata = {
+            'id': pid,
+            'model_name': self._model_name,
+            'adapter_path': self._adapter_path or '',
+            'tokens': json.dumps(list(tokens)),
+            'text': text or '',
+            'created': str(time.time())
+        }
+        # Write to a temporary file first so a crash never leaves a truncated cache
+        tmp_path = path + '.tmp' + CACHE_FILE_SUFFIX
+        save_prompt_cache(tmp_path, cache, metadata)
+        os.replace(tmp_path, path)
+
+        info = self._info_from_metadata(metadata, path)
+        with self._lock:
+            self._entries[pid] = info
+        logger.info(f"Registered prefix {pid} ({info['num_tokens']} tokens, {info['bytes']} bytes)")
+        return info
+
+    def evict(self, pid: str) -> Optional[Dict[str, Any]]:
+        """
+        Delete a registered prefix of the active model.
+
+        Args:
+            pid: Prefix identifier
+
+        Returns:
+            dict or None: Information about the evicted prefix, None if unknown
+        """
+        with self._lock:
+            info = self._entries.pop(pid, None)
+        if info is None:
+            return None
+        try:
+            os.remove(info['path'])
+        except FileNotFoundError:
+            pass
+        logger.info(f"Evicted registered prefix {pid}")
+        return info
+
+    def list(self) -> List[Dict[str, Any]]:
+        """List the registered prefixes of the active model, newest first."""
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda info: info['created'], reverse=True)
+
+    def _info_from_metadata(self, metadata: Dict[str, str], path: str) -> Dict[str, Any]:
+        text = metadata.get('text', '')
+        return {
+            'id': metadata['id'],
+            'num_tokens': len(json.loads(metadata['tokens'])),
+            'preview': text[:200],
+            'bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+            'created': float(metadata.get('created', 0)),
+            'path': path
+        }
@@ -0,0 +1,287 @@
+"""
+Prompt KV-cache reuse across chat turns.
+
+The web UI resends the whole conversation on every turn. The
+PromptCacheStore keeps the KV cache of each finished request together with
+the tokens it covers, so the next turn only has to prefill the part of the
+prompt that is new. Entries are keyed by the client's session id when one
+is given, otherwise by a hash of their tokens, and are matched against a new
+prompt by longest common token prefix. When a conversation is edited the
+matching entry is trimmed back to the point where the prompts diverge.
+
+The store is bounded by a memory budget with least-recently-used eviction
+and must be cleared whenever the base model changes. KV states computed
+with different adapters live in separate namespaces and never match each
+other. Registered prefixes (see prefix_cache) are pinned: they take part in
+matching but are neither evicted nor counted against the budget.
+"""
+
+import copy
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _private_copy(layer, length: int, stored_length: int):
+    """
+    Copy one layer of a stored cache for a request, covering its first length tokens.
+
+    Caches are written in place while a request is prefilled and decoded
+    (KVCache assigns into its preallocated key/value buffers), so a request
+    must never hold the stored arrays themselves. A plain KVCache only needs
+    the shared prefix: the new cache holds slices of exactly that length, and
+    its first update allocates new buffers instead of writing into the stored
+    ones. Other cache types (rotating, quantized, recurrent) are deep-copied
+    and trimmed.
+    """
+    from mlx_lm.models.cache import KVCache
+
+    if type(layer) is KVCache and layer.keys is not None:
+        copy_ = KVCache()
+        copy_.keys = layer.keys[..., :length, :]
+        copy_.values = layer.values[..., :length, :]
+        copy_.offset = length
+        return copy_
+    copy_ = copy.deepcopy(layer)
+    if length < stored_length:
+        copy_.trim(stored_length - length)
+    return copy_
+
+
+def _common_prefix_length(a, b) -> int:
+    """Return the number of leading tokens shared by two token sequences."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class _Entry:
+    """A cached prompt: the tokens covered by the KV cache and the cache itself."""
+
+    __slots__ = ('tokens', 'cache', 'nbytes', 'pinned')
+
+    def __init__(self, tokens, cache, nbytes, pinned=False):
+        self.tokens = tokens
+        self.cache = cache
+        self.nbytes = nbytes
+        self.pinned = pinned
+
+
+class PromptCacheStore:
+    """LRU store of per-conversation prompt caches bounded by a memory budget."""
+
+    def __init__(self, max_bytes: int = 1 << 30, max_entries: int = 64):
+        """
+        Initialize the store.
+
+        Args:
+            max_bytes: Memory budget for all cached KV states (0 disables the store)
+            max_entries: Maximum number of cached conversations
+        """
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries = max(1, int(max_entries))
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._pinned_bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._reused_tokens = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def fetch(self, tokens: List[int], session_id: Optional[str] = None,
+              namespace: Optional[str] = None) -> Tuple[Optional[List[Any]], int]:
+        """
+        Find a cached KV state for the longest prefix of a prompt.
+
+        The returned cache is a private copy trimmed to the shared prefix, so
+        the caller only has to prefill ``tokens[cached:]``. At least one
+        prompt token is always left uncached so its logits can be computed.
+
+        Args:
+            tokens: Token ids of the new prompt
+            session_id: Optional conversation id supplied by the client
+            namespace: Adapter the prompt will be processed with (None for the base model)
+
+        Returns:
+            Tuple of (cache, cached): the per-layer cache or None, and the
+            number of prompt tokens it covers
+        """
+        if (not self.enabled and not self._pinned_bytes) or len(tokens) < 2:
+            return None, 0
+
+        from mlx_lm.models.cache import can_trim_prompt_cache
+
+        with self._lock:
+            key, entry, common = self._find(tokens, session_id, namespace)
+            if entry is None:
+                self._misses += 1
+                return None, 0
+
+            usable = min(common, len(tokens) - 1)
+            if usable < len(entry.tokens) and not can_trim_prompt_cache(entry.cache):
+                # Rotating caches cannot be rolled back to the shared prefix
+                self._misses += 1
+                return None, 0
+
+            self._entries.move_to_end(key)
+            cache = [_private_copy(layer, usable, len(entry.tokens)) for layer in entry.cache]
+            self._hits += 1
+            self._reused_tokens += usable
+
+        return cache, usable
+
+    def _find(self, tokens, session_id, namespace):
+        """Return (key, entry, common prefix) of the best match; lock must be held."""
+        session_key = (namespace, session_id)
+        if session_id is not None and session_key in self._entries:
+            entry = self._entries[session_key]
+            common = _common_prefix_length(entry.tokens, tokens)
+            if common < min(len(entry.tokens), len(tokens)):
+                # The conversation was edited: everything after the
+                # divergence point is stale
+                self._invalidations += 1
+            if common > 0:
+                return session_key, entry, common
+
+        best_key, best_entry, best_common = None, None, 0
+        for key, entry in self._entries.items():
+            if key[0] != namespace:
+                continue
+            common = _common_prefix_length(entry.tokens, tokens)
+            if common > best_common:
+                best_key, best_entry, best_common = key, entry, common
+        return best_key, best_entry, best_common
+
+    def insert(self, tokens: List[int], cache: List[Any], session_id: Optional[str] = None,
+               namespace: Optional[str] = None):
+        """
+        Store the KV state of a finished request.
+
+        Args:
+            tokens: Token ids covered by the cache (prompt plus generated tokens)
+            cache: The per-layer cache; the store takes ownership of it
+            session_id: Optional conversation id supplied by the client
+            namespace: Adapter the cache was computed with (None for the base model)
+        """
+        if not self.enabled or not tokens:
+            return
+
+        tokens = tuple(tokens)
+        nbytes = sum(c.nbytes for c in cache)
+        if nbytes > self.max_bytes:
+            logger.debug(f"Prompt cache entry of {nbytes} bytes exceeds the budget, not caching")
+            return
+
+        key = (namespace, session_id if session_id is not None else 'prefix:' + hashlib.sha1(
+            repr(tokens).encode()
+        ).hexdigest())
+
+        with self._lock:
+            self._remove(key)
+            if session_id is None:
+                # Anonymous entries that this one extends are now redundant
+                for other in [k for k, e in self._entries.items()
+                              if k[0] == namespace and k[1].startswith('prefix:')
+                              and tokens[:len(e.tokens)] == e.tokens]:
+                    self._remove(other)
+
+            self._entries[key] = _Entry(tokens, cache, nbytes)
+            self._nbytes += nbytes
+
+            unpinned = [k for k, e in self._entries.items() if not e.pinned]
+            while unpinned and (self._nbytes > self.max_bytes or len(unpinned) > self.max_entries):
+                self._remove(unpinned.pop(0))
+                self._evictions += 1
+
+    def pin(self, key: str, tokens: List[int], cache: List[Any], namespace: Optional[str] = None):
+        """
+        Add a registered prefix that is never evicted.
+
+        Args:
+            key: Identifier of the prefix (used by unpin)
+            tokens: Token ids covered by the cache
+            cache: The per-layer cache of the prefix
+            namespace: Adapter the cache was computed with (None for the base model)
+        """
+        key = (namespace, key)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = _Entry(tuple(tokens), cache, sum(c.nbytes for c in cache), pinned=True)
+            self._pinned_bytes += self._entries[key].nbytes
+
+    def unpin(self, key: str, namespace: Optional[str] = None) -> bool:
+        """Remove a registered prefix; returns False if it was not present."""
+        with self._lock:
+            return self._remove((namespace, key))
+
+    def unpin_namespace(self, namespace: Optional[str]) -> int:
+        """Remove every registered prefix of one adapter; returns how many were removed."""
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.pinned and k[0] == namespace]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear_namespace(self, namespace: Optional[str], reason: str = "") -> int:
+        """Drop every entry of one adapter, pinned or not, e.g. after its weights changed; returns how many."""
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == namespace]
+            for key in keys:
+                self._remove(key)
+        if keys:
+            logger.info(f"Cleared {len(keys)} prompt cache entries of {namespace}{f' ({reason})' if reason else ''}")
+        return len(keys)
+
+    def _remove(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        if entry.pinned:
+            self._pinned_bytes -= entry.nbytes
+        else:
+            self._nbytes -= entry.nbytes
+        return True
+
+    def clear(self, reason: str = ""):
+        """Drop every cached entry, e.g. after the model or adapter changed."""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._nbytes = 0
+            self._pinned_bytes = 0
+        if count:
+            logger.info(f"Cleared {count} prompt cache entries{f' ({reason})' if reason else ''}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prompt cache statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            pinned = sum(1 for e in self._entries.values() if e.pinned)
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries) - pinned,
+                'bytes': self._nbytes,
+                'pinned_entries': pinned,
+                'pinned_bytes': self._pinned_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else None,
+                'reused_tokens': self._reused_tokens,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations,
+            }
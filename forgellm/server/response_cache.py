@@ -0,0 +1,380 @@
+"""
+Response cache for deterministic generation requests.
+
+Regression and evaluation sweeps send the same prompt with the same seed (or
+greedy sampling) to a checkpoint over and over. When the cache is enabled
+(``--response-cache-size``), the model server keeps the generated text of
+such requests and answers a repeated request without generating again, and
+without waiting for a slot in the admission queue.
+
+Entries are keyed by the model and adapter, the token ids of the formatted
+prompt and every parameter that affects sampling. Only requests whose output
+is reproducible are cached: greedy sampling (temperature 0) or an explicit
+seed. The model and adapter are identified by the size and modification time
+of their weight files, so a model or adapter that is retrained and loaded
+again never matches the entries of its previous weights. Loading or
+unloading a model also drops its entries from memory.
+
+The in-memory tier is bounded by a byte budget and a number of entries with
+least-recently-used eviction. Entries can also be written to an on-disk tier
+(``--response-cache-dir``) that survives restarts and is bounded by its own
+byte budget. Entries of both tiers expire after a time-to-live.
+
+Clients opt out per request with ``Cache-Control: no-cache`` (generate again
+and replace the cached entry) or ``Cache-Control: no-store`` (neither read
+nor write the cache).
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from forgellm.server.adapters import ADAPTER_CONFIG_FILE, resolve_adapter
+from forgellm.server.model_loader import weight_files
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = '.json'
+
+
+def is_deterministic(temperature: Optional[float], seed: Optional[int]) -> bool:
+    """Whether a request with these sampling parameters always generates the same text."""
+    return seed is not None or (temperature is not None and temperature <= 0)
+
+
+def cache_directives(cache_control: Optional[str]) -> Tuple[bool, bool]:
+    """
+    Read the Cache-Control header of a request.
+
+    Returns:
+        Tuple of (lookup, store): whether the cache may answer the request,
+        and whether the response may be cached
+    """
+    directives = {d.strip().lower() for d in (cache_control or '').split(',')}
+    if 'no-store' in directives:
+        return False, False
+    if 'no-cache' in directives:
+        return False, True
+    return True, True
+
+
+def files_fingerprint(paths: List[str]) -> str:
+    """Identify the contents of files by their size and modification time."""
+    stats = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stats.append([os.path.abspath(path), st.st_size, st.st_mtime_ns])
+        except OSError:
+            stats.append([os.path.abspath(path), None, None])
+    return hashlib.sha1(json.dumps(stats).encode()).hexdigest()[:16]
+
+
+class _Entry:
+    """A cached response and its bookkeeping."""
+
+    __slots__ = ('record', 'nbytes', 'model_name', 'expires')
+
+    def __init__(self, record, nbytes, model_name, expires):
+        self.record = record
+        self.nbytes = nbytes
+        self.model_name = model_name
+        self.expires = expires
+
+
+class ResponseCache:
+    """Size- and TTL-bounded cache of generated responses with an optional disk tier."""
+
+    def __init__(self, max_bytes: int = 0, max_entries: int = 4096, ttl: float = 3600.0,
+                 cache_dir: Optional[str] = None, max_disk_bytes: int = 1 << 30):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Memory budget for cached responses (0 disables the cache)
+            max_entries: Maximum number of responses kept in memory
+            ttl: Seconds after which an entry expires (0 keeps entries until evicted)
+            cache_dir: Directory of the on-disk tier (None keeps entries in memory only)
+            max_disk_bytes: Budget of the on-disk tier
+        """
+        self.max_bytes = max(0, int(max_bytes))
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = max(0.0, float(ttl))
+        self.cache_dir = cache_dir if self.max_bytes else None
+        self.max_disk_bytes = max(0, int(max_disk_bytes))
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._model_fingerprints = {}
+
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._expired = 0
+        self._invalidations = 0
+        self._bypassed = 0
+
+        self._disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_files())
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def key(self, model_name: str, model_path: Optional[str], adapter_path: Optional[str],
+            prompt_tokens: List[int], params: Dict[str, Any]) -> str:
+        """
+        Build the cache key of a request.
+
+        Args:
+            model_name: Model name as requested by the client
+            model_path: Resolved local path of the model
+            adapter_path: Adapter the request is generated with (None for the base model)
+            prompt_tokens: Token ids of the formatted prompt
+            params: Every request parameter that affects the generated text
+
+        Returns:
+            Hex digest identifying the request
+        """
+        model_path = model_path or model_name
+        with self._lock:
+            model_fingerprint = self._model_fingerprints.get(model_path)
+        if model_fingerprint is None:
+            model_fingerprint = files_fingerprint(
+                weight_files(model_path) + [os.path.join(model_path, 'config.json')])
+            with self._lock:
+                self._model_fingerprints[model_path] = model_fingerprint
+
+        adapter_fingerprint = None
+        if adapter_path:
+            adapter_dir, weights_file = resolve_adapter(adapter_path)
+            adapter_fingerprint = files_fingerprint(
+                [weights_file, os.path.join(adapter_dir, ADAPTER_CONFIG_FILE)])
+
+        identity = json.dumps([
+            os.path.abspath(model_path) if os.path.exists(model_path) else model_path,
+            model_fingerprint,
+            os.path.abspath(adapter_path) if adapter_path else None,
+            adapter_fingerprint,
+            list(prompt_tokens),
+            params
+        ], sort_keys=True)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def get(self, key: str, model_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response, in memory first and then on disk.
+
+        Args:
+            key: Key returned by key()
+            model_name: Model the request is addressed to (used when promoting a disk entry)
+
+        Returns:
+            The cached response record, or None
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires is not None and entry.expires <= now:
+                    self._remove(key)
+                    self._expired += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return dict(entry.record)
+
+        record = self._read_disk(key, now)
+        with self._lock:
+            if record is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._insert(key, record, model_name, record.get('created', now))
+        return dict(record)
+
+    def put(self, key: str, record: Dict[str, Any], model_name: Optional[str] = None):
+        """
+        Cache the response of a finished request.
+
+        Args:
+            key: Key returned by key()
+            record: JSON-serializable response (text, token counts, finish reason)
+            model_name: Model that generated the response (for invalidate)
+        """
+        if not self.enabled:
+            return
+        record = dict(record, created=time.time())
+        with self._lock:
+            if not self._insert(key, record, model_name, record['created']):
+                return
+            self._stores += 1
+        if self.cache_dir:
+            self._write_disk(key, record)
+
+    def bypass(self):
+        """Count a request that skipped the cache because of its Cache-Control header."""
+        with self._lock:
+            self._bypassed += 1
+
+    def _insert(self, key, record, model_name, created) -> bool:
+        """Add an entry to the memory tier; lock must be held."""
+        nbytes = len(json.dumps(record))
+        if nbytes > self.max_bytes:
+            logger.debug(f"Response of {nbytes} bytes exceeds the response cache budget, not caching")
+            return False
+        self._remove(key)
+        self._entries[key] = _Entry(record, nbytes, model_name, created + self.ttl if self.ttl else None)
+        self._nbytes += nbytes
+        while self._entries and (self._nbytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+        return True
+
+    def _remove(self, key) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._nbytes -= entry.nbytes
+        return True
+
+    def invalidate(self, model_name: str) -> int:
+        """
+        Drop the in-memory entries of a model, e.g. when it is loaded again or unloaded.
+
+        On-disk entries are kept: they only match weights with the same fingerprint.
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.model_name == model_name]
+            for key in keys:
+                self._remove(key)
+            self._model_fingerprints.clear()
+            self._invalidations += len(keys)
+        if keys:
+            logger.info(f"Dropped {len(keys)} cached responses of {model_name}")
+        return len(keys)
+
+    def clear(self):
+        """Drop every entry of both tiers."""
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+            self._model_fingerprints.clear()
+        for path, _, _ in self._disk_files():
+            self._unlink(path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def _disk_files(self) -> List[Tuple[str, float, int]]:
+        """List (path, mtime, size) of the on-disk entries."""
+        if not self.cache_dir:
+            return []
+        files = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_FILE_SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((entry.path, st.st_mtime, st.st_size))
+        return files
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable response cache file {path}: {e}")
+            self._unlink(path)
+            return None
+        if self.ttl and record.get('created', 0) + self.ttl <= now:
+            self._unlink(path)
+            with self._lock:
+                self._expired += 1
+            return None
+        return record
+
+    def _write_disk(self, key: str, record: Dict[str, Any]):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            data = json.dumps(record).encode()
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write response cache file {path}: {e}")
+            self._unlink(tmp_path)
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - previous
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the oldest on-disk entries until the tier fits its budget again."""
+        files = sorted(self._disk_files(), key=lambda f: f[1])
+        total = sum(size for _, _, size in files)
+        target = self.max_disk_bytes * 0.9
+        while files and total > target:
+            path, _, size = files.pop(0)
+            if self._unlink(path):
+                total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def _unlink(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._nbytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'disk_dir': self.cache_dir,
+                'disk_bytes': self._disk_bytes,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else None,
+                'stores': self._stores,
+                'evictions': self._evictions,
+                'expired': self._expired,
+                'invalidations': self._invalidations,
+                'bypassed': self._bypassed,
+            }
@@ -0,0 +1,230 @@
+"""
+Log-likelihood scoring for the model server.
+
+``POST /api/model/score`` evaluates a batch of texts, or of prompt and
+continuation pairs, with plain forward passes and no sampling. For each item
+it returns the log-probability of every scored token, the total negative
+log-likelihood (NLL) and the perplexity. Totals over the whole batch are
+returned as well, so a held-out set can be scored per checkpoint in one call.
+
+Items are sorted by length and packed into right-padded batches under a
+token budget, since the logits of a forward pass take
+``rows x length x vocabulary`` floats. The batches run on the engine thread
+between two generation steps, so generation requests in flight keep going
+while a large set is scored.
+"""
+
+import math
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Padded tokens evaluated in one forward pass
+DEFAULT_BATCH_TOKENS = 4096
+
+# Rows evaluated in one forward pass
+DEFAULT_BATCH_ROWS = 32
+
+# Items accepted in one request
+MAX_ITEMS = 10000
+
+
+class ScoreItem:
+    """One text to score: its tokens and the position of the first scored token."""
+
+    __slots__ = ('index', 'tokens', 'start', 'logprobs', 'greedy')
+
+    def __init__(self, index: int, tokens: List[int], start: int):
+        self.index = index
+        self.tokens = tokens
+        self.start = start
+        self.logprobs = None
+        self.greedy = None
+
+    @property
+    def num_scored(self) -> int:
+        return len(self.tokens) - self.start
+
+
+def parse_items(data: Dict[str, Any], tokenizer) -> List[ScoreItem]:
+    """
+    Tokenize the items of a score request.
+
+    A request has either ``texts`` (every token after the first is scored)
+    or ``items`` of ``{"prompt": ..., "continuation": ...}`` (only the
+    continuation is scored, conditioned on the prompt).
+
+    Args:
+        data: The request body
+        tokenizer: Tokenizer of the model
+
+    Returns:
+        List of ScoreItem in request order
+
+    Raises:
+        ValueError: If the request is malformed
+    """
+    texts, pairs = data.get('texts'), data.get('items')
+    if (texts is None) == (pairs is None):
+        raise ValueError("Provide either 'texts' or 'items'")
+    entries = texts if texts is not None else pairs
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("'texts' or 'items' must be a non-empty list")
+    if len(entries) > MAX_ITEMS:
+        raise ValueError(f"At most {MAX_ITEMS} items can be scored in one request")
+
+    items = []
+    for index, entry in enumerate(entries):
+        if texts is not None:
+            if not isinstance(entry, str) or not entry:
+                raise ValueError(f"texts[{index}] must be a non-empty string")
+            tokens = tokenizer.encode(entry)
+            start = 1
+        else:
+            if not isinstance(entry, dict) or not isinstance(entry.get('continuation'), str) \
+                    or not entry['continuation']:
+                raise ValueError(f"items[{index}] needs a non-empty 'continuation'")
+            prompt = entry.get('prompt') or ''
+            context = tokenizer.encode(prompt) if prompt else []
+            if not context and tokenizer.bos_token_id is not None:
+                context = [tokenizer.bos_token_id]
+            continuation = tokenizer.encode(entry['continuation'], add_special_tokens=False)
+            tokens = list(context) + list(continuation)
+            start = max(1, len(context))
+        if len(tokens) <= start:
+            raise ValueError(f"Item {index} has no token to score")
+        items.append(ScoreItem(index, list(tokens), start))
+    return items
+
+
+def plan_batches(items: List[ScoreItem], max_tokens: int = DEFAULT_BATCH_TOKENS,
+                 max_rows: int = DEFAULT_BATCH_ROWS) -> List[List[ScoreItem]]:
+    """
+    Group items of similar length into batches that fit a padded token budget.
+
+    An item longer than the budget is scored on its own.
+    """
+    batches, batch = [], []
+    for item in sorted(items, key=lambda i: len(i.tokens), reverse=True):
+        # Sorted longest first, so the first item sets the padded length
+        width = len(batch[0].tokens) - 1 if batch else len(item.tokens) - 1
+        if batch and (len(batch) >= max_rows or (len(batch) + 1) * width > max_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(item)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def score_batch(model, batch: List[ScoreItem], adapters=None, adapter: Optional[str] = None):
+    """
+    Score a batch of items with one forward pass (engine thread).
+
+    Fills in the logprobs and greedy fields of every item.
+
+    Args:
+        model: The MLX model
+        batch: Items to score together
+        adapters: AdapterCache of the engine, if any
+        adapter: LoRA adapter to score with (None for the model as loaded)
+    """
+    import mlx.core as mx
+
+    width = max(len(item.tokens) for item in batch) - 1
+    inputs = [item.tokens[:-1] + [0] * (width - len(item.tokens) + 1) for item in batch]
+    targets = [item.tokens[1:] + [0] * (width - len(item.tokens) + 1) for item in batch]
+
+    slot = 0
+    if adapters is not None:
+        slot = adapters.acquire(adapter)
+        adapters.set_batch([slot] * len(batch))
+    try:
+        # Right padding never changes the logits of the real tokens before it
+        logits = model(mx.array(inputs)).astype(mx.float32)
+        targets = mx.array(targets)
+        target_logits = mx.take_along_axis(logits, targets[..., None], axis=-1).squeeze(-1)
+        logprobs = target_logits - mx.logsumexp(logits, axis=-1)
+        greedy = mx.argmax(logits, axis=-1) == targets
+        mx.eval(logprobs, greedy)
+    finally:
+        if adapters is not None:
+            adapters.release(slot)
+
+    logprobs, greedy = logprobs.tolist(), greedy.tolist()
+    for row, item in enumerate(batch):
+        # Position t predicts token t + 1
+        first, last = item.start - 1, len(item.tokens) - 1
+        item.logprobs = logprobs[row][first:last]
+        item.greedy = all(greedy[row][first:last])
+
+
+def item_result(item: ScoreItem, include_logprobs: bool = True) -> Dict[str, Any]:
+    """Summarize the score of one item."""
+    nll = -sum(item.logprobs)
+    result = {
+        'index': item.index,
+        'tokens': item.num_scored,
+        'nll': nll,
+        'mean_nll': nll / item.num_scored,
+        'perplexity': _perplexity(nll, item.num_scored),
+        'greedy': item.greedy
+    }
+    if include_logprobs:
+        result['token_ids'] = item.tokens[item.start:]
+        result['logprobs'] = item.logprobs
+    return result
+
+
+def summarize(items: List[ScoreItem], elapsed: float, include_logprobs: bool = True) -> Dict[str, Any]:
+    """Build the score response: per-item results and corpus totals."""
+    total_tokens = sum(item.num_scored for item in items)
+    total_nll = -sum(sum(item.logprobs) for item in items)
+    processed = sum(len(item.tokens) for item in items)
+    return {
+        'results': [item_result(item, include_logprobs) for item in items],
+        'total_tokens': total_tokens,
+        'total_nll': total_nll,
+        'mean_nll': total_nll / total_tokens,
+        'perplexity': _perplexity(total_nll, total_tokens),
+        'scoring_time': round(elapsed, 4),
+        'tokens_per_sec': round(processed / elapsed, 1) if elapsed > 0 else 0
+    }
+
+
+def _perplexity(nll: float, tokens: int) -> float:
+    try:
+        return math.exp(nll / tokens)
+    except OverflowError:
+        return float('inf')
+
+
+def score(engine, model, items: List[ScoreItem], adapter: Optional[str] = None,
+          max_tokens: int = DEFAULT_BATCH_TOKENS, timeout: Optional[float] = None) -> float:
+    """
+    Score items on the engine thread, one batch between two generation steps.
+
+    Args:
+        engine: The BatchEngine of the model
+        model: The MLX model
+        items: Items returned by parse_items
+        adapter: LoRA adapter to score with (the engine default if None)
+        max_tokens: Padded tokens per forward pass
+        timeout: Maximum seconds to wait for each batch
+
+    Returns:
+        Seconds spent scoring
+    """
+    start_time = time.time()
+    adapters = engine.adapters if engine.adapters is not None and engine.adapters.enabled else None
+    adapter = adapter or engine.default_adapter
+    if adapter and adapters is None:
+        raise ValueError("This model cannot score with a per-request adapter")
+    batches = plan_batches(items, max_tokens)
+    for batch in batches:
+        engine.run_on_engine(lambda: score_batch(model, batch, adapters, adapter), timeout)
+    elapsed = time.time() - start_time
+    logger.info(f"Scored {len(items)} items in {len(batches)} batches in {elapsed:.2f}s")
+    return elapsed
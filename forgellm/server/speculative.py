@@ -0,0 +1,99 @@
+"""
+Draft models for speculative decoding.
+
+Decoding a large model is bound by memory bandwidth: every token reads all
+of its weights once. With a draft model, a small model of the same family
+proposes the next few tokens and the target model checks all of them in a
+single forward pass. Every proposed token that matches what the target
+itself samples is kept, plus the target's own token at the first mismatch,
+so the output is exactly what the target alone would produce.
+
+The BatchEngine uses the draft model while a single sequence is decoding;
+with several sequences in flight, batching already keeps the hardware busy
+and the engine decodes normally.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NUM_DRAFT_TOKENS = 3
+
+
+def check_draft_compatible(tokenizer, draft_tokenizer, draft_name: str = "draft model"):
+    """
+    Make sure a draft model proposes tokens from the target's vocabulary.
+
+    Args:
+        tokenizer: Tokenizer of the target model
+        draft_tokenizer: Tokenizer of the draft model
+        draft_name: Name used in the error message
+
+    Raises:
+        ValueError: If the vocabularies differ
+    """
+    if tokenizer.vocab_size != draft_tokenizer.vocab_size:
+        raise ValueError(
+            f"{draft_name} has a vocabulary of {draft_tokenizer.vocab_size} tokens, "
+            f"the model has {tokenizer.vocab_size}; draft and model must share a tokenizer"
+        )
+    for token in ('bos_token_id', 'eos_token_id'):
+        if getattr(tokenizer, token, None) != getattr(draft_tokenizer, token, None):
+            raise ValueError(f"{draft_name} uses a different {token} than the model")
+
+
+def load_draft_model(draft_model: str, tokenizer):
+    """
+    Load a draft model for speculative decoding.
+
+    Args:
+        draft_model: Model name (HF cache, published/...) or local path
+        tokenizer: Tokenizer of the target model
+
+    Returns:
+        The loaded MLX draft model
+
+    Raises:
+        ValueError: If the draft model does not share the target's tokenizer
+    """
+    from mlx_lm import load
+    from forgellm.models.model_paths import resolve_model_path
+
+    draft_path = resolve_model_path(draft_model)
+    model, draft_tokenizer = load(draft_path)
+    check_draft_compatible(tokenizer, draft_tokenizer, draft_model)
+    logger.info(f"Loaded draft model {draft_model} from {draft_path}")
+    return model
+
+
+def speculative_stats(draft_tokens: int, accepted_tokens: int, generated_tokens: int,
+                      target_passes: int, target_time: float, total_time: float) -> Optional[Dict[str, Any]]:
+    """
+    Summarize the speculative steps of a request.
+
+    The speedup is an estimate: a target forward pass over a few tokens costs
+    about as much as one ordinary decode step, so the same tokens without a
+    draft model would have taken one such pass each.
+
+    Args:
+        draft_tokens: Tokens proposed by the draft model
+        accepted_tokens: Proposed tokens the target model agreed with
+        generated_tokens: Tokens produced by speculative steps
+        target_passes: Target forward passes of speculative steps
+        target_time: Seconds spent in those target passes
+        total_time: Seconds spent in speculative steps (draft and target)
+
+    Returns:
+        Dictionary with acceptance rate and speedup, or None without speculative steps
+    """
+    if not target_passes:
+        return None
+    step_time = target_time / target_passes
+    return {
+        'draft_tokens': draft_tokens,
+        'accepted_tokens': accepted_tokens,
+        'acceptance_rate': round(accepted_tokens / draft_tokens, 3) if draft_tokens else 0.0,
+        'tokens_per_pass': round(generated_tokens / target_passes, 2),
+        'speedup': round(generated_tokens * step_time / total_time, 2) if total_time > 0 else 1.0
+    }
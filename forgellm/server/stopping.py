@@ -0,0 +1,224 @@
+"""
+Stop sequences for the batch engine.
+
+A request can name stop sequences (``stop`` in the native and OpenAI APIs),
+and chat requests to instruct models also stop at the end-of-turn markers of
+their architecture (``model_architectures.json``). The engine checks them
+after every token, so decoding halts as soon as one is generated instead of
+running on to ``max_tokens`` and trimming the text afterwards.
+
+A stop sequence that is a single token of the vocabulary (such as
+``<|im_end|>``) is matched by token id, like the EOS token. Other sequences
+are matched on the text of the generated tokens: each request keeps a
+streaming detokenizer, and only the window of text that the new token can
+complete is searched. Tokens whose text could be the start of a stop
+sequence are held back from the consumer until the sequence is either
+completed or ruled out, so streamed text never shows a partial stop
+sequence. The matched sequence itself is never returned.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Stop sequences accepted per request
+MAX_STOP_SEQUENCES = 16
+
+# Longest stop sequence accepted, in characters
+MAX_STOP_LENGTH = 256
+
+# Compiled stop sets remembered per engine
+COMPILED_CACHE_SIZE = 256
+
+
+def parse_stop(value: Union[None, str, Iterable[str]]) -> List[str]:
+    """
+    Validate the stop parameter of a request.
+
+    Args:
+        value: A string, a list of strings, or None
+
+    Returns:
+        List of non-empty stop sequences
+
+    Raises:
+        ValueError: If the parameter is malformed
+    """
+    if value is None:
+        return []
+    stops = [value] if isinstance(value, str) else value
+    if not isinstance(stops, (list, tuple)) or not all(isinstance(s, str) for s in stops):
+        raise ValueError("'stop' must be a string or a list of strings")
+    stops = [s for s in stops if s]
+    if len(stops) > MAX_STOP_SEQUENCES:
+        raise ValueError(f"At most {MAX_STOP_SEQUENCES} stop sequences are supported")
+    if any(len(s) > MAX_STOP_LENGTH for s in stops):
+        raise ValueError(f"Stop sequences must be at most {MAX_STOP_LENGTH} characters")
+    return stops
+
+
+class StopCompiler:
+    """Splits stop sequences into token-id stops and text stops, once per set of sequences."""
+
+    def __init__(self, tokenizer, cache_size: int = COMPILED_CACHE_SIZE):
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._special_ids = None
+
+    def compile(self, stops: Iterable[str]) -> Tuple[FrozenSet[int], Tuple[str, ...]]:
+        """
+        Compile stop sequences.
+
+        Args:
+            stops: Stop sequences of a request
+
+        Returns:
+            Tuple of (token ids that stop generation, sequences matched on the text)
+        """
+        key = tuple(sorted(set(stops)))
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self._cache.move_to_end(key)
+            return compiled
+
+        token_ids, texts = set(), []
+        for stop in key:
+            token_id = self._single_token(stop)
+            if token_id is not None:
+                token_ids.add(token_id)
+                if token_id in self.special_ids:
+                    # The model only ever produces it as that one token
+                    continue
+            texts.append(stop)
+
+        compiled = (frozenset(token_ids), tuple(texts))
+        self._cache[key] = compiled
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return compiled
+
+    @property
+    def special_ids(self) -> FrozenSet[int]:
+        """Ids of special and added tokens."""
+        if self._special_ids is None:
+            ids = set(getattr(self.tokenizer, 'all_special_ids', None) or [])
+            ids.update(getattr(self.tokenizer, 'added_tokens_decoder', None) or {})
+            self._special_ids = frozenset(ids)
+        return self._special_ids
+
+    def _single_token(self, stop: str) -> Optional[int]:
+        try:
+            ids = self.tokenizer.encode(stop, add_special_tokens=False)
+        except Exception as e:
+            logger.debug(f"Could not tokenize stop sequence {stop!r}: {e}")
+            return None
+        return ids[0] if len(ids) == 1 else None
+
+
+class StopMatcher:
+    """Incremental search for stop sequences in the text of generated tokens."""
+
+    def __init__(self, detokenizer, stops: Iterable[str]):
+        """
+        Initialize the matcher.
+
+        Args:
+            detokenizer: A fresh streaming detokenizer of the model's tokenizer
+            stops: Sequences to match on the text
+        """
+        self.detokenizer = detokenizer
+        self.stops = tuple(stops)
+        self.max_length = max(len(s) for s in self.stops)
+        # Proper prefixes of the stop sequences: text ending with one may become a match
+        self._prefixes = {s[:i] for s in self.stops for i in range(1, len(s))}
+        self.match_offset = None
+        self.match = None
+        # Text before this offset can no longer be part of a match
+        self.safe_offset = 0
+
+    def add(self, token: int) -> bool:
+        """
+        Add a generated token.
+
+        Returns:
+            True if the text now contains a stop sequence
+        """
+        previous = len(self.detokenizer.text)
+        self.detokenizer.add_token(token)
+        text = self.detokenizer.text
+        if len(text) == previous:
+            return False
+
+        # Only a match ending in the new text is new
+        window = max(0, previous - self.max_length + 1)
+        for stop in self.stops:
+            offset = text.find(stop, window)
+            if offset >= 0 and (self.match_offset is None or offset < self.match_offset):
+                self.match_offset, self.match = offset, stop
+        if self.match is not None:
+            return True
+
+        # Hold back the longest tail that could still grow into a stop sequence
+        self.safe_offset = len(text)
+        for offset in range(max(0, len(text) - self.max_length + 1), len(text)):
+            if text[offset:] in self._prefixes:
+                self.safe_offset = offset
+                break
+        return False
+
+    @property
+    def text_length(self) -> int:
+        return len(self.detokenizer.text)
+
+
+class StopTrimmedDetokenizer:
+    """Streaming detokenizer of a request's tokens that leaves out a matched stop sequence."""
+
+    def __init__(self, detokenizer, request):
+        self._detokenizer = detokenizer
+        self._request = request
+        self._sent = 0
+
+    def add_token(self, token: int):
+        self._detokenizer.add_token(token)
+
+    def finalize(self):
+        self._detokenizer.finalize()
+
+    @property
+    def text(self) -> str:
+        text = self._detokenizer.text
+        offset = self._request.stop_offset
+        return text if offset is None else text[:offset]
+
+    @property
+    def last_segment(self) -> str:
+        text = self.text
+        segment = text[self._sent:]
+        self._sent = len(text)
+        return segment
+
+
+def detokenizer_for(tokenizer, request):
+    """
+    Get a streaming detokenizer for the tokens of a request.
+
+    Use it instead of ``tokenizer.detokenizer`` for requests that may stop
+    on a text sequence: the token that completes a match can carry text
+    before the sequence, and the sequence is cut from the text.
+    """
+    if request.stop_matcher is None:
+        return tokenizer.detokenizer
+    return StopTrimmedDetokenizer(tokenizer.detokenizer, request)
+
+
+def completion_text(tokenizer, request) -> str:
+    """Decode the whole completion of a finished request."""
+    detokenizer = detokenizer_for(tokenizer, request)
+    for token in request.output_tokens:
+        detokenizer.add_token(token)
+    detokenizer.finalize()
+    return detokenizer.text
@@ -0,0 +1,82 @@
+"""
+Transport between the web process and the model server.
+
+The model server answers over HTTP/1.1 with persistent (keep-alive)
+connections, so the pooled client of the web process reuses one connection
+per worker instead of opening a new one for every status check or
+generation request. When both processes run on the same host, the server
+can also listen on a Unix domain socket (``--unix-socket``), which skips
+the loopback TCP stack altogether.
+
+Model state changes (a load starting, progressing, finishing or failing,
+models being unloaded) are pushed to ``GET /api/model/events`` subscribers
+as they happen, so the web process does not poll the status endpoint.
+"""
+
+import os
+import socketserver
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded HTTP server listening on a Unix domain socket."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        # A socket file left behind by a server that did not shut down cleanly
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+        # Only processes of the same user may talk to the model server
+        os.chmod(self.server_address, 0o600)
+
+    def get_request(self):
+        # Unix sockets have no peer address; give handlers a TCP-like one for logging
+        request, _ = super().get_request()
+        return request, ('unix', 0)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class StatusEvents:
+    """Version counter that wakes /api/model/events subscribers when the model state changes."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        with self._cond:
+            return self._version
+
+    def notify(self) -> int:
+        """Signal a state change; returns the new version."""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+            return self._version
+
+    def wait(self, version: int, timeout: float) -> int:
+        """
+        Wait until the state changes after a version.
+
+        Args:
+            version: Last version the caller has seen
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The current version (unchanged on timeout)
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._version != version, timeout)
+            return self._version
@@ -1,9 +1,14 @@
 """Training module for continued pre-training and fine-tuning."""
 
-from .config import TrainingConfig
-from .trainer import ContinuedPretrainer
-from .dashboard import create_comprehensive_dashboard, identify_best_checkpoints, load_training_data
-from .metrics_logger import TrainingMetricsLogger, create_training_logger
+_EXPORTS = {
+    "TrainingConfig": ".config",
+    "ContinuedPretrainer": ".trainer",
+    "create_comprehensive_dashboard": ".dashboard",
+    "identify_best_checkpoints": ".dashboard",
+    "load_training_data": ".dashboard",
+    "TrainingMetricsLogger": ".metrics_logger",
+    "create_training_logger": ".metrics_logger",
+}
 
 __all__ = [
     "TrainingConfig", 
@@ -13,4 +18,14 @@ __all__ = [
     "load_training_data",
     "TrainingMetricsLogger",
     "create_training_logger"
-] 
\ No newline at end of file
+] 
+
+
+def __getattr__(name):
+    # Imported on first access: the submodules pull in mlx, matplotlib or Flask
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
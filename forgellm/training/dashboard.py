@@ -9,10 +9,9 @@ import math
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
 import numpy as np
-from matplotlib.colors import LinearSegmentedColormap
+
+from .downsampling import downsample, select_range
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +84,10 @@ class DashboardGenerator:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        # Imported here: matplotlib takes longer to import than the rest of the web app
+        import matplotlib.pyplot as plt
+        import matplotlib.gridspec as gridspec
+        
         # Create figure with grid layout for multiple plots
         self.fig = plt.figure(figsize=figsize, dpi=dpi)
         gs = gridspec.GridSpec(4, 3, figure=self.fig)
@@ -837,15 +840,21 @@ def identify_best_checkpoints(data, top_k: int = 3):
     return generator.identify_best_checkpoints(data, top_k)
 
 
-def generate_web_chart_data(data: Dict[str, Any]) -> Dict[str, Any]:
+def generate_web_chart_data(data: Dict[str, Any], max_points: Optional[int] = None,
+                            method: str = 'auto', x_range: Optional[Tuple] = None) -> Dict[str, Any]:
     """
     Generate chart data for web dashboard from training metrics
     
     Args:
         data: Training data containing metrics
+        max_points: Downsample each series to at most this many points (default: all)
+        method: 'lttb', 'minmax', or 'auto' (LTTB for losses and learning rate,
+            min/max buckets for speed and memory)
+        x_range: Only the points within this (min, max) iteration range
         
     Returns:
-        Dictionary containing chart data for Plotly.js
+        Dictionary containing chart data for Plotly.js; each chart has
+        'downsampled' set if points were left out
     """
     try:
         metrics = data.get('metrics', [])
@@ -867,6 +876,26 @@ def generate_web_chart_data(data: Dict[str, Any]) -> Dict[str, Any]:
         speed_iterations = [m.get('iteration', 0) for m in metrics if m.get('tokens_per_sec') is not None]
         memory_iterations = [m.get('iteration', 0) for m in metrics if m.get('peak_memory_gb') is not None]
         
+        # Reduce the series to the requested range and resolution
+        downsampled = set()
+        
+        def sample(name, xs, ys, default_method, keep=None):
+            if x_range is not None:
+                xs, ys = select_range(xs, ys, *x_range)
+            if max_points is not None:
+                count = len(ys)
+                xs, ys = downsample(xs, ys, max_points, default_method if method == 'auto' else method, keep)
+                if len(ys) < count:
+                    downsampled.add(name)
+            return xs, ys
+        
+        val_iterations, val_loss = sample('loss', val_iterations, val_loss, 'lttb')
+        # Training loss at every validation point, for the generalization gap
+        train_iterations, train_loss = sample('loss', train_iterations, train_loss, 'lttb', keep=val_iterations)
+        lr_iterations, learning_rate = sample('learning_rate', lr_iterations, learning_rate, 'lttb')
+        speed_iterations, tokens_per_sec = sample('speed', speed_iterations, tokens_per_sec, 'minmax')
+        memory_iterations, peak_memory = sample('speed', memory_iterations, peak_memory, 'minmax')
+        
         charts = {}
         
         # Loss Chart
@@ -1004,6 +1033,10 @@ def generate_web_chart_data(data: Dict[str, Any]) -> Dict[str, Any]:
                 }
             }
         
+        # Perplexity is derived from the loss series
+        for key, chart in charts.items():
+            chart['downsampled'] = ('loss' if key == 'perplexity' else key) in downsampled
+        
         return charts
         
     except Exception as e:
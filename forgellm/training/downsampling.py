@@ -0,0 +1,174 @@
+"""
+Downsampling of chart series.
+
+A long run logs tens of thousands of iterations, far more points than a
+chart is wide, and sending all of them makes the chart endpoints return
+megabytes of Plotly JSON. Series are reduced to a target number of points
+in a way that keeps their shape:
+
+- ``lttb``: Largest-Triangle-Three-Buckets. Keeps the first and last
+  points and, from each bucket, the point forming the largest triangle with
+  the point kept from the previous bucket and the mean of the next one.
+  Suited to trends such as losses and learning rates. The global minimum
+  and maximum are always kept, so the best loss of a run stays on the chart.
+- ``minmax``: the minimum and maximum of each bucket. Keeps every spike,
+  suited to noisy series such as throughput and memory.
+
+Points are picked, never averaged, so every value sent is a logged value.
+Full resolution stays available for a zoomed-in range with
+``select_range``.
+"""
+
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('lttb', 'minmax')
+
+# Fewest points a series can be reduced to
+MIN_POINTS = 10
+
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], n: int) -> np.ndarray:
+    """
+    Select points of a series with Largest-Triangle-Three-Buckets.
+
+    Bucket boundaries, bucket means and the triangle areas within a bucket
+    are computed with NumPy; only the walk from bucket to bucket (each
+    choice depends on the previous one) is a loop, of n iterations.
+
+    Args:
+        x: X values, ascending
+        y: Y values
+        n: Number of points to keep (at least 3)
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+
+    # n - 2 buckets of the points between the first and the last
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    # The third vertex for each bucket: the mean of the next bucket, or the last point
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = [0]
+    a = 0
+    # Plain floats and ints in the loop: NumPy scalars are slow
+    edges, next_x, next_y = edges.tolist(), next_x.tolist(), next_y.tolist()
+    x_list, y_list = x.tolist(), y.tolist()
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x_list[a], y_list[a]
+        # Twice the triangle areas, for every point of the bucket at once
+        areas = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(areas.argmax())
+        selected.append(a)
+    selected.append(size - 1)
+    return np.array(selected, dtype=np.intp)
+
+
+def minmax_indices(y: Sequence[float], n: int) -> np.ndarray:
+    """
+    Select the minimum and maximum of each bucket of a series.
+
+    Args:
+        y: Y values
+        n: Maximum number of points to keep (at least 4)
+
+    Returns:
+        Sorted indices of the kept points, the first and last included
+    """
+    y = np.asarray(y, dtype=float)
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+
+    buckets = (n - 2) // 2
+    edges = np.linspace(0, size, buckets + 1).astype(np.intp)
+    width = int(np.diff(edges).max())
+    # One row per bucket, padded to the widest one
+    index = edges[:-1, None] + np.arange(width)[None, :]
+    valid = (index < edges[1:, None])
+    values = y[np.minimum(index, size - 1)]
+    valid &= ~np.isnan(values)
+    lows = np.argmin(np.where(valid, values, np.inf), axis=1)
+    highs = np.argmax(np.where(valid, values, -np.inf), axis=1)
+    return np.unique(np.concatenate([edges[:-1] + lows, edges[:-1] + highs, [0, size - 1]]))
+
+
+def downsample(x: Sequence[float], y: Sequence[float], max_points: Optional[int],
+               method: str = 'lttb', keep: Optional[Sequence[float]] = None) -> Tuple[List, List]:
+    """
+    Reduce a series to at most max_points points.
+
+    Args:
+        x: X values, ascending
+        y: Y values
+        max_points: Maximum number of points (None keeps all of them)
+        method: 'lttb' or 'minmax'
+        keep: X values whose points are always kept, e.g. the iterations of
+            a series plotted against this one. They count against max_points,
+            though at least MIN_POINTS points are still picked by the method.
+
+    Returns:
+        The kept x and y values, as lists
+
+    Raises:
+        ValueError: If the method is unknown or max_points is below MIN_POINTS
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}' (use one of {', '.join(METHODS)})")
+    if max_points is not None and max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    if max_points is None or len(y) <= max_points:
+        return list(x), list(y)
+
+    kept = np.flatnonzero(np.isin(np.asarray(x), keep)) if keep is not None and len(keep) else np.empty(0, np.intp)
+    budget = max(max_points - len(kept), MIN_POINTS)
+    if len(y) <= budget:
+        return list(x), list(y)
+
+    if method == 'minmax':
+        index = minmax_indices(y, budget)
+    else:
+        values = np.asarray(y, dtype=float)
+        index = lttb_indices(x, values, budget - 2)
+        if not np.isnan(values).all():
+            index = np.union1d(index, [np.nanargmin(values), np.nanargmax(values)])
+    index = np.union1d(index, kept)
+    return np.asarray(x)[index].tolist(), np.asarray(y)[index].tolist()
+
+
+def select_range(x: Sequence[float], y: Sequence[float], x_min: Optional[float] = None,
+                 x_max: Optional[float] = None) -> Tuple[List, List]:
+    """
+    Get the points of a series within an x range.
+
+    The nearest point outside the range on either side is included, so that
+    lines run to the edges of a zoomed-in chart.
+
+    Args:
+        x: X values, ascending
+        y: Y values
+        x_min: Lower bound (None for no bound)
+        x_max: Upper bound (None for no bound)
+
+    Returns:
+        The x and y values in the range, as lists
+    """
+    x_values = np.asarray(x, dtype=float)
+    lo = 0 if x_min is None else max(int(np.searchsorted(x_values, x_min, side='left')) - 1, 0)
+    hi = len(x_values) if x_max is None else int(np.searchsorted(x_values, x_max, side='right')) + 1
+    return list(x[lo:hi]), list(y[lo:hi])
@@ -16,6 +16,7 @@ import numpy as np
 
 from .training.config import InstructTuningConfig
 from .models.model_manager import ModelManager
+from ..utils.process_watch import process_watch
 
 logger = logging.getLogger(__name__)
 
@@ -325,18 +326,18 @@ class SOTAInstructTrainer:
             bufsize=1,
             universal_newlines=True,
         )
-        
-        # Process output
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
+        with process_watch.watching(process, 'training', output_dir=str(self.config.output_dir)):
+            # Process output
+            while True:
+                line = process.stdout.readline()
+                if not line and process.poll() is not None:
+                    break
                 
-            if line:
-                logger.info(f"MLX-LM: {line.strip()}")
+                if line:
+                    logger.info(f"MLX-LM: {line.strip()}")
         
-        # Check return code
-        return_code = process.wait()
+            # Check return code
+            return_code = process.wait()
         
         if return_code == 0:
             logger.info("✅ MLX-LM instruction tuning completed successfully")
@@ -0,0 +1,191 @@
+"""
+Incremental metrics of training logs for live dashboards.
+
+A live dashboard polls the metrics of the running session every few
+seconds, and usually only one iteration was added since the last poll.
+``MetricsTail`` keeps the parsed log of a session (re-read only when the
+file's size or modification time changed) and gives every metrics entry,
+and every field of it, the version at which it last changed. A client
+passes back the ``cursor`` of its previous answer and gets only the entries
+that are new or changed since then, plus the chart points they add.
+
+Cursors only increase. A tail starts counting from the current time in
+milliseconds, so cursors handed out before a server restart stay older
+than the new ones. When already-sent chart values change (metrics
+backfilled at the end of a run, or the log rewritten), a client holding an
+older cursor gets the whole run again with ``reset`` set, and should redraw
+its charts instead of appending to them.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Metrics plotted by the dashboard charts
+SERIES_FIELDS = ('train_loss', 'val_loss', 'learning_rate', 'tokens_per_sec', 'peak_memory_gb')
+
+# Logs kept parsed at once
+MAX_TAILS = 16
+
+_tails: 'OrderedDict[str, MetricsTail]' = OrderedDict()
+_tails_lock = threading.Lock()
+
+
+class MetricsTail:
+    """The parsed metrics of a training log, with change versions."""
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        self.data: Dict[str, Any] = {}
+        self.points: List[Dict[str, Any]] = []
+        self.cursor = int(time.time() * 1000)
+        # Clients with a cursor older than this must redraw
+        self.reset_cursor = self.cursor
+        self._point_versions: List[int] = []
+        self._field_versions: List[Dict[str, int]] = []
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        """
+        Re-read the log if it changed.
+
+        Returns:
+            True if new metrics were loaded
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.log_file)
+            except OSError:
+                return False
+            signature = (st.st_mtime_ns, st.st_size)
+            if signature == self._signature:
+                return False
+            try:
+                with open(self.log_file, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                # Being written; the next refresh reads it
+                return False
+            self._signature = signature
+            self.data = data if isinstance(data, dict) else {}
+            return self._apply(self.data.get('metrics') or [])
+
+    def _apply(self, points: List[Dict[str, Any]]) -> bool:
+        version = self.cursor + 1
+        previous = {p.get('iteration'): i for i, p in enumerate(self.points)}
+        last_iteration = self.points[-1].get('iteration', 0) if self.points else None
+        point_versions, field_versions = [], []
+        changed = rewritten = False
+
+        for point in points:
+            i = previous.pop(point.get('iteration'), None)
+            if i is None:
+                point_versions.append(version)
+                field_versions.append({field: version for field in point})
+                changed = True
+                if last_iteration is not None and (point.get('iteration') or 0) < last_iteration:
+                    # Points can only be appended to a chart
+                    rewritten = True
+                continue
+
+            old = self.points[i]
+            versions = dict(self._field_versions[i])
+            point_changed = False
+            for field, value in point.items():
+                if old.get(field) != value:
+                    versions[field] = version
+                    point_changed = True
+                    if field in SERIES_FIELDS and old.get(field) is not None:
+                        rewritten = True
+            point_versions.append(version if point_changed else self._point_versions[i])
+            field_versions.append(versions)
+            changed = changed or point_changed
+
+        if previous:
+            # Entries removed from the log
+            rewritten = changed = True
+        if not changed:
+            return False
+
+        self.points = points
+        self._point_versions = point_versions
+        self._field_versions = field_versions
+        self.cursor = version
+        if rewritten:
+            self.reset_cursor = version
+        return True
+
+    def delta(self, since_iteration: Optional[int] = None, cursor: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get the metrics added since a previous answer.
+
+        Args:
+            since_iteration: Return the entries after this iteration
+            cursor: Return the entries new or changed since the answer with
+                this cursor (takes precedence over since_iteration)
+
+        Returns:
+            Dictionary with the entries ('points'), the chart points they add
+            per metric ('series': {metric: {'x': iterations, 'y': values}}),
+            the new 'cursor', 'last_iteration', 'total_points', whether the
+            run 'finished', and 'reset' if the client must redraw
+        """
+        self.refresh()
+        with self._lock:
+            points, point_versions, field_versions = self.points, self._point_versions, self._field_versions
+            current, reset_cursor, data = self.cursor, self.reset_cursor, self.data
+
+        reset = cursor is not None and not reset_cursor <= cursor <= current
+        if reset:
+            cursor = since_iteration = None
+
+        if cursor is not None:
+            selected = [i for i, v in enumerate(point_versions) if v > cursor]
+        elif since_iteration is not None:
+            selected = [i for i, p in enumerate(points) if (p.get('iteration') or 0) > since_iteration]
+        else:
+            selected = list(range(len(points)))
+
+        series = {field: {'x': [], 'y': []} for field in SERIES_FIELDS}
+        for i in selected:
+            point = points[i]
+            for field in SERIES_FIELDS:
+                if point.get(field) is None:
+                    continue
+                if cursor is not None and field_versions[i].get(field, 0) <= cursor:
+                    # Already sent
+                    continue
+                series[field]['x'].append(point.get('iteration', 0))
+                series[field]['y'].append(point[field])
+
+        return {
+            'points': [points[i] for i in selected],
+            'series': {field: s for field, s in series.items() if s['x']},
+            'cursor': current,
+            'last_iteration': points[-1].get('iteration') if points else None,
+            'total_points': len(points),
+            'finished': data.get('end_time') is not None,
+            'reset': reset
+        }
+
+
+def get_metrics_tail(log_file: str) -> MetricsTail:
+    """Get the shared tail of a training log."""
+    key = os.path.abspath(log_file)
+    with _tails_lock:
+        tail = _tails.get(key)
+        if tail is None:
+            tail = MetricsTail(log_file)
+            _tails[key] = tail
+            while len(_tails) > MAX_TAILS:
+                _tails.popitem(last=False)
+        else:
+            _tails.move_to_end(key)
+        return tail
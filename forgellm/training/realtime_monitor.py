@@ -13,6 +13,8 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
+from ..utils.process_watch import process_watch
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,33 +47,12 @@ class RealtimeTrainingMonitor:
         logger.info("Real-time training monitor stopped")
         
     def _check_mlx_processes_running(self):
-        """Check if any MLX training processes are actually running
+        """Check if any MLX training, fuse or convert processes are actually running
         
         Returns:
-            bool: True if MLX training processes are found, False otherwise
+            bool: True if MLX processes are found, False otherwise
         """
-        import psutil
-        
-        try:
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if proc.info['cmdline']:
-                        cmdline = ' '.join(proc.info['cmdline'])
-                        # Look for actual MLX training commands
-                        if any(pattern in cmdline for pattern in [
-                            'mlx_lm.lora',      # MLX LoRA training
-                            'mlx_lm.fuse',      # MLX model fusion
-                            'mlx-lm',           # MLX-LM package calls
-                            'mlx_lm',           # MLX-LM package calls
-                        ]):
-                            logger.info(f"RealtimeMonitor: Found active MLX process: PID {proc.info['pid']}")
-                            return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
-        except Exception as e:
-            logger.warning(f"Error checking MLX processes: {e}")
-        
-        return False
+        return process_watch.is_active()
 
     def _find_active_training_file(self) -> Optional[str]:
         """Find the most recent active training file"""
@@ -80,6 +61,11 @@ class RealtimeTrainingMonitor:
             logger.info("RealtimeMonitor: No MLX processes running - no active training")
             return None
         
+        # The training process registers its log when it starts
+        run = process_watch.active_training()
+        if run and run.get('log_file') and os.path.exists(run['log_file']):
+            return run['log_file']
+        
         possible_dirs = [
             Path("models/cpt")
         ]
@@ -0,0 +1,319 @@
+"""Persistent index of training sessions.
+
+The training routes list, compare and badge sessions from their
+``CPT_*.json`` logs. Parsing every log (metrics and all) on every request
+takes seconds once there are hundreds of runs, so the session metadata is
+kept in a SQLite database under ``MODELS_DIR``: the log's top-level fields,
+the training config, the latest metrics entry, the adapter config and the
+checkpoint files of every session.
+
+A refresh lists the session directories and stats their files. Only the
+logs whose size or modification time changed since they were indexed (or
+whose adapter config or checkpoints changed) are parsed again, and sessions
+whose log is gone are dropped.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the table layout or the indexed fields change; the index is rebuilt
+SCHEMA_VERSION = 1
+
+# Database file, relative to MODELS_DIR
+INDEX_FILE = '.session_index.db'
+
+# Seconds during which queries reuse the last refresh instead of listing the directories again
+REFRESH_INTERVAL = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    log_file TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    session_dir TEXT NOT NULL,
+    log_mtime_ns INTEGER NOT NULL,
+    log_size INTEGER NOT NULL,
+    adapter_config_mtime_ns INTEGER NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    status TEXT,
+    model_name TEXT,
+    base_model TEXT,
+    metrics_count INTEGER NOT NULL,
+    latest_metrics TEXT,
+    config TEXT,
+    adapter_config TEXT,
+    checkpoints TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_id ON sessions (session_id);
+"""
+
+_indexes: Dict[str, 'SessionIndex'] = {}
+_indexes_lock = threading.Lock()
+
+
+class SessionIndex:
+    """SQLite index of the training sessions in MODELS_DIR/cpt."""
+
+    def __init__(self, models_dir: str, db_path: Optional[str] = None, refresh_interval: float = REFRESH_INTERVAL):
+        """Open (or create) the index.
+
+        Args:
+            models_dir: The models directory (MODELS_DIR)
+            db_path: Database file (default: MODELS_DIR/.session_index.db)
+            refresh_interval: Seconds during which queries reuse the last refresh
+        """
+        self.models_dir = models_dir
+        self.sessions_dir = os.path.join(models_dir, 'cpt')
+        self.db_path = db_path or os.path.join(models_dir, INDEX_FILE)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._last_refresh = None
+        self._stats = {'refreshes': 0, 'parsed_logs': 0, 'removed_logs': 0, 'refresh_time': 0.0}
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not open session index {self.db_path}: {e}; keeping it in memory")
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            conn.execute('DROP TABLE IF EXISTS sessions')
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        return conn
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    def invalidate(self):
+        """Make the next query refresh the index (after sessions were created or deleted)."""
+        with self._lock:
+            self._last_refresh = None
+
+    def refresh(self, force: bool = False):
+        """Bring the index up to date with the session directories.
+
+        Args:
+            force: Refresh even if the last refresh is more recent than refresh_interval
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+
+            indexed = {
+                row['log_file']: (row['log_mtime_ns'], row['log_size'], row['adapter_config_mtime_ns'],
+                                  row['checkpoints'])
+                for row in self._conn.execute(
+                    'SELECT log_file, log_mtime_ns, log_size, adapter_config_mtime_ns, checkpoints FROM sessions')
+            }
+            seen, parsed = set(), 0
+            for session_id, session_dir, logs, adapter_config_mtime_ns, checkpoints in _scan(self.sessions_dir):
+                checkpoints_json = json.dumps(checkpoints)
+                for log_file, stat in logs:
+                    seen.add(log_file)
+                    signature = (stat.st_mtime_ns, stat.st_size, adapter_config_mtime_ns, checkpoints_json)
+                    if indexed.get(log_file) == signature:
+                        continue
+                    row = _parse_session(session_id, session_dir, log_file, stat,
+                                         adapter_config_mtime_ns, checkpoints_json)
+                    if row is None:
+                        # Probably being written; the old entry stays until the next refresh
+                        continue
+                    self._conn.execute(
+                        f"INSERT OR REPLACE INTO sessions ({', '.join(row)}) "
+                        f"VALUES ({', '.join('?' * len(row))})", list(row.values()))
+                    parsed += 1
+
+            removed = [log_file for log_file in indexed if log_file not in seen]
+            self._conn.executemany('DELETE FROM sessions WHERE log_file = ?', [(f,) for f in removed])
+            self._conn.commit()
+
+            elapsed = time.monotonic() - now
+            self._stats['refreshes'] += 1
+            self._stats['parsed_logs'] += parsed
+            self._stats['removed_logs'] += len(removed)
+            self._stats['refresh_time'] += elapsed
+            if parsed or removed:
+                logger.debug(f"Session index: {parsed} logs parsed, {len(removed)} removed in {elapsed:.3f}s")
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        self.refresh()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """Get the summary of every session, most recently modified first."""
+        return [_summary(row) for row in self._query('SELECT * FROM sessions ORDER BY log_mtime_ns DESC')]
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the indexed data of a session (None if it is unknown).
+
+        Returns:
+            The summary of the session plus its config, latest_metrics,
+            adapter_config and checkpoints
+        """
+        rows = self._query('SELECT * FROM sessions WHERE session_id = ? ORDER BY log_file LIMIT 1', (session_id,))
+        return _details(rows[0]) if rows else None
+
+    def find_log_file(self, session_id: str) -> Optional[str]:
+        """Get the log file of a session (None if it is unknown)."""
+        session = self.get_session(session_id)
+        return session['log_file'] if session else None
+
+    def active_sessions(self, max_age: float = 600) -> List[Dict[str, Any]]:
+        """Get the sessions that have not ended and whose log was written recently, newest first.
+
+        Args:
+            max_age: Seconds since the last write of the log
+        """
+        since = int((time.time() - max_age) * 1e9)
+        rows = self._query('SELECT * FROM sessions WHERE end_time IS NULL AND log_mtime_ns >= ? '
+                           'ORDER BY log_mtime_ns DESC', (since,))
+        return [_details(row) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['sessions'] = self._conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        stats['refresh_time'] = round(stats['refresh_time'], 4)
+        stats['db_path'] = self.db_path
+        return stats
+
+
+def _scan(sessions_dir: str):
+    """List the session directories: (session_id, dir, [(log_file, stat)], adapter config mtime, checkpoints)."""
+    try:
+        entries = list(os.scandir(sessions_dir))
+    except OSError:
+        return
+    for entry in entries:
+        try:
+            if not entry.is_dir():
+                continue
+            logs, checkpoints, adapter_config_mtime_ns = [], [], 0
+            for f in os.scandir(entry.path):
+                if f.name.startswith('CPT_') and f.name.endswith('.json'):
+                    logs.append((f.path, f.stat()))
+                elif f.name.endswith('_adapters.safetensors'):
+                    checkpoints.append(f.name)
+                elif f.name == 'adapter_config.json':
+                    adapter_config_mtime_ns = f.stat().st_mtime_ns
+        except OSError:
+            # Deleted while we were listing it
+            continue
+        if logs:
+            yield entry.name, entry.path, logs, adapter_config_mtime_ns, sorted(checkpoints)
+
+
+def _load_json(path: str) -> Any:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _parse_session(session_id, session_dir, log_file, stat, adapter_config_mtime_ns, checkpoints_json):
+    """Read the fields of a session that the index keeps (None if the log cannot be parsed)."""
+    try:
+        data = _load_json(log_file)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Error reading training session {log_file}: {e}")
+        return None
+    if not isinstance(data, dict):
+        logger.warning(f"Error reading training session {log_file}: not a JSON object")
+        return None
+
+    adapter_config = None
+    if adapter_config_mtime_ns:
+        try:
+            adapter_config = _load_json(os.path.join(session_dir, 'adapter_config.json'))
+        except (OSError, ValueError):
+            pass
+
+    metrics = data.get('metrics') or []
+    config = data.get('config') or {}
+    return {
+        'log_file': log_file,
+        'session_id': session_id,
+        'session_dir': session_dir,
+        'log_mtime_ns': stat.st_mtime_ns,
+        'log_size': stat.st_size,
+        'adapter_config_mtime_ns': adapter_config_mtime_ns,
+        'start_time': data.get('start_time'),
+        'end_time': data.get('end_time'),
+        'status': data.get('status', 'unknown'),
+        'model_name': data.get('model_name') or data.get('base_model') or config.get('model_name', 'Unknown'),
+        'base_model': data.get('base_model'),
+        'metrics_count': len(metrics),
+        'latest_metrics': json.dumps(metrics[-1]) if metrics else None,
+        'config': json.dumps(config),
+        'adapter_config': json.dumps(adapter_config) if adapter_config is not None else None,
+        'checkpoints': checkpoints_json
+    }
+
+
+def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+    """The session entry of /api/training/sessions."""
+    session = {
+        "session_id": row['session_id'],
+        "session_name": row['session_id'],
+        "log_file": row['log_file'],
+        "start_time": row['start_time'],
+        "status": row['status'],
+        "model_name": row['model_name'],
+        "base_model": row['base_model'],
+        "metrics_count": row['metrics_count'],
+        "modified": datetime.fromtimestamp(row['log_mtime_ns'] / 1e9).isoformat()
+    }
+    if row['latest_metrics']:
+        latest = json.loads(row['latest_metrics'])
+        session.update({
+            "latest_iteration": latest.get('iteration'),
+            "latest_loss": latest.get('train_loss'),
+            "latest_val_loss": latest.get('val_loss')
+        })
+    return session
+
+
+def _details(row: sqlite3.Row) -> Dict[str, Any]:
+    session = _summary(row)
+    session.update({
+        'session_dir': row['session_dir'],
+        'end_time': row['end_time'],
+        'config': json.loads(row['config']) if row['config'] else {},
+        'latest_metrics': json.loads(row['latest_metrics']) if row['latest_metrics'] else None,
+        'adapter_config': json.loads(row['adapter_config']) if row['adapter_config'] else None,
+        'checkpoints': json.loads(row['checkpoints'])
+    })
+    return session
+
+
+def get_session_index(models_dir: Optional[str] = None) -> SessionIndex:
+    """Get the shared index of a models directory (MODELS_DIR by default)."""
+    models_dir = models_dir or os.environ.get('MODELS_DIR', 'models')
+    key = os.path.abspath(models_dir)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            # Paths keep the form of MODELS_DIR, like the rest of the API reports them
+            index = SessionIndex(models_dir)
+            _indexes[key] = index
+        return index
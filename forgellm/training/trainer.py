@@ -21,6 +21,7 @@ from .data_processor import PretrainingDataProcessor
 from .monitor import AdvancedTrainingMonitor
 from .metrics_logger import TrainingMetricsLogger
 from ..utils.process_tracker import process_tracker
+from ..utils.process_watch import process_watch
 
 logger = logging.getLogger(__name__)
 
@@ -370,49 +371,50 @@ class ContinuedPretrainer:
                 bufsize=1,
                 universal_newlines=True,
             )
-            
-            # Initialise before first use inside loop
-            parsed_metrics = None
-            
-            # Define a callback function to process each line
-            def process_line(raw_line, stripped_line):
-                nonlocal parsed_metrics
+            with process_watch.watching(process, 'training', output_dir=str(self.config.output_dir),
+                                        log_file=metrics_logger.log_file):
+                # Initialise before first use inside loop
+                parsed_metrics = None
+            
+                # Define a callback function to process each line
+                def process_line(raw_line, stripped_line):
+                    nonlocal parsed_metrics
                 
-                # Write raw line with original formatting to file
-                raw_log_fh.write(raw_line)
-                raw_log_fh.flush()
+                    # Write raw line with original formatting to file
+                    raw_log_fh.write(raw_line)
+                    raw_log_fh.flush()
                 
-                logger.info(f"MLX-LM: {stripped_line}")
+                    logger.info(f"MLX-LM: {stripped_line}")
                 
-                # Parse and log metrics using enhanced logger
-                parsed_metrics = metrics_logger.parse_and_log_line(stripped_line)
-                if parsed_metrics:
-                    logger.info(f"📊 Captured metrics for iteration {parsed_metrics.iteration}")
+                    # Parse and log metrics using enhanced logger
+                    parsed_metrics = metrics_logger.parse_and_log_line(stripped_line)
+                    if parsed_metrics:
+                        logger.info(f"📊 Captured metrics for iteration {parsed_metrics.iteration}")
                     
-                    # Always log training metrics (per-iteration). Validation loss may be None.
-                    self.monitor.log_metrics(
-                        parsed_metrics.iteration,
-                        parsed_metrics.train_loss or 0.0,
-                        parsed_metrics.val_loss,  # can be None
-                        parsed_metrics.learning_rate or self.config.learning_rate,
-                        parsed_metrics.tokens_per_sec or 0.0,
-                        parsed_metrics.peak_memory_gb or 0.0,
-                    )
+                        # Always log training metrics (per-iteration). Validation loss may be None.
+                        self.monitor.log_metrics(
+                            parsed_metrics.iteration,
+                            parsed_metrics.train_loss or 0.0,
+                            parsed_metrics.val_loss,  # can be None
+                            parsed_metrics.learning_rate or self.config.learning_rate,
+                            parsed_metrics.tokens_per_sec or 0.0,
+                            parsed_metrics.peak_memory_gb or 0.0,
+                        )
                     
-                    # Only evaluate early-stopping when a validation value is available
-                    if parsed_metrics.val_loss is not None and self.monitor.should_stop_early(parsed_metrics.val_loss):
-                        logger.warning("🛑 Stopping training early")
-                        process.terminate()
-            
-            # Use the safe stream parser from the metrics logger
-            thread, output_queue, stop_event = metrics_logger.parse_stream_safely(
-                process.stdout, 
-                callback=process_line
-            )
-            
-            # Wait for the process to complete
-            while process.poll() is None:
-                time.sleep(0.1)
+                        # Only evaluate early-stopping when a validation value is available
+                        if parsed_metrics.val_loss is not None and self.monitor.should_stop_early(parsed_metrics.val_loss):
+                            logger.warning("🛑 Stopping training early")
+                            process.terminate()
+            
+                # Use the safe stream parser from the metrics logger
+                thread, output_queue, stop_event = metrics_logger.parse_stream_safely(
+                    process.stdout, 
+                    callback=process_line
+                )
+            
+                # Wait for the process to complete
+                while process.poll() is None:
+                    time.sleep(0.1)
                 
             # Stop the reader thread
             stop_event.set()
@@ -556,17 +558,23 @@ class ContinuedPretrainer:
             
             # Track the process for cleanup
             process_tracker.track_process(self._training_process)
+            process_watch.register(self._training_process, 'training', output_dir=str(config.output_dir))
             
             # Set training active flag
             self._is_training_active = True
             
-            # Start output monitor thread
+            # Start output monitor thread, which unregisters the process when it exits
             self._should_stop_monitor = False
-            self._output_monitor_thread = threading.Thread(
-                target=self._monitor_output,
-                daemon=True
-            )
-            self._output_monitor_thread.start()
+            try:
+                self._output_monitor_thread = threading.Thread(
+                    target=self._monitor_output,
+                    daemon=True
+                )
+                self._output_monitor_thread.start()
+            except Exception:
+                self._is_training_active = False
+                process_watch.unregister(self._training_process, 'training')
+                raise
             
             logger.info(f"Training started with PID {self._training_process.pid}")
             
@@ -656,6 +664,7 @@ class ContinuedPretrainer:
             logger.error(f"Error monitoring training output: {e}")
         finally:
             self._is_training_active = False
+            process_watch.unregister(self._training_process, 'training')
     
     def stop_training(self):
         """Stop the training process"""
@@ -692,6 +701,8 @@ class ContinuedPretrainer:
                     process_tracker.untrack_process(self._training_process)
                 except Exception as e:
                     logger.error(f"Error terminating tracked process: {e}")
+                finally:
+                    process_watch.unregister(self._training_process, 'training')
             
             # Find and terminate any MLX training processes
             import psutil
@@ -761,33 +772,12 @@ class ContinuedPretrainer:
         return False
     
     def _check_mlx_processes_running(self):
-        """Check if any MLX training processes are actually running
+        """Check if any MLX training, fuse or convert processes are actually running
         
         Returns:
-            bool: True if MLX training processes are found, False otherwise
+            bool: True if MLX processes are found, False otherwise
         """
-        import psutil
-        
-        try:
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                try:
-                    if proc.info['cmdline']:
-                        cmdline = ' '.join(proc.info['cmdline'])
-                        # Look for actual MLX training commands
-                        if any(pattern in cmdline for pattern in [
-                            'mlx_lm.lora',      # MLX LoRA training
-                            'mlx_lm.fuse',      # MLX model fusion
-                            'mlx-lm',           # MLX-LM package calls
-                            'mlx_lm',           # MLX-LM package calls
-                        ]):
-                            logger.info(f"Found active MLX process: PID {proc.info['pid']}, CMD: {cmdline}")
-                            return True
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    continue
-        except Exception as e:
-            logger.warning(f"Error checking MLX processes: {e}")
-        
-        return False
+        return process_watch.is_active()
 
     def _find_active_training_log(self):
         """Find the most recent training log file that corresponds to actual running MLX processes
@@ -800,6 +790,11 @@ class ContinuedPretrainer:
             logger.info("No MLX processes running - no active training")
             return None
         
+        # The training process registers its log when it starts
+        run = process_watch.active_training()
+        if run and run.get('log_file') and os.path.exists(run['log_file']):
+            return run['log_file']
+        
         import glob
         from pathlib import Path
         from datetime import datetime
@@ -2,6 +2,16 @@
 Utilities for model architecture detection and formatting.
 """
 
-from .model_architectures import ModelArchitectureManager
+_EXPORTS = {"ModelArchitectureManager": ".model_architectures"}
 
-__all__ = ['ModelArchitectureManager'] 
\ No newline at end of file
+__all__ = ['ModelArchitectureManager'] 
+
+
+def __getattr__(name):
+    # Imported on first access, so that importing one utility does not import the others
+    if name in _EXPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,141 @@
 """
 Model Architecture Manager for handling different LLM chat templates and formatting.
+
+Architecture and instruct/base detection are resolved once per model name.
+Each architecture's chat template is compiled into a PromptFormatter that
+remembers the formatted text of recent conversations, so formatting the
+next turn of a chat only formats the messages that were added.
 """
 
 import json
 import os
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Formatted conversation prefixes remembered per architecture
+FORMAT_CACHE_SIZE = 256
+
+
+class PromptFormatter:
+    """The chat template of one architecture, compiled into per-role templates."""
+    
+    def __init__(self, architecture: str, config: Dict[str, Any], cache_size: int = FORMAT_CACHE_SIZE):
+        """
+        Compile the formatter.
+        
+        Args:
+            architecture: The architecture name
+            config: The architecture configuration
+            cache_size: Number of formatted conversation prefixes to remember
+        """
+        self.architecture = architecture
+        self.system_as_assistant = config.get("system_as_assistant", False)
+        
+        system_prefix = config.get("system_prefix", "")
+        system_suffix = config.get("system_suffix", "")
+        user_prefix = config.get("user_prefix", "")
+        user_suffix = config.get("user_suffix", "")
+        assistant_prefix = config.get("assistant_prefix", "")
+        assistant_suffix = config.get("assistant_suffix", "")
+        
+        if system_prefix or system_suffix:
+            # Architecture has explicit system message support
+            system = (system_prefix, system_suffix)
+        elif self.system_as_assistant:
+            # Architecture uses assistant/model turns for system messages (e.g., Gemma)
+            system = (f"{assistant_prefix}System: ", assistant_suffix)
+        elif architecture == "deepseek":
+            # DeepSeek: No explicit system support, prepend to conversation
+            system = ("System: ", "\n\n")
+        else:
+            # Generic fallback: treat as user message with system prefix
+            system = (f"{user_prefix}System: ", user_suffix)
+        
+        self._templates = {
+            "system": system,
+            "user": (user_prefix, user_suffix),
+            "assistant": (assistant_prefix, assistant_suffix)
+        }
+        self.generation_prompt = assistant_prefix
+        # End-of-turn markers: the end of the assistant turn, and the start of
+        # the next user turn that a model running on past its turn writes
+        self.stop_sequences = [s for s in dict.fromkeys((assistant_suffix.strip(), user_prefix.strip())) if s]
+        
+        self.cache_size = cache_size
+        self._history = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'formatted_messages': 0, 'reused_messages': 0}
+    
+    def format_message(self, message: Dict[str, str]) -> str:
+        """Format one message (messages with unknown roles are dropped)."""
+        template = self._templates.get(message.get("role", ""))
+        if template is None:
+            return ""
+        return f"{template[0]}{message.get('content', '')}{template[1]}"
+    
+    def format(self, messages: List[Dict[str, str]], add_generation_prompt: bool = True) -> str:
+        """
+        Format a conversation, reusing the formatted text of its longest known prefix.
+        
+        Args:
+            messages: List of message dictionaries with 'role' and 'content' keys
+            add_generation_prompt: Append the prefix of the next assistant turn
+            
+        Returns:
+            Formatted prompt string
+        """
+        keys = self._prefix_keys(messages)
+        
+        text, start = "", 0
+        with self._lock:
+            for i in range(len(keys) - 1, -1, -1):
+                cached = self._history.get(keys[i])
+                if cached is not None:
+                    self._history.move_to_end(keys[i])
+                    text, start = cached, i + 1
+                    break
+        
+        if start < len(messages):
+            text += "".join(self.format_message(message) for message in messages[start:])
+        
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['reused_messages'] += start
+            self._stats['formatted_messages'] += len(messages) - start
+            if keys and start < len(keys):
+                self._history[keys[-1]] = text
+                while len(self._history) > self.cache_size:
+                    self._history.popitem(last=False)
+        
+        return text + self.generation_prompt if add_generation_prompt else text
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get formatting statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_conversations'] = len(self._history)
+        return stats
+    
+    @staticmethod
+    def _prefix_keys(messages: List[Dict[str, str]]) -> List[bytes]:
+        """Digest of every prefix of the conversation, chained so each message is hashed once."""
+        keys = []
+        digest = b""
+        for message in messages:
+            h = hashlib.blake2b(digest, digest_size=16)
+            h.update(str(message.get("role", "")).encode("utf-8", "surrogatepass"))
+            h.update(b"\0")
+            h.update(str(message.get("content", "")).encode("utf-8", "surrogatepass"))
+            digest = h.digest()
+            keys.append(digest)
+        return keys
+
+
 class ModelArchitectureManager:
     """Manages model architectures and provides formatting capabilities."""
     
@@ -23,6 +150,13 @@ class ModelArchitectureManager:
         self.architectures = {}
         self.message_formats = {}
         self.tool_formats = {}
+        
+        # Detection results and compiled formatters, resolved once per name
+        self._patterns: List[Tuple[str, str]] = []
+        self._architecture_cache: Dict[str, str] = {}
+        self._instruct_cache: Dict[str, bool] = {}
+        self._formatters: Dict[str, PromptFormatter] = {}
+        self._lock = threading.Lock()
         self._load_config()
     
     def _load_config(self):
@@ -36,6 +170,7 @@ class ModelArchitectureManager:
             self.tool_formats = config.get("tool_formats", {})
             
             logger.info(f"Loaded {len(self.architectures)} model architectures from {self.config_path}")
+            self._compile_patterns()
             
         except FileNotFoundError:
             logger.error(f"Model architecture config file not found: {self.config_path}")
@@ -67,6 +202,20 @@ class ModelArchitectureManager:
             "basic": "Simple role: content format (e.g., 'User:...')."
         }
         self.tool_formats = {}
+        self._compile_patterns()
+    
+    def _compile_patterns(self):
+        """Lower-case the detection patterns once and drop cached results."""
+        self._patterns = [
+            (arch_name, pattern.lower())
+            for arch_name, arch_config in self.architectures.items()
+            if arch_name != "generic"  # Skip generic, it's the fallback
+            for pattern in arch_config.get("patterns", [])
+        ]
+        with self._lock:
+            self._architecture_cache.clear()
+            self._instruct_cache.clear()
+            self._formatters.clear()
     
     def detect_architecture(self, model_name: str) -> str:
         """
@@ -81,22 +230,26 @@ class ModelArchitectureManager:
         if not model_name:
             return "generic"
         
+        architecture = self._architecture_cache.get(model_name)
+        if architecture is not None:
+            return architecture
+        
         model_name_lower = model_name.lower()
+        architecture = "generic"
         
         # Check each architecture's patterns
-        for arch_name, arch_config in self.architectures.items():
-            if arch_name == "generic":
-                continue  # Skip generic, it's the fallback
-                
-            patterns = arch_config.get("patterns", [])
-            for pattern in patterns:
-                if pattern.lower() in model_name_lower:
-                    logger.info(f"Detected architecture '{arch_name}' for model '{model_name}' (pattern: '{pattern}')")
-                    return arch_name
-        
-        # No specific architecture detected, use generic
-        logger.info(f"No specific architecture detected for model '{model_name}', using 'generic'")
-        return "generic"
+        for arch_name, pattern in self._patterns:
+            if pattern in model_name_lower:
+                logger.info(f"Detected architecture '{arch_name}' for model '{model_name}' (pattern: '{pattern}')")
+                architecture = arch_name
+                break
+        else:
+            # No specific architecture detected, use generic
+            logger.info(f"No specific architecture detected for model '{model_name}', using 'generic'")
+        
+        with self._lock:
+            self._architecture_cache[model_name] = architecture
+        return architecture
     
     def is_instruct_model(self, model_name: str) -> bool:
         """
@@ -111,6 +264,15 @@ class ModelArchitectureManager:
         if not model_name:
             return False
         
+        is_instruct = self._instruct_cache.get(model_name)
+        if is_instruct is None:
+            is_instruct = self._detect_instruct(model_name)
+            with self._lock:
+                self._instruct_cache[model_name] = is_instruct
+        return is_instruct
+    
+    def _detect_instruct(self, model_name: str) -> bool:
+        """Match the model name against the base and instruct patterns."""
         model_name_lower = model_name.lower()
         
         # Special handling for Qwen models: they are instruct by default EXCEPT if "base" is in the name
@@ -159,6 +321,33 @@ class ModelArchitectureManager:
         """
         return self.architectures.get(architecture, self.architectures.get("generic", {}))
     
+    def get_formatter(self, model_name: str) -> PromptFormatter:
+        """
+        Get the compiled formatter for a model's architecture.
+        
+        Args:
+            model_name: The name/path of the model
+            
+        Returns:
+            The PromptFormatter shared by all models of the architecture
+        """
+        architecture = self.detect_architecture(model_name)
+        formatter = self._formatters.get(architecture)
+        if formatter is None:
+            with self._lock:
+                formatter = self._formatters.get(architecture)
+                if formatter is None:
+                    formatter = PromptFormatter(architecture, self.get_architecture_config(architecture))
+                    self._formatters[architecture] = formatter
+        return formatter
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get detection and formatting cache statistics."""
+        return {
+            'detected_models': len(self._architecture_cache),
+            'formatters': {name: formatter.get_stats() for name, formatter in list(self._formatters.items())}
+        }
+    
     def format_messages(self, messages: List[Dict[str, str]], model_name: str) -> str:
         """
         Format a list of messages according to the model's architecture.
@@ -170,57 +359,11 @@ class ModelArchitectureManager:
         Returns:
             Formatted prompt string ready for the model
         """
-        architecture = self.detect_architecture(model_name)
-        arch_config = self.get_architecture_config(architecture)
-        
-        logger.info(f"Formatting {len(messages)} messages for architecture '{architecture}'")
+        formatter = self.get_formatter(model_name)
+        formatted_prompt = formatter.format(messages)
         
-        # Get the formatting tokens
-        system_prefix = arch_config.get("system_prefix", "")
-        system_suffix = arch_config.get("system_suffix", "")
-        user_prefix = arch_config.get("user_prefix", "")
-        user_suffix = arch_config.get("user_suffix", "")
-        assistant_prefix = arch_config.get("assistant_prefix", "")
-        assistant_suffix = arch_config.get("assistant_suffix", "")
-        
-        formatted_parts = []
-        
-        # Process each message
-        for message in messages:
-            role = message.get("role", "")
-            content = message.get("content", "")
-            
-            if role == "system":
-                if system_prefix or system_suffix:
-                    # Architecture has explicit system message support
-                    formatted_parts.append(f"{system_prefix}{content}{system_suffix}")
-                else:
-                    # Special handling for architectures without explicit system support
-                    if arch_config.get("system_as_assistant", False):
-                        # Architecture uses assistant/model turns for system messages (e.g., Gemma)
-                        # This is a "trick" to make models follow system instructions
-                        formatted_parts.append(f"{assistant_prefix}System: {content}{assistant_suffix}")
-                        logger.debug(f"Formatting system message as assistant turn for {architecture}")
-                    elif architecture == "deepseek":
-                        # DeepSeek: No explicit system support, prepend to conversation
-                        formatted_parts.append(f"System: {content}\n\n")
-                    else:
-                        # Generic fallback: treat as user message with system prefix
-                        formatted_parts.append(f"{user_prefix}System: {content}{user_suffix}")
-                        
-            elif role == "user":
-                formatted_parts.append(f"{user_prefix}{content}{user_suffix}")
-                
-            elif role == "assistant":
-                formatted_parts.append(f"{assistant_prefix}{content}{assistant_suffix}")
-        
-        # Join all parts
-        formatted_prompt = "".join(formatted_parts)
-        
-        # Add generation prompt for the next assistant turn
-        formatted_prompt += assistant_prefix
-        
-        logger.debug(f"Formatted prompt preview: {formatted_prompt[:200]}...")
+        logger.debug(f"Formatted {len(messages)} messages for architecture '{formatter.architecture}': "
+                     f"{formatted_prompt[:200]}...")
         return formatted_prompt
     
     def format_single_turn(self, prompt: str, system_prompt: str, model_name: str) -> str:
@@ -244,6 +387,18 @@ class ModelArchitectureManager:
         
         return self.format_messages(messages, model_name)
     
+    def get_stop_sequences(self, model_name: str) -> List[str]:
+        """
+        Get the end-of-turn sequences at which generation for an instruct model should stop.
+        
+        Args:
+            model_name: The name/path of the model
+            
+        Returns:
+            List of stop sequences (may be empty)
+        """
+        return list(self.get_formatter(model_name).stop_sequences)
+    
     def get_supported_architectures(self) -> List[str]:
         """Get a list of all supported architecture names."""
         return list(self.architectures.keys())
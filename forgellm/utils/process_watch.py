@@ -0,0 +1,256 @@
+"""
+Process Watch - Shared, cached view of the MLX subprocesses spawned by ForgeLLM
+
+Training, fuse and convert subprocesses are registered when they are spawned:
+the spawning process writes a PID file (``<kind>-<pid>.json``) with the
+process's start time and what it is working on (output directory, training
+log). Every ForgeLLM process - the web interface, the training runner, the
+CLI - writes to the same directory, so any of them can see the others' runs.
+
+The dashboard routes and the training monitors ask whether training is
+active on every request or loop tick. Instead of walking the whole process
+table and joining every command line, they query the watch: it re-checks the
+registered PIDs at most every ``REFRESH_INTERVAL`` seconds and answers from
+that snapshot in between.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Kinds of MLX subprocesses
+TRAINING = 'training'
+FUSE = 'fuse'
+CONVERT = 'convert'
+KINDS = (TRAINING, FUSE, CONVERT)
+
+# Seconds during which queries reuse the last check of the registered PIDs
+REFRESH_INTERVAL = 2.0
+
+# Directory of the PID files (shared by every ForgeLLM process of the user)
+DEFAULT_PID_DIR = os.path.join(os.path.expanduser('~/.cache/forgellm'), 'processes')
+
+# Start times within this many seconds belong to the same process (PID reuse check)
+_CREATE_TIME_TOLERANCE = 0.01
+
+
+class ProcessWatch:
+    """
+    Tracks the MLX subprocesses of ForgeLLM by PID.
+
+    Thread-safe; queries are answered from a snapshot refreshed at most every
+    refresh_interval seconds.
+    """
+
+    def __init__(self, pid_dir: Optional[str] = None, refresh_interval: float = REFRESH_INTERVAL):
+        self.pid_dir = pid_dir or os.environ.get('FORGELLM_PID_DIR', DEFAULT_PID_DIR)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._active: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in KINDS}
+        self._last_refresh = None
+        # PID file name -> entry, for the processes registered here
+        self._own: Dict[str, Dict[str, Any]] = {}
+        # PID file name -> (mtime_ns, entry), so each file of another process is read once
+        self._cache: Dict[str, tuple] = {}
+        # Processes spawned by this process, checked with poll() instead of psutil
+        self._children: Dict[int, Any] = {}
+
+    def register(self, process, kind: str, **info) -> Optional[Dict[str, Any]]:
+        """
+        Register a spawned subprocess.
+
+        Args:
+            process: The subprocess.Popen object (or a PID)
+            kind: One of 'training', 'fuse', 'convert'
+            **info: What the process works on (output_dir, log_file, ...)
+
+        Returns:
+            The registered entry, or None if the process could not be registered
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown process kind '{kind}'")
+        pid = process if isinstance(process, int) else process.pid
+        try:
+            create_time = psutil.Process(pid).create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            create_time = None
+
+        entry = {
+            'pid': pid,
+            'kind': kind,
+            'create_time': create_time,
+            'started': datetime.now().isoformat(),
+            'parent_pid': os.getpid(),
+            **info
+        }
+        try:
+            os.makedirs(self.pid_dir, exist_ok=True)
+            path = self._pid_file(kind, pid)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(entry, f)
+            os.replace(path + '.tmp', path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not write PID file for {kind} process {pid}: {e}")
+
+        with self._lock:
+            if not isinstance(process, int):
+                self._children[pid] = process
+            self._own[os.path.basename(self._pid_file(kind, pid))] = entry
+            self._last_refresh = None
+        logger.debug(f"Watching {kind} process PID {pid}")
+        return entry
+
+    def unregister(self, process, kind: Optional[str] = None) -> None:
+        """Forget a subprocess (when it has exited)."""
+        pid = process if isinstance(process, int) else process.pid
+        with self._lock:
+            for k in ([kind] if kind else KINDS):
+                self._own.pop(os.path.basename(self._pid_file(k, pid)), None)
+                try:
+                    os.remove(self._pid_file(k, pid))
+                except OSError:
+                    pass
+            self._children.pop(pid, None)
+            self._last_refresh = None
+
+    @contextmanager
+    def watching(self, process, kind: str, **info):
+        """Register a subprocess for the duration of a with block."""
+        self.register(process, kind, **info)
+        try:
+            yield process
+        finally:
+            self.unregister(process, kind)
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Re-check the registered processes.
+
+        Args:
+            force: Refresh even if the last refresh is more recent than refresh_interval
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None and now - self._last_refresh < self.refresh_interval:
+                return
+
+            try:
+                names = [n for n in os.listdir(self.pid_dir) if n.endswith('.json')]
+            except OSError:
+                names = []
+            # Entries registered here are known even if their PID file could not be written
+            names = set(names) | set(self._own)
+
+            active = {kind: [] for kind in KINDS}
+            cache = {}
+            for name in names:
+                entry = self._own.get(name)
+                if entry is None:
+                    entry = self._read(name, cache)
+                    if entry is None:
+                        continue
+                if not self._is_alive(entry):
+                    self._remove(name, entry)
+                    continue
+                if entry.get('kind') in active:
+                    active[entry['kind']].append(entry)
+
+            for entries in active.values():
+                entries.sort(key=lambda e: e.get('started') or '', reverse=True)
+            self._cache = cache
+            self._active = active
+            self._last_refresh = now
+
+    def _pid_file(self, kind: str, pid: int) -> str:
+        return os.path.join(self.pid_dir, f'{kind}-{pid}.json')
+
+    def _read(self, name: str, cache: Dict[str, tuple]) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.pid_dir, name)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == mtime_ns:
+                entry = cached[1]
+            else:
+                with open(path, 'r') as f:
+                    entry = json.load(f)
+                int(entry['pid'])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Removed, or not a PID file of ours
+            return None
+        cache[name] = (mtime_ns, entry)
+        return entry
+
+    def _is_alive(self, entry: Dict[str, Any]) -> bool:
+        pid = entry['pid']
+        child = self._children.get(pid)
+        if child is not None:
+            return child.poll() is None
+        try:
+            proc = psutil.Process(pid)
+            if proc.status() == psutil.STATUS_ZOMBIE:
+                return False
+            create_time = entry.get('create_time')
+            # A different process that got the same PID
+            return create_time is None or abs(proc.create_time() - create_time) < _CREATE_TIME_TOLERANCE
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return False
+        except psutil.AccessDenied:
+            return True
+
+    def _remove(self, name: str, entry: Dict[str, Any]) -> None:
+        self._own.pop(name, None)
+        self._children.pop(entry['pid'], None)
+        try:
+            os.remove(os.path.join(self.pid_dir, name))
+        except OSError:
+            pass
+
+    def active_processes(self, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the running processes, most recently started first within each kind.
+
+        Args:
+            kinds: Kinds to include (default: all)
+        """
+        self.refresh()
+        active = self._active
+        return [dict(entry) for kind in (kinds or KINDS) for entry in active.get(kind, ())]
+
+    def is_active(self, kinds: Optional[Iterable[str]] = None) -> bool:
+        """Whether any MLX subprocess (of the given kinds) is running."""
+        self.refresh()
+        active = self._active
+        return any(active.get(kind) for kind in (kinds or KINDS))
+
+    def is_training_active(self) -> bool:
+        """Whether a training process is running."""
+        return self.is_active((TRAINING,))
+
+    def active_training(self) -> Optional[Dict[str, Any]]:
+        """
+        Get the current training run.
+
+        Returns:
+            The entry of the most recently started training process, preferring
+            one that reported its training log, or None if no training is running
+        """
+        self.refresh()
+        runs = self._active[TRAINING]
+        for run in runs:
+            if run.get('log_file'):
+                return dict(run)
+        return dict(runs[0]) if runs else None
+
+
+# Global instance
+process_watch = ProcessWatch()
@@ -0,0 +1,158 @@
+"""
+Startup profiling for the forgellm entry points.
+
+``forgellm --profile-startup <command>`` (or ``forgellm <command>
+--profile-startup``) times every module imported by the main thread from
+the moment the entry point starts, and prints a breakdown when the command
+is ready: the model server when it starts serving, the web interface when
+its app is created, and CLI commands when they exit.
+
+Imports are timed by wrapping ``builtins.__import__``: each module gets its
+cumulative time (including the modules it imports) and its own time, and
+the own times are summed per top-level package.
+"""
+
+import sys
+import time
+import atexit
+import builtins
+import threading
+from typing import Dict, List, Optional
+
+FLAG = '--profile-startup'
+
+# Rows printed in each table of the report
+TOP_N = 15
+
+_PROFILER = None
+
+
+class StartupProfiler:
+    """Times imports and startup phases of the main thread."""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        # module -> [cumulative seconds, own seconds]
+        self.modules: Dict[str, List[float]] = {}
+        self.phases: List[tuple] = []
+        self.reported = False
+        self._stack: List[float] = []
+        self._original_import = None
+
+    def start(self):
+        """Start timing imports."""
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def stop(self):
+        """Stop timing imports."""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if threading.current_thread() is not threading.main_thread():
+            return original(name, globals, locals, fromlist, level)
+        module_name = _resolve(name, globals, level)
+        if module_name is None or module_name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.modules[module_name] = [elapsed, elapsed - children]
+
+    def mark(self, phase: str):
+        """Record the time at which a startup phase ended."""
+        self.phases.append((phase, time.perf_counter() - self.start_time))
+
+    def report(self, ready: str, file=None):
+        """Print the import-time breakdown once."""
+        if self.reported:
+            return
+        self.reported = True
+        self.stop()
+        file = file or sys.stderr
+        total = time.perf_counter() - self.start_time
+        imported = sum(own for _, own in self.modules.values())
+
+        packages: Dict[str, List[float]] = {}
+        for module, (_, own) in self.modules.items():
+            package = packages.setdefault(_package(module), [0.0, 0])
+            package[0] += own
+            package[1] += 1
+
+        lines = [f"Startup profile: {ready} after {total * 1000:.0f} ms "
+                 f"({imported * 1000:.0f} ms importing {len(self.modules)} modules)"]
+        for phase, at in self.phases:
+            lines.append(f"  {at * 1000:8.0f} ms  {phase}")
+        lines.append("Import time by package (own time):")
+        for package, (own, count) in sorted(packages.items(), key=lambda p: -p[1][0])[:TOP_N]:
+            lines.append(f"  {own * 1000:8.1f} ms  {package} ({count} modules)")
+        lines.append("Slowest imports (including the modules they import):")
+        slowest = sorted(self.modules.items(), key=lambda m: -m[1][0])[:TOP_N]
+        for module, (cumulative, own) in slowest:
+            lines.append(f"  {cumulative * 1000:8.1f} ms  {module} (own {own * 1000:.1f} ms)")
+        print('\n'.join(lines), file=file, flush=True)
+
+
+def _resolve(name: str, globals: Optional[dict], level: int) -> Optional[str]:
+    """Absolute name of the module an import statement refers to."""
+    if level == 0:
+        return name
+    package = (globals or {}).get('__package__') or ''
+    parts = package.rsplit('.', level - 1)
+    if len(parts) < level:
+        return None
+    base = parts[0]
+    return f"{base}.{name}" if name else base
+
+
+def _package(module: str) -> str:
+    """Group forgellm modules by subpackage and others by distribution."""
+    parts = module.split('.')
+    if parts[0] == 'forgellm' and len(parts) > 1:
+        return '.'.join(parts[:2])
+    return parts[0]
+
+
+def profile_startup_from_argv(argv: Optional[List[str]] = None) -> Optional[StartupProfiler]:
+    """
+    Start profiling if the command line has --profile-startup (which is removed from it).
+
+    The report is printed by mark_ready, or when the process exits.
+    """
+    global _PROFILER
+    argv = sys.argv if argv is None else argv
+    if FLAG not in argv:
+        return None
+    argv.remove(FLAG)
+    if _PROFILER is None:
+        _PROFILER = StartupProfiler().start()
+        atexit.register(_PROFILER.report, 'exit')
+    return _PROFILER
+
+
+def enabled() -> bool:
+    """Whether startup profiling is on in this process."""
+    return _PROFILER is not None
+
+
+def mark(phase: str):
+    """Record the end of a startup phase, if profiling."""
+    if _PROFILER is not None:
+        _PROFILER.mark(phase)
+
+
+def mark_ready(ready: str):
+    """Print the startup profile, if profiling, now that the command is ready."""
+    if _PROFILER is not None:
+        _PROFILER.report(ready)
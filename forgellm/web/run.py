@@ -6,6 +6,7 @@ import os
 import sys
 import logging
 from .app import create_app
+from ..utils import startup_profile
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,8 @@ def run_web_interface(host='0.0.0.0', port=5001, debug=False, static_folder=None
     # Create app
     app = create_app(static_folder=static_folder, template_folder=template_folder)
     
+    startup_profile.mark_ready('web interface ready')
+    
     # Run app
     logger.info(f"Starting web interface on {host}:{port}")
     app.socketio.run(app, host=host, port=port, debug=debug, allow_unsafe_werkzeug=True)
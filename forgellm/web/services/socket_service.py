@@ -11,6 +11,8 @@ from flask_socketio import SocketIO, emit
 from pathlib import Path
 
 from ...training.dashboard import load_training_data, identify_best_checkpoints
+from ...training.metrics_stream import get_metrics_tail
+from ...training.session_index import get_session_index
 
 logger = logging.getLogger(__name__)
 
@@ -239,6 +241,33 @@ def setup_socketio(socketio: SocketIO, app=None):
                 logger.error(f"Error loading training log: {e}")
                 emit('error', {'message': f"Error loading training log: {e}"})
     
+    @socketio.on('request_metrics_delta')
+    def handle_request_metrics_delta(data):
+        """Handle request for the metrics added since a previous delta"""
+        data = data or {}
+        session_id = data.get('session_id')
+        try:
+            log_file = data.get('log_file')
+            if not log_file and session_id:
+                log_file = get_session_index().find_log_file(session_id)
+            if not log_file:
+                emit('error', {'message': f"Training session not found: {session_id}"})
+                return
+            
+            cursor = data.get('cursor')
+            since_iteration = data.get('since_iteration')
+            delta = get_metrics_tail(log_file).delta(
+                since_iteration=int(since_iteration) if since_iteration is not None else None,
+                cursor=int(cursor) if cursor is not None else None
+            )
+            emit('metrics_delta', {
+                'session_id': session_id or os.path.basename(os.path.dirname(log_file)),
+                **delta
+            })
+        except Exception as e:
+            logger.error(f"Error getting metrics delta: {e}")
+            emit('error', {'message': f"Error getting metrics delta: {e}"})
+    
     @socketio.on('start_generation')
     def handle_start_generation(data):
         """Handle start generation"""
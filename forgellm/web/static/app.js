@@ -15,6 +15,7 @@ class TrainingInterface {
         this.promptTokens = 0;       // Track prompt tokens
         this.completionTokens = 0;   // Track completion tokens
         this.conversationTokens = 0; // Track actual conversation content tokens (not cumulative prompt)
+        this.chatSessionId = this.newChatSessionId(); // Lets the model server reuse the KV cache of earlier turns
         this.lastTokensPerSec = null; // Track latest tokens per second
         this.trainingStartTime = null; // Store training start time for timing calculations
         this.markdownEnabled = true; // Enable markdown rendering by default
@@ -23,6 +24,7 @@ class TrainingInterface {
         this.lastCheckpointsUpdate = 0; // Track checkpoint updates
         this.detectedBaseModel = null; // Store auto-detected base model for fusion
         this.isMonitoringPollingActive = false; // Flag to prevent duplicate polling
+        this.chartMaxPoints = 1000;  // Points per chart series; zooming in loads full resolution
         
         // Global folder configuration
         this.globalHuggingFaceFolder = localStorage.getItem('global_huggingface_folder') || '~/.cache/huggingface';
@@ -843,8 +845,13 @@ class TrainingInterface {
             
             console.log('📊 Updating monitoring dashboard');
             
-            // Make the API call
-            const response = await fetch('/api/dashboard/realtime');
+            // Make the API call (without charts if they are already drawn for this run)
+            const live = this.liveCharts;
+            let url = `/api/dashboard/realtime?max_points=${this.chartMaxPoints}`;
+            if (live) {
+                url += `&have_charts=${encodeURIComponent(live.file)}`;
+            }
+            const response = await fetch(url);
             const data = await response.json();
             
             this.isTraining = data.active || false;
@@ -861,9 +868,17 @@ class TrainingInterface {
                 this.updateAllFields(data.current_values, data.config);
                 this.updateTrainingStatus(data);
                 if (data.charts) {
-                    this.renderCharts(data.charts);
+                    this.renderCharts(data.charts, data.training_file);
+                    this.liveCharts = {
+                        file: data.training_file,
+                        session: data.session_id,
+                        cursor: data.metrics_cursor
+                    };
+                } else if (live && live.file === data.training_file) {
+                    await this.appendMetricsDelta();
                 }
             } else {
+                this.liveCharts = null;
                 this.updateTrainingStatus({active: this.isTraining});
             }
             
@@ -1166,7 +1181,7 @@ class TrainingInterface {
             }
             
             // Format size
-            const sizeStr = model.size > 0 ? ` (${model.size}GB)` : '';
+            const sizeStr = model.size == null ? ' (size pending)' : model.size > 0 ? ` (${model.size}GB)` : '';
             
             option.textContent = `${icon}${model.name}${sizeStr}`;
             select.appendChild(option);
@@ -1310,7 +1325,7 @@ class TrainingInterface {
             const response = await fetch('/api/dashboard/historical', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ log_file: logFile })
+                body: JSON.stringify({ log_file: logFile, max_points: this.chartMaxPoints })
             });
             
             console.log('📥 Response status:', response.status);
@@ -1327,7 +1342,7 @@ class TrainingInterface {
                 
                 // Display historical charts and metrics
                 console.log('📈 Displaying historical charts with data:', data);
-                this.displayHistoricalCharts(data);
+                this.displayHistoricalCharts(data, logFile);
                 
                 // Update metrics
                 if (data.summary) {
@@ -1805,7 +1820,7 @@ class TrainingInterface {
         return;
     }
     
-    renderCharts(charts) {
+    renderCharts(charts, logFile = null) {
         // Define chart IDs and their corresponding data in the charts object
         const chartConfigs = [
             { id: 'loss-chart', key: 'loss' },
@@ -1849,6 +1864,10 @@ class TrainingInterface {
                                 responsive: true,
                                 displayModeBar: false
                             });
+                            if (chartData.downsampled && logFile) {
+                                // Load the points left out when zooming in
+                                chartElement.on('plotly_relayout', event => this.loadChartRange(config, logFile, event));
+                            }
                         } catch (error) {
                             console.error(`Error rendering chart ${config.id}:`, error);
                         }
@@ -1862,6 +1881,101 @@ class TrainingInterface {
         });
     }
     
+    async loadChartRange(config, logFile, event) {
+        // Redraw a downsampled chart with the points of the zoomed-in range (or the whole run on zoom out)
+        let range = null;
+        if (event['xaxis.range[0]'] !== undefined) {
+            range = [event['xaxis.range[0]'], event['xaxis.range[1]']];
+        } else if (Array.isArray(event['xaxis.range'])) {
+            range = event['xaxis.range'];
+        } else if (!event['xaxis.autorange']) {
+            return;  // Not a change of the iteration range
+        }
+        
+        const body = { log_file: logFile, max_points: this.chartMaxPoints };
+        if (range) {
+            body.x_min = Math.floor(range[0]);
+            body.x_max = Math.ceil(range[1]);
+        }
+        
+        try {
+            const response = await fetch('/api/dashboard/historical', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+            const data = await response.json();
+            const chartData = data.success && data.charts ? data.charts[config.key] : null;
+            if (!chartData) return;
+            
+            const layout = chartData.layout || {};
+            layout.xaxis = Object.assign({}, layout.xaxis, range ? { range: range } : { autorange: true });
+            Plotly.react(config.id, chartData.data, layout);
+        } catch (error) {
+            console.error(`Error loading range of chart ${config.id}:`, error);
+        }
+    }
+    
+    async appendMetricsDelta() {
+        // Append the metrics logged since the last poll to the live charts. Appended points are
+        // full resolution while the drawn traces may be downsampled to chartMaxPoints, so the
+        // density is mixed until a trace grows a quarter past chartMaxPoints and the charts are
+        // redrawn (downsampled again) by the next poll.
+        const live = this.liveCharts;
+        const response = await fetch(`/api/training/${encodeURIComponent(live.session)}/metrics?cursor=${live.cursor}`);
+        const delta = await response.json();
+        
+        if (!delta.success || delta.reset) {
+            // Already drawn values changed - redraw everything on the next poll
+            this.liveCharts = null;
+            return;
+        }
+        
+        const perplexity = loss => Math.exp(Math.min(loss, 20));  // Capped like the server charts
+        const chartTraces = {
+            'loss-chart': [['Training Loss', 'train_loss'], ['Validation Loss', 'val_loss']],
+            'perplexity-chart': [['Training Perplexity', 'train_loss', perplexity], ['Validation Perplexity', 'val_loss', perplexity]],
+            'lr-chart': [['Learning Rate', 'learning_rate']],
+            'speed-chart': [['Tokens/sec', 'tokens_per_sec'], ['Memory (GB)', 'peak_memory_gb']]
+        };
+        
+        const updates = [];
+        for (const [chartId, traces] of Object.entries(chartTraces)) {
+            const chartElement = document.getElementById(chartId);
+            const update = {x: [], y: [], indices: []};
+            for (const [name, field, transform] of traces) {
+                const series = delta.series[field];
+                if (!series) continue;
+                const index = chartElement && chartElement.data ? chartElement.data.findIndex(trace => trace.name === name) : -1;
+                if (index < 0) {
+                    // A metric without a trace yet (e.g. the first validation loss) - redraw on the next poll
+                    this.liveCharts = null;
+                    return;
+                }
+                update.x.push(series.x);
+                update.y.push(transform ? series.y.map(transform) : series.y);
+                update.indices.push(index);
+            }
+            if (update.indices.length > 0) {
+                updates.push([chartId, update]);
+            }
+        }
+        
+        updates.forEach(([chartId, update]) => {
+            Plotly.extendTraces(chartId, {x: update.x, y: update.y}, update.indices);
+        });
+        live.cursor = delta.cursor;
+        
+        const redrawAt = Math.floor(this.chartMaxPoints * 1.25);
+        const grown = Object.keys(chartTraces).some(chartId => {
+            const chartElement = document.getElementById(chartId);
+            return chartElement && chartElement.data && chartElement.data.some(trace => trace.x && trace.x.length > redrawAt);
+        });
+        if (grown) {
+            this.liveCharts = null;
+        }
+    }
+    
     updateCharts(data) {
         // Update charts with real-time data
         if (!data || data.error) return;
@@ -1945,12 +2059,15 @@ class TrainingInterface {
                 body: JSON.stringify(requestBody)
             });
             
+            const data = await this.waitForModelLoad(await response.json());
+            console.log(`📡 Load response:`, data);
+            
             const endTime = Date.now();
             const duration = endTime - startTime;
             console.log(`⏱️ Model load completed in: ${duration}ms`);
-            
-            const data = await response.json();
-            console.log(`📡 Load response:`, data);
+            if (data.success && data.loading_time === undefined) {
+                data.loading_time = (duration / 1000).toFixed(2);
+            }
             
             if (data.success) {
                 this.modelLoaded = true;
@@ -2010,6 +2127,47 @@ class TrainingInterface {
         }
     }
     
+    async waitForModelLoad(data) {
+        // The load request returns as soon as loading starts; follow the
+        // server status until the model is loaded, showing its progress
+        if (!data.success || !data.loading) {
+            return data;
+        }
+        
+        const loadingMessage = document.getElementById('loading-message');
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 500));
+            
+            const response = await fetch('/api/model/status');
+            const status = await response.json();
+            
+            if (status.loaded) {
+                const progress = status.load_progress;
+                return {
+                    ...data,
+                    loading: false,
+                    loading_time: progress ? progress.elapsed : undefined
+                };
+            }
+            if (status.error) {
+                return { success: false, error: `Model loading failed: ${status.error}` };
+            }
+            if (status.success && !status.is_loading) {
+                return { success: false, error: 'Model loading stopped unexpectedly' };
+            }
+            
+            const progress = status.load_progress;
+            if (loadingMessage && progress && progress.bytes_total) {
+                const eta = progress.eta_seconds !== null ? `, ${Math.ceil(progress.eta_seconds)}s left` : '';
+                loadingMessage.textContent =
+                    `Loading model... ${progress.percent}% ` +
+                    `(${this.formatBytes(Math.max(progress.bytes_loaded, progress.bytes_read))} of ` +
+                    `${this.formatBytes(progress.bytes_total)}, ` +
+                    `${progress.shards_done}/${progress.shards_total} shards${eta})`;
+            }
+        }
+    }
+    
     setLoadingState(loading) {
         const loadButton = document.getElementById('load-model-btn');
         const unloadButton = document.getElementById('unload-model-btn');
@@ -2081,12 +2239,11 @@ class TrainingInterface {
                         
                         if (baseModel) {
                             // Load the adapter with the detected base model
-                            // Use the directory path for MLX-LM (it expects the directory, not the .safetensors file)
-                            const actualAdapterPath = adapterPath.endsWith('.safetensors') ? adapterDir : adapterPath;
+                            // Checkpoint files are sent as-is; the model server applies that checkpoint
+                            const actualAdapterPath = adapterPath;
                             
                             console.log(`🚀 Auto-detected base model: ${baseModel}`);
-                            console.log(`📂 Original adapter selection: ${adapterPath}`);
-                            console.log(`📂 Using adapter directory for MLX-LM: ${actualAdapterPath}`);
+                            console.log(`📂 Adapter selection: ${actualAdapterPath}`);
                             
                             const loadPayload = {
                                 model_name: baseModel,
@@ -2101,7 +2258,7 @@ class TrainingInterface {
                                 body: JSON.stringify(loadPayload)
                             });
                             
-                            const loadData = await loadResponse.json();
+                            const loadData = await this.waitForModelLoad(await loadResponse.json());
                             
                             if (loadData.success) {
                                 this.modelLoaded = true;
@@ -3044,7 +3201,8 @@ ${content.trim()}
                 max_kv_size: maxKvSize || undefined,
                 streaming: streaming,
                 // Add model type hint for backend
-                is_base_model: isBaseModel
+                is_base_model: isBaseModel,
+                session_id: this.chatSessionId
             };
             
             // Only include seed if it's not -1 (random seed)
@@ -3636,13 +3794,13 @@ ${content.trim()}
         }
     }
 
-    displayHistoricalCharts(data) {
+    displayHistoricalCharts(data, logFile = null) {
         console.log('📈 displayHistoricalCharts called with data:', data);
         
         // Update charts with historical data
         if (data.charts) {
             console.log('📊 Rendering charts:', Object.keys(data.charts));
-            this.renderCharts(data.charts);
+            this.renderCharts(data.charts, logFile);
         } else {
             console.log('⚠️ No charts data found in response');
         }
@@ -3895,6 +4053,10 @@ ${content.trim()}
     }
 
     /* ---------- Chat helpers ---------- */
+    newChatSessionId() {
+        return `chat-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+    }
+
     initChatToolbar() {
         const clearBtn = document.getElementById('clear-chat-btn');
         const toggleBtn = document.getElementById('toggle-chat-btn');
@@ -3936,6 +4098,9 @@ ${content.trim()}
             document.getElementById('clear-chat-btn').disabled = true;
             document.getElementById('save-chat-btn').disabled = true;
             
+            // Start a new conversation (and prompt cache session)
+            this.chatSessionId = this.newChatSessionId();
+            
             // Reset all token counters
             this.currentTokenCount = 0;
             this.promptTokens = 0;
@@ -1,6 +1,8 @@
 // COMPARE TAB - USING PLOTLY (SAME AS MONITORING TAB)
 let selectedSessions = new Map();
 let hoveredSessionId = null; // Track which session is currently being hovered
+// Points per chart series requested from the server (downsampling keeps the first, last, lowest and highest values)
+const CHART_MAX_POINTS = 1000;
 
 // NEW: Centralized Session Data Manager
 class SessionDataManager {
@@ -39,7 +41,7 @@ class SessionDataManager {
             const response = await fetch(`/api/dashboard/historical`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ log_file: session.log_file })
+                body: JSON.stringify({ log_file: session.log_file, max_points: CHART_MAX_POINTS })
             });
             const sessionData = await response.json();
 
@@ -1458,7 +1460,7 @@ async function getBestCheckpointIteration(sessionId) {
         const response = await fetch(`/api/dashboard/historical`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ log_file: session.log_file })
+            body: JSON.stringify({ log_file: session.log_file, max_points: CHART_MAX_POINTS })
         });
         
         const sessionData = await response.json();
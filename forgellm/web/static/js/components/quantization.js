@@ -268,7 +268,7 @@ class QuantizationComponent {
             }
             
             // Format size
-            const sizeStr = model.size > 0 ? ` (${model.size}GB)` : '';
+            const sizeStr = model.size == null ? ' (size pending)' : model.size > 0 ? ` (${model.size}GB)` : '';
             
             option.textContent = `${icon}${model.name}${sizeStr}`;
             select.appendChild(option);
@@ -606,7 +606,7 @@ class QuantizationComponent {
                                     ${baseName}
                                 </h6>
                                 <div class="d-flex flex-wrap gap-2 mb-2">
-                                    <span class="badge bg-primary">${model.size} GB</span>
+                                    <span class="badge bg-primary">${model.size != null ? `${model.size} GB` : 'Size pending'}</span>
                                     <span class="badge bg-info">${model.bits}-bit</span>
                                     <span class="badge bg-secondary">Group ${model.group_size}</span>
                                 </div>
@@ -10,6 +10,7 @@ class SocketService {
             disconnect: [],
             training_update: [],
             training_finished: [],
+            metrics_delta: [],
             error: []
         };
     }
@@ -94,6 +95,16 @@ class SocketService {
         console.log('🚫 Socket loadTrainingLog disabled - using HTTP API');
     }
 
+    /**
+     * Request the metrics of a session added since a previous delta
+     * DISABLED - Using HTTP API approach instead (/api/training/<session_id>/metrics)
+     * @param {string} sessionId - Training session ID
+     * @param {number} cursor - Cursor of the previous metrics_delta
+     */
+    requestMetricsDelta(sessionId, cursor) {
+        console.log('🚫 Socket requestMetricsDelta disabled - using HTTP API');
+    }
+
     /**
      * Start text generation
      * DISABLED - Using HTTP API approach instead
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Tests for swapping adapters into a resident model.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model, build_tiny_adapter
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.adapters import AdapterSwapper, AdapterSwapError, resolve_adapter
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.model_pool import ResidentModel
+from forgellm.server.prompt_cache import PromptCacheStore
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestAdapterSwap(unittest.TestCase):
+    """Test cases for AdapterSwapper and ResidentModel.swap_adapter."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.model_dir = build_tiny_model(os.path.join(cls.tmp_dir, "model"))
+        cls.adapter_dir = build_tiny_adapter(cls.model_dir, os.path.join(cls.tmp_dir, "lora"))
+        cls.dora_dir = build_tiny_adapter(cls.model_dir, os.path.join(cls.tmp_dir, "dora"),
+                                          rank=2, fine_tune_type="dora")
+        cls.checkpoint = os.path.join(cls.adapter_dir, "0000100_adapters.safetensors")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def _generate(self, model, tokenizer):
+        engine = BatchEngine(model, tokenizer)
+        engine.start()
+        try:
+            request = engine.submit(GenerationRequest(tokenizer.encode("the quick brown fox"), max_tokens=8))
+            return list(request.tokens(timeout=30))
+        finally:
+            engine.stop()
+
+    def _reference(self, adapter_path=None):
+        import mlx.core as mx
+
+        model, tokenizer = load(self.model_dir, adapter_path=adapter_path)
+        mx.eval(model.parameters())
+        return self._generate(model, tokenizer)
+
+    def test_resolve_adapter(self):
+        self.assertEqual(resolve_adapter(None), (None, None))
+        self.assertEqual(resolve_adapter(self.adapter_dir),
+                         (self.adapter_dir, os.path.join(self.adapter_dir, "adapters.safetensors")))
+        self.assertEqual(resolve_adapter(self.checkpoint), (self.adapter_dir, self.checkpoint))
+
+    def test_swap_matches_fresh_load(self):
+        model, tokenizer = load(self.model_dir)
+        swapper = AdapterSwapper(model)
+        base = self._generate(model, tokenizer)
+
+        swapper.apply(self.adapter_dir)
+        self.assertEqual(self._generate(model, tokenizer), self._reference(self.adapter_dir))
+
+        swapper.apply(self.dora_dir)
+        self.assertEqual(self._generate(model, tokenizer), self._reference(self.dora_dir))
+
+        swapper.apply(None)
+        self.assertEqual(self._generate(model, tokenizer), base)
+
+    def test_checkpoint_file_is_applied(self):
+        model, tokenizer = load(self.model_dir)
+        swapper = AdapterSwapper(model)
+        swapper.apply(self.adapter_dir)
+        final = self._generate(model, tokenizer)
+
+        swapper.apply(self.checkpoint)
+        self.assertEqual(swapper.adapter_path, self.checkpoint)
+        self.assertNotEqual(self._generate(model, tokenizer), final)
+
+    def test_resident_swap_waits_for_batch_and_clears_prompt_cache(self):
+        model, tokenizer = load(self.model_dir)
+        store = PromptCacheStore()
+        engine = BatchEngine(model, tokenizer, prompt_cache=store)
+        engine.start()
+        resident = ResidentModel("tiny", None, model, tokenizer, engine=engine, prompt_cache=store)
+        try:
+            prompt = tokenizer.encode("the quick brown fox")
+            running = engine.submit(GenerationRequest(prompt, max_tokens=16))
+            resident.swap_adapter(self.adapter_dir)
+
+            # The request submitted before the swap finished first, with the base weights
+            self.assertTrue(running.finished)
+            self.assertEqual(resident.adapter_path, self.adapter_dir)
+            self.assertEqual(store.get_stats()['entries'], 0)
+
+            request = engine.submit(GenerationRequest(prompt, max_tokens=8))
+            self.assertEqual(list(request.tokens(timeout=30)), self._reference(self.adapter_dir))
+        finally:
+            engine.stop()
+
+    def test_incompatible_adapter_leaves_model_unchanged(self):
+        model, tokenizer = load(self.model_dir)
+        resident = ResidentModel("tiny", None, model, tokenizer)
+        resident.swap_adapter(self.adapter_dir)
+        before = self._generate(model, tokenizer)
+
+        broken_dir = os.path.join(self.tmp_dir, "broken")
+        shutil.copytree(self.dora_dir, broken_dir, dirs_exist_ok=True)
+        shutil.copy(os.path.join(self.adapter_dir, "adapters.safetensors"), broken_dir)
+        with self.assertRaises(AdapterSwapError):
+            resident.swap_adapter(broken_dir)
+
+        self.assertEqual(resident.adapter_path, self.adapter_dir)
+        self.assertEqual(self._generate(model, tokenizer), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Tests for generation admission control in the model server.
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.server.admission import AdmissionController, QueueFullError, QueueTimeoutError
+
+
+class TestAdmissionController(unittest.TestCase):
+    """Test cases for the bounded generation queue."""
+
+    def _hold_slot(self, controller, started, release):
+        with controller.slot():
+            started.set()
+            release.wait(5)
+
+    def test_free_slot_is_admitted_immediately(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+        with controller.slot() as wait_time:
+            self.assertEqual(wait_time, 0.0)
+            self.assertEqual(controller.get_stats()['active'], 1)
+        self.assertEqual(controller.get_stats()['active'], 0)
+
+    def test_full_queue_is_rejected_with_retry_after(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1)
+        started, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=self._hold_slot, args=(controller, started, release))
+        holder.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(QueueFullError) as ctx:
+                with controller.slot():
+                    pass
+            self.assertEqual(ctx.exception.status_code, 429)
+            self.assertGreaterEqual(ctx.exception.retry_after, 1)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(controller.get_stats()['rejected_total'], 1)
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.2)
+        started, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=self._hold_slot, args=(controller, started, release))
+        holder.start()
+        started.wait(5)
+        try:
+            with self.assertRaises(QueueTimeoutError) as ctx:
+                with controller.slot():
+                    pass
+            self.assertEqual(ctx.exception.status_code, 503)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(controller.get_stats()['queued'], 0)
+
+    def test_waiter_is_admitted_when_slot_frees(self):
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=5)
+        started, release = threading.Event(), threading.Event()
+        holder = threading.Thread(target=self._hold_slot, args=(controller, started, release))
+        holder.start()
+        started.wait(5)
+        threading.Timer(0.1, release.set).start()
+        start = time.time()
+        with controller.slot() as wait_time:
+            self.assertGreater(wait_time, 0)
+        self.assertLess(time.time() - start, 5)
+        holder.join()
+        self.assertEqual(controller.get_stats()['admitted_total'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
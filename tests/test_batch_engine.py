@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Tests for the continuous batching engine used by the model server.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import mlx.core as mx
+    from mlx_lm import load, stream_generate
+    from mlx_lm.sample_utils import make_sampler
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestBatchEngine(unittest.TestCase):
+    """Test cases for BatchEngine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.engine = BatchEngine(self.model, self.tokenizer, max_batch_size=4, prefill_step_size=4)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def _prompts(self):
+        return [
+            self.tokenizer.encode("hello world"),
+            self.tokenizer.encode("the quick brown fox jumps over the lazy dog"),
+            self.tokenizer.encode("lazy"),
+            self.tokenizer.encode("brown dog"),
+            self.tokenizer.encode("over the world"),
+        ]
+
+    def _serial_greedy(self, prompt, max_tokens):
+        return [
+            response.token
+            for response in stream_generate(self.model, self.tokenizer, prompt, max_tokens=max_tokens)
+            if response.finish_reason != 'stop'
+        ]
+
+    def test_batched_greedy_matches_serial(self):
+        prompts = self._prompts()
+        requests = [self.engine.submit(GenerationRequest(p, max_tokens=12)) for p in prompts]
+        outputs = [list(request.tokens(timeout=30)) for request in requests]
+
+        for prompt, output in zip(prompts, outputs):
+            expected = self._serial_greedy(prompt, 12)
+            self.assertEqual(output, expected[:len(output)])
+        self.assertGreater(self.engine.get_stats()['max_batch_seen'], 1)
+
+    def test_seeded_sampling_independent_of_batch(self):
+        prompt = self.tokenizer.encode("hello world")
+
+        def run(seed):
+            request = GenerationRequest(prompt, max_tokens=16, sampler=make_sampler(1.0), seed=seed)
+            return list(self.engine.submit(request).tokens(timeout=30))
+
+        alone = run(7)
+
+        results = {}
+        threads = []
+        for i, seed in enumerate([7, 8, 9, 10]):
+            thread = threading.Thread(target=lambda i=i, seed=seed: results.__setitem__(i, run(seed)))
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+
+        self.assertEqual(results[0], alone)
+
+    def test_finish_reasons(self):
+        request = self.engine.submit(GenerationRequest(self.tokenizer.encode("hello"), max_tokens=3))
+        tokens = list(request.tokens(timeout=30))
+        self.assertLessEqual(len(tokens), 3)
+        self.assertIn(request.finish_reason, ('length', 'stop'))
+
+        empty = self.engine.submit(GenerationRequest(self.tokenizer.encode("hello"), max_tokens=0))
+        self.assertEqual(list(empty.tokens(timeout=1)), [])
+        self.assertEqual(empty.finish_reason, 'length')
+
+    def test_timing_breakdown(self):
+        prompt = self.tokenizer.encode("the quick brown fox jumps over the lazy dog")
+        request = self.engine.submit(GenerationRequest(prompt, max_tokens=6))
+        while not request.finished:
+            time.sleep(0.01)
+        self.assertEqual(request.pending_tokens(), len(request.generated_tokens) + 1)
+        self.assertEqual(len(list(request.tokens(timeout=1))), len(request.generated_tokens))
+        self.assertEqual(request.pending_tokens(), 0)
+
+        timing = request.get_timing()
+        self.assertGreater(timing['prefill_time'], 0)
+        self.assertGreaterEqual(timing['decode_time'], 0)
+        self.assertAlmostEqual(timing['queue_time'] + timing['prefill_time'] + timing['decode_time'],
+                               timing['total_time'], places=6)
+
+    def test_token_batches_coalesce(self):
+        prompt = self.tokenizer.encode("hello world")
+        expected = list(self.engine.submit(GenerationRequest(prompt, max_tokens=10)).tokens(timeout=30))
+
+        live = self.engine.submit(GenerationRequest(prompt, max_tokens=10))
+        batches = list(live.token_batches(max_tokens=3, max_delay=1.0, timeout=30))
+        self.assertEqual(sum(batches, []), expected)
+
+        # A consumer that falls behind gets everything that piled up in one batch
+        slow = self.engine.submit(GenerationRequest(prompt, max_tokens=10))
+        while not slow.finished:
+            time.sleep(0.01)
+        self.assertEqual(list(slow.token_batches(max_tokens=1, timeout=1)), [expected])
+
+    def test_cancel_leaves_batch(self):
+        # Without EOS the long request would only stop at max_tokens
+        self.engine.eos_token_ids = set()
+        neighbour_prompt = self.tokenizer.encode("the quick brown fox")
+        expected = self._serial_greedy(neighbour_prompt, 200)
+
+        abandoned = self.engine.submit(GenerationRequest(self.tokenizer.encode("hello world"), max_tokens=100000))
+        neighbour = self.engine.submit(GenerationRequest(neighbour_prompt, max_tokens=200))
+        tokens = abandoned.tokens(timeout=30)
+        for _ in range(5):
+            next(tokens)
+
+        self.assertIs(self.engine.cancel(abandoned.request_id), abandoned)
+        self.assertTrue(abandoned.wait(10))
+        self.assertEqual(abandoned.finish_reason, 'cancelled')
+        self.assertLess(len(abandoned.generated_tokens), 100000)
+        self.assertIsNone(self.engine.cancel(abandoned.request_id))
+
+        output = list(neighbour.tokens(timeout=30))
+        self.assertEqual(len(output), 200)
+        self.assertEqual(output[:len(expected)], expected)
+        self.assertEqual(self.engine.get_stats()['active_sequences'], 0)
+        self.assertIsNone(self.engine.cancel("unknown"))
+
+    def test_submit_after_stop_raises(self):
+        self.engine.stop()
+        with self.assertRaises(RuntimeError):
+            self.engine.submit(GenerationRequest(self.tokenizer.encode("hello"), max_tokens=3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+Tests for the downsampling of chart series.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.training.downsampling import downsample, lttb_indices, minmax_indices, select_range
+from forgellm.training.dashboard import generate_web_chart_data
+
+
+def lttb_reference(x, y, n):
+    """Plain-Python LTTB, as in the original description of the algorithm."""
+    size = len(x)
+    every = (size - 2) / (n - 2)
+    selected, a = [0], 0
+    for i in range(n - 2):
+        lo, hi = int(i * every) + 1, int((i + 1) * every) + 1
+        next_lo, next_hi = hi, min(int((i + 2) * every) + 1, size - 1)
+        if next_lo >= next_hi:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx = sum(x[next_lo:next_hi]) / (next_hi - next_lo)
+            cy = sum(y[next_lo:next_hi]) / (next_hi - next_lo)
+        areas = [abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a])) for j in range(lo, hi)]
+        a = lo + areas.index(max(areas))
+        selected.append(a)
+    return selected + [size - 1]
+
+
+class TestDownsampling(unittest.TestCase):
+    """Test cases for the downsampling functions."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = list(range(1, 20001))
+        self.y = (3.0 * np.exp(-np.arange(20000) / 4000) + rng.normal(0, 0.05, 20000)).tolist()
+
+    def test_lttb_matches_reference(self):
+        x, y = self.x[:1003], self.y[:1003]
+        self.assertEqual(lttb_indices(x, y, 100).tolist(), lttb_reference(x, y, 100))
+
+    def test_lttb_keeps_ends_and_extremes(self):
+        y = list(self.y)
+        y[12345] = -1.0
+        xs, ys = downsample(self.x, y, 500, 'lttb')
+        self.assertLessEqual(len(xs), 500)
+        self.assertEqual((xs[0], xs[-1]), (1, 20000))
+        self.assertEqual(min(ys), -1.0)
+        self.assertEqual(max(ys), max(y))
+        self.assertEqual(xs, sorted(xs))
+        # Picked, not averaged
+        self.assertTrue(all(y[x - 1] == v for x, v in zip(xs, ys)))
+
+    def test_minmax_keeps_spikes(self):
+        y = [100.0] * 20000
+        y[777], y[15000] = 5.0, 900.0
+        index = minmax_indices(y, 100)
+        self.assertLessEqual(len(index), 100)
+        self.assertIn(777, index)
+        self.assertIn(15000, index)
+        self.assertEqual((index[0], index[-1]), (0, 19999))
+
+    def test_keep(self):
+        keep = list(range(100, 20001, 100))
+        xs, ys = downsample(self.x, self.y, 500, 'lttb', keep=keep)
+        self.assertLessEqual(len(xs), 500)
+        self.assertTrue(set(keep) <= set(xs))
+        self.assertEqual(min(ys), min(self.y))
+
+    def test_short_series_and_invalid_options(self):
+        self.assertEqual(downsample([1, 2, 3], [1.0, 2.0, 3.0], 100), ([1, 2, 3], [1.0, 2.0, 3.0]))
+        with self.assertRaises(ValueError):
+            downsample(self.x, self.y, 2)
+        with self.assertRaises(ValueError):
+            downsample(self.x, self.y, 100, 'mean')
+
+    def test_select_range(self):
+        xs, ys = select_range(self.x, self.y, 100, 200)
+        # One point beyond each edge
+        self.assertEqual((xs[0], xs[-1], len(xs)), (99, 201, 103))
+        self.assertEqual(ys[0], self.y[98])
+        self.assertEqual(select_range(self.x, self.y, None, 3)[0], [1, 2, 3, 4])
+
+
+class TestChartDownsampling(unittest.TestCase):
+    """Charts and chart endpoints downsample on request."""
+
+    def setUp(self):
+        self.metrics = [{'iteration': i, 'train_loss': 3.0 - i / 10000, 'learning_rate': 1e-5,
+                         'tokens_per_sec': 500.0 + (i % 7), 'peak_memory_gb': 10.0,
+                         'val_loss': 3.1 - i / 10000 if i % 100 == 0 else None}
+                        for i in range(1, 20001)]
+
+    def test_generate_web_chart_data(self):
+        full = generate_web_chart_data({'metrics': self.metrics})
+        self.assertEqual(len(full['loss']['data'][0]['x']), 20000)
+        self.assertFalse(full['loss']['downsampled'])
+
+        charts = generate_web_chart_data({'metrics': self.metrics}, max_points=500)
+        for key in ('loss', 'perplexity', 'learning_rate', 'speed'):
+            self.assertTrue(charts[key]['downsampled'])
+            for trace in charts[key]['data']:
+                self.assertLessEqual(len(trace['x']), 500)
+        self.assertEqual(charts['loss']['data'][0]['x'][-1], 20000)
+
+        zoomed = generate_web_chart_data({'metrics': self.metrics}, max_points=500, x_range=(1000, 1100))
+        self.assertEqual(len(zoomed['loss']['data'][0]['x']), 103)
+        self.assertFalse(zoomed['loss']['downsampled'])
+
+    def test_gap_keeps_validation_points(self):
+        for every in (100, 10):
+            metrics = [dict(m, val_loss=3.1 - m['iteration'] / 10000 if m['iteration'] % every == 0 else None)
+                       for m in self.metrics]
+            train, val = generate_web_chart_data({'metrics': metrics}, max_points=500)['loss']['data']
+            self.assertLessEqual(len(val['x']), 500)
+            self.assertLessEqual(len(train['x']), 500 + len(val['x']))
+            # The generalization gap (compare tab) pairs the traces by iteration
+            gap = [x for x in train['x'] if x in set(val['x'])]
+            self.assertEqual(gap, val['x'])
+
+    def test_compare_route(self):
+        from flask import Flask
+        from unittest import mock
+        from forgellm.api.routes import setup_api
+        from forgellm.training.session_index import get_session_index
+
+        models_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, models_dir)
+        for session_id in ('run_a', 'run_b'):
+            os.makedirs(os.path.join(models_dir, 'cpt', session_id))
+            with open(os.path.join(models_dir, 'cpt', session_id, f'CPT_{session_id}.json'), 'w') as f:
+                json.dump({'base_model': 'test/base', 'config': {}, 'metrics': self.metrics}, f)
+
+        with mock.patch.dict(os.environ, {'MODELS_DIR': models_dir}):
+            self.addCleanup(get_session_index(models_dir).close)
+            app = Flask(__name__)
+            app.config['TESTING'] = True
+            # No real managers: ModelManager would start a model server
+            for name in ('model_manager', 'trainer', 'training_manager', 'quantizer', 'fuser'):
+                setattr(app, name, mock.Mock())
+            app.register_blueprint(setup_api(app))
+            client = app.test_client()
+
+            response = client.post('/api/training/compare',
+                                   json={'session_ids': ['run_a', 'run_b'], 'max_points': 200})
+            sessions = response.get_json()['comparison_data']
+            self.assertEqual(len(sessions), 2)
+            self.assertNotIn('metrics', sessions[0]['data'])
+            train, val = sessions[0]['charts']['loss']['data']
+            self.assertLessEqual(len(val['x']), 200)
+            # Training loss also keeps the points at the validation iterations
+            self.assertLessEqual(len(train['x']), 200 + len(val['x']))
+            self.assertTrue(set(val['x']) <= set(train['x']))
+
+            response = client.post('/api/training/compare',
+                                   json={'session_ids': ['run_a', 'run_b'], 'max_points': 'many'})
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
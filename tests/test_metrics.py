@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Tests for the Prometheus metrics of the model server.
+"""
+
+import functools
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.admission import AdmissionController
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.metrics import Counter, Histogram, InferenceMetrics
+
+
+def samples(text):
+    """Parse the sample lines of a metrics page into {'name{labels}': value}."""
+    return {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in text.splitlines() if line and not line.startswith('#')
+    }
+
+
+class TestMetricTypes(unittest.TestCase):
+    """Test cases for the metric types and the text format."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('model',), buckets=(0.1, 1.0))
+        histogram.observe_many([0.05, 0.1, 0.5, 3.0], ('m "1"',))
+        text = '\n'.join(histogram.render())
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        values = samples(text)
+        self.assertEqual(values['latency_seconds_bucket{model="m \\"1\\"",le="0.1"}'], 2)
+        self.assertEqual(values['latency_seconds_bucket{model="m \\"1\\"",le="1"}'], 3)
+        self.assertEqual(values['latency_seconds_bucket{model="m \\"1\\"",le="+Inf"}'], 4)
+        self.assertEqual(values['latency_seconds_count{model="m \\"1\\""}'], 4)
+        self.assertAlmostEqual(values['latency_seconds_sum{model="m \\"1\\""}'], 3.65)
+
+    def test_counter(self):
+        counter = Counter('requests_total', 'Requests.', ('reason',))
+        counter.inc(('stop',))
+        counter.inc(('stop',), 2)
+        self.assertEqual(samples('\n'.join(counter.render())), {'requests_total{reason="stop"}': 3})
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestInferenceMetrics(unittest.TestCase):
+    """Test cases for metrics recorded by the batch engine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_requests_are_recorded(self):
+        metrics = InferenceMetrics()
+        engine = BatchEngine(self.model, self.tokenizer,
+                             on_finish=functools.partial(metrics.observe_request, 'tiny'))
+        engine.start()
+        try:
+            request = engine.submit(GenerationRequest(self.tokenizer.encode("hello world"), max_tokens=8))
+            list(request.tokens(timeout=30))
+            self.assertTrue(request.wait(1))
+        finally:
+            engine.stop()
+
+        admission = AdmissionController(max_concurrent=2)
+        with admission.slot() as wait_time:
+            metrics.observe_admission_wait(wait_time)
+        values = samples(metrics.render(admission=admission))
+
+        labels = '{model="tiny",adapter=""}'
+        generated = len(request.generated_tokens)
+        self.assertEqual(values['forgellm_time_to_first_token_seconds_count' + labels], 1)
+        self.assertEqual(values['forgellm_inter_token_latency_seconds_count' + labels], generated - 1)
+        self.assertEqual(values['forgellm_generation_tokens_total' + labels], generated)
+        self.assertEqual(values['forgellm_requests_total{model="tiny",adapter="",finish_reason="%s"}'
+                                % request.finish_reason], 1)
+        self.assertEqual(values['forgellm_queue_wait_seconds_count'], 1)
+        self.assertEqual(values['forgellm_queue_depth'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Tests for the incremental training metrics.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.training.metrics_stream import MetricsTail
+from forgellm.training.session_index import get_session_index
+
+
+def write_log(log_file, metrics, end_time=None):
+    """Write a training log like the trainer does."""
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    with open(log_file, 'w') as f:
+        json.dump({'base_model': 'test/base', 'start_time': '2025-01-01T00:00:00',
+                   'end_time': end_time, 'config': {}, 'metrics': metrics}, f)
+    # Make each write visible to the (mtime, size) check
+    write_log.mtime += 1
+    os.utime(log_file, (write_log.mtime, write_log.mtime))
+
+
+write_log.mtime = 1.7e9
+
+
+def metrics(first, last):
+    return [{'iteration': i, 'train_loss': 2.0 / i, 'learning_rate': 1e-5} for i in range(first, last + 1)]
+
+
+class TestMetricsTail(unittest.TestCase):
+    """Test cases for MetricsTail."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.dir, 'run', 'CPT_run.json')
+        write_log(self.log_file, metrics(1, 10))
+        self.tail = MetricsTail(self.log_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_only_new_points_are_returned(self):
+        full = self.tail.delta()
+        self.assertEqual(full['total_points'], 10)
+        self.assertEqual(full['series']['train_loss']['x'], list(range(1, 11)))
+        self.assertFalse(full['reset'])
+
+        # Nothing new
+        same = self.tail.delta(cursor=full['cursor'])
+        self.assertEqual(same['points'], [])
+        self.assertEqual(same['series'], {})
+        self.assertEqual(same['cursor'], full['cursor'])
+
+        write_log(self.log_file, metrics(1, 12))
+        delta = self.tail.delta(cursor=full['cursor'])
+        self.assertEqual([p['iteration'] for p in delta['points']], [11, 12])
+        self.assertEqual(delta['series']['learning_rate'], {'x': [11, 12], 'y': [1e-5, 1e-5]})
+        self.assertGreater(delta['cursor'], full['cursor'])
+        self.assertEqual(delta['last_iteration'], 12)
+
+        self.assertEqual([p['iteration'] for p in self.tail.delta(since_iteration=10)['points']], [11, 12])
+
+    def test_added_fields_are_sent_alone(self):
+        cursor = self.tail.delta()['cursor']
+        points = metrics(1, 10)
+        points[-1]['val_loss'] = 1.5
+        write_log(self.log_file, points)
+
+        delta = self.tail.delta(cursor=cursor)
+        self.assertFalse(delta['reset'])
+        self.assertEqual(delta['series'], {'val_loss': {'x': [10], 'y': [1.5]}})
+
+    def test_rewritten_values_reset_the_client(self):
+        cursor = self.tail.delta()['cursor']
+        points = metrics(1, 10)
+        points[4]['train_loss'] = 9.0
+        write_log(self.log_file, points, end_time='2025-01-01T01:00:00')
+
+        delta = self.tail.delta(cursor=cursor)
+        self.assertTrue(delta['reset'])
+        self.assertTrue(delta['finished'])
+        self.assertEqual(delta['total_points'], len(delta['points']))
+        # From the new cursor on, deltas are incremental again
+        self.assertFalse(self.tail.delta(cursor=delta['cursor'])['reset'])
+
+        # Cursors this tail never handed out
+        self.assertTrue(self.tail.delta(cursor=0)['reset'])
+        self.assertTrue(self.tail.delta(cursor=delta['cursor'] + 1)['reset'])
+
+    def test_unreadable_log_keeps_the_last_metrics(self):
+        cursor = self.tail.delta()['cursor']
+        with open(self.log_file, 'w') as f:
+            f.write('{"metrics": [')
+        delta = self.tail.delta(cursor=cursor)
+        self.assertEqual(delta['points'], [])
+        self.assertEqual(delta['total_points'], 10)
+
+
+class TestMetricsRoute(unittest.TestCase):
+    """The metrics route and socket event answer with deltas."""
+
+    def setUp(self):
+        from flask import Flask
+
+        self.models_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {'MODELS_DIR': self.models_dir})
+        self.env.start()
+        self.log_file = os.path.join(self.models_dir, 'cpt', 'run_a', 'CPT_run_a.json')
+        write_log(self.log_file, metrics(1, 5))
+
+        from forgellm.api.routes import setup_api
+        self.app = Flask(__name__)
+        self.app.config['TESTING'] = True
+        # No real managers: ModelManager would start a model server
+        for name in ('model_manager', 'trainer', 'training_manager', 'quantizer', 'fuser'):
+            setattr(self.app, name, mock.Mock())
+        self.app.trainer.is_training_active.return_value = False
+        self.app.register_blueprint(setup_api(self.app))
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        get_session_index(self.models_dir).close()
+        shutil.rmtree(self.models_dir)
+
+    def test_metrics_route(self):
+        full = self.client.get('/api/training/run_a/metrics').get_json()
+        self.assertEqual(full['total_points'], 5)
+
+        write_log(self.log_file, metrics(1, 6))
+        delta = self.client.get(f"/api/training/run_a/metrics?cursor={full['cursor']}").get_json()
+        self.assertEqual([p['iteration'] for p in delta['points']], [6])
+
+        since = self.client.get('/api/training/run_a/metrics?since_iteration=4').get_json()
+        self.assertEqual(since['series']['train_loss']['x'], [5, 6])
+
+        self.assertEqual(self.client.get('/api/training/missing/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/api/training/run_a/metrics?cursor=abc').status_code, 400)
+
+    def test_metrics_delta_event(self):
+        try:
+            from flask_socketio import SocketIO
+        except ImportError:
+            self.skipTest("flask_socketio is not installed")
+        from forgellm.web.services.socket_service import setup_socketio
+
+        socketio = SocketIO(self.app)
+        setup_socketio(socketio, self.app)
+        client = socketio.test_client(self.app)
+        client.get_received()
+
+        client.emit('request_metrics_delta', {'session_id': 'run_a', 'since_iteration': 3})
+        events = [e for e in client.get_received() if e['name'] == 'metrics_delta']
+        self.assertEqual(len(events), 1)
+        delta = events[0]['args'][0]
+        self.assertEqual(delta['session_id'], 'run_a')
+        self.assertEqual([p['iteration'] for p in delta['points']], [4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
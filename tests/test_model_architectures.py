@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Tests for architecture detection and compiled prompt formatters.
+"""
+
+import os
+import sys
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.utils.model_architectures import ModelArchitectureManager
+
+
+def reference_format(arch_config, architecture, messages):
+    """Format messages the way the uncompiled template does."""
+    parts = []
+    for message in messages:
+        role, content = message["role"], message["content"]
+        if role == "system":
+            if arch_config.get("system_prefix") or arch_config.get("system_suffix"):
+                parts.append(f"{arch_config.get('system_prefix', '')}{content}{arch_config.get('system_suffix', '')}")
+            elif arch_config.get("system_as_assistant", False):
+                parts.append(f"{arch_config.get('assistant_prefix', '')}System: {content}"
+                             f"{arch_config.get('assistant_suffix', '')}")
+            elif architecture == "deepseek":
+                parts.append(f"System: {content}\n\n")
+            else:
+                parts.append(f"{arch_config.get('user_prefix', '')}System: {content}{arch_config.get('user_suffix', '')}")
+        elif role in ("user", "assistant"):
+            parts.append(f"{arch_config.get(role + '_prefix', '')}{content}{arch_config.get(role + '_suffix', '')}")
+    return "".join(parts) + arch_config.get("assistant_prefix", "")
+
+
+class TestModelArchitectureManager(unittest.TestCase):
+    """Test cases for ModelArchitectureManager and PromptFormatter."""
+
+    def setUp(self):
+        self.manager = ModelArchitectureManager()
+        self.conversation = [
+            {"role": "system", "content": "You are helpful."},
+            {"role": "user", "content": "Hello!"},
+            {"role": "assistant", "content": "Hi, how can I help?"},
+            {"role": "user", "content": "Tell me a joke."},
+        ]
+
+    def test_formatters_match_templates(self):
+        models = {
+            "qwen": "mlx-community/Qwen3-4B-bf16",
+            "gemma": "mlx-community/gemma-3-1b-it-bf16",
+            "llama": "mlx-community/Llama-3.2-3B-Instruct",
+            "deepseek": "deepseek-ai/deepseek-coder",
+            "generic": "some/unknown-model",
+        }
+        for architecture, model_name in models.items():
+            self.assertEqual(self.manager.detect_architecture(model_name), architecture)
+            expected = reference_format(self.manager.get_architecture_config(architecture),
+                                        architecture, self.conversation)
+            self.assertEqual(self.manager.format_messages(self.conversation, model_name), expected)
+
+    def test_next_turn_only_formats_new_messages(self):
+        model_name = "mlx-community/Qwen3-4B-bf16"
+        formatter = self.manager.get_formatter(model_name)
+        first = self.manager.format_messages(self.conversation, model_name)
+
+        next_turn = self.conversation + [
+            {"role": "assistant", "content": "Why did the chicken cross the road?"},
+            {"role": "user", "content": "Why?"},
+        ]
+        second = self.manager.format_messages(next_turn, model_name)
+        stats = formatter.get_stats()
+        self.assertEqual(stats['reused_messages'], 4)
+        self.assertEqual(stats['formatted_messages'], 6)
+
+        self.assertTrue(second.startswith(first))
+        expected = reference_format(self.manager.get_architecture_config("qwen"), "qwen", next_turn)
+        self.assertEqual(second, expected)
+
+        # Editing the last message reuses the previous turn
+        edited = [dict(m) for m in next_turn]
+        edited[-1]["content"] = "Go on."
+        self.assertEqual(self.manager.format_messages(edited, model_name),
+                         reference_format(self.manager.get_architecture_config("qwen"), "qwen", edited))
+        self.assertEqual(formatter.get_stats()['reused_messages'], 8)
+
+        # Editing an earlier message formats the conversation again
+        edited[1]["content"] = "Good morning!"
+        self.assertEqual(self.manager.format_messages(edited, model_name),
+                         reference_format(self.manager.get_architecture_config("qwen"), "qwen", edited))
+        self.assertEqual(formatter.get_stats()['reused_messages'], 8)
+
+    def test_detection_is_resolved_once(self):
+        model_name = "mlx-community/gemma-3-1b-it-bf16"
+        with self.assertLogs('forgellm.utils.model_architectures', level='INFO'):
+            self.manager.detect_architecture(model_name)
+            self.manager.is_instruct_model(model_name)
+        with self.assertNoLogs('forgellm.utils.model_architectures', level='INFO'):
+            for _ in range(3):
+                self.assertEqual(self.manager.detect_architecture(model_name), "gemma")
+                self.assertTrue(self.manager.is_instruct_model(model_name))
+                self.manager.format_messages(self.conversation, model_name)
+        self.assertIs(self.manager.get_formatter(model_name), self.manager.get_formatter("google/gemma-2b"))
+
+    def test_stop_sequences_end_the_assistant_turn(self):
+        self.assertEqual(self.manager.get_stop_sequences("mlx-community/Qwen3-4B-bf16"),
+                         ["<|im_end|>", "<|im_start|>user"])
+        self.assertEqual(self.manager.get_stop_sequences("mlx-community/gemma-3-1b-it-bf16"),
+                         ["<end_of_turn>", "<start_of_turn>user"])
+        self.assertEqual(self.manager.get_stop_sequences("some/unknown-model"), ["Human:"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+"""
+Tests for the model catalog and the cached directory sizes.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.models.model_catalog import DirectorySizeService, ModelCatalog, directory_size, GB
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+class TestDirectorySizes(unittest.TestCase):
+    """Test cases for directory_size and DirectorySizeService."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_exact_size_without_links(self):
+        model = os.path.join(self.root, 'models--org--model')
+        write(os.path.join(model, 'blobs', 'abc'), 1000)
+        write(os.path.join(model, 'blobs', 'def'), 24)
+        os.makedirs(os.path.join(model, 'snapshots', 'rev'))
+        os.symlink('../../blobs/abc', os.path.join(model, 'snapshots', 'rev', 'model.safetensors'))
+        os.link(os.path.join(model, 'blobs', 'def'), os.path.join(model, 'snapshots', 'rev', 'config.json'))
+        self.assertEqual(directory_size(model), 1024)
+
+    def test_sizes_are_cached_and_revalidated(self):
+        service = DirectorySizeService(max_workers=2)
+        model = os.path.join(self.root, 'model')
+        write(os.path.join(model, 'weights', 'a.safetensors'), 100)
+
+        self.assertEqual(service.get(model), 100)
+        self.assertEqual(service.get(model), 100)
+        self.assertEqual(service.get_stats()['computed'], 1)
+        self.assertEqual(service.get_stats()['hits'], 1)
+
+        # A change in a subdirectory: the old size is served while it is recomputed
+        write(os.path.join(model, 'weights', 'b.safetensors'), 50)
+        self.assertEqual(service.get(model), 100)
+        wait_for(lambda: service.get_stats()['computed'] == 2)
+        self.assertEqual(service.get(model), 150)
+
+    def test_unmeasured_directories_are_measured_in_parallel(self):
+        service = DirectorySizeService(max_workers=4)
+        paths = []
+        for i in range(4):
+            paths.append(os.path.join(self.root, f'model_{i}'))
+            write(os.path.join(paths[-1], 'weights.bin'), i)
+        self.assertEqual(service.get_many(paths), dict(zip(paths, range(4))))
+
+
+class TestModelCatalog(unittest.TestCase):
+    """Test cases for ModelCatalog."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.catalog = ModelCatalog(DirectorySizeService())
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_local_models(self):
+        write(os.path.join(self.root, 'cpt', 'run_b', 'adapters.safetensors'), 10)
+        write(os.path.join(self.root, 'cpt', 'run_a', 'adapters.safetensors'), 10)
+        write(os.path.join(self.root, 'cpt', 'notes.txt'), 1)
+        self.assertEqual([m['path'] for m in self.catalog.local_models(self.root, 'cpt')],
+                         [os.path.join('cpt', 'run_a'), os.path.join('cpt', 'run_b')])
+        self.assertEqual(self.catalog.local_models(self.root, 'ift'), [])
+
+        write(os.path.join(self.root, 'cpt', 'run_c', 'adapters.safetensors'), 10)
+        self.assertEqual(len(self.catalog.local_models(self.root, 'cpt')), 3)
+
+    def test_hf_models(self):
+        hub = os.path.join(self.root, 'hub')
+        write(os.path.join(hub, 'models--org--model', 'snapshots', 'rev', 'config.json'), 10)
+        write(os.path.join(hub, 'models--published--mine', 'config.json'), 10)
+        os.makedirs(os.path.join(hub, 'models--org--empty'))
+        os.makedirs(os.path.join(hub, 'datasets--org--data'))
+
+        models = {m['name']: m for m in self.catalog.hf_models(self.root)}
+        self.assertEqual(set(models), {'org/model', 'published/mine', 'org/empty'})
+        self.assertEqual(models['org/model']['model_path'],
+                         os.path.join(hub, 'models--org--model', 'snapshots', 'rev'))
+        self.assertEqual(models['published/mine']['model_path'], os.path.join(hub, 'models--published--mine'))
+        self.assertIsNone(models['org/empty']['model_path'])
+
+        # A download finishing is picked up
+        write(os.path.join(hub, 'models--org--empty', 'snapshots', 'rev', 'config.json'), 10)
+        models = {m['name']: m for m in self.catalog.hf_models(self.root)}
+        self.assertIsNotNone(models['org/empty']['model_path'])
+
+
+class BlockedSizeService(DirectorySizeService):
+    """Measures directories only once released."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+
+    def _measure(self, path):
+        self.release.wait()
+        return super()._measure(path)
+
+
+class TestModelListings(unittest.TestCase):
+    """The quantizer and fuser listings measure their directories together."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name in ('run_a', 'run_b', 'run_c'):
+            write(os.path.join(self.root, 'cpt', name, 'adapters.safetensors'), GB // 100)
+        self.env = mock.patch.dict(os.environ, {'MODELS_DIR': self.root})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.root)
+
+    def test_sizes_not_measured_yet_are_pending(self):
+        from forgellm.models.model_fuser import ModelFuser
+        from forgellm.models.model_quantizer import ModelQuantizer
+
+        service = BlockedSizeService(wait_timeout=0.5)
+        with mock.patch('forgellm.models.model_quantizer.get_size_service', return_value=service), \
+                mock.patch('forgellm.models.model_fuser.get_size_service', return_value=service):
+            # One wait for all the directories, not one per directory
+            start = time.monotonic()
+            models = [m for m in ModelQuantizer().get_available_models() if m['type'] == 'CPT']
+            self.assertLess(time.monotonic() - start, 1.4)
+            self.assertEqual(len(models), 3)
+            self.assertTrue(all(m['size'] is None for m in models))
+
+            service.release.set()
+            wait_for(lambda: service.get_stats()['computed'] >= 3)
+            adapters = ModelFuser().get_available_adapters()
+            self.assertEqual([a['size'] for a in adapters], [0.01, 0.01, 0.01])
+
+    def test_routes_report_pending_sizes(self):
+        from flask import Flask
+        from forgellm.api.routes import setup_api
+
+        write(os.path.join(self.root, 'ift', 'run_d', 'adapters.safetensors'), GB // 100)
+        service = BlockedSizeService(wait_timeout=0.2)
+        self.addCleanup(service.release.set)
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        # No real managers: ModelManager would start a model server
+        for name in ('model_manager', 'trainer', 'training_manager', 'quantizer', 'fuser'):
+            setattr(app, name, mock.Mock())
+        with mock.patch('forgellm.api.routes.get_model_catalog', return_value=ModelCatalog(service)):
+            app.register_blueprint(setup_api(app))
+        client = app.test_client()
+
+        models = client.get('/api/cpt_models').get_json()['models']
+        self.assertEqual(len(models), 3)
+        self.assertTrue(all(m['size'] is None for m in models))
+        ift = [m for m in client.get('/api/models').get_json()['models'] if m['type'] == 'ift']
+        self.assertEqual([m['size'] for m in ift], [None])
+
+        service.release.set()
+        wait_for(lambda: service.get_stats()['computed'] >= 4)
+        self.assertEqual([m['size'] for m in client.get('/api/ift_models').get_json()['models']], [0.01])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+"""
+Tests for model loading with progress reporting.
+"""
+
+import os
+import sys
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import mlx.core as mx
+    from mlx.utils import tree_flatten
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server import model_loader
+from forgellm.server.model_loader import LoadCancelled, LoadProgress, load_model_with_progress, weight_files
+
+
+class CancelAfterFirstBatch(LoadProgress):
+    """Progress that cancels the load once the first batch was evaluated."""
+
+    def add_loaded(self, nbytes):
+        super().add_loaded(nbytes)
+        self.cancel()
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestModelLoader(unittest.TestCase):
+    """Test cases for load_model_with_progress."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+
+        # Split the weights into two shards like large checkpoints are
+        path = os.path.join(cls.model_dir, "model.safetensors")
+        weights = mx.load(path)
+        names = sorted(weights)
+        half = len(names) // 2
+        for i, part in enumerate((names[:half], names[half:])):
+            mx.save_safetensors(os.path.join(cls.model_dir, f"model-0000{i + 1}-of-00002.safetensors"),
+                                {name: weights[name] for name in part})
+        os.remove(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_progress_reaches_done(self):
+        files = weight_files(self.model_dir)
+        self.assertEqual(len(files), 2)
+
+        progress = LoadProgress("tiny")
+        with mock.patch.object(model_loader, 'EVAL_BATCH_BYTES', 4096):
+            model, _ = load_model_with_progress(self.model_dir, progress, workers=2)
+
+        status = progress.to_dict()
+        self.assertEqual(status['stage'], 'done')
+        self.assertEqual(status['bytes_total'], sum(os.path.getsize(f) for f in files))
+        self.assertEqual(status['bytes_loaded'], status['bytes_total'])
+        self.assertEqual(status['shards_total'], 2)
+        self.assertEqual(status['shards_done'], 2)
+        self.assertEqual(status['percent'], 100.0)
+        self.assertIsNone(status['eta_seconds'])
+
+        # Same weights as a plain load
+        expected, _ = load(self.model_dir)
+        loaded = dict(tree_flatten(model.parameters()))
+        for name, value in tree_flatten(expected.parameters()):
+            self.assertTrue(mx.array_equal(loaded[name], value), name)
+
+    def test_cancel(self):
+        progress = LoadProgress("tiny")
+        progress.cancel()
+        with self.assertRaises(LoadCancelled):
+            load_model_with_progress(self.model_dir, progress)
+
+        progress = CancelAfterFirstBatch("tiny")
+        with mock.patch.object(model_loader, 'EVAL_BATCH_BYTES', 4096):
+            with self.assertRaises(LoadCancelled):
+                load_model_with_progress(self.model_dir, progress, workers=0)
+        self.assertLess(progress.bytes_loaded, progress.bytes_total)
+
+
+class TestLoadRequests(unittest.TestCase):
+    """The model server runs one load at a time."""
+
+    def setUp(self):
+        from forgellm.server import main
+        self.main = main
+        self.started = []
+        self.release = threading.Event()
+
+        def load_model(model_name, adapter_path=None, progress=None):
+            self.started.append(model_name)
+            self.release.wait(10)
+            main.IS_LOADING = False
+
+        for name, value in (('load_model', load_model), ('MODEL_NAME', None), ('ADAPTER_PATH', None),
+                            ('IS_LOADING', False), ('LOAD_PROGRESS', None)):
+            patcher = mock.patch.object(main, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.release.set)
+
+    def _load(self, model_name):
+        handler = self.main.ModelHandler.__new__(self.main.ModelHandler)
+        handler.wfile = io.BytesIO()
+        handler._set_headers = mock.Mock()
+        handler._handle_load({'model_name': model_name})
+        args = handler._set_headers.call_args[0]
+        return (args[0] if args else 200), json.loads(handler.wfile.getvalue())
+
+    def test_second_load_is_refused(self):
+        status, response = self._load('model-a')
+        self.assertEqual(status, 200)
+        self.assertTrue(self.main.IS_LOADING)
+
+        status, response = self._load('model-b')
+        self.assertEqual(status, 409)
+        self.assertEqual(response['loading_model_name'], 'model-a')
+        # The load in progress keeps its name and progress
+        self.assertEqual(self.main.MODEL_NAME, 'model-a')
+        self.assertEqual(self.main.LOAD_PROGRESS.model_name, 'model-a')
+
+        self.release.set()
+        for _ in range(100):
+            if not self.main.IS_LOADING:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self._load('model-b')[0], 200)
+        self.assertEqual(self.started, ['model-a', 'model-b'])
+
+    def test_concurrent_loads(self):
+        results = []
+        threads = [threading.Thread(target=lambda i=i: results.append(self._load(f'model-{i}')[0]))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [200] + [409] * 7)
+        self.assertEqual(len(self.started), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Tests for the multi-model residency pool.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.model_pool import ModelPool, ResidentModel, estimate_model_bytes
+from forgellm.server.prompt_cache import PromptCacheStore
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestModelPool(unittest.TestCase):
+    """Test cases for ModelPool."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def _resident(self, name):
+        model, tokenizer = load(self.model_dir)
+        prompt_cache = PromptCacheStore()
+        engine = BatchEngine(model, tokenizer, prompt_cache=prompt_cache)
+        engine.start()
+        return ResidentModel(name, None, model, tokenizer, engine=engine,
+                             prompt_cache=prompt_cache, model_path=self.model_dir)
+
+    def test_least_recently_used_model_is_evicted(self):
+        pool = ModelPool(max_models=2)
+        a, b, c = self._resident("a"), self._resident("b"), self._resident("c")
+        pool.add(a)
+        pool.add(b)
+        self.assertIs(pool.activate("a"), a)
+
+        self.assertEqual(pool.make_room(0), [("b", None)])
+        pool.add(c)
+
+        self.assertEqual([m['model_name'] for m in pool.list()], ["c", "a"])
+        self.assertIs(pool.active, c)
+        self.assertIsNone(b.engine)
+        self.assertEqual(pool.get_stats()['evictions'], 1)
+        pool.clear()
+
+    def test_memory_budget_limits_residency(self):
+        resident = self._resident("a")
+        pool = ModelPool(max_bytes=int(resident.nbytes * 1.5), max_models=4)
+        pool.add(resident)
+
+        self.assertGreater(estimate_model_bytes(self.model_dir), 0)
+        self.assertEqual(pool.make_room(resident.nbytes), [("a", None)])
+        self.assertIsNone(pool.active)
+        self.assertEqual(pool.used_bytes(), 0)
+
+    def test_resident_models_serve_requests_by_name(self):
+        pool = ModelPool(max_models=2)
+        pool.add(self._resident("a"))
+        pool.add(self._resident("b"))
+
+        resident = pool.get("a")
+        request = resident.engine.submit(GenerationRequest(resident.tokenizer.encode("hello world"), max_tokens=4))
+        self.assertEqual(len(list(request.tokens(timeout=30))), 4)
+        self.assertEqual(pool.active.model_name, "b")
+
+        self.assertTrue(pool.remove("a"))
+        self.assertFalse(pool.remove("a"))
+        self.assertIsNone(pool.get("a"))
+        pool.clear()
+        self.assertEqual(pool.list(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Tests for serving several LoRA adapters in one batch.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model, build_tiny_adapter
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.adapters import AdapterSwapper
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.model_pool import ResidentModel
+from forgellm.server.multi_adapter import AdapterCache
+from forgellm.server.prompt_cache import PromptCacheStore
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestMultiAdapter(unittest.TestCase):
+    """Test cases for AdapterCache and per-request adapters in BatchEngine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.model_dir = build_tiny_model(os.path.join(cls.tmp_dir, "model"))
+        cls.lora_dir = build_tiny_adapter(cls.model_dir, os.path.join(cls.tmp_dir, "lora"))
+        cls.checkpoint = os.path.join(cls.lora_dir, "0000100_adapters.safetensors")
+        cls.small_dir = build_tiny_adapter(cls.model_dir, os.path.join(cls.tmp_dir, "small"), rank=2)
+        cls.dora_dir = build_tiny_adapter(cls.model_dir, os.path.join(cls.tmp_dir, "dora"),
+                                          rank=2, fine_tune_type="dora")
+
+        cls.prompts = [
+            cls._encode("the quick brown fox"),
+            cls._encode("hello world"),
+            cls._encode("over the lazy dog"),
+            cls._encode("jumps over")
+        ]
+        cls.references = {}
+        for adapter in (None, cls.lora_dir, cls.checkpoint, cls.small_dir):
+            model, tokenizer = load(cls.model_dir)
+            AdapterSwapper(model).apply(adapter)
+            engine = BatchEngine(model, tokenizer)
+            engine.start()
+            try:
+                for prompt in cls.prompts:
+                    request = engine.submit(GenerationRequest(prompt, max_tokens=8))
+                    cls.references[(adapter, tuple(prompt))] = list(request.tokens(timeout=30))
+            finally:
+                engine.stop()
+
+    @classmethod
+    def _encode(cls, text):
+        if not hasattr(cls, '_tokenizer'):
+            _, cls._tokenizer = load(cls.model_dir)
+        return cls._tokenizer.encode(text)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.model, self.tokenizer = load(self.model_dir)
+        self.store = PromptCacheStore()
+        self.adapters = AdapterCache(self.model, max_adapters=4, on_change=self.store.clear_namespace)
+        self.engine = BatchEngine(self.model, self.tokenizer, prompt_cache=self.store, adapters=self.adapters)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def test_mixed_adapters_share_a_batch(self):
+        adapters = [None, self.lora_dir, self.checkpoint, self.small_dir]
+        requests = [
+            self.engine.submit(GenerationRequest(prompt, max_tokens=8, adapter=adapter))
+            for prompt, adapter in zip(self.prompts, adapters)
+        ]
+        for request, prompt, adapter in zip(requests, self.prompts, adapters):
+            self.assertEqual(list(request.tokens(timeout=30)), self.references[(adapter, tuple(prompt))])
+
+        self.assertGreater(self.engine.get_stats()['max_batch_seen'], 1)
+        stats = self.adapters.get_stats()
+        self.assertEqual(stats['adapters'], 3)
+        self.assertTrue(all(a['in_use'] == 0 for a in self.adapters.list()))
+
+    def test_least_recently_used_adapter_is_evicted(self):
+        self.adapters.max_adapters = 2
+        for adapter in (self.lora_dir, self.small_dir, self.checkpoint):
+            request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8, adapter=adapter))
+            self.assertEqual(list(request.tokens(timeout=30)), self.references[(adapter, tuple(self.prompts[0]))])
+
+        self.assertEqual([a['adapter_path'] for a in self.adapters.list()], [self.checkpoint, self.small_dir])
+        self.assertEqual(self.adapters.get_stats()['evictions'], 1)
+
+        # The slot freed by the evicted adapter is reused without leftovers
+        request = self.engine.submit(GenerationRequest(self.prompts[1], max_tokens=8, adapter=self.small_dir))
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(self.small_dir, tuple(self.prompts[1]))])
+
+    def test_rewritten_adapter_is_loaded_again(self):
+        adapter_dir = os.path.join(self.tmp_dir, "rewritten")
+        shutil.copytree(self.lora_dir, adapter_dir, dirs_exist_ok=True)
+        request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8, adapter=adapter_dir))
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(self.lora_dir, tuple(self.prompts[0]))])
+
+        # A training run checkpoints into the same directory
+        weights = os.path.join(adapter_dir, "adapters.safetensors")
+        shutil.copyfile(self.checkpoint, weights)
+        st = os.stat(weights)
+        os.utime(weights, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8, adapter=adapter_dir))
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(self.checkpoint, tuple(self.prompts[0]))])
+
+        self.assertEqual([a['adapter_path'] for a in self.adapters.list()], [adapter_dir])
+        self.assertEqual(self.adapters.get_stats()['loads'], 2)
+
+    def test_over_budget_is_logged(self):
+        self.adapters.max_bytes = 1
+        with self.assertLogs('forgellm.server.multi_adapter', level='WARNING') as logs:
+            request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8, adapter=self.lora_dir))
+            list(request.tokens(timeout=30))
+        self.assertIn('exceeds its budget', logs.output[0])
+
+    def test_prompt_cache_is_separate_per_adapter(self):
+        prompt = self.prompts[0]
+        request = self.engine.submit(GenerationRequest(prompt, max_tokens=8, session_id="chat", adapter=self.lora_dir))
+        reply = list(request.tokens(timeout=30))
+
+        follow_up = prompt + reply + self.tokenizer.encode(" hello", add_special_tokens=False)
+        request = self.engine.submit(GenerationRequest(follow_up, max_tokens=4, session_id="chat"))
+        list(request.tokens(timeout=30))
+        self.assertEqual(request.cached_tokens, 0)
+
+        request = self.engine.submit(GenerationRequest(follow_up, max_tokens=4, session_id="chat", adapter=self.lora_dir))
+        list(request.tokens(timeout=30))
+        self.assertGreaterEqual(request.cached_tokens, len(prompt))
+
+    def test_dora_adapter_cannot_be_stacked(self):
+        request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=4, adapter=self.dora_dir))
+        with self.assertRaises(RuntimeError):
+            list(request.tokens(timeout=30))
+
+        # The engine keeps serving other requests
+        request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8))
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(None, tuple(self.prompts[0]))])
+
+    def test_default_adapter_switch_does_not_disturb_requests_in_flight(self):
+        resident = ResidentModel("tiny", None, self.model, self.tokenizer,
+                                 engine=self.engine, prompt_cache=self.store)
+        running = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8))
+        resident.swap_adapter(self.lora_dir)
+
+        request = self.engine.submit(GenerationRequest(self.prompts[1], max_tokens=8))
+        self.assertEqual(list(running.tokens(timeout=30)), self.references[(None, tuple(self.prompts[0]))])
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(self.lora_dir, tuple(self.prompts[1]))])
+        self.assertEqual(request.adapter, self.lora_dir)
+
+        # DoRA adapters fall back to being applied in place
+        resident.swap_adapter(self.dora_dir)
+        self.assertEqual(resident.adapters.adapter_path, self.dora_dir)
+        self.assertFalse(self.adapters.enabled)
+
+        resident.swap_adapter(None)
+        self.assertTrue(self.adapters.enabled)
+        request = self.engine.submit(GenerationRequest(self.prompts[0], max_tokens=8))
+        self.assertEqual(list(request.tokens(timeout=30)), self.references[(None, tuple(self.prompts[0]))])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Tests for the OpenAI-compatible request and response formats.
+"""
+
+import io
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.server import openai_api
+from forgellm.server.openai_api import OpenAIError
+
+
+class TestOpenAIAPI(unittest.TestCase):
+    """Test cases for the OpenAI wire format helpers."""
+
+    def test_parse_messages(self):
+        messages = openai_api.parse_messages({'messages': [
+            {'role': 'developer', 'content': 'Be brief.'},
+            {'role': 'user', 'content': [{'type': 'text', 'text': 'Hello, '},
+                                         {'type': 'image_url', 'image_url': {'url': 'x'}},
+                                         {'type': 'text', 'text': 'world'}]},
+        ]})
+        self.assertEqual(messages, [{'role': 'system', 'content': 'Be brief.'},
+                                    {'role': 'user', 'content': 'Hello, world'}])
+        for data in ({}, {'messages': []}, {'messages': [{'content': 'no role'}]}):
+            with self.assertRaises(OpenAIError):
+                openai_api.parse_messages(data)
+
+    def test_parse_prompt(self):
+        self.assertEqual(openai_api.parse_prompt({'prompt': 'hi'}), 'hi')
+        self.assertEqual(openai_api.parse_prompt({'prompt': ['hi']}), 'hi')
+        self.assertEqual(openai_api.parse_prompt({'prompt': [1, 2, 3]}), [1, 2, 3])
+        with self.assertRaises(OpenAIError) as context:
+            openai_api.parse_prompt({'prompt': ['a', 'b']})
+        self.assertEqual(context.exception.to_dict()['error']['param'], 'prompt')
+
+    def test_streamed_chunks(self):
+        chunk = openai_api.completion_chunk('chatcmpl-1', 'model', True, 123, text='', role=True)
+        self.assertEqual(chunk['object'], 'chat.completion.chunk')
+        self.assertEqual(chunk['choices'][0]['delta'], {'role': 'assistant', 'content': ''})
+
+        final = openai_api.completion_chunk('cmpl-1', 'model', False, 123, reason='length')
+        self.assertEqual(final['choices'][0], {'index': 0, 'text': '', 'logprobs': None, 'finish_reason': 'length'})
+
+        event = openai_api.sse(chunk)
+        self.assertTrue(event.startswith(b'data: ') and event.endswith(b'\n\n'))
+        self.assertEqual(json.loads(event[len(b'data: '):]), chunk)
+        self.assertEqual(openai_api.SSE_DONE, b'data: [DONE]\n\n')
+
+    def test_completion_response(self):
+        usage = openai_api.usage(5, 3, cached_tokens=2)
+        self.assertEqual(usage['total_tokens'], 8)
+        response = openai_api.completion_response('chatcmpl-1', 'model', True, 'Hi!', 'stop', usage)
+        self.assertEqual(response['object'], 'chat.completion')
+        self.assertEqual(response['choices'][0]['message'], {'role': 'assistant', 'content': 'Hi!'})
+        self.assertEqual(response['usage']['prompt_tokens_details']['cached_tokens'], 2)
+
+    def test_stream_settings(self):
+        include_usage, tokens, delay = openai_api.stream_settings(
+            {'stream_options': {'include_usage': True}}, 0, 25)
+        self.assertEqual((include_usage, tokens, delay), (True, 1, 0.025))
+        self.assertFalse(openai_api.stream_settings({}, 4, 25)[0])
+
+    def test_generation_options(self):
+        options = openai_api.generation_options({'temperature': '0', 'max_tokens': 8, 'repetition_penalty': 1.2})
+        self.assertIsNone(options['sampler'])
+        self.assertEqual(len(options['logits_processors']), 1)
+
+        for name in ('temperature', 'top_p', 'repetition_penalty'):
+            for value in ('hot', [1], {}):
+                with self.assertRaises(OpenAIError) as error:
+                    openai_api.generation_options({name: value})
+                self.assertEqual(error.exception.status_code, 400)
+                self.assertEqual(error.exception.param, name)
+
+
+class TestOpenAIModels(unittest.TestCase):
+    """OpenAI requests name a resident model or none."""
+
+    def _complete(self, data):
+        from forgellm.server import main
+
+        handler = main.ModelHandler.__new__(main.ModelHandler)
+        handler.wfile = io.BytesIO()
+        handler._set_headers = mock.Mock()
+        handler._handle_openai_completion(data, chat=True)
+        return handler._set_headers.call_args[0][0], json.loads(handler.wfile.getvalue())
+
+    def test_unknown_model(self):
+        from forgellm.server.model_pool import ModelPool
+
+        with mock.patch('forgellm.server.main.MODEL_POOL', ModelPool()):
+            status, response = self._complete({'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'Hi'}]})
+            self.assertEqual(status, 404)
+            self.assertEqual(response['error']['code'], 'model_not_found')
+            self.assertEqual(response['error']['param'], 'model')
+
+            status, response = self._complete({'messages': [{'role': 'user', 'content': 'Hi'}]})
+            self.assertEqual(status, 503)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Tests for persistent prompt caches of registered prefixes.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.prefix_cache import PrefixCacheRegistry
+from forgellm.server.prompt_cache import PromptCacheStore
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestPrefixCache(unittest.TestCase):
+    """Test cases for PrefixCacheRegistry."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.store = PromptCacheStore(max_bytes=0)
+        self.engine = BatchEngine(self.model, self.tokenizer, prompt_cache=self.store)
+        self.engine.start()
+        self.prefix = self.tokenizer.encode("the quick brown fox jumps over the lazy dog")
+
+    def tearDown(self):
+        self.engine.stop()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _register(self, registry):
+        request = self.engine.submit(GenerationRequest(self.prefix, prefill_only=True))
+        list(request.tokens(timeout=30))
+        self.assertEqual(request.finish_reason, 'prefill')
+        self.assertEqual(request.cache[0].offset, len(self.prefix))
+        return registry.save(self.prefix, request.cache, "the quick brown fox")
+
+    def test_saved_prefix_is_restored_for_same_model(self):
+        registry = PrefixCacheRegistry(self.cache_dir)
+        registry.activate(self.model_dir)
+        info = self._register(registry)
+        self.assertTrue(os.path.exists(info['path']))
+
+        restarted = PrefixCacheRegistry(self.cache_dir)
+        loaded = restarted.activate(self.model_dir)
+        self.assertEqual(len(loaded), 1)
+        restored_info, tokens, cache = loaded[0]
+        self.assertEqual(restored_info['id'], info['id'])
+        self.assertEqual(tokens, self.prefix)
+        self.assertEqual([p['id'] for p in restarted.list()], [info['id']])
+
+        # Pinned prefixes are reused even with the turn cache disabled
+        self.store.pin(f"registered:{info['id']}", tokens, cache)
+        prompt = self.prefix + self.tokenizer.encode(" hello", add_special_tokens=False)
+        request = self.engine.submit(GenerationRequest(prompt, max_tokens=4))
+        list(request.tokens(timeout=30))
+        self.assertEqual(request.cached_tokens, len(self.prefix))
+
+    def test_prefixes_are_scoped_to_model_and_adapter(self):
+        registry = PrefixCacheRegistry(self.cache_dir)
+        registry.activate(self.model_dir)
+        self._register(registry)
+
+        self.assertEqual(registry.activate(self.model_dir, adapter_path="/tmp/some-adapter"), [])
+        self.assertEqual(registry.list(), [])
+
+    def test_evict_removes_file(self):
+        registry = PrefixCacheRegistry(self.cache_dir)
+        registry.activate(self.model_dir)
+        info = self._register(registry)
+
+        self.assertIsNotNone(registry.evict(info['id']))
+        self.assertFalse(os.path.exists(info['path']))
+        self.assertIsNone(registry.evict(info['id']))
+        self.assertEqual(PrefixCacheRegistry(self.cache_dir).activate(self.model_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
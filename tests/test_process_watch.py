@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Tests for the shared MLX process watch.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.utils.process_watch import ProcessWatch
+
+
+def sleeper():
+    return subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+
+
+class TestProcessWatch(unittest.TestCase):
+    """Test cases for ProcessWatch."""
+
+    def setUp(self):
+        self.pid_dir = tempfile.mkdtemp()
+        self.watch = ProcessWatch(self.pid_dir, refresh_interval=0)
+        self.processes = []
+
+    def tearDown(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+        shutil.rmtree(self.pid_dir)
+
+    def spawn(self):
+        process = sleeper()
+        self.processes.append(process)
+        return process
+
+    def test_registered_process_is_active(self):
+        self.assertFalse(self.watch.is_active())
+        self.assertIsNone(self.watch.active_training())
+
+        process = self.spawn()
+        self.watch.register(process, 'training', log_file='/tmp/CPT_run.json')
+        self.assertTrue(self.watch.is_training_active())
+        self.assertFalse(self.watch.is_active(['fuse']))
+        self.assertEqual(self.watch.active_training()['log_file'], '/tmp/CPT_run.json')
+
+        self.watch.unregister(process)
+        self.assertFalse(self.watch.is_active())
+        self.assertEqual(os.listdir(self.pid_dir), [])
+
+    def test_other_processes_see_the_pid_file(self):
+        process = self.spawn()
+        self.watch.register(process, 'fuse', output_dir='/tmp/fused')
+
+        other = ProcessWatch(self.pid_dir, refresh_interval=0)
+        self.assertEqual([(p['pid'], p['kind']) for p in other.active_processes()], [(process.pid, 'fuse')])
+
+        # A process that exited without unregistering is dropped, with its PID file
+        process.kill()
+        process.wait()
+        self.assertFalse(other.is_active())
+        self.assertEqual(os.listdir(self.pid_dir), [])
+
+    def test_reused_pid_is_not_active(self):
+        with open(os.path.join(self.pid_dir, f'training-{os.getpid()}.json'), 'w') as f:
+            json.dump({'pid': os.getpid(), 'kind': 'training', 'create_time': 1.0}, f)
+        self.assertFalse(self.watch.is_active())
+
+    def test_answers_are_cached(self):
+        watch = ProcessWatch(self.pid_dir, refresh_interval=60)
+        process = self.spawn()
+        ProcessWatch(self.pid_dir).register(process, 'convert')
+        self.assertTrue(watch.is_active())
+
+        process.kill()
+        process.wait()
+        self.assertTrue(watch.is_active())
+        watch.refresh(force=True)
+        self.assertFalse(watch.is_active())
+
+    def test_watching(self):
+        process = self.spawn()
+        with self.watch.watching(process, 'fuse'):
+            self.assertTrue(self.watch.is_active(['fuse']))
+        self.assertFalse(self.watch.is_active())
+
+        # Also when the caller fails while the process runs
+        with self.assertRaises(RuntimeError):
+            with self.watch.watching(process, 'convert'):
+                raise RuntimeError("monitoring failed")
+        self.assertFalse(self.watch.is_active())
+        self.assertEqual(os.listdir(self.pid_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Tests for prompt KV-cache reuse across chat turns.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.prompt_cache import PromptCacheStore
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestPromptCache(unittest.TestCase):
+    """Test cases for PromptCacheStore and its use by BatchEngine."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.store = PromptCacheStore()
+        self.cached_engine = BatchEngine(self.model, self.tokenizer, prefill_step_size=8, prompt_cache=self.store)
+        self.plain_engine = BatchEngine(self.model, self.tokenizer, prefill_step_size=8)
+        self.cached_engine.start()
+        self.plain_engine.start()
+
+    def tearDown(self):
+        self.cached_engine.stop()
+        self.plain_engine.stop()
+
+    def _encode(self, text):
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def _generate(self, engine, tokens, session_id=None):
+        request = engine.submit(GenerationRequest(tokens, max_tokens=8, session_id=session_id))
+        return request, list(request.tokens(timeout=30))
+
+    def test_second_turn_prefills_only_the_suffix(self):
+        turn1 = self.tokenizer.encode("the quick brown fox jumps over the lazy dog")
+        request, reply = self._generate(self.cached_engine, turn1, "chat-1")
+        self.assertEqual(request.cached_tokens, 0)
+
+        turn2 = turn1 + reply + self._encode(" hello world")
+        request, cached_reply = self._generate(self.cached_engine, turn2, "chat-1")
+        _, expected = self._generate(self.plain_engine, turn2)
+
+        self.assertGreaterEqual(request.cached_tokens, len(turn1))
+        self.assertLess(request.cached_tokens, len(turn2))
+        self.assertEqual(cached_reply, expected)
+
+    def test_edited_message_reuses_only_shared_prefix(self):
+        turn1 = self.tokenizer.encode("the quick brown fox jumps over the lazy dog")
+        self._generate(self.cached_engine, turn1, "chat-1")
+
+        edited = turn1[:4] + self._encode(" lazy lazy") + turn1[4:]
+        request, reply = self._generate(self.cached_engine, edited, "chat-1")
+        _, expected = self._generate(self.plain_engine, edited)
+
+        self.assertEqual(request.cached_tokens, 4)
+        self.assertEqual(reply, expected)
+        self.assertEqual(self.store.get_stats()['invalidations'], 1)
+
+    def test_lookup_without_session_matches_longest_prefix(self):
+        prompt = self.tokenizer.encode("hello world the quick brown fox")
+        self._generate(self.cached_engine, prompt)
+        request, _ = self._generate(self.cached_engine, prompt + self._encode(" jumps"))
+        self.assertGreaterEqual(request.cached_tokens, len(prompt))
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        prompt = self.tokenizer.encode("hello world")
+        self._generate(self.cached_engine, prompt, "a")
+        self.store.max_bytes = int(self.store.get_stats()['bytes'] * 2.5)
+
+        self._generate(self.cached_engine, prompt, "b")
+        self._generate(self.cached_engine, prompt, "c")
+
+        stats = self.store.get_stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertLessEqual(stats['bytes'], self.store.max_bytes)
+        self.assertEqual(stats['evictions'], 1)
+
+    def test_fetched_cache_is_private(self):
+        import mlx.core as mx
+
+        prompt = self.tokenizer.encode("the quick brown fox jumps over the lazy dog")
+        self._generate(self.cached_engine, prompt, "chat-1")
+        stored = [mx.array(layer.keys) for layer in self.store._entries[(None, "chat-1")].cache]
+
+        # Writing into a trimmed copy must not reach the stored buffers
+        cache, cached = self.store.fetch(prompt[:4] + self._encode(" lazy lazy"), "chat-1")
+        self.assertEqual(cached, 4)
+        for layer in cache:
+            keys = layer.keys[..., :1, :]
+            layer.update_and_fetch(mx.ones_like(keys), mx.ones_like(layer.values[..., :1, :]))
+        mx.eval([layer.keys for layer in cache])
+        for before, layer in zip(stored, self.store._entries[(None, "chat-1")].cache):
+            self.assertTrue(mx.array_equal(before, layer.keys))
+
+    def test_clear_drops_all_entries(self):
+        self._generate(self.cached_engine, self.tokenizer.encode("hello world"), "a")
+        self.store.clear("model reload")
+        self.assertEqual(self.store.get_stats()['entries'], 0)
+        self.assertEqual(self.store.fetch(self.tokenizer.encode("hello world"), "a"), (None, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
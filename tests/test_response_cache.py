@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Tests for the response cache of deterministic generation requests.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.server.response_cache import ResponseCache, cache_directives, is_deterministic
+
+PARAMS = {'max_tokens': 20, 'temperature': 0.7, 'top_p': 0.9, 'repetition_penalty': 1.1, 'seed': 3}
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test cases for ResponseCache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.model_dir = os.path.join(self.tmp_dir, 'model')
+        os.makedirs(self.model_dir)
+        for name in ('model.safetensors', 'config.json'):
+            with open(os.path.join(self.model_dir, name), 'w') as f:
+                f.write('{}')
+        self.cache_dir = os.path.join(self.tmp_dir, 'responses')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _record(self, text="hello"):
+        return {'text': text, 'prompt_tokens': 3, 'completion_tokens': 2, 'finish_reason': 'stop'}
+
+    def test_hit_and_key_parts(self):
+        cache = ResponseCache(max_bytes=1 << 20)
+        key = cache.key('tiny', self.model_dir, None, [1, 2, 3], PARAMS)
+        self.assertIsNone(cache.get(key))
+        cache.put(key, self._record(), 'tiny')
+        self.assertEqual(cache.get(key)['text'], "hello")
+
+        self.assertNotEqual(key, cache.key('tiny', self.model_dir, None, [1, 2, 4], PARAMS))
+        self.assertNotEqual(key, cache.key('tiny', self.model_dir, None, [1, 2, 3], dict(PARAMS, seed=4)))
+        self.assertNotEqual(key, cache.key('tiny', self.model_dir, self.model_dir, [1, 2, 3], PARAMS))
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        self.assertEqual(cache.get_stats()['misses'], 1)
+
+    def test_reloaded_weights_do_not_match(self):
+        cache = ResponseCache(max_bytes=1 << 20)
+        key = cache.key('tiny', self.model_dir, None, [1, 2, 3], PARAMS)
+        cache.put(key, self._record(), 'tiny')
+
+        # Retrained weights written under the same path, then loaded again
+        weights = os.path.join(self.model_dir, 'model.safetensors')
+        with open(weights, 'w') as f:
+            f.write('{"retrained": true}')
+        self.assertEqual(cache.invalidate('tiny'), 1)
+        self.assertIsNone(cache.get(key))
+        self.assertNotEqual(key, cache.key('tiny', self.model_dir, None, [1, 2, 3], PARAMS))
+
+    def test_size_and_ttl_bounds(self):
+        size = len(json.dumps(dict(self._record(), created=time.time())))
+        cache = ResponseCache(max_bytes=2 * size + 10, ttl=60)
+        keys = [cache.key('tiny', self.model_dir, None, [i], PARAMS) for i in range(3)]
+        for key in keys:
+            cache.put(key, self._record(), 'tiny')
+        self.assertIsNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+        with mock.patch('forgellm.server.response_cache.time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get(keys[2]))
+        self.assertEqual(cache.get_stats()['expired'], 1)
+
+    def test_disk_tier_survives_restart(self):
+        cache = ResponseCache(max_bytes=1 << 20, cache_dir=self.cache_dir)
+        key = cache.key('tiny', self.model_dir, None, [1, 2, 3], PARAMS)
+        cache.put(key, self._record("from disk"), 'tiny')
+
+        restarted = ResponseCache(max_bytes=1 << 20, cache_dir=self.cache_dir)
+        self.assertEqual(restarted.get(key, 'tiny')['text'], "from disk")
+        self.assertEqual(restarted.get_stats()['disk_hits'], 1)
+
+        # Disk budget: the oldest files are deleted first
+        small = ResponseCache(max_bytes=1 << 20, cache_dir=self.cache_dir, max_disk_bytes=400)
+        for i in range(5):
+            small.put(small.key('tiny', self.model_dir, None, [i], PARAMS), self._record(), 'tiny')
+        self.assertLessEqual(small.get_stats()['disk_bytes'], 400)
+        self.assertLess(len(os.listdir(self.cache_dir)), 6)
+
+    def test_request_options(self):
+        self.assertTrue(is_deterministic(0.0, None))
+        self.assertTrue(is_deterministic(0.7, 42))
+        self.assertFalse(is_deterministic(0.7, None))
+        self.assertEqual(cache_directives(None), (True, True))
+        self.assertEqual(cache_directives('no-cache'), (False, True))
+        self.assertEqual(cache_directives('max-age=0, no-store'), (False, False))
+
+        disabled = ResponseCache(max_bytes=0, cache_dir=self.cache_dir)
+        disabled.put('key', self._record(), 'tiny')
+        self.assertIsNone(disabled.get('key'))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+class TestCachedResponse(unittest.TestCase):
+    """A cache hit reports what answering from the cache cost."""
+
+    def _send(self, data):
+        from forgellm.server.main import ModelHandler
+
+        handler = ModelHandler.__new__(ModelHandler)
+        handler.wfile = io.BytesIO()
+        handler._set_headers = mock.Mock()
+        resident = mock.Mock(adapter_path=None)
+        prepared = ('prompt', [1, 2, 3], False, 0.002, 0.001)
+        record = {'text': 'hello', 'prompt_tokens': 3, 'completion_tokens': 64, 'finish_reason': 'stop'}
+        handler._send_cached_response(data, resident, prepared, record, 0.0005)
+        lines = handler.wfile.getvalue().decode().strip().splitlines()
+        return json.loads(lines[-1])
+
+    def test_timing_fields(self):
+        for data in ({}, {'streaming': True}):
+            result = self._send(data)
+            self.assertTrue(result['cached'])
+            self.assertEqual(result['response_cache'], 'hit')
+            # Nothing was decoded: no rate
+            self.assertIsNone(result['tokens_per_sec'])
+            self.assertAlmostEqual(result['generation_time'], 0.0035)
+            self.assertEqual(result['timing'], {'format': 0.002, 'tokenize': 0.001, 'cache_lookup': 0.0005})
+            self.assertEqual(result['completion_tokens'], 64)
+
+
+class TestGenerateParams(unittest.TestCase):
+    """Sampling parameters are validated before the response cache sees them."""
+
+    def test_conversion(self):
+        from forgellm.server.main import generate_params
+
+        params = generate_params({'temperature': '0', 'top_p': None, 'max_tokens': 8, 'seed': 3})
+        self.assertEqual((params['temperature'], params['top_p'], params['repetition_penalty']), (0.0, 0.9, 1.1))
+        for data in ({'temperature': 'hot'}, {'top_p': [1]}, {'repetition_penalty': {}},
+                     {'max_tokens': '8'}, {'max_tokens': -1}, {'seed': 1.5}):
+            with self.assertRaises(ValueError):
+                generate_params(data)
+
+    def test_invalid_request_with_cache_enabled(self):
+        from forgellm.server import main
+
+        handler = main.ModelHandler.__new__(main.ModelHandler)
+        handler.wfile = io.BytesIO()
+        handler._set_headers = mock.Mock()
+        handler.headers = {}
+        handler._get_resident = mock.Mock(return_value=mock.Mock(adapter_path=None))
+        with mock.patch.object(main, 'RESPONSE_CACHE', ResponseCache(max_bytes=1 << 20)):
+            handler._handle_admitted_generate({'prompt': 'Hi', 'temperature': 'hot', 'seed': 1})
+        handler._set_headers.assert_called_once_with(400)
+        self.assertEqual(json.loads(handler.wfile.getvalue())['error'], "'temperature' must be a number")
+
+
+if __name__ == '__main__':
+    unittest.main()
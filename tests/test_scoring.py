@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Tests for log-likelihood scoring.
+"""
+
+import os
+import sys
+import math
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    import mlx.core as mx
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server import scoring
+from forgellm.server.batch_engine import BatchEngine
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestScoring(unittest.TestCase):
+    """Test cases for batched scoring."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.engine = BatchEngine(self.model, self.tokenizer)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def _reference(self, tokens, start):
+        """Log-probs of tokens[start:] from one unpadded forward pass."""
+        logits = self.model(mx.array(tokens[:-1])[None])[0].astype(mx.float32)
+        logprobs = logits - mx.logsumexp(logits, axis=-1, keepdims=True)
+        return [logprobs[t - 1, tokens[t]].item() for t in range(start, len(tokens))]
+
+    def test_batched_scores_match_single_passes(self):
+        texts = ["hello world", "the quick brown fox jumps over the lazy dog", "lazy dog", "over the world"]
+        items = scoring.parse_items({'texts': texts}, self.tokenizer)
+        # A small budget forces several padded batches
+        self.assertGreater(len(scoring.plan_batches(items, max_tokens=16)), 1)
+        elapsed = scoring.score(self.engine, self.model, items, max_tokens=16)
+        response = scoring.summarize(items, elapsed)
+
+        self.assertEqual([r['index'] for r in response['results']], list(range(len(texts))))
+        for item, result in zip(items, response['results']):
+            expected = self._reference(item.tokens, item.start)
+            self.assertEqual(len(result['logprobs']), len(expected))
+            for got, want in zip(result['logprobs'], expected):
+                self.assertAlmostEqual(got, want, places=4)
+            self.assertAlmostEqual(result['nll'], -sum(expected), places=3)
+            self.assertAlmostEqual(result['perplexity'], math.exp(-sum(expected) / len(expected)), places=2)
+
+        self.assertEqual(response['total_tokens'], sum(r['tokens'] for r in response['results']))
+        self.assertAlmostEqual(response['total_nll'], sum(r['nll'] for r in response['results']), places=3)
+
+    def test_continuation_only_is_scored(self):
+        items = scoring.parse_items({'items': [{'prompt': "the quick brown", 'continuation': " fox"}]}, self.tokenizer)
+        item = items[0]
+        context = self.tokenizer.encode("the quick brown")
+        self.assertEqual(item.start, len(context))
+        scoring.score(self.engine, self.model, items)
+        self.assertEqual(len(item.logprobs), item.num_scored)
+        for got, want in zip(item.logprobs, self._reference(item.tokens, item.start)):
+            self.assertAlmostEqual(got, want, places=4)
+
+    def test_invalid_requests(self):
+        for data in ({}, {'texts': []}, {'texts': ["a"], 'items': []}, {'items': [{'prompt': "a"}]}):
+            with self.assertRaises(ValueError):
+                scoring.parse_items(data, self.tokenizer)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Tests for the persistent training-session index.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.training.session_index import SessionIndex, get_session_index
+
+
+def write_session(models_dir, session_id, metrics, end_time=None, adapter_config=None, checkpoints=()):
+    """Write a session directory like the trainer does."""
+    session_dir = os.path.join(models_dir, 'cpt', session_id)
+    os.makedirs(session_dir, exist_ok=True)
+    log_file = os.path.join(session_dir, f'CPT_{session_id}.json')
+    with open(log_file, 'w') as f:
+        json.dump({
+            'base_model': 'test/base',
+            'start_time': '2025-01-01T00:00:00',
+            'end_time': end_time,
+            'status': 'completed' if end_time else 'running',
+            'config': {'learning_rate': 1e-5, 'max_seq_length': 512},
+            'metrics': metrics
+        }, f)
+    if adapter_config is not None:
+        with open(os.path.join(session_dir, 'adapter_config.json'), 'w') as f:
+            json.dump(adapter_config, f)
+    for iteration in checkpoints:
+        open(os.path.join(session_dir, f'{iteration:07d}_adapters.safetensors'), 'w').close()
+    return log_file
+
+
+def metrics(iterations):
+    return [{'iteration': i, 'train_loss': 2.0 / i, 'val_loss': 2.5 / i} for i in range(1, iterations + 1)]
+
+
+class TestSessionIndex(unittest.TestCase):
+    """Test cases for SessionIndex."""
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.index = SessionIndex(self.models_dir, refresh_interval=0)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.models_dir)
+
+    def test_list_sessions(self):
+        write_session(self.models_dir, 'run_a', metrics(10), end_time='2025-01-01T01:00:00')
+        log_file = write_session(self.models_dir, 'run_b', metrics(3))
+        os.utime(log_file, (2e9, 2e9))
+
+        sessions = self.index.list_sessions()
+        self.assertEqual([s['session_id'] for s in sessions], ['run_b', 'run_a'])
+        self.assertEqual(sessions[0]['log_file'], log_file)
+        self.assertEqual(sessions[0]['model_name'], 'test/base')
+        self.assertEqual(sessions[1]['metrics_count'], 10)
+        self.assertEqual(sessions[1]['latest_iteration'], 10)
+        self.assertAlmostEqual(sessions[1]['latest_loss'], 0.2)
+
+    def test_only_changed_logs_are_parsed(self):
+        write_session(self.models_dir, 'run_a', metrics(5))
+        write_session(self.models_dir, 'run_b', metrics(5))
+        self.index.list_sessions()
+        self.assertEqual(self.index.get_stats()['parsed_logs'], 2)
+
+        self.index.list_sessions()
+        self.assertEqual(self.index.get_stats()['parsed_logs'], 2)
+
+        write_session(self.models_dir, 'run_b', metrics(6), checkpoints=[6])
+        session = self.index.get_session('run_b')
+        self.assertEqual(self.index.get_stats()['parsed_logs'], 3)
+        self.assertEqual(session['metrics_count'], 6)
+        self.assertEqual(session['checkpoints'], ['0000006_adapters.safetensors'])
+
+        # A new checkpoint alone updates the entry too
+        open(os.path.join(self.models_dir, 'cpt', 'run_b', '0000007_adapters.safetensors'), 'w').close()
+        self.assertEqual(len(self.index.get_session('run_b')['checkpoints']), 2)
+
+    def test_removed_and_unreadable_sessions(self):
+        write_session(self.models_dir, 'run_a', metrics(5))
+        log_file = write_session(self.models_dir, 'run_b', metrics(5))
+        self.assertEqual(len(self.index.list_sessions()), 2)
+
+        # A log being rewritten keeps its previous entry
+        with open(log_file, 'w') as f:
+            f.write('{"metrics": [')
+        self.assertEqual(self.index.get_session('run_b')['metrics_count'], 5)
+
+        shutil.rmtree(os.path.join(self.models_dir, 'cpt', 'run_a'))
+        self.assertIsNone(self.index.find_log_file('run_a'))
+        self.assertEqual(self.index.get_stats()['removed_logs'], 1)
+
+    def test_active_sessions_and_details(self):
+        write_session(self.models_dir, 'finished', metrics(2), end_time='2025-01-01T01:00:00')
+        old = write_session(self.models_dir, 'stale', metrics(2))
+        os.utime(old, (1e9, 1e9))
+        write_session(self.models_dir, 'running', metrics(4),
+                      adapter_config={'optimizer_config': {'adamw': {'weight_decay': 0.01}}})
+
+        active = self.index.active_sessions(max_age=600)
+        self.assertEqual([s['session_id'] for s in active], ['running'])
+        self.assertEqual(active[0]['latest_metrics']['iteration'], 4)
+        self.assertEqual(active[0]['config']['max_seq_length'], 512)
+        self.assertEqual(active[0]['adapter_config']['optimizer_config']['adamw']['weight_decay'], 0.01)
+
+    def test_index_persists(self):
+        write_session(self.models_dir, 'run_a', metrics(5))
+        self.index.list_sessions()
+        self.index.close()
+
+        self.index = SessionIndex(self.models_dir, refresh_interval=0)
+        self.assertEqual(len(self.index.list_sessions()), 1)
+        self.assertEqual(self.index.get_stats()['parsed_logs'], 0)
+
+
+class TestSessionRoutes(unittest.TestCase):
+    """The training-session routes answer from the index."""
+
+    def setUp(self):
+        from flask import Flask
+        from forgellm.api.routes import setup_api
+
+        self.models_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {'MODELS_DIR': self.models_dir})
+        self.env.start()
+        write_session(self.models_dir, 'run_a', metrics(10), end_time='2025-01-01T01:00:00',
+                      adapter_config={'lr_schedule': {'arguments': [1e-5, 100, 1e-6]},
+                                      'optimizer_config': {'adamw': {'weight_decay': 0.01}}})
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        # No real managers: ModelManager would start a model server
+        for name in ('model_manager', 'trainer', 'training_manager', 'quantizer', 'fuser'):
+            setattr(app, name, mock.Mock())
+        app.register_blueprint(setup_api(app))
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        get_session_index(self.models_dir).close()
+        shutil.rmtree(self.models_dir)
+
+    def test_sessions_and_badges(self):
+        sessions = self.client.get('/api/training/sessions').get_json()['training_sessions']
+        self.assertEqual([s['session_id'] for s in sessions], ['run_a'])
+
+        with mock.patch('forgellm.api.routes.process_watch.is_active', return_value=False):
+            response = self.client.post('/api/training/sessions/batch-data',
+                                        json={'session_ids': ['run_a', 'missing']})
+        results = response.get_json()['results']
+        self.assertEqual(results['run_a']['training_loss'], '0.200')
+        self.assertEqual(results['run_a']['lr_decay_factor'], 0.1)
+        self.assertEqual(results['run_a']['weight_decay'], 0.01)
+        self.assertEqual(results['run_a']['max_seq_length'], 512)
+        self.assertFalse(results['missing']['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
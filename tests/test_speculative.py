@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Tests for speculative decoding with a draft model in the batch engine.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from mlx_lm.sample_utils import make_sampler, make_repetition_penalty
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+from forgellm.server.prompt_cache import PromptCacheStore
+from forgellm.server.speculative import check_draft_compatible, speculative_stats
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestSpeculativeDecoding(unittest.TestCase):
+    """Test cases for BatchEngine with a draft model."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.model_dir = build_tiny_model(os.path.join(cls.tmp_dir, "model"))
+        cls.other_dir = build_tiny_model(os.path.join(cls.tmp_dir, "other"), seed=1)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+        cls.same_draft, _ = load(cls.model_dir)
+        cls.other_draft, _ = load(cls.other_dir)
+        cls.prompts = [
+            cls.tokenizer.encode("the quick brown fox"),
+            cls.tokenizer.encode("hello world, hello world"),
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def _generate(self, draft_model, prompt, **kwargs):
+        engine = BatchEngine(self.model, self.tokenizer, draft_model=draft_model, num_draft_tokens=3)
+        engine.start()
+        try:
+            request = engine.submit(GenerationRequest(prompt, **kwargs))
+            tokens = list(request.tokens(timeout=30))
+            return tokens, request, engine.get_stats()
+        finally:
+            engine.stop()
+
+    def test_greedy_output_is_unchanged(self):
+        for prompt in self.prompts:
+            expected, request, _ = self._generate(None, prompt, max_tokens=20)
+            self.assertIsNone(request.get_speculative_stats())
+            for draft in (self.same_draft, self.other_draft):
+                tokens, request, stats = self._generate(draft, prompt, max_tokens=20)
+                self.assertEqual(tokens, expected)
+                self.assertGreater(stats['speculative_steps'], 0)
+
+    def test_seeded_sampling_is_unchanged(self):
+        def options():
+            return dict(max_tokens=20, seed=7, sampler=make_sampler(temp=1.0, top_p=0.9),
+                        logits_processors=[make_repetition_penalty(1.3)])
+
+        for prompt in self.prompts:
+            expected, _, _ = self._generate(None, prompt, **options())
+            for draft in (self.same_draft, self.other_draft):
+                tokens, _, _ = self._generate(draft, prompt, **options())
+                self.assertEqual(tokens, expected)
+
+    def test_matching_draft_is_always_accepted(self):
+        tokens, request, stats = self._generate(self.same_draft, self.prompts[0], max_tokens=17)
+        self.assertEqual(len(tokens), 17)
+        speculative = request.get_speculative_stats()
+        self.assertEqual(speculative['acceptance_rate'], 1.0)
+        # The first token comes from the prefill, the other 16 from 4 passes
+        self.assertEqual(speculative['tokens_per_pass'], 4.0)
+        self.assertEqual(stats['speculative_steps'], 4)
+
+        _, request, _ = self._generate(self.other_draft, self.prompts[0], max_tokens=17)
+        self.assertLess(request.get_speculative_stats()['acceptance_rate'], 1.0)
+
+    def test_batch_decodes_without_draft_and_caches_stay_valid(self):
+        expected = [self._generate(None, prompt, max_tokens=12)[0] for prompt in self.prompts]
+
+        store = PromptCacheStore()
+        engine = BatchEngine(self.model, self.tokenizer, prompt_cache=store, draft_model=self.other_draft)
+        engine.start()
+        try:
+            requests = [engine.submit(GenerationRequest(p, max_tokens=12, session_id=str(i)))
+                        for i, p in enumerate(self.prompts)]
+            self.assertEqual([list(r.tokens(timeout=30)) for r in requests], expected)
+
+            # A follow-up turn reuses the KV state left by speculative steps
+            follow_up = self.prompts[0] + expected[0] + self.tokenizer.encode(" dog", add_special_tokens=False)
+            reference, _, _ = self._generate(None, follow_up, max_tokens=8)
+            request = engine.submit(GenerationRequest(follow_up, max_tokens=8, session_id="0"))
+            self.assertEqual(list(request.tokens(timeout=30)), reference)
+            self.assertGreater(request.cached_tokens, 0)
+        finally:
+            engine.stop()
+
+    def test_draft_must_share_the_tokenizer(self):
+        draft = SimpleNamespace(vocab_size=self.tokenizer.vocab_size + 1)
+        with self.assertRaises(ValueError):
+            check_draft_compatible(self.tokenizer, draft)
+        self.assertIsNone(speculative_stats(0, 0, 0, 0, 0.0, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Tests for lazy imports and startup profiling of the entry points.
+"""
+
+import io
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.utils.startup_profile import FLAG, StartupProfiler, profile_startup_from_argv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Packages that only the code paths using them may import
+HEAVY_MODULES = ['mlx', 'mlx_lm', 'matplotlib', 'flask']
+
+
+def imported_modules(module: str):
+    """Heavy packages imported by a fresh interpreter importing a module."""
+    code = (f"import sys, json, {module}; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImports(unittest.TestCase):
+    """Entry points must not import the model or plotting stack up front."""
+
+    def test_server_does_not_import_mlx(self):
+        self.assertEqual(imported_modules('forgellm.server.main'), [])
+
+    def test_cli_does_not_import_mlx(self):
+        self.assertEqual(imported_modules('forgellm.cli.main'), [])
+
+    def test_package_exports_are_lazy(self):
+        code = ("import sys, forgellm.training as t; before = 'matplotlib' in sys.modules; "
+                "t.identify_best_checkpoints; print(before, 'matplotlib' in sys.modules)")
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'False False')
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """Test cases for the import profiler."""
+
+    def test_flag_is_removed_from_argv(self):
+        argv = ['forgellm', 'cli', '--help']
+        self.assertIsNone(profile_startup_from_argv(argv))
+        self.assertEqual(argv, ['forgellm', 'cli', '--help'])
+
+    def test_report_lists_imports(self):
+        sys.modules.pop('colorsys', None)
+        profiler = StartupProfiler().start()
+        try:
+            import colorsys  # noqa: F401
+        finally:
+            profiler.stop()
+        profiler.mark('imported')
+        self.assertIn('colorsys', profiler.modules)
+
+        out = io.StringIO()
+        profiler.report('done', file=out)
+        report = out.getvalue()
+        self.assertIn('Startup profile: done', report)
+        self.assertIn('imported', report)
+        self.assertIn('colorsys', report)
+
+        # Only reported once
+        profiler.report('again', file=out)
+        self.assertNotIn('again', out.getvalue())
+
+    def test_profiled_cli(self):
+        result = subprocess.run([sys.executable, '-m', 'forgellm', 'cli', '--help', FLAG],
+                                cwd=ROOT, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0)
+        self.assertIn('Startup profile: exit', result.stderr)
+        self.assertIn('forgellm.cli.main', result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Tests for stop sequences in the batch engine.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+try:
+    from mlx_lm import load
+    from tests.tiny_model import build_tiny_model
+    MLX_AVAILABLE = True
+except ImportError:
+    MLX_AVAILABLE = False
+
+from forgellm.server import stopping
+from forgellm.server.batch_engine import BatchEngine, GenerationRequest
+
+
+class CharDetokenizer:
+    """Streaming detokenizer of a vocabulary of strings."""
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+        self.text = ""
+
+    def add_token(self, token):
+        self.text += self.vocab[token]
+
+
+class TestStopMatcher(unittest.TestCase):
+    """Test cases for the incremental stop matcher."""
+
+    def setUp(self):
+        self.vocab = ["Hello", " there", "\n", "Hu", "man", ":", " Human", "!"]
+
+    def _feed(self, stops, tokens):
+        matcher = stopping.StopMatcher(CharDetokenizer(self.vocab), stops)
+        for i, token in enumerate(tokens):
+            if matcher.add(token):
+                return matcher, i
+        return matcher, None
+
+    def test_match_across_tokens(self):
+        matcher, index = self._feed(["\nHuman:"], [0, 1, 2, 3, 4, 5, 7])
+        self.assertEqual(index, 5)
+        self.assertEqual(matcher.match_offset, len("Hello there"))
+
+    def test_partial_match_is_held_back(self):
+        matcher, index = self._feed(["\nHuman:"], [0, 1, 2, 3])
+        self.assertIsNone(index)
+        self.assertEqual(matcher.safe_offset, len("Hello there"))
+        # The sequence is ruled out, the text is safe again
+        matcher.add(7)
+        self.assertEqual(matcher.safe_offset, matcher.text_length)
+
+    def test_match_inside_a_token(self):
+        matcher, index = self._feed(["Human:"], [0, 6, 5])
+        self.assertEqual(index, 2)
+        self.assertEqual(matcher.match_offset, len("Hello "))
+
+    def test_parse_stop(self):
+        self.assertEqual(stopping.parse_stop(None), [])
+        self.assertEqual(stopping.parse_stop("###"), ["###"])
+        self.assertEqual(stopping.parse_stop(["a", ""]), ["a"])
+        for value in (3, [1], ["x"] * (stopping.MAX_STOP_SEQUENCES + 1)):
+            with self.assertRaises(ValueError):
+                stopping.parse_stop(value)
+
+
+@unittest.skipUnless(MLX_AVAILABLE, "MLX is not available")
+class TestEngineStops(unittest.TestCase):
+    """Test cases for stop sequences in generation requests."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model_dir = tempfile.mkdtemp()
+        build_tiny_model(cls.model_dir)
+        cls.model, cls.tokenizer = load(cls.model_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.engine = BatchEngine(self.model, self.tokenizer, max_batch_size=4)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+
+    def _generate(self, stop=None, max_tokens=60):
+        """Greedy generation; returns the request, its streamed text and its final text."""
+        request = self.engine.submit(GenerationRequest(self.tokenizer.encode("hello world"),
+                                                       max_tokens=max_tokens, stop=stop))
+        detokenizer = stopping.detokenizer_for(self.tokenizer, request)
+        streamed = []
+        for token in request.tokens(timeout=30):
+            detokenizer.add_token(token)
+            streamed.append(detokenizer.last_segment)
+        detokenizer.finalize()
+        streamed.append(detokenizer.last_segment)
+        return request, "".join(streamed), detokenizer.text
+
+    def test_text_stop_ends_generation(self):
+        reference, _, full = self._generate()
+        self.assertEqual(reference.finish_reason, 'length')
+        stop = full[20:24]
+        expected = full[:full.find(stop)]
+
+        request, streamed, text = self._generate([stop])
+        self.assertEqual(request.finish_reason, 'stop')
+        self.assertEqual(request.stop_sequence, stop)
+        self.assertEqual(text, expected)
+        self.assertEqual(streamed, expected)
+        self.assertEqual(stopping.completion_text(self.tokenizer, request), expected)
+        self.assertLess(len(request.generated_tokens), len(reference.generated_tokens))
+
+    def test_unmatched_stop_keeps_text(self):
+        _, _, full = self._generate()
+        # Its start is in the text, but the sequence is never completed
+        request, streamed, text = self._generate([full[30:33] + "\x00\x00"])
+        self.assertEqual(request.finish_reason, 'length')
+        self.assertEqual(text, full)
+        self.assertEqual(streamed, full)
+
+    def test_single_token_stop(self):
+        reference, _, _ = self._generate()
+        token = reference.generated_tokens[5]
+        stop = self.tokenizer.decode([token])
+        if self.tokenizer.encode(stop, add_special_tokens=False) != [token]:
+            self.skipTest("Token does not round-trip")
+        request, _, _ = self._generate([stop])
+        self.assertEqual(request.finish_reason, 'stop')
+        self.assertIn(token, request.stop_token_ids)
+        self.assertNotIn(token, request.output_tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
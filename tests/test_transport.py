@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Tests for the keep-alive, Unix socket and status event transport of the model server.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import http.client
+import unittest
+from http.server import ThreadingHTTPServer
+
+# Add parent directory to path to import from forgellm
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from forgellm.server import main as server
+from forgellm.server.transport import UnixHTTPServer
+from forgellm.models.server_client import ServerClient, iter_lines
+
+
+class TestTransport(unittest.TestCase):
+    """Test cases for the model server transport."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.socket_path = os.path.join(cls.tmp_dir, 'server.sock')
+        cls.servers = [ThreadingHTTPServer(('localhost', 0), server.ModelHandler),
+                       UnixHTTPServer(cls.socket_path, server.ModelHandler)]
+        for httpd in cls.servers:
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        cls.port = cls.servers[0].server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        for httpd in cls.servers:
+            httpd.shutdown()
+            httpd.server_close()
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_keep_alive(self):
+        conn = http.client.HTTPConnection('localhost', self.port, timeout=5)
+        for path in ('/api/model/status', '/not-found', '/api/model/status'):
+            conn.request('GET', path)
+            response = conn.getresponse()
+            body = response.read()
+            self.assertEqual(len(body), int(response.headers['Content-Length']))
+            self.assertFalse(response.will_close)
+        conn.close()
+
+    def test_unix_socket_client_reuses_connection(self):
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+        client = ServerClient('http://unused:1', socket_path=self.socket_path)
+        for _ in range(3):
+            response = client.get('/api/model/status', timeout=5)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('status_version', response.json())
+        response = client.post('/api/model/load', json={}, timeout=5)
+        self.assertEqual(response.status_code, 400)
+        pool = client.session.get_adapter('http://localhost').get_connection('http://localhost')
+        self.assertEqual(pool.num_connections, 1)
+        client.close()
+
+    def test_status_events_are_pushed(self):
+        client = ServerClient(f'http://localhost:{self.port}')
+        with client.get('/api/model/events', stream=True, timeout=5) as response:
+            lines = iter_lines(response)
+            first = json.loads(next(lines))
+            self.assertIn('loaded', first)
+
+            start = time.time()
+            version = server.STATUS_EVENTS.notify()
+            event = json.loads(next(lines))
+            self.assertEqual(event['status_version'], version)
+            self.assertLess(time.time() - start, server.STATUS_EVENT_INTERVAL)
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Helper for building a tiny random MLX model on disk for server tests.
+
+The model is a two-layer Llama with a byte-level BPE tokenizer trained on a
+single sentence, so it loads in well under a second and needs no network.
+"""
+
+import os
+import json
+
+
+def build_tiny_model(output_dir, seed=0):
+    """Write a tiny Llama model and tokenizer to output_dir and return the path."""
+    import mlx.core as mx
+    from mlx.utils import tree_flatten
+    from mlx_lm.models import llama
+    from tokenizers import Tokenizer, models, pre_tokenizers, decoders, trainers
+    from transformers import PreTrainedTokenizerFast
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = Tokenizer(models.BPE(unk_token="<unk>"))
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=300,
+        special_tokens=["<unk>", "<s>", "</s>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    )
+    tokenizer.train_from_iterator(["hello world the quick brown fox jumps over the lazy dog"] * 10, trainer)
+    PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, bos_token="<s>", eos_token="</s>", unk_token="<unk>"
+    ).save_pretrained(output_dir)
+
+    config = {
+        "model_type": "llama",
+        "hidden_size": 32,
+        "num_hidden_layers": 2,
+        "intermediate_size": 64,
+        "num_attention_heads": 4,
+        "num_key_value_heads": 2,
+        "rms_norm_eps": 1e-5,
+        "vocab_size": tokenizer.get_vocab_size(),
+        "tie_word_embeddings": False,
+        "rope_theta": 10000.0
+    }
+    mx.random.seed(seed)
+    model = llama.Model(llama.ModelArgs.from_dict(config))
+    mx.eval(model.parameters())
+    mx.save_safetensors(os.path.join(output_dir, "model.safetensors"), dict(tree_flatten(model.parameters())))
+    with open(os.path.join(output_dir, "config.json"), "w") as f:
+        json.dump(config, f)
+
+    return output_dir
+
+
+def build_tiny_adapter(model_dir, output_dir, checkpoints=(100, 200), rank=4, fine_tune_type="lora"):
+    """
+    Write random LoRA checkpoints for a tiny model to output_dir.
+
+    Every checkpoint is saved as ``<iteration>_adapters.safetensors`` and the
+    last one also as ``adapters.safetensors``, like mlx_lm training does.
+    """
+    import mlx.core as mx
+    from mlx.utils import tree_flatten
+    from mlx_lm import load
+    from mlx_lm.tuner.utils import linear_to_lora_layers
+
+    os.makedirs(output_dir, exist_ok=True)
+    config = {
+        "fine_tune_type": fine_tune_type,
+        "num_layers": 2,
+        "lora_parameters": {"rank": rank, "scale": 10.0, "dropout": 0.0}
+    }
+    with open(os.path.join(output_dir, "adapter_config.json"), "w") as f:
+        json.dump(config, f)
+
+    model, _ = load(model_dir)
+    linear_to_lora_layers(model, config["num_layers"], config["lora_parameters"],
+                          use_dora=(fine_tune_type == "dora"))
+    for i, iteration in enumerate(checkpoints):
+        mx.random.seed(1000 + i)
+        weights = {}
+        for name, value in tree_flatten(model.parameters()):
+            if name.rsplit(".", 1)[-1] in ("lora_a", "lora_b", "m"):
+                weights[name] = mx.random.normal(value.shape) * 0.5
+        mx.save_safetensors(os.path.join(output_dir, f"{iteration:07d}_adapters.safetensors"), weights)
+    mx.save_safetensors(os.path.join(output_dir, "adapters.safetensors"), weights)
+    return output_dir